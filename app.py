@@ -1,39 +1,98 @@
 import os
+import hmac
 import json
 import logging
+import threading
+import uuid
 from datetime import datetime, timezone
 from flask import Flask, request, jsonify, g
 from typing import cast
 from twilio.twiml.voice_response import VoiceResponse, Dial
-from twilio.rest import Client
-from twilio.jwt.access_token import AccessToken
-from twilio.jwt.access_token.grants import VoiceGrant
 from dotenv import load_dotenv
 from flasgger import Swagger
 from flask_cors import CORS
 
 from core.config import Config
-from core.database import db, init_db
+from core.logging_setup import setup_logging, set_correlation_id, reset_correlation_id
+from core.twilio_client import get_twilio_client, twilio_api_url
+from core.apispec import build_spec, serve_prebuilt_spec
+from core.profiling import init_profiling, get_profile_store
+from core import memory
+from core.metrics import init_metrics, start_metrics_flusher, external_call, collect as collect_metrics
+from core.database import db, init_db, create_tables, read_only, WRITE_TOKEN_HEADER
 from core.phone_utils import get_state_from_phone, get_caller_id_for_number
+from core.caller_id_pool import (
+    get_caller_id_pool, get_own_numbers_normalized, load_caller_id_pool, start_caller_id_pool
+)
 from core.alerts import init_alerts, get_alert_manager, CallAlert
 from core.attio import get_attio_client
+from core.lead_cache import get_lead_cache
+from core.voice_tokens import get_voice_token_cache
+from core.lead_context import init_lead_prewarmer, get_lead_prewarmer, get_lead_context_cache
+from core import attio_mirror, contact_index, dialer
+from core.dialer import build_outbound_call_params
+from core.call_events import (
+    record_event, parse_task_attributes, task_call_sid, start_call_projector, get_call_projector,
+    get_journal_stats, LeaseHeldError, insert_spooled_events, project_inline
+)
+from core.webhook_spool import start_spool_replayer
+from core.voice_routing import VoiceBudget, resolve_agent_identities, get_voice_stats
+from core.attio_outbox import enqueue_note, build_resumo_note, make_idempotency_key, get_outbox_stats, start_outbox_worker
 from models.call import Call
 from auth.routes import auth_bp
 from auth.decorators import jwt_required, validate_twilio_signature
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (queued, written by a background thread)
+setup_logging(level=Config.LOG_LEVEL, category_levels=Config.LOG_LEVELS, fmt=Config.LOG_FORMAT,
+              debug_sample_rate=Config.LOG_DEBUG_SAMPLE_RATE, queue_size=Config.LOG_QUEUE_SIZE)
 logger = logging.getLogger(__name__)
 
+# Per-category loggers (levels via LOG_LEVELS, e.g. "app.inbound=DEBUG")
+startup_log = logging.getLogger('app.startup')
+webhook_log = logging.getLogger('app.webhook')
+inbound_log = logging.getLogger('app.inbound')
+outbound_log = logging.getLogger('app.outbound')
+amd_log = logging.getLogger('app.amd')
+recording_log = logging.getLogger('app.recording')
+taskrouter_log = logging.getLogger('app.taskrouter')
+attio_log = logging.getLogger('app.attio')
+dialer_log = logging.getLogger('app.dialer')
+token_log = logging.getLogger('app.token')
+
 load_dotenv()
 
-print("[STARTUP] Creating Flask app...")
+startup_log.info("[STARTUP] Creating Flask app...")
 app = Flask(__name__)
 app.config.from_object(Config)
 
 # Enable CORS for all routes (allows Lovable frontend to access API)
-CORS(app)
-print("[STARTUP] CORS enabled")
+# The write token must be readable by the frontend, which echoes it (read-your-writes)
+CORS(app, expose_headers=[WRITE_TOKEN_HEADER])
+startup_log.info("[STARTUP] CORS enabled")
+
+
+# Correlation ID on every log line of a request: CallSid for Twilio webhooks,
+# else the caller's X-Request-ID, else a new one (echoed back as X-Request-ID)
+@app.before_request
+def _bind_correlation_id():
+    correlation_id = (request.values.get('CallSid') or request.headers.get('X-Request-ID')
+                      or uuid.uuid4().hex[:16])
+    g.correlation_id = correlation_id
+    g.correlation_token = set_correlation_id(correlation_id)
+
+
+@app.after_request
+def _add_request_id_header(response):
+    if 'correlation_id' in g:
+        response.headers['X-Request-ID'] = g.correlation_id
+    return response
+
+
+@app.teardown_request
+def _unbind_correlation_id(exc):
+    token = g.pop('correlation_token', None)
+    if token is not None:
+        reset_correlation_id(token)
 
 # ============== HEALTH CHECK (registered first!) ==============
 @app.route("/health", methods=['GET'])
@@ -41,7 +100,24 @@ def health():
     """Health check - always responds even if other services fail"""
     return jsonify({"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}), 200
 
-print("[STARTUP] Health endpoint registered")
+startup_log.info("[STARTUP] Health endpoint registered")
+
+# Request latency / SQL / in-flight metrics (GET /metrics)
+if init_metrics(app):
+    startup_log.info("[STARTUP] Metrics enabled")
+# Per-route SQL budgets and on-demand profiles (GET /admin/profiles)
+init_profiling(app)
+
+
+@app.route("/metrics", methods=['GET'])
+def metrics():
+    """Prometheus metrics of all workers on this host (Bearer METRICS_TOKEN if set)"""
+    if not Config.METRICS_ENABLED:
+        return jsonify({"error": "Metrics disabled"}), 404
+    if Config.METRICS_TOKEN and not hmac.compare_digest(
+            request.headers.get('Authorization', ''), f"Bearer {Config.METRICS_TOKEN}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return collect_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
 
 # Swagger config with JWT auth
 swagger_config = {
@@ -77,32 +153,147 @@ swagger_template = {
     "security": [{"Bearer": []}]
 }
 
-swagger = Swagger(app, config=swagger_config, template=swagger_template)
+# APIDOCS_MODE: static = spec prebuilt once and served from memory (gzip + ETag),
+# dynamic = Flasgger builds it per request, off = no API docs
+if Config.APIDOCS_MODE != 'off':
+    swagger = Swagger(app, config=swagger_config, template=swagger_template)
+    if Config.APIDOCS_MODE == 'static':
+        serve_prebuilt_spec(app, Config.APIDOCS_SPEC_PATH)
+    startup_log.info(f"[STARTUP] API docs enabled ({Config.APIDOCS_MODE})")
 
 # Initialize database (with error handling)
-print("[STARTUP] Initializing database...")
-init_db(app)
+startup_log.info("[STARTUP] Initializing database...")
+init_db(app, create_tables_on_startup=not Config.LAZY_STARTUP)
+
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create missing tables (used when LAZY_STARTUP skips create_all at import)"""
+    create_tables(app)
+
+
+@app.cli.command('build-apispec')
+def build_apispec_command():
+    """Write the prebuilt OpenAPI spec served when APIDOCS_MODE=static"""
+    spec = build_spec(app)
+    spec.save(Config.APIDOCS_SPEC_PATH)
+    print(f"[APIDOCS] Wrote {Config.APIDOCS_SPEC_PATH} ({len(spec.body)} bytes, {len(spec.gzipped)} gzipped)")
 
 # Register auth blueprint
 app.register_blueprint(auth_bp, url_prefix='/auth')
-print("[STARTUP] Auth blueprint registered")
+startup_log.info("[STARTUP] Auth blueprint registered")
+
+# Twilio client is created on first use (core.twilio_client.get_twilio_client)
+_services_started = False
+_services_lock = threading.Lock()
+
+
+def start_background_services():
+    """
+    Alerts and background workers (once per process).
+
+    Eager startup runs this at import. With LAZY_STARTUP (set by
+    gunicorn.conf.py when preloading) it runs in each worker after fork -
+    threads do not survive fork - or on the first request.
+    """
+    global _services_started
+    with _services_lock:
+        if _services_started:
+            return
+        _services_started = True
+
+    # Metrics snapshots for /metrics on other workers (written only while scraped)
+    try:
+        if start_metrics_flusher():
+            startup_log.info("[STARTUP] Metrics snapshot flusher started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Metrics flusher failed: {e}")
+
+    # RSS watchdog (logs growth; recycles the gunicorn worker above MEMORY_RECYCLE_RSS_MB)
+    try:
+        if memory.start_memory_watchdog():
+            startup_log.info("[STARTUP] Memory watchdog started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Memory watchdog failed: {e}")
+
+    # Caller ID pool (loaded off the request path; static caller IDs until then)
+    try:
+        if start_caller_id_pool(app):
+            startup_log.info("[STARTUP] Caller ID pool loader started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Caller ID pool loader failed: {e}")
+
+    # Initialize alerts (Slack only)
+    try:
+        init_alerts()
+        startup_log.info("[STARTUP] Alerts initialized")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Alerts failed: {e}")
+
+    # Attio local mirror (background sync, only if ATTIO_MIRROR_ENABLED)
+    try:
+        if attio_mirror.start_mirror_sync(app):
+            startup_log.info("[STARTUP] Attio mirror sync started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Attio mirror sync failed: {e}")
+
+    # Attio note outbox (background flush to Attio)
+    try:
+        if start_outbox_worker(app):
+            startup_log.info("[STARTUP] Attio note outbox worker started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Attio note outbox failed: {e}")
+
+    # Lead context pre-warming for inbound calls
+    try:
+        if init_lead_prewarmer(app):
+            startup_log.info("[STARTUP] Lead context prewarmer initialized")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Lead context prewarmer failed: {e}")
+
+    # Contact typeahead index (background refresh, only if CONTACT_INDEX_ENABLED)
+    try:
+        if contact_index.start_contact_index(app):
+            startup_log.info("[STARTUP] Contact search index refresh started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Contact search index failed: {e}")
+
+    # Webhook journal projection (async: background thread; inline: in the webhook)
+    try:
+        # _calculate_contact_tracking is defined below; resolved when the projection creates a call
+        if start_call_projector(app, track_call=lambda call: _calculate_contact_tracking(call)):
+            startup_log.info("[STARTUP] Call event projector started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Call event projector failed: {e}")
+
+    # Webhook disk spool replayer (journal writes made while the database was down)
+    try:
+        after_replay = project_inline if Config.CALL_EVENTS_PROJECTION == 'inline' else None
+        if start_spool_replayer(app, insert_spooled_events, after_replay=after_replay):
+            startup_log.info("[STARTUP] Webhook spool replayer started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Webhook spool replayer failed: {e}")
+
+    # Campaign dialer (only if DIALER_ENABLED)
+    try:
+        # _calculate_contact_tracking is defined below; resolved when each call is placed
+        if Config.DIALER_ENABLED and dialer.start_dialer(
+            app, get_twilio_client(), track_call=lambda call: _calculate_contact_tracking(call)
+        ):
+            startup_log.info("[STARTUP] Campaign dialer started")
+    except Exception as e:
+        startup_log.error(f"[STARTUP ERROR] Campaign dialer failed: {e}")
 
-# Twilio client
-try:
-    client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
-    print("[STARTUP] Twilio client initialized")
-except Exception as e:
-    print(f"[STARTUP ERROR] Twilio client failed: {e}")
-    client = None
 
-# Initialize alerts (Slack only)
-try:
-    init_alerts()
-    print("[STARTUP] Alerts initialized")
-except Exception as e:
-    print(f"[STARTUP ERROR] Alerts failed: {e}")
+if Config.LAZY_STARTUP:
+    @app.before_request
+    def _start_services_on_first_request():
+        if not _services_started:
+            start_background_services()
+else:
+    start_background_services()
 
-print("[STARTUP] App initialization complete")
+startup_log.info("[STARTUP] App initialization complete")
 
 
 # ============== HELPER FUNCTIONS ==============
@@ -114,8 +305,7 @@ def _calculate_contact_tracking(call):
 
     Contact number counts ALL contacts with a lead (both inbound and outbound).
     """
-    from core.phone_utils import get_contact_period, get_lead_phone_for_call
-    from datetime import date
+    from core.phone_utils import get_contact_period, get_lead_phone_for_call, get_local_date
     from sqlalchemy import or_, and_
 
     direction = call.direction or 'outbound'
@@ -130,19 +320,12 @@ def _calculate_contact_tracking(call):
 
     # Normaliza o número do lead (últimos 10 dígitos)
     lead_phone_normalized = ''.join(c for c in lead_phone if c.isdigit())[-10:]
-    today = date.today()
-
-    # Lista de números Twilio (não devem ser considerados como leads)
-    twilio_numbers = [
-        Config.TWILIO_NUMBER,
-        Config.CALLER_ID_FL,
-        Config.CALLER_ID_TX,
-        Config.CALLER_ID_DEFAULT
-    ]
-    twilio_numbers_normalized = [
-        ''.join(c for c in n if c.isdigit())[-10:]
-        for n in twilio_numbers if n
-    ]
+    # "Hoje" é o dia local do lead (não o dia UTC do servidor)
+    started_at = call.started_at or datetime.now(timezone.utc)
+    today = get_local_date(started_at, call.lead_state)
+
+    # Números Twilio (caller IDs fixos + pool) não devem ser considerados como leads
+    twilio_numbers_normalized = get_own_numbers_normalized()
 
     # Se o "lead" é na verdade um número Twilio, não calcular tracking
     if lead_phone_normalized in twilio_numbers_normalized:
@@ -185,7 +368,10 @@ def _calculate_contact_tracking(call):
     call.contact_number = len(filtered_calls) + 1
 
     # 2. Contact number today
-    today_calls = [c for c in filtered_calls if c.started_at and c.started_at.date() == today]
+    today_calls = [
+        c for c in filtered_calls
+        if c.started_at and get_local_date(c.started_at, call.lead_state) == today
+    ]
     call.contact_number_today = len(today_calls) + 1
 
     # 3. Previously answered (já atendeu alguma vez?)
@@ -195,92 +381,37 @@ def _calculate_contact_tracking(call):
     call.contact_period = get_contact_period(call.started_at, call.lead_state)
 
 
-def _sanitize_disposition(call):
-    """
-    Sanitize and fix disposition based on call data.
-
-    REGRA CRÍTICA para inbound calls:
-    - Se worker_name/worker_email está NULL = NINGUÉM ATENDEU
-    - Duration > 0 sem worker = tempo que ficou tocando/na fila, NÃO é "answered"
-
-    Lógica correta:
-    1. Se worker atendeu (worker_name tem valor) → answered
-    2. Se ninguém atendeu mas tem voicemail recording → voicemail
-    3. Se ninguém atendeu e sem voicemail → no-answer
-    4. busy, failed, canceled → manter como está
-    """
-    # Para inbound calls via Lovable: worker_name NULL = ninguém atendeu
-    if call.direction == 'inbound' and not call.worker_name and not call.worker_email:
-        # NINGUÉM ATENDEU esta chamada inbound
-        if call.disposition == 'answered':
-            # ERRO: marcada como answered mas worker é NULL
-            if call.recording_url and 'voicemail' in call.recording_url.lower():
-                call.disposition = 'voicemail'
-                print(f"[SANITIZE] Fixed: inbound 'answered' with NULL worker + voicemail → voicemail")
-            else:
-                call.disposition = 'no-answer'
-                call.answered_at = None  # Remove answered_at incorreto
-                print(f"[SANITIZE] Fixed: inbound 'answered' with NULL worker → no-answer")
-            return
-        elif call.disposition in ('voicemail', 'no-answer', 'busy', 'failed', 'canceled'):
-            # Já está correto
-            return
-        elif call.disposition is None or call.disposition == '':
-            # NULL disposition em inbound sem worker
-            call.disposition = 'no-answer'
-            call.answered_at = None
-            print(f"[SANITIZE] Fixed: inbound NULL disposition with NULL worker → no-answer")
-            return
-
-    # Para outbound calls ou inbound com worker: lógica antiga
-    valid_dispositions = ('answered', 'voicemail', 'busy', 'failed', 'canceled')
-    if call.disposition in valid_dispositions:
-        # Não mexe se já tem disposition válida
-        return
-
-    if call.disposition == 'no-answer':
-        # no-answer pode estar correto, não mexe
-        return
-
-    # Disposition é NULL ou inválido - determinar baseado na duração
-    if call.duration and call.duration > 0:
-        # Teve duração > 0, provavelmente foi atendida (só para outbound)
-        if call.direction == 'outbound':
-            call.disposition = 'answered'
-            if not call.answered_at and call.started_at:
-                call.answered_at = call.started_at
-            print(f"[SANITIZE] Fixed NULL disposition (outbound) with duration {call.duration}s → answered")
-        else:
-            # Inbound com duration mas sem worker já foi tratado acima
-            call.disposition = 'no-answer'
-            print(f"[SANITIZE] Fixed NULL disposition (inbound, no worker) with duration {call.duration}s → no-answer")
-    else:
-        # Duração 0 ou NULL, não foi atendida
-        call.disposition = 'no-answer'
-        print(f"[SANITIZE] Fixed NULL disposition with no duration → no-answer")
+def _journal(source: str, deadline=None, **fields):
+    """Append this webhook's payload (+ fields) to call_events (folded into calls by core.call_events)"""
+    form = request.form.to_dict()
+    form.update(fields)
+    return record_event(source, form, dedupe_key=request.headers.get('I-Twilio-Idempotency-Token'),
+                        deadline=deadline)
 
 
-def _calculate_duration(call):
-    """
-    Calculate call duration based on timestamps.
-    For answered calls: ended_at - answered_at (talk time)
-    For unanswered calls: ended_at - started_at (total time)
-    Returns 0 if timestamps are missing or result is negative.
-    """
-    if not call.ended_at:
-        return 0
+def _save_voice_call(call_sid: str, **fields) -> bool:
+    """Insert the /voice call row with its contact tracking (False if it already exists)"""
+    if Call.query.filter_by(call_sid=call_sid).first():
+        return False
+    call = Call(call_sid=call_sid, **fields)
+    db.session.add(call)
+    _calculate_contact_tracking(call)
+    db.session.commit()
+    return True
 
-    if call.answered_at:
-        # Answered call: duration = talk time
-        duration = int((call.ended_at - call.answered_at).total_seconds())
-    elif call.started_at:
-        # Unanswered call: duration = total time
-        duration = int((call.ended_at - call.started_at).total_seconds())
-    else:
-        return 0
 
-    # Never return negative values
-    return max(duration, 0)
+def _voicemail_twiml(response: VoiceResponse) -> None:
+    """Ninguém disponível: deixa mensagem"""
+    response.say(
+        "We're sorry, no one is available to take your call. Please leave a message after the beep.",
+        language='en-US',
+        voice='Polly.Joanna'
+    )
+    response.record(
+        max_length=120,
+        action=f"{Config.BASE_URL}/voicemail_recorded",
+        recording_status_callback=f"{Config.BASE_URL}/recording_status"
+    )
 
 
 # ============== TWILIO WEBHOOKS (with signature validation) ==============
@@ -292,10 +423,15 @@ def voice():
     Handle voice calls:
     - Outbound from browser (Lovable): Dial to the destination number
     - Inbound to Twilio number: Play disclaimer and enqueue
+
+    Database work has VOICE_DEADLINE_MS: past it the call row is created by
+    the journal projection and Lovable agents come from the cached list.
     """
     call_sid = request.form.get('CallSid', '')
     from_number = request.form.get('From', '')
     to_number = request.form.get('To', '')
+    budget = VoiceBudget(call_sid, Config.VOICE_DEADLINE_MS / 1000)
+    journal_fields = {}
 
     # Check if this is an outbound call from browser (client:identity)
     # Browser calls have From starting with "client:"
@@ -305,7 +441,7 @@ def voice():
 
     if is_browser_call:
         # ========== OUTBOUND CALL FROM BROWSER ==========
-        print(f"[BROWSER CALL] From: {from_number}, To: {to_number}")
+        inbound_log.info(f"[BROWSER CALL] From: {from_number}, To: {to_number}")
 
         # Get the destination number and worker info from params
         dest_number = request.form.get('To', '')
@@ -316,25 +452,21 @@ def voice():
             # Select Caller ID based on destination state
             caller_id = get_caller_id_for_number(dest_number)
             lead_state = get_state_from_phone(dest_number)
+            journal_fields['SelectedCallerId'] = caller_id  # The projection creates the row if the save is skipped
 
-            print(f"[BROWSER CALL] Dialing {dest_number} with Caller ID {caller_id} (State: {lead_state}) - Worker: {worker_email}")
+            inbound_log.info(f"[BROWSER CALL] Dialing {dest_number} with Caller ID {caller_id} (State: {lead_state}) - Worker: {worker_email}")
 
             # Save call to database
-            existing_call = Call.query.filter_by(call_sid=call_sid).first()
-            if not existing_call:
-                call = Call(
-                    call_sid=call_sid,
-                    from_number=caller_id,
-                    to_number=dest_number,
-                    lead_state=lead_state,
-                    direction='outbound',
-                    worker_email=worker_email,
-                    worker_name=worker_name,
-                    started_at=datetime.now(timezone.utc)
-                )
-                db.session.add(call)
-                _calculate_contact_tracking(call)
-                db.session.commit()
+            budget.run(
+                'save_call', _save_voice_call, call_sid,
+                from_number=caller_id,
+                to_number=dest_number,
+                lead_state=lead_state,
+                direction='outbound',
+                worker_email=worker_email,
+                worker_name=worker_name,
+                started_at=datetime.now(timezone.utc)
+            )
 
             # Dial the destination number with AMD (Answering Machine Detection)
             dial = cast(Dial, response.dial(
@@ -358,40 +490,49 @@ def voice():
     else:
         # ========== INBOUND CALL ==========
         direction = request.form.get('Direction', 'inbound')
+        lead_state = get_state_from_phone(from_number)
+        caller_city = request.form.get('FromCity', '')
 
-        # Save call to database
-        existing_call = Call.query.filter_by(call_sid=call_sid).first()
-        if not existing_call:
-            lead_state = get_state_from_phone(from_number)
-            caller_city = request.form.get('FromCity', '')
-            call = Call(
+        # Save call to database (None = skipped: the projection creates it)
+        created = budget.run(
+            'save_call', _save_voice_call, call_sid,
+            from_number=from_number,
+            to_number=to_number,
+            lead_state=lead_state,
+            direction=direction,
+            caller_city=caller_city,
+            started_at=datetime.now(timezone.utc)
+        )
+        if created is not False:
+            inbound_log.info(f"[INBOUND] New call {call_sid} from {from_number} ({caller_city}) - State: {lead_state}")
+
+            # Send "Incoming Call" alert
+            alert_manager = get_alert_manager()
+            alert = CallAlert(
                 call_sid=call_sid,
                 from_number=from_number,
                 to_number=to_number,
+                status='ringing',
+                duration=0,
                 lead_state=lead_state,
-                direction=direction,
-                caller_city=caller_city,
-                started_at=datetime.now(timezone.utc)
+                direction='inbound',
+                caller_city=caller_city
             )
-            db.session.add(call)
-            _calculate_contact_tracking(call)
-            db.session.commit()
-            print(f"[INBOUND] New call {call_sid} from {from_number} ({caller_city}) - State: {lead_state}")
 
-            # Send "Incoming Call" alert
-            alert_manager = get_alert_manager()
-            if alert_manager:
-                alert = CallAlert(
-                    call_sid=call_sid,
-                    from_number=from_number,
-                    to_number=to_number,
-                    status='ringing',
-                    duration=0,
-                    lead_state=lead_state,
-                    direction='inbound',
-                    caller_city=caller_city
-                )
-                alert_manager.notify_call_status(alert)
+            # Resolve lead + history while it rings; the alert goes out with the lead name
+            prewarmer = get_lead_prewarmer()
+            if prewarmer:
+                def _send_ringing_alert(context, alert=alert):
+                    lead = context.get('lead') or {}
+                    alert.lead_name = lead.get('name') or None
+                    if alert_manager:
+                        alert_manager.notify_call_status(alert)
+
+                prewarmer.prewarm(call_sid, from_number, on_ready=_send_ringing_alert)
+            elif alert_manager:
+                # Slack fora da request: o TwiML não espera o webhook
+                threading.Thread(target=alert_manager.notify_call_status, args=(alert,),
+                                 name='voice-ringing-alert', daemon=True).start()
 
         response.say(
             "This call is being recorded for your security and quality assurance.",
@@ -404,33 +545,29 @@ def voice():
 
         if use_lovable:
             # ===== LOVABLE: Dial para todos os SDRs conectados =====
-            from models.user import User
-
-            # Busca todos os usuários ativos
-            active_users = User.query.filter_by(is_active=True).all()
-
-            # Gera identidades dos clientes (mesmo formato do /token)
-            client_identities = []
-            for user in active_users:
-                identity = ''.join(c for c in user.email if c.isalnum() or c in '_-')
-                client_identities.append(identity)
-
-            print(f"[INBOUND] Dialing to Lovable clients: {client_identities}")
+            # Identidades dos usuários ativos (mesmo formato do /token); em cache se o banco não respondeu
+            client_identities = resolve_agent_identities(budget)
 
-            # Dial para todos os clientes - primeiro a atender ganha
-            dial = cast(Dial, response.dial(
-                timeout=30,
-                action=f"{Config.BASE_URL}/inbound_status",
-                record='record-from-answer-dual',
-                recording_status_callback=f"{Config.BASE_URL}/recording_status",
-                recording_status_callback_event='completed'
-            ))
-
-            for identity in client_identities:
-                # Pass parent call SID so client can use it for hold
-                client_elem = dial.client(identity)
-                if client_elem is not None:
-                    client_elem.parameter(name='ParentCallSid', value=call_sid)  # type: ignore[union-attr]
+            if client_identities is None:
+                inbound_log.warning(f"[INBOUND] No agent list available for {call_sid} - sending to voicemail")
+                _voicemail_twiml(response)
+            else:
+                inbound_log.info(f"[INBOUND] Dialing to Lovable clients: {client_identities}")
+
+                # Dial para todos os clientes - primeiro a atender ganha
+                dial = cast(Dial, response.dial(
+                    timeout=30,
+                    action=f"{Config.BASE_URL}/inbound_status",
+                    record='record-from-answer-dual',
+                    recording_status_callback=f"{Config.BASE_URL}/recording_status",
+                    recording_status_callback_event='completed'
+                ))
+
+                for identity in client_identities:
+                    # Pass parent call SID so client can use it for hold
+                    client_elem = dial.client(identity)
+                    if client_elem is not None:
+                        client_elem.parameter(name='ParentCallSid', value=call_sid)  # type: ignore[union-attr]
 
         else:
             # ===== FLEX: Enqueue para TaskRouter =====
@@ -440,6 +577,15 @@ def voice():
                 wait_url=f"{Config.BASE_URL}/wait"
             )
 
+    if call_sid:
+        try:
+            _journal('voice', deadline=budget.journal_deadline(), **journal_fields)
+        except Exception as e:
+            # Spool disabled and the database down: the TwiML still goes out
+            db.session.rollback()
+            budget.skip('journal', 'error', f"{type(e).__name__}: {e}")
+
+    budget.finish()
     return str(response), 200, {'Content-Type': 'application/xml'}
 
 
@@ -461,34 +607,17 @@ def wait():
 def amd_callback():
     """
     Callback dedicado para AMD (Answering Machine Detection).
-    Recebe o resultado do AMD e atualiza a chamada.
+    Registra o resultado no journal; a projeção marca a chamada como voicemail.
     """
     call_sid = request.form.get('CallSid', '')
     parent_call_sid = request.form.get('ParentCallSid', '')
     answered_by = request.form.get('AnsweredBy', '')
     machine_detection_duration = request.form.get('MachineDetectionDuration', '0')
 
-    print(f"[AMD CALLBACK] CallSid={call_sid}, ParentSid={parent_call_sid}, AnsweredBy={answered_by}, Duration={machine_detection_duration}ms")
-
-    # Usa o ParentCallSid para encontrar a chamada pai (outbound)
-    target_call_sid = parent_call_sid if parent_call_sid else call_sid
+    amd_log.info(f"[AMD CALLBACK] CallSid={call_sid}, ParentSid={parent_call_sid}, AnsweredBy={answered_by}, Duration={machine_detection_duration}ms")
 
-    call = Call.query.filter_by(call_sid=target_call_sid).first()
-    if not call:
-        print(f"[AMD CALLBACK] Call {target_call_sid} not found")
-        return '', 204
-
-    # Tipos de máquina/voicemail
-    machine_types = ['machine_start', 'machine_end_beep', 'machine_end_silence', 'machine_end_other', 'fax']
-
-    if answered_by in machine_types:
-        call.disposition = 'voicemail'
-        db.session.commit()
-        print(f"[AMD CALLBACK] Call {target_call_sid} marked as voicemail (AnsweredBy: {answered_by})")
-    elif answered_by == 'human':
-        print(f"[AMD CALLBACK] Call {target_call_sid} - Human detected, no action needed")
-    else:
-        print(f"[AMD CALLBACK] Call {target_call_sid} - Unknown AnsweredBy: {answered_by}")
+    # Marca voicemail na chamada pai (ParentCallSid) via projeção
+    _journal('amd_callback')
 
     return '', 204
 
@@ -540,6 +669,8 @@ def hold_call():
     if not call_sid:
         return jsonify({"error": "call_sid is required"}), 400
 
+    client = get_twilio_client()
+
     if client is None:
         return jsonify({"error": "Twilio client not initialized"}), 500
 
@@ -548,7 +679,7 @@ def hold_call():
         call_info = client.calls(call_sid).fetch()
 
         if call_info.status not in ('in-progress', 'ringing'):
-            print(f"[HOLD] Call {call_sid} is not active (status: {call_info.status})")
+            outbound_log.info(f"[HOLD] Call {call_sid} is not active (status: {call_info.status})")
             return jsonify({
                 "error": "Call is not active",
                 "call_status": call_info.status,
@@ -558,17 +689,17 @@ def hold_call():
         # Usa BASE_URL ou constrói a partir da request
         base_url = Config.BASE_URL or request.host_url.rstrip('/')
         hold_url = f"{base_url}/hold_music"
-        print(f"[HOLD] Redirecting call {call_sid} to {hold_url}")
+        outbound_log.info(f"[HOLD] Redirecting call {call_sid} to {hold_url}")
 
         # Redireciona a chamada do lead para tocar música de espera
         call = client.calls(call_sid).update(
             url=hold_url,
             method='POST'
         )
-        print(f"[HOLD] Call {call_sid} placed on hold successfully")
+        outbound_log.info(f"[HOLD] Call {call_sid} placed on hold successfully")
         return jsonify({"success": True, "message": "Call placed on hold", "call_sid": call_sid})
     except Exception as e:
-        print(f"[HOLD ERROR] {e}")
+        outbound_log.error(f"[HOLD ERROR] {e}")
         # Verifica se é erro de chamada não encontrada ou já finalizada
         error_msg = str(e).lower()
         if 'not found' in error_msg or 'completed' in error_msg or 'canceled' in error_msg:
@@ -615,6 +746,8 @@ def unhold_call():
     if not call_sid or not agent_identity:
         return jsonify({"error": "call_sid and agent_identity are required"}), 400
 
+    client = get_twilio_client()
+
     if client is None:
         return jsonify({"error": "Twilio client not initialized"}), 500
 
@@ -623,7 +756,7 @@ def unhold_call():
         call_info = client.calls(call_sid).fetch()
 
         if call_info.status not in ('in-progress', 'ringing'):
-            print(f"[UNHOLD] Call {call_sid} is not active (status: {call_info.status})")
+            outbound_log.info(f"[UNHOLD] Call {call_sid} is not active (status: {call_info.status})")
             return jsonify({
                 "error": "Call is not active",
                 "call_status": call_info.status,
@@ -635,10 +768,10 @@ def unhold_call():
         call = client.calls(call_sid).update(
             twiml=f'<Response><Dial><Client>{agent_identity}</Client></Dial></Response>'
         )
-        print(f"[UNHOLD] Call {call_sid} reconnected to {agent_identity}")
+        outbound_log.info(f"[UNHOLD] Call {call_sid} reconnected to {agent_identity}")
         return jsonify({"success": True, "message": "Call resumed", "call_sid": call_sid})
     except Exception as e:
-        print(f"[UNHOLD ERROR] {e}")
+        outbound_log.error(f"[UNHOLD ERROR] {e}")
         # Verifica se é erro de chamada não encontrada ou já finalizada
         error_msg = str(e).lower()
         if 'not found' in error_msg or 'completed' in error_msg or 'canceled' in error_msg:
@@ -654,7 +787,7 @@ def unhold_call():
 def inbound_status():
     """
     Callback quando o Dial para clientes Lovable completa.
-    Atualiza o banco com quem atendeu a chamada.
+    Registra no journal (a projeção grava quem atendeu) e responde o TwiML.
     """
     call_sid = request.form.get('CallSid', '')
     dial_call_status = request.form.get('DialCallStatus', '')  # completed, no-answer, busy, failed, canceled
@@ -662,103 +795,27 @@ def inbound_status():
     called_via = request.form.get('Called', '')  # client:identity que atendeu
     dial_bridge_target = request.form.get('DialBridged', '')  # Who answered (for simultaneous dial)
 
-    # Log all form data for debugging
-    print(f"[INBOUND STATUS] CallSid={call_sid}, DialStatus={dial_call_status}, CalledVia={called_via}, DialBridged={dial_bridge_target}")
-    print(f"[INBOUND STATUS] All form data: {dict(request.form)}")
-
-    response = VoiceResponse()
-
-    # Busca a chamada no banco
-    call = Call.query.filter_by(call_sid=call_sid).first()
-    print(f"[INBOUND STATUS] Call found in DB: {call is not None}")
-
-    if dial_call_status == 'completed' or dial_call_status == 'answered':
-        # Dial completou - mas alguém realmente atendeu?
-        print(f"[INBOUND STATUS] Dial completed/answered - call found: {call is not None}")
-        if call:
-            worker_found = False
-
-            # Extrai a identidade do cliente que atendeu
-            print(f"[INBOUND STATUS] Called field: '{called_via}' - starts with 'client:': {called_via.startswith('client:') if called_via else False}")
-
-            if called_via and called_via.startswith('client:'):
-                client_identity = called_via.replace('client:', '')
-                print(f"[INBOUND STATUS] Looking for client identity: '{client_identity}'")
-
-                # Tenta encontrar o usuário pelo identity
-                from models.user import User
-                active_users = User.query.filter_by(is_active=True).all()
-                print(f"[INBOUND STATUS] Found {len(active_users)} active users")
-
-                for user in active_users:
-                    user_identity = ''.join(c for c in user.email if c.isalnum() or c in '_-')
-                    print(f"[INBOUND STATUS] Comparing '{client_identity}' with '{user_identity}' ({user.email})")
-                    if user_identity == client_identity:
-                        call.worker_email = user.email
-                        call.worker_name = user.name or user.email.split('@')[0].capitalize()
-                        call.answered_at = datetime.now(timezone.utc)
-                        call.disposition = 'answered'
-                        worker_found = True
-                        print(f"[INBOUND STATUS] ✓ Call answered by {call.worker_name} ({call.worker_email})")
-                        break
-
-                if not worker_found:
-                    print(f"[INBOUND STATUS] ✗ No matching user found for identity '{client_identity}' - NOT marking as answered")
-                    call.disposition = 'no-answer'
-            else:
-                print(f"[INBOUND STATUS] ✗ Called field doesn't start with 'client:' - marking as no-answer")
-                call.disposition = 'no-answer'
+    inbound_log.info(f"[INBOUND STATUS] CallSid={call_sid}, DialStatus={dial_call_status}, CalledVia={called_via}, DialBridged={dial_bridge_target}")
+    inbound_log.debug("[INBOUND STATUS] All form data: %s", request.form.to_dict())
 
-            db.session.commit()
+    # Quem atendeu (Called=client:identity) é resolvido pela projeção
+    _journal('inbound_status')
 
-            # Send "Call Answered by Agent" alert (ONLY if worker was identified)
-            alert_manager = get_alert_manager()
-            if alert_manager and worker_found and call.worker_name:
-                alert = CallAlert(
-                    call_sid=call_sid,
-                    from_number=call.from_number,
-                    to_number=call.to_number,
-                    status='in-progress',
-                    duration=0,
-                    disposition='answered',
-                    lead_state=call.lead_state,
-                    recording_url=None,
-                    direction='inbound',
-                    worker_name=call.worker_name,
-                    caller_city=call.caller_city
-                )
-                alert_manager.notify_call_status(alert)
+    response = VoiceResponse()
 
-    elif dial_call_status == 'no-answer':
+    if dial_call_status == 'no-answer':
         # Ninguém atendeu - deixa mensagem
-        if call:
-            call.disposition = 'no-answer'
-            db.session.commit()
-
-        response.say(
-            "We're sorry, no one is available to take your call. Please leave a message after the beep.",
-            language='en-US',
-            voice='Polly.Joanna'
-        )
-        response.record(
-            max_length=120,
-            action=f"{Config.BASE_URL}/voicemail_recorded",
-            recording_status_callback=f"{Config.BASE_URL}/recording_status"
-        )
+        _voicemail_twiml(response)
 
     elif dial_call_status in ('busy', 'failed', 'canceled'):
-        if call:
-            call.disposition = dial_call_status
-            db.session.commit()
-
         response.say(
             "We're sorry, we couldn't connect your call. Please try again later.",
             language='en-US',
             voice='Polly.Joanna'
         )
         response.hangup()
-    else:
-        print(f"[INBOUND STATUS] ⚠️ Unexpected DialCallStatus: '{dial_call_status}'")
+    elif dial_call_status not in ('completed', 'answered'):
+        inbound_log.warning(f"[INBOUND STATUS] ⚠️ Unexpected DialCallStatus: '{dial_call_status}'")
 
     return str(response), 200, {'Content-Type': 'application/xml'}
 
@@ -770,15 +827,9 @@ def voicemail_recorded():
     call_sid = request.form.get('CallSid', '')
     recording_url = request.form.get('RecordingUrl', '')
 
-    print(f"[VOICEMAIL] Recorded for {call_sid}: {recording_url}")
+    inbound_log.info(f"[VOICEMAIL] Recorded for {call_sid}: {recording_url}")
 
-    # Atualiza o banco
-    call = Call.query.filter_by(call_sid=call_sid).first()
-    if call:
-        call.disposition = 'voicemail'
-        if recording_url:
-            call.recording_url = recording_url
-        db.session.commit()
+    _journal('voicemail_recorded')
 
     response = VoiceResponse()
     response.say("Thank you for your message. Goodbye.", language='en-US', voice='Polly.Joanna')
@@ -791,7 +842,7 @@ def voicemail_recorded():
 @validate_twilio_signature
 def assignment():
     """Callback do TaskRouter - aceita a tarefa sem instrução específica"""
-    print(f"[ASSIGNMENT] Task assignment callback received")
+    taskrouter_log.info("[ASSIGNMENT] Task assignment callback received")
 
     # Retorna accept para deixar o Flex gerenciar o fluxo da chamada
     return jsonify({"accept": True})
@@ -806,104 +857,20 @@ def taskrouter_event():
     task_sid = request.form.get('TaskSid', '')
     worker_name = request.form.get('WorkerName', '')
 
-    print(f"[TASKROUTER EVENT] {event_type} - TaskSid: {task_sid} - Worker: {worker_name}")
-    print(f"[TASKROUTER ATTRS] {task_attributes}")
-
-    try:
-        attrs = json.loads(task_attributes)
-    except:
-        attrs = {}
-
-    # Helper para extrair call_sid do customer nas conferences
-    def get_customer_call_sid(attributes):
-        """Extrai o call_sid do customer de conference.participants"""
-        conference = attributes.get('conference', {})
-        participants = conference.get('participants', {})
-        customer = participants.get('customer', '')
-        # customer pode ser o call_sid direto ou um objeto
-        if isinstance(customer, str) and customer.startswith('CA'):
-            return customer
-        elif isinstance(customer, dict):
-            return customer.get('call_sid', '')
-        return ''
-
-    # Quando uma task é criada (captura chamadas outbound do Flex)
-    if event_type == 'task.created':
-        direction = attrs.get('direction', '')
-        from_number = attrs.get('from', '')
-        to_number = attrs.get('outbound_to', '') or attrs.get('to', '')
-        call_sid = attrs.get('call_sid', '') or get_customer_call_sid(attrs)
-
-        print(f"[TASK CREATED] TaskSid={task_sid}, CallSid={call_sid}, Direction={direction}, From={from_number}, To={to_number}")
-
-        if direction == 'outbound' and to_number:
-            # Usa task_sid como identificador se call_sid ainda não existe
-            identifier = call_sid if call_sid else f"TASK:{task_sid}"
-
-            existing_call = Call.query.filter_by(call_sid=identifier).first()
-            if not existing_call:
-                lead_state = get_state_from_phone(to_number)
-                call = Call(
-                    call_sid=identifier,
-                    from_number=from_number,
-                    to_number=to_number,
-                    lead_state=lead_state,
-                    direction='outbound',
-                    started_at=datetime.now(timezone.utc)
-                )
-                db.session.add(call)
-                db.session.commit()
-                print(f"[OUTBOUND] Saved call {identifier} to database - To: {to_number}, State: {lead_state}")
-
-                # Send alert for outbound call initiated
-                alert_manager = get_alert_manager()
-                if alert_manager:
-                    alert = CallAlert(
-                        call_sid=identifier,
-                        from_number=from_number,
-                        to_number=to_number,
-                        status='initiated',
-                        duration=0,
-                        lead_state=lead_state,
-                        direction='outbound'
-                    )
-                    alert_manager.notify_call_status(alert)
-
-    # Quando a task é atualizada (pode conter o call_sid real)
-    elif event_type == 'task.updated':
-        call_sid = attrs.get('call_sid', '') or get_customer_call_sid(attrs)
-
-        print(f"[TASK UPDATED] TaskSid={task_sid}, CallSid={call_sid}")
-
-        if call_sid and task_sid:
-            # Busca pelo task_sid temporário e atualiza com o call_sid real
-            temp_identifier = f"TASK:{task_sid}"
-            call = Call.query.filter_by(call_sid=temp_identifier).first()
-            if call:
-                call.call_sid = call_sid
-                db.session.commit()
-                print(f"[OUTBOUND] Updated call_sid from {temp_identifier} to {call_sid}")
-
-    # Quando o agente aceita a reserva (chamada atendida)
-    elif event_type == 'reservation.accepted':
-        call_sid = attrs.get('call_sid', '') or get_customer_call_sid(attrs)
-        direction = attrs.get('direction', '')
+    taskrouter_log.info(f"[TASKROUTER EVENT] {event_type} - TaskSid: {task_sid} - Worker: {worker_name}")
+    taskrouter_log.debug("[TASKROUTER ATTRS] %s", task_attributes)
 
-        print(f"[RESERVATION ACCEPTED] Agent {worker_name} answered - TaskSid={task_sid}, CallSid={call_sid}")
+    # Criação/atualização das chamadas pela projeção (core.call_events)
+    event = _journal('taskrouter_event')
 
-        # Tenta encontrar a chamada pelo call_sid ou pelo task_sid temporário
-        call = None
-        if call_sid:
-            call = Call.query.filter_by(call_sid=call_sid).first()
-        if not call and task_sid:
-            call = Call.query.filter_by(call_sid=f"TASK:{task_sid}").first()
-            if call and call_sid:
-                # Atualiza com o call_sid real
-                call.call_sid = call_sid
-                print(f"[OUTBOUND] Updated call_sid to {call_sid}")
+    # Quando o agente aceita a reserva: começa a gravar enquanto a chamada está ativa
+    # (não repete para um retry do mesmo webhook)
+    if event_type == 'reservation.accepted' and event is not None:
+        call_sid = task_call_sid(parse_task_attributes(task_attributes))
+        taskrouter_log.info(f"[RESERVATION ACCEPTED] Agent {worker_name} answered - TaskSid={task_sid}, CallSid={call_sid}")
 
         if call_sid:
-            # Start recording when call is answered
+            client = get_twilio_client()
             if client is not None:
                 try:
                     client.calls(call_sid).recordings.create(
@@ -911,58 +878,11 @@ def taskrouter_event():
                         recording_status_callback=f"{Config.BASE_URL}/recording_status",
                         recording_status_callback_event=['completed']
                     )
-                    print(f"[RECORDING] Started recording for call {call_sid}")
+                    recording_log.info(f"[RECORDING] Started recording for call {call_sid}")
                 except Exception as e:
-                    print(f"[RECORDING ERROR] Failed to start recording for {call_sid}: {e}")
+                    recording_log.error(f"[RECORDING ERROR] Failed to start recording for {call_sid}: {e}")
             else:
-                print(f"[RECORDING ERROR] Twilio client is not initialized. Cannot start recording for {call_sid}")
-
-        if call:
-            call.answered_at = datetime.now(timezone.utc)
-            call.disposition = 'answered'
-            call.worker_name = worker_name
-            # Calculate queue_time (time from started_at to answered_at)
-            if call.started_at:
-                queue_seconds = (call.answered_at - call.started_at).total_seconds()
-                call.queue_time = int(queue_seconds)
-            db.session.commit()
-
-            # Send "Call Answered" alert
-            alert_manager = get_alert_manager()
-            if alert_manager:
-                alert = CallAlert(
-                    call_sid=call.call_sid,
-                    from_number=call.from_number,
-                    to_number=call.to_number,
-                    status='in-progress',
-                    duration=0,
-                    lead_state=call.lead_state,
-                    direction=call.direction or 'inbound',
-                    worker_name=worker_name,
-                    caller_city=call.caller_city
-                )
-                alert_manager.notify_call_status(alert)
-
-    # Quando a task é completada (chamada encerrada)
-    elif event_type == 'task.completed':
-        call_sid = attrs.get('call_sid', '') or get_customer_call_sid(attrs)
-
-        # Tenta encontrar pelo call_sid ou task_sid
-        call = None
-        if call_sid:
-            call = Call.query.filter_by(call_sid=call_sid).first()
-        if not call and task_sid:
-            call = Call.query.filter_by(call_sid=f"TASK:{task_sid}").first()
-
-        if call and not call.ended_at:
-            call.ended_at = datetime.now(timezone.utc)
-            if not call.disposition:
-                call.disposition = 'completed'
-            # Calculate duration if not already set
-            if not call.duration or call.duration == 0:
-                call.duration = _calculate_duration(call)
-            db.session.commit()
-            print(f"[TASK COMPLETED] Call {call.call_sid} marked as completed - Duration: {call.duration}s")
+                recording_log.error(f"[RECORDING ERROR] Twilio client is not initialized. Cannot start recording for {call_sid}")
 
     return '', 204
 
@@ -971,155 +891,24 @@ def taskrouter_event():
 @validate_twilio_signature
 def call_status():
     """
-    Recebe atualizacoes de status da chamada e salva no banco.
+    Recebe atualizacoes de status da chamada e registra no journal (call_events).
     Eventos: initiated, ringing, in-progress, completed, busy, no-answer, canceled, failed
     """
     call_sid = request.form.get('CallSid', '')
     parent_call_sid = request.form.get('ParentCallSid', '')  # SID da chamada pai (para outbound-dial)
     status = request.form.get('CallStatus', '')
-    duration = request.form.get('CallDuration', '0')
-    from_number = request.form.get('From', '')
-    to_number = request.form.get('To', '')
     direction = request.form.get('Direction', '')
     answered_by = request.form.get('AnsweredBy', '')  # AMD result
 
     # Debug: log all incoming webhook data
-    print(f"[WEBHOOK DEBUG] CallSid={call_sid}, ParentSid={parent_call_sid}, Status={status}, Direction={direction}, AnsweredBy={answered_by}")
+    webhook_log.debug("[WEBHOOK DEBUG] CallSid=%s, ParentSid=%s, Status=%s, Direction=%s, AnsweredBy=%s",
+                      call_sid, parent_call_sid, status, direction, answered_by)
 
     if not call_sid:
         return '', 400
 
-    # Para chamadas outbound-dial (perna do lead), atualiza a chamada pai
-    # Não cria registro novo para evitar duplicatas
-    if direction == 'outbound-dial' and parent_call_sid:
-        call = Call.query.filter_by(call_sid=parent_call_sid).first()
-        if call:
-            print(f"[WEBHOOK] Updating parent call {parent_call_sid} with child status: {status}, AnsweredBy: {answered_by}")
-        else:
-            # Se não encontrar o pai, ignora (não cria duplicata)
-            print(f"[WEBHOOK] Parent call {parent_call_sid} not found, ignoring outbound-dial status")
-            return '', 204
-    else:
-        # Busca ou cria registro da chamada
-        call = Call.query.filter_by(call_sid=call_sid).first()
-
-        if not call:
-            # Não cria registros para outbound-dial sem pai
-            if direction == 'outbound-dial':
-                print(f"[WEBHOOK] Ignoring orphan outbound-dial call {call_sid}")
-                return '', 204
-
-            # Determina o número do lead (depende da direção)
-            lead_number = from_number if direction == 'inbound' else to_number
-            lead_state = get_state_from_phone(lead_number)
-            caller_city = request.form.get('FromCity', '') if direction == 'inbound' else ''
-
-            call = Call(
-                call_sid=call_sid,
-                from_number=from_number,
-                to_number=to_number,
-                lead_state=lead_state,
-                direction=direction,
-                caller_city=caller_city,
-                started_at=datetime.now(timezone.utc)
-            )
-            db.session.add(call)
-            _calculate_contact_tracking(call)
-
-    # AMD Detection: Se detectou máquina/voicemail, marca como voicemail
-    machine_types = ['machine_start', 'machine_end_beep', 'machine_end_silence', 'machine_end_other', 'fax']
-    if answered_by in machine_types:
-        call.disposition = 'voicemail'
-        print(f"[AMD] Call {call_sid}: Detected {answered_by} - setting disposition to voicemail")
-    elif answered_by == 'human':
-        print(f"[AMD] Call {call_sid}: Human detected")
-
-    # Atualiza campos baseado no status
-    twilio_duration = int(duration) if duration else 0
-
-    # in-progress = chamada foi atendida (para outbound, significa que o lead atendeu)
-    if status == 'in-progress':
-        if not call.answered_at:
-            call.answered_at = datetime.now(timezone.utc)
-            print(f"[STATUS] Call {call_sid} answered at {call.answered_at}")
-            # Calculate queue_time for outbound (time from started_at to answered_at)
-            if call.started_at:
-                queue_seconds = (call.answered_at - call.started_at).total_seconds()
-                call.queue_time = int(queue_seconds)
-        db.session.commit()
-        return '', 204
-
-    if status == 'completed':
-        call.ended_at = datetime.now(timezone.utc)
-
-        # Calculate duration first (needed for voicemail detection)
-        if call.answered_at:
-            # Duration = tempo de conversa (ended_at - answered_at)
-            calculated_duration = int((call.ended_at - call.answered_at).total_seconds())
-        elif call.started_at:
-            # Duration = tempo total (ended_at - started_at)
-            calculated_duration = int((call.ended_at - call.started_at).total_seconds())
-        else:
-            calculated_duration = 0
-
-        # Use o maior valor entre calculado e Twilio (fallback)
-        call.duration = max(calculated_duration, twilio_duration, 0)
-
-        # Não sobrescrever disposition se já foi setado pelo AMD (voicemail, etc)
-        if call.disposition not in ('voicemail', 'busy', 'failed', 'canceled'):
-            if call.answered_at:
-                # Fallback: chamadas outbound muito curtas (< 15s) são provavelmente voicemail
-                # AMD não funciona bem para números internacionais
-                if call.direction == 'outbound' and call.duration < 15:
-                    call.disposition = 'voicemail'
-                    print(f"[VOICEMAIL FALLBACK] Call {call_sid}: Short duration ({call.duration}s) - likely voicemail")
-                else:
-                    call.disposition = 'answered'
-            else:
-                call.disposition = 'no-answer'
-    elif status == 'busy':
-        call.ended_at = datetime.now(timezone.utc)
-        call.disposition = 'busy'
-        call.duration = _calculate_duration(call)
-    elif status == 'no-answer':
-        call.ended_at = datetime.now(timezone.utc)
-        call.disposition = 'no-answer'
-        call.duration = _calculate_duration(call)
-    elif status == 'failed':
-        call.ended_at = datetime.now(timezone.utc)
-        call.disposition = 'failed'
-        call.duration = _calculate_duration(call)
-    elif status == 'canceled':
-        call.ended_at = datetime.now(timezone.utc)
-        call.disposition = 'canceled'
-        call.duration = _calculate_duration(call)
-
-    # Sanitiza disposition para corrigir inconsistências
-    _sanitize_disposition(call)
-
-    db.session.commit()
-
-    print(f"[STATUS] Call {call_sid}: {status} | Disposition: {call.disposition} | Duration: {call.duration}s (Twilio sent: {twilio_duration}s)")
-
-    # Send alerts for status changes (only for terminal statuses)
-    alert_manager = get_alert_manager()
-    if alert_manager and status in ('completed', 'busy', 'no-answer', 'failed', 'canceled'):
-        # Use disposition for alert status
-        alert_status = call.disposition or status
-        alert = CallAlert(
-            call_sid=call_sid,
-            from_number=from_number,
-            to_number=to_number,
-            status=alert_status,
-            duration=call.duration or 0,
-            disposition=call.disposition,
-            lead_state=call.lead_state,
-            recording_url=call.recording_url,
-            direction=call.direction or direction,
-            worker_name=call.worker_name,
-            caller_city=call.caller_city
-        )
-        alert_manager.notify_call_status(alert)
+    # Disposition, duração, alertas e dialer: projeção (core.call_events)
+    _journal('call_status')
 
     return '', 204
 
@@ -1129,43 +918,15 @@ def call_status():
 def recording_status():
     """
     Recebe callback quando gravacao esta pronta.
-    Salva a URL da gravacao no banco.
+    Registra no journal; a projeção salva a URL da gravacao e envia o alerta.
     """
     call_sid = request.form.get('CallSid', '')
     recording_sid = request.form.get('RecordingSid', '')
     recording_url = request.form.get('RecordingUrl', '')
     rec_status = request.form.get('RecordingStatus', '')
 
-    if rec_status == 'completed' and recording_url:
-        call = Call.query.filter_by(call_sid=call_sid).first()
-        if call:
-            # URL com formato .mp3 para facilitar reprodução
-            call.recording_url = f"{recording_url}.mp3"
-            call.recording_sid = recording_sid
-            db.session.commit()
-            print(f"[RECORDING] Call {call_sid}: Recording saved - {recording_url}.mp3")
-
-            # Send recording alert
-            alert_manager = get_alert_manager()
-            if alert_manager:
-                alert = CallAlert(
-                    call_sid=call_sid,
-                    from_number=call.from_number,
-                    to_number=call.to_number,
-                    status=call.disposition or 'completed',
-                    duration=call.duration or 0,
-                    disposition=call.disposition,
-                    lead_state=call.lead_state,
-                    recording_url=call.recording_url,
-                    direction=call.direction or '',
-                    worker_name=call.worker_name,
-                    caller_city=call.caller_city
-                )
-                alert_manager.notify_recording_ready(alert)
-        else:
-            print(f"[RECORDING] Call {call_sid} not found in database")
-    else:
-        print(f"[RECORDING] Call {call_sid}: Status {rec_status}")
+    recording_log.info(f"[RECORDING] Call {call_sid}: Status {rec_status} {recording_sid} {recording_url}")
+    _journal('recording_status')
 
     return '', 204
 
@@ -1184,14 +945,18 @@ def get_recording(recording_sid):
 
     try:
         # URL da gravação no Twilio
-        recording_url = f"https://api.twilio.com/2010-04-01/Accounts/{Config.TWILIO_ACCOUNT_SID}/Recordings/{recording_sid}.mp3"
+        recording_url = twilio_api_url(
+            f"https://api.twilio.com/2010-04-01/Accounts/{Config.TWILIO_ACCOUNT_SID}/Recordings/{recording_sid}.mp3"
+        )
 
         # Busca com autenticação
-        response = requests.get(
-            recording_url,
-            auth=(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN),
-            stream=True
-        )
+        with external_call('twilio', 'recording') as twilio_call:
+            response = requests.get(
+                recording_url,
+                auth=(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN),
+                stream=True
+            )
+            twilio_call.ok = response.status_code < 400
 
         if response.status_code == 200:
             from flask import Response
@@ -1203,11 +968,11 @@ def get_recording(recording_sid):
                 }
             )
         else:
-            print(f"[RECORDING PROXY] Failed to fetch {recording_sid}: {response.status_code}")
+            recording_log.warning(f"[RECORDING PROXY] Failed to fetch {recording_sid}: {response.status_code}")
             return jsonify({"error": "Recording not found"}), 404
 
     except Exception as e:
-        print(f"[RECORDING PROXY ERROR] {e}")
+        recording_log.error(f"[RECORDING PROXY ERROR] {e}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -1265,7 +1030,10 @@ def handle_amd_status():
     answered_by = request.form.get('AnsweredBy', '')
     machine_detection_duration = request.form.get('MachineDetectionDuration', '0')
 
-    print(f"[AMD] CallSid={call_sid}, AnsweredBy={answered_by}, Duration={machine_detection_duration}ms")
+    amd_log.info(f"[AMD] CallSid={call_sid}, AnsweredBy={answered_by}, Duration={machine_detection_duration}ms")
+
+    # Disposition 'voicemail' pela projeção
+    _journal('amd_status')
 
     # Valores possíveis de AnsweredBy:
     # - human: Humano atendeu
@@ -1279,27 +1047,21 @@ def handle_amd_status():
     is_machine = answered_by in ('machine_start', 'machine_end_beep', 'machine_end_silence', 'machine_end_other')
 
     if is_machine and call_sid:
-        print(f"[AMD] Voicemail detected for {call_sid} - Leaving message and hanging up")
-
-        # Atualiza o banco com disposition 'voicemail'
-        call = Call.query.filter_by(call_sid=call_sid).first()
-        if call:
-            call.disposition = 'voicemail'
-            db.session.commit()
-            print(f"[AMD] Updated call {call_sid} disposition to 'voicemail'")
+        amd_log.info(f"[AMD] Voicemail detected for {call_sid} - Leaving message and hanging up")
 
         # Redireciona a chamada para deixar mensagem e desligar
+        client = get_twilio_client()
         if client is not None:
             try:
                 client.calls(call_sid).update(
                     url=f"{Config.BASE_URL}/voicemail_message",
                     method='POST'
                 )
-                print(f"[AMD] Redirected call {call_sid} to voicemail message")
+                amd_log.info(f"[AMD] Redirected call {call_sid} to voicemail message")
             except Exception as e:
-                print(f"[AMD ERROR] Failed to redirect call {call_sid}: {e}")
+                amd_log.error(f"[AMD ERROR] Failed to redirect call {call_sid}: {e}")
     else:
-        print(f"[AMD] Human detected for {call_sid} - Call continues normally")
+        amd_log.info(f"[AMD] Human detected for {call_sid} - Call continues normally")
 
     return '', 204
 
@@ -1311,7 +1073,7 @@ def voicemail_message():
     TwiML para deixar mensagem na caixa postal e desligar.
     """
     call_sid = request.form.get('CallSid', '')
-    print(f"[VOICEMAIL] Playing message for call {call_sid}")
+    inbound_log.info(f"[VOICEMAIL] Playing message for call {call_sid}")
 
     response = VoiceResponse()
 
@@ -1365,6 +1127,8 @@ def make_call():
     if not to_number:
         return jsonify({"error": "Missing 'to' parameter"}), 400
 
+    client = get_twilio_client()
+
     if client is None:
         return jsonify({"error": "Twilio client is not initialized"}), 500
 
@@ -1373,28 +1137,10 @@ def make_call():
         caller_id = get_caller_id_for_number(to_number)
         lead_state = get_state_from_phone(to_number)
 
-        print(f"[CALLER ID] Lead state: {lead_state} → Using: {caller_id}")
-
-        # Parâmetros base da chamada
-        call_params = {
-            'url': f"{Config.BASE_URL}/outbound_connect",
-            'to': to_number,
-            'from_': caller_id,
-            'record': True,
-            'recording_channels': 'dual',
-            'recording_status_callback': f"{Config.BASE_URL}/recording_status",
-            'recording_status_callback_event': ['completed'],
-            'status_callback': f"{Config.BASE_URL}/call_status",
-            'status_callback_event': ['initiated', 'ringing', 'in-progress', 'completed', 'busy', 'no-answer', 'canceled', 'failed']
-        }
+        outbound_log.info(f"[CALLER ID] Lead state: {lead_state} → Using: {caller_id}")
 
-        # Adiciona AMD se habilitado
-        if Config.AMD_ENABLED:
-            call_params['machine_detection'] = 'DetectMessageEnd'
-            call_params['machine_detection_timeout'] = 30
-            call_params['async_amd'] = True
-            call_params['async_amd_status_callback'] = f"{Config.BASE_URL}/amd_status"
-            call_params['async_amd_status_callback_method'] = 'POST'
+        # Parâmetros da chamada (mesmos usados pelo discador de campanhas)
+        call_params = build_outbound_call_params(to_number, caller_id)
 
         # Criar chamada via Twilio
         twilio_call = client.calls.create(**call_params)
@@ -1422,6 +1168,7 @@ def make_call():
 
 @app.route("/calls", methods=['GET'])
 @jwt_required
+@read_only
 def get_calls():
     """
     Lista historico de chamadas
@@ -1492,6 +1239,7 @@ def get_calls():
 
 @app.route("/calls/stats", methods=['GET'])
 @jwt_required
+@read_only
 def get_calls_stats():
     """
     Estatisticas das chamadas por estado
@@ -1559,6 +1307,7 @@ def get_voice_token():
               type: string
             ttl:
               type: integer
+              description: Segundos restantes de validade (tokens são reusados por identidade)
       500:
         description: Erro ao gerar token (credenciais não configuradas)
     """
@@ -1582,33 +1331,20 @@ def get_voice_token():
     identity = ''.join(c for c in identity if c.isalnum() or c in '_-')
 
     try:
-        # Cria Access Token
-        token = AccessToken(
-            Config.TWILIO_ACCOUNT_SID,
-            Config.TWILIO_API_KEY,
-            Config.TWILIO_API_SECRET,
-            identity=identity,
-            ttl=Config.VOICE_TOKEN_TTL
-        )
-
-        # Adiciona grant de voz
-        voice_grant = VoiceGrant(
-            outgoing_application_sid=Config.TWILIO_TWIML_APP_SID,
-            incoming_allow=True  # Permite receber chamadas
-        )
-        token.add_grant(voice_grant)
+        # Reusa o token da identidade até VOICE_TOKEN_REFRESH_FRACTION do TTL
+        token, ttl = get_voice_token_cache().get(identity)
 
-        print(f"[TOKEN] Generated voice token for {identity} (TTL: {Config.VOICE_TOKEN_TTL}s)")
+        token_log.info(f"[TOKEN] Voice token for {identity} (expires in {ttl}s)")
 
         return jsonify({
-            "token": token.to_jwt(),
+            "token": token,
             "identity": identity,
             "email": g.current_user_email,  # Email completo para uso no Lovable
-            "ttl": Config.VOICE_TOKEN_TTL
+            "ttl": ttl  # Segundos restantes de validade deste token
         })
 
     except Exception as e:
-        print(f"[TOKEN ERROR] {e}")
+        token_log.error(f"[TOKEN ERROR] {e}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -1654,6 +1390,47 @@ def admin_delete_calls():
     return jsonify({"deleted": deleted, "count": len(deleted)})
 
 
+@app.route("/calls/<call_sid>/context", methods=['GET'])
+@jwt_required
+def get_call_lead_context(call_sid):
+    """
+    Contexto do lead de uma chamada (lead do Attio + histórico de ligações).
+    Para inbound é resolvido enquanto a chamada toca, então normalmente já está pronto ao atender.
+    ---
+    tags:
+      - Calls
+    security:
+      - Bearer: []
+    parameters:
+      - name: call_sid
+        in: path
+        type: string
+        required: true
+        description: SID da chamada (ParentCallSid no cliente)
+    responses:
+      200:
+        description: Contexto do lead
+      404:
+        description: Chamada não encontrada
+    """
+    from core.lead_context import build_lead_context
+    from core.phone_utils import get_lead_phone_for_call
+
+    cache = get_lead_context_cache()
+    context = cache.get(call_sid=call_sid, wait=Config.LEAD_CONTEXT_WAIT)
+    if context is not None:
+        return jsonify({**context, "prewarmed": True})
+
+    # Not pre-warmed in this worker (outbound, other worker, expired): resolve now
+    call = Call.query.filter_by(call_sid=call_sid).first()
+    if not call:
+        return jsonify({"error": "Call not found"}), 404
+
+    lead_phone = get_lead_phone_for_call(call.direction or 'outbound', call.from_number, call.to_number)
+    context = build_lead_context(call_sid, lead_phone)
+    return jsonify({**context, "prewarmed": False})
+
+
 @app.route("/calls/<call_sid>/resumo", methods=['PUT', 'PATCH'])
 @jwt_required
 def update_call_resumo(call_sid):
@@ -1677,6 +1454,12 @@ def update_call_resumo(call_sid):
             resumo:
               type: string
               description: Texto do resumo/notas da ligação
+            sync_attio:
+              type: boolean
+              description: Também envia o resumo como nota no Attio (default ATTIO_SYNC_RESUMO)
+            attio_record_id:
+              type: string
+              description: ID do record no Attio (opcional, senão busca pelo telefone do lead)
     responses:
       200:
         description: Resumo atualizado
@@ -1685,6 +1468,8 @@ def update_call_resumo(call_sid):
     """
     data = request.get_json() or {}
     resumo = data.get('resumo', '')
+    sync_attio = data.get('sync_attio', Config.ATTIO_SYNC_RESUMO)
+    attio_record_id = data.get('attio_record_id')
 
     call = Call.query.filter_by(call_sid=call_sid).first()
 
@@ -1701,13 +1486,33 @@ def update_call_resumo(call_sid):
     call.resumo = resumo
     db.session.commit()
 
-    print(f"[RESUMO] Call {call_sid} resumo updated: {resumo[:50]}..." if len(resumo) > 50 else f"[RESUMO] Call {call_sid} resumo updated: {resumo}")
+    attio_log.info(f"[RESUMO] Call {call_sid} resumo updated: {resumo[:50]}..." if len(resumo) > 50 else f"[RESUMO] Call {call_sid} resumo updated: {resumo}")
 
-    return jsonify({
+    response_data = {
         "success": True,
         "call_sid": call.call_sid,
         "resumo": call.resumo
-    })
+    }
+
+    # Envia o resumo como nota no Attio (via outbox, sem esperar o Attio)
+    if sync_attio and resumo.strip() and get_attio_client() is not None:
+        from core.phone_utils import get_lead_phone_for_call
+        try:
+            lead_phone = get_lead_phone_for_call(call.direction or 'outbound', call.from_number, call.to_number)
+            outbox_note, created = enqueue_note(
+                build_resumo_note(call, resumo),
+                record_id=attio_record_id,
+                lead_phone=lead_phone,
+                call_sid=call.call_sid,
+                idempotency_key=f"resumo:{call.call_sid}:{make_idempotency_key(resumo)}"
+            )
+            response_data["attio_note"] = {"note_id": outbox_note.id, "status": outbox_note.status}
+            attio_log.info(f"[RESUMO] Call {call_sid} resumo queued for Attio (outbox id {outbox_note.id})")
+        except Exception as e:
+            db.session.rollback()
+            attio_log.error(f"[RESUMO] Failed to queue Attio note for {call_sid}: {e}")
+
+    return jsonify(response_data)
 
 
 @app.route("/admin/setup_workers", methods=['POST'])
@@ -1813,174 +1618,120 @@ def admin_setup_workers():
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/admin/fix_dispositions", methods=['POST'])
+@app.route("/admin/call_events", methods=['GET'])
 @jwt_required
-def admin_fix_dispositions():
+def call_events_status():
     """
-    Corrige chamadas com disposition inconsistente.
-    - NULL com duration > 0: answered
-    - NULL com duration = 0: no-answer
-    - no-answer com duration > 0: answered (bug fix)
+    Journal de webhooks: checkpoint da projeção, eventos pendentes e atraso
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Modo (async/inline), checkpoint, pendentes e lag em segundos
     """
-    results = []
+    return jsonify(get_journal_stats())
 
-    try:
-        # 1. Busca chamadas com disposition NULL
-        null_calls = Call.query.filter(Call.disposition == None).all()
-        results.append(f"Encontradas {len(null_calls)} chamadas com disposition NULL")
-
-        null_answered = 0
-        null_no_answer = 0
-
-        for call in null_calls:
-            if call.duration and call.duration > 0:
-                call.disposition = 'answered'
-                if not call.answered_at and call.started_at:
-                    call.answered_at = call.started_at
-                null_answered += 1
-            else:
-                call.disposition = 'no-answer'
-                null_no_answer += 1
-
-        results.append(f"  → {null_answered} marcadas como 'answered'")
-        results.append(f"  → {null_no_answer} marcadas como 'no-answer'")
-
-        # 2. Busca chamadas no-answer com duration > 0 (bug)
-        bad_no_answer = Call.query.filter(
-            Call.disposition == 'no-answer',
-            Call.duration > 0
-        ).all()
-        results.append(f"Encontradas {len(bad_no_answer)} chamadas no-answer com duration > 0")
-
-        for call in bad_no_answer:
-            call.disposition = 'answered'
-            if not call.answered_at and call.started_at:
-                call.answered_at = call.started_at
-
-        results.append(f"  → {len(bad_no_answer)} corrigidas para 'answered'")
-
-        db.session.commit()
-
-        # Verifica se ainda há problemas
-        remaining_null = Call.query.filter(Call.disposition == None).count()
-        remaining_bad = Call.query.filter(Call.disposition == 'no-answer', Call.duration > 0).count()
-        results.append(f"Restantes com NULL: {remaining_null}")
-        results.append(f"Restantes no-answer com duration > 0: {remaining_bad}")
 
-        return jsonify({
-            "success": True,
-            "results": results
-        })
+@app.route("/admin/call_events/<call_sid>", methods=['GET'])
+@jwt_required
+def call_events_for_call(call_sid):
+    """
+    Eventos de webhook de uma chamada, na ordem em que são projetados
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - name: call_sid
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Eventos (payload bruto do Twilio) e a linha projetada
+    """
+    from models.call_event import CallEvent
 
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 500
+    events = CallEvent.query.filter_by(call_sid=call_sid).order_by(CallEvent.received_at.asc(), CallEvent.id.asc()).all()
+    call = Call.query.filter_by(call_sid=call_sid).first()
+    return jsonify({
+        'call': call.to_dict() if call else None,
+        'events': [event.to_dict() for event in events]
+    })
 
 
-@app.route("/admin/fix_inbound_dispositions", methods=['POST'])
+@app.route("/admin/call_events/rebuild", methods=['POST'])
 @jwt_required
-def admin_fix_inbound_dispositions():
+def call_events_rebuild():
     """
-    Corrige dispositions de chamadas inbound incorretas.
-
-    REGRA: Inbound calls com worker_name NULL = ninguém atendeu
-    - Se disposition = 'answered' mas worker_name NULL → muda para 'no-answer'
-    - Remove answered_at incorreto
+    Recalcula chamadas a partir do journal (substitui os antigos /admin/fix_*).
+    Zera disposition, durações, worker e gravação e reaplica os eventos, sem
+    alertas nem dialer. Só faz sentido para chamadas com todos os webhooks no
+    journal (criadas depois que ele entrou em produção). Roda em qualquer
+    worker: assume o lease do projetor, que volta a projetar ao final.
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        schema:
+          type: object
+          properties:
+            call_sids:
+              type: array
+              items:
+                type: string
+              description: Só estas chamadas (padrão - todas com eventos)
+            since:
+              type: string
+              description: Só chamadas criadas a partir desta data (YYYY-MM-DD)
+    responses:
+      200:
+        description: Chamadas e eventos reprocessados, quantas mudaram
+      409:
+        description: Outra reconstrução em andamento (tente de novo)
     """
-    results = []
+    data = request.get_json(silent=True) or {}
+    since = None
+    if data.get('since'):
+        try:
+            since = datetime.strptime(data['since'], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        except ValueError:
+            return jsonify({"error": "since must be YYYY-MM-DD"}), 400
 
     try:
-        # Busca chamadas inbound marcadas como answered mas sem worker
-        bad_answered = Call.query.filter(
-            Call.direction == 'inbound',
-            Call.disposition == 'answered',
-            (Call.worker_name == None) | (Call.worker_name == '')
-        ).all()
-
-        results.append(f"Encontradas {len(bad_answered)} chamadas inbound 'answered' sem worker")
-
-        fixed_count = 0
-        for call in bad_answered:
-            call.disposition = 'no-answer'
-            call.answered_at = None  # Remove answered_at incorreto
-            fixed_count += 1
-
-        db.session.commit()
-        results.append(f"  → {fixed_count} corrigidas para 'no-answer'")
-
-        # Verifica se ainda há problemas
-        remaining = Call.query.filter(
-            Call.direction == 'inbound',
-            Call.disposition == 'answered',
-            (Call.worker_name == None) | (Call.worker_name == '')
-        ).count()
-        results.append(f"Restantes com problema: {remaining}")
-
-        return jsonify({
-            "success": True,
-            "results": results
-        })
-
+        result = get_call_projector().rebuild(call_sids=data.get('call_sids') or None, since=since)
+    except LeaseHeldError as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         db.session.rollback()
+        webhook_log.error(f"[CALL EVENTS] Rebuild failed: {e}")
         return jsonify({"error": str(e)}), 500
+    return jsonify({"success": True, **result})
 
 
-@app.route("/admin/fix_answered_inbound_to_eduarda", methods=['POST'])
+@app.route("/admin/voice_fallbacks", methods=['GET'])
 @jwt_required
-def admin_fix_answered_inbound_to_eduarda():
+def voice_fallbacks_status():
     """
-    Corrige chamadas inbound que foram realmente atendidas mas estão como no-answer.
-
-    Critérios:
-    - direction = 'inbound'
-    - disposition = 'no-answer'
-    - duration > 60 segundos
-    - tem recording_url
-    - worker_name NULL
-
-    Ação: muda para answered e atribui a Eduarda
+    Respostas do /voice que pularam etapas para caber no VOICE_DEADLINE_MS (este processo)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Requests, fallbacks, taxa, contagem por etapa/motivo, últimos fallbacks e agentes em cache
     """
-    results = []
-
-    try:
-        # Busca chamadas que se encaixam nos critérios
-        answered_calls = Call.query.filter(
-            Call.direction == 'inbound',
-            Call.disposition == 'no-answer',
-            Call.duration > 60,
-            Call.recording_url != None,
-            Call.recording_url != '',
-            (Call.worker_name == None) | (Call.worker_name == '')
-        ).all()
-
-        results.append(f"Encontradas {len(answered_calls)} chamadas inbound realmente atendidas")
-
-        fixed_count = 0
-        call_ids = []
-        for call in answered_calls:
-            call.disposition = 'answered'
-            call.worker_email = 'eduarda@fyntrainc.com'
-            call.worker_name = 'eduarda'
-            # Define answered_at como started_at se não existir
-            if not call.answered_at:
-                call.answered_at = call.started_at
-            call_ids.append(call.id)
-            fixed_count += 1
-
-        db.session.commit()
-        results.append(f"  → {fixed_count} corrigidas e atribuídas a Eduarda")
-        results.append(f"  → IDs: {call_ids}")
-
-        return jsonify({
-            "success": True,
-            "results": results,
-            "fixed_call_ids": call_ids
-        })
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 500
+    return jsonify(get_voice_stats())
 
 
 @app.route("/admin/setup_contact_tracking", methods=['POST'])
@@ -1994,7 +1745,7 @@ def admin_setup_contact_tracking():
     - Exclui números Twilio do tracking
     """
     from sqlalchemy import text
-    from core.phone_utils import get_contact_period, get_lead_phone_for_call
+    from core.phone_utils import get_contact_periods, get_lead_phones_for_calls, get_local_dates, normalize_phones
 
     results = []
 
@@ -2020,17 +1771,8 @@ def admin_setup_contact_tracking():
                 else:
                     results.append(f"Erro em '{col_name}': {str(e)[:50]}")
 
-        # Lista de números Twilio (não devem ser considerados como leads)
-        twilio_numbers = [
-            Config.TWILIO_NUMBER,
-            Config.CALLER_ID_FL,
-            Config.CALLER_ID_TX,
-            Config.CALLER_ID_DEFAULT
-        ]
-        twilio_numbers_normalized = set(
-            ''.join(c for c in n if c.isdigit())[-10:]
-            for n in twilio_numbers if n
-        )
+        # Números Twilio (caller IDs fixos + pool) não devem ser considerados como leads
+        twilio_numbers_normalized = get_own_numbers_normalized()
         results.append(f"Números Twilio excluídos: {len(twilio_numbers_normalized)}")
 
         # 2. Calcular valores para chamadas existentes
@@ -2038,6 +1780,20 @@ def admin_setup_contact_tracking():
         all_calls = Call.query.order_by(Call.started_at.asc()).all()
         results.append(f"Processando {len(all_calls)} chamadas...")
 
+        # Números dos leads normalizados em lote (últimos 10 dígitos)
+        lead_phones = get_lead_phones_for_calls(
+            [call.direction or 'outbound' for call in all_calls],
+            [call.from_number for call in all_calls],
+            [call.to_number for call in all_calls]
+        )
+        lead_phones_normalized = normalize_phones(lead_phones)
+
+        # Período e dia no horário local do lead, também em lote
+        started = [call.started_at for call in all_calls]
+        states = [call.lead_state for call in all_calls]
+        contact_periods = get_contact_periods(started, states)
+        local_dates = get_local_dates(started, states)
+
         # Dicionários para tracking (por lead, somando inbound + outbound)
         phone_contact_count = {}  # phone -> total count
         phone_daily_count = {}    # (phone, date) -> daily count
@@ -2046,29 +1802,20 @@ def admin_setup_contact_tracking():
         updated_count = 0
         skipped_twilio = 0
 
-        for call in all_calls:
-            # Determina o número do lead
-            direction = call.direction or 'outbound'
-            lead_phone = get_lead_phone_for_call(direction, call.from_number, call.to_number)
-
+        rows = zip(all_calls, lead_phones, lead_phones_normalized, contact_periods, local_dates)
+        for call, lead_phone, lead_phone_normalized, contact_period, call_date in rows:
             if not lead_phone:
                 continue
 
-            # Normaliza o número (últimos 10 dígitos)
-            lead_phone_normalized = ''.join(c for c in lead_phone if c.isdigit())[-10:]
-
             # Pula se o lead é um número Twilio
             if lead_phone_normalized in twilio_numbers_normalized:
                 call.contact_number = None
                 call.contact_number_today = None
                 call.previously_answered = False
-                call.contact_period = get_contact_period(call.started_at, call.lead_state)
+                call.contact_period = contact_period
                 skipped_twilio += 1
                 continue
 
-            # Data da chamada
-            call_date = call.started_at.date() if call.started_at else None
-
             # 1. Contact number (total - inbound + outbound)
             phone_contact_count[lead_phone_normalized] = phone_contact_count.get(lead_phone_normalized, 0) + 1
             call.contact_number = phone_contact_count[lead_phone_normalized]
@@ -2089,7 +1836,7 @@ def admin_setup_contact_tracking():
                 phone_answered[lead_phone_normalized] = True
 
             # 4. Contact period
-            call.contact_period = get_contact_period(call.started_at, call.lead_state)
+            call.contact_period = contact_period
 
             updated_count += 1
 
@@ -2107,7 +1854,186 @@ def admin_setup_contact_tracking():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/admin/profiles", methods=['GET'])
+@jwt_required
+def list_profiles():
+    """
+    Lista os perfis de requisição gravados (mais recentes primeiro)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+    responses:
+      200:
+        description: Resumo dos perfis (rota, duração, queries SQL)
+    """
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    return jsonify({'profiles': get_profile_store().list(limit)})
+
+
+@app.route("/admin/profiles/<profile_id>", methods=['GET'])
+@jwt_required
+def get_profile(profile_id):
+    """
+    Perfil completo de uma requisição (SQL com tempos, amostras de stack)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+      - name: format
+        in: query
+        type: string
+        enum: [json, folded]
+        description: folded = stacks no formato do flamegraph.pl / speedscope
+    responses:
+      200:
+        description: Perfil
+      404:
+        description: Perfil não encontrado
+    """
+    profile = get_profile_store().get(profile_id)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if request.args.get('format') == 'folded':
+        return '\n'.join(profile['cpu']['folded']) + '\n', 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    return jsonify(profile)
+
+
+@app.route("/admin/memory", methods=['GET'])
+@jwt_required
+def memory_stats():
+    """
+    Diagnóstico de memória do worker que atendeu (RSS, tracemalloc, sessões ORM, gc)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - name: types
+        in: query
+        type: boolean
+        description: Conta objetos por tipo (percorre todos os objetos - lento)
+    responses:
+      200:
+        description: Estatísticas de memória deste processo
+    """
+    watchdog = memory.get_memory_watchdog()
+    if watchdog is not None:
+        process = watchdog.stats()
+    else:
+        process = {'pid': os.getpid(), 'rss_mb': round(memory.current_rss_bytes() / (1024 * 1024), 2)}
+    return jsonify({
+        'process': process,
+        'tracemalloc': memory.get_tracemalloc_session().status(),
+        'orm': memory.orm_stats(db),
+        'gc': memory.gc_stats(with_types=request.args.get('types', '').lower() in ('1', 'true'))
+    })
+
+
+@app.route("/admin/memory/tracemalloc/<action>", methods=['POST'])
+@jwt_required
+def memory_tracemalloc(action):
+    """
+    Controla o tracemalloc deste worker (start, baseline, stop)
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - name: action
+        in: path
+        type: string
+        enum: [start, baseline, stop]
+        required: true
+      - name: body
+        in: body
+        schema:
+          type: object
+          properties:
+            frames:
+              type: integer
+              default: 1
+              description: Frames guardados por alocação (start)
+    responses:
+      200:
+        description: Estado do tracemalloc
+      400:
+        description: Ação inválida
+    """
+    session = memory.get_tracemalloc_session()
+    if action == 'start':
+        frames = min(int((request.get_json(silent=True) or {}).get('frames', 1)), 25)
+        status = session.start(frames)
+    elif action == 'baseline':
+        status = session.reset_baseline()
+    elif action == 'stop':
+        status = session.stop()
+    else:
+        return jsonify({"error": "action must be start, baseline or stop"}), 400
+    logger.info(f"[MEMORY] tracemalloc {action} (pid {os.getpid()})")
+    return jsonify({'pid': os.getpid(), **status})
+
+
+@app.route("/admin/memory/tracemalloc/top", methods=['GET'])
+@jwt_required
+def memory_tracemalloc_top():
+    """
+    Maiores alocadores (por arquivo ou linha), ou crescimento desde o baseline
+    ---
+    tags:
+      - Admin
+    security:
+      - Bearer: []
+    parameters:
+      - name: group_by
+        in: query
+        type: string
+        enum: [lineno, filename, traceback]
+        default: lineno
+      - name: diff
+        in: query
+        type: boolean
+        default: true
+      - name: limit
+        in: query
+        type: integer
+        default: 25
+    responses:
+      200:
+        description: Top alocadores
+      409:
+        description: tracemalloc não está ativo
+    """
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in ('lineno', 'filename', 'traceback'):
+        return jsonify({"error": "group_by must be lineno, filename or traceback"}), 400
+    try:
+        result = memory.get_tracemalloc_session().top(
+            group_by=group_by,
+            limit=min(request.args.get('limit', 25, type=int), 200),
+            diff=request.args.get('diff', 'true').lower() != 'false'
+        )
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({'pid': os.getpid(), **result})
+
+
 @app.route("/admin/analyze_calls", methods=['GET'])
+@read_only
 def analyze_calls():
     """
     Análise diagnóstica das chamadas.
@@ -2200,116 +2126,705 @@ def analyze_calls():
         return jsonify({'error': str(e)}), 500
 
 
-# ============== ATTIO CRM INTEGRATION ==============
+# ============== CALLER ID POOL ==============
 
-@app.route("/attio/lead", methods=['GET'])
+@app.route("/caller_ids", methods=['GET'])
 @jwt_required
-def get_attio_lead():
+def list_caller_ids():
     """
-    Busca dados do lead no Attio pelo número de telefone
+    Lista os números do pool de caller ID e o uso por minuto (deste worker)
     ---
     tags:
-      - Attio
+      - Caller ID
     security:
       - Bearer: []
-    parameters:
-      - name: phone
-        in: query
-        type: string
-        required: true
-        description: Número de telefone para buscar (formato E.164 ou 10 dígitos)
     responses:
       200:
-        description: Dados do lead encontrado
-      404:
-        description: Lead não encontrado
-      500:
-        description: Erro na integração com Attio
+        description: Números cadastrados e estatísticas do pool
     """
-    phone = request.args.get('phone')
-
-    if not phone:
-        return jsonify({"error": "Missing 'phone' parameter"}), 400
-
-    attio = get_attio_client()
-    if attio is None:
-        return jsonify({"error": "Attio integration not configured"}), 500
-
-    try:
-        lead = attio.search_person_by_phone(phone)  # type: ignore[union-attr]
-
-        if lead:
-            # Include raw if debug param is set
-            if request.args.get('debug') == 'true':
-                print(f"[ATTIO] Found lead for {phone}: {lead.get('name', 'Unknown')} (debug mode)")
-                return jsonify({"found": True, "lead": lead})
-            else:
-                # Remove raw data from response (too verbose)
-                lead_response = {k: v for k, v in lead.items() if k != 'raw'}
-                print(f"[ATTIO] Found lead for {phone}: {lead_response.get('name', 'Unknown')}")
-                return jsonify({"found": True, "lead": lead_response})
-        else:
-            print(f"[ATTIO] No lead found for {phone}")
-            return jsonify({"found": False, "lead": None}), 404
+    from models.phone_number import PhoneNumber
 
-    except Exception as e:
-        print(f"[ATTIO ERROR] {e}")
-        return jsonify({"error": str(e)}), 500
+    numbers = PhoneNumber.query.order_by(PhoneNumber.state.asc(), PhoneNumber.phone_number.asc()).all()
+    pool = get_caller_id_pool()
+    return jsonify({
+        "numbers": [n.to_dict() for n in numbers],
+        "pool": pool.stats() if pool else None
+    })
 
 
-@app.route("/attio/lead/note", methods=['POST'])
+@app.route("/caller_ids", methods=['POST'])
 @jwt_required
-def add_attio_note():
+def add_caller_id():
     """
-    Adiciona uma nota ao lead no Attio (para logar resultado da chamada)
+    Adiciona um número Twilio ao pool de caller ID
     ---
     tags:
-      - Attio
+      - Caller ID
     security:
       - Bearer: []
     parameters:
-      - name: record_id
-        in: formData
-        type: string
-        required: true
-        description: ID do record no Attio
-      - name: note
-        in: formData
-        type: string
+      - name: body
+        in: body
         required: true
-        description: Conteúdo da nota
+        schema:
+          required:
+            - phone_number
+          properties:
+            phone_number:
+              type: string
+              description: Número Twilio (E.164)
+            label:
+              type: string
+            max_calls_per_minute:
+              type: integer
+              description: Limite de chamadas por minuto (default CALLER_ID_MAX_CALLS_PER_MINUTE)
     responses:
-      200:
-        description: Nota adicionada com sucesso
+      201:
+        description: Número adicionado
       400:
-        description: Parâmetros ausentes
-      500:
-        description: Erro na integração com Attio
+        description: Número inválido
+      409:
+        description: Número já cadastrado
     """
-    record_id = request.form.get('record_id')
-    note = request.form.get('note')
+    from core.phone_utils import format_phone_number, normalize_phone
+    from models.phone_number import PhoneNumber
 
-    if not record_id or not note:
-        return jsonify({"error": "Missing 'record_id' or 'note' parameter"}), 400
+    data = request.get_json() or {}
+    phone_number = format_phone_number(data.get('phone_number') or '')
+    if not phone_number.startswith('+1') or len(phone_number) != 12:
+        return jsonify({"error": "Invalid 'phone_number' (expected US/CA number in E.164)"}), 400
+
+    if PhoneNumber.query.filter_by(phone_number=phone_number).first():
+        return jsonify({"error": "Phone number already in pool"}), 409
+
+    number = PhoneNumber(
+        phone_number=phone_number,
+        area_code=normalize_phone(phone_number)[:3],
+        state=get_state_from_phone(phone_number),
+        label=data.get('label'),
+        max_calls_per_minute=data.get('max_calls_per_minute'),
+        is_active=True
+    )
+    db.session.add(number)
+    db.session.commit()
+    load_caller_id_pool()
+
+    outbound_log.info(f"[CALLER ID] Added {phone_number} ({number.state or 'no state'}) to pool")
+    return jsonify(number.to_dict()), 201
+
+
+@app.route("/caller_ids/<int:number_id>", methods=['PATCH'])
+@jwt_required
+def update_caller_id(number_id):
+    """
+    Atualiza um número do pool (ativar/desativar, label, limite por minuto)
+    ---
+    tags:
+      - Caller ID
+    security:
+      - Bearer: []
+    parameters:
+      - name: number_id
+        in: path
+        type: integer
+        required: true
+      - name: body
+        in: body
+        schema:
+          properties:
+            is_active:
+              type: boolean
+            label:
+              type: string
+            max_calls_per_minute:
+              type: integer
+    responses:
+      200:
+        description: Número atualizado
+      404:
+        description: Número não encontrado
+    """
+    from models.phone_number import PhoneNumber
+
+    number = db.session.get(PhoneNumber, number_id)
+    if not number:
+        return jsonify({"error": "Phone number not found"}), 404
+
+    data = request.get_json() or {}
+    for field in ('is_active', 'label', 'max_calls_per_minute'):
+        if field in data:
+            setattr(number, field, data[field])
+    db.session.commit()
+    load_caller_id_pool()
+
+    return jsonify(number.to_dict())
+
+
+# ============== CAMPAIGNS ==============
+
+def _parse_campaign_leads():
+    """
+    Leads do request: JSON {"leads": [{"phone_number", "name"}]} ou
+    upload CSV (campo 'file', colunas phone_number/phone e name).
+    Retorna (leads válidos, números inválidos).
+    """
+    import csv
+    import io
+    from core.phone_utils import format_phone_number
+
+    if 'file' in request.files:
+        content = request.files['file'].read().decode('utf-8-sig')
+        rows = list(csv.DictReader(io.StringIO(content)))
+    else:
+        rows = (request.get_json(silent=True) or {}).get('leads') or []
+
+    leads, invalid, seen = [], [], set()
+    for row in rows:
+        if isinstance(row, str):
+            row = {'phone_number': row}
+        raw = (row.get('phone_number') or row.get('phone') or '').strip()
+        phone_number = format_phone_number(raw)
+        if not phone_number.startswith('+') or len(phone_number) < 11:
+            invalid.append(raw)
+            continue
+        if phone_number in seen:
+            continue
+        seen.add(phone_number)
+        leads.append({'phone_number': phone_number, 'name': (row.get('name') or '').strip() or None})
+    return leads, invalid
+
+
+def _add_campaign_leads(campaign, leads):
+    """Insere leads que ainda não estão na campanha. Retorna quantos foram adicionados."""
+    from models.campaign import CampaignLead
+
+    existing = {
+        phone for (phone,) in db.session.query(CampaignLead.phone_number).filter_by(campaign_id=campaign.id)
+    }
+    added = 0
+    for lead in leads:
+        if lead['phone_number'] in existing:
+            continue
+        db.session.add(CampaignLead(
+            campaign_id=campaign.id,
+            phone_number=lead['phone_number'],
+            name=lead['name'],
+            lead_state=get_state_from_phone(lead['phone_number']),
+            status='pending'
+        ))
+        added += 1
+    return added
+
+
+@app.route("/campaigns", methods=['GET'])
+@jwt_required
+@read_only
+def list_campaigns():
+    """
+    Lista as campanhas do discador
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    parameters:
+      - name: status
+        in: query
+        type: string
+        description: Filtrar por status (draft, running, paused, completed, canceled)
+    responses:
+      200:
+        description: Lista de campanhas com contagem de leads por status
+    """
+    from models.campaign import Campaign
+
+    query = Campaign.query
+    status = request.args.get('status')
+    if status:
+        query = query.filter_by(status=status)
+    campaigns = query.order_by(Campaign.created_at.desc()).all()
+    return jsonify({
+        "campaigns": [c.to_dict(lead_counts=dialer.get_lead_counts(c.id)) for c in campaigns]
+    })
+
+
+@app.route("/campaigns", methods=['POST'])
+@jwt_required
+def create_campaign():
+    """
+    Cria uma campanha com a lista de leads (JSON ou upload CSV)
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    consumes:
+      - application/json
+      - multipart/form-data
+    parameters:
+      - name: body
+        in: body
+        schema:
+          required:
+            - name
+          properties:
+            name:
+              type: string
+            calls_per_second:
+              type: number
+              description: Ritmo da campanha (limitado por DIALER_ACCOUNT_CPS)
+            max_attempts:
+              type: integer
+            max_attempts_per_day:
+              type: integer
+              description: Tentativas por dia local do lead
+            retry_delay_minutes:
+              type: integer
+            leads:
+              type: array
+              items:
+                properties:
+                  phone_number:
+                    type: string
+                  name:
+                    type: string
+    responses:
+      201:
+        description: Campanha criada (status draft)
+      400:
+        description: Nome ausente ou nenhum lead válido
+    """
+    from models.campaign import Campaign
+
+    data = request.get_json(silent=True) or request.form
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({"error": "Missing 'name'"}), 400
+
+    leads, invalid = _parse_campaign_leads()
+    if not leads:
+        return jsonify({"error": "No valid leads", "invalid": invalid}), 400
+
+    campaign = Campaign(
+        name=name,
+        status='draft',
+        calls_per_second=min(float(data.get('calls_per_second') or Config.DIALER_ACCOUNT_CPS), Config.DIALER_ACCOUNT_CPS),
+        max_attempts=int(data.get('max_attempts') or 3),
+        max_attempts_per_day=int(data.get('max_attempts_per_day') or 2),
+        retry_delay_minutes=int(data.get('retry_delay_minutes') or 60),
+        created_by=g.current_user_email
+    )
+    db.session.add(campaign)
+    db.session.flush()
+    added = _add_campaign_leads(campaign, leads)
+    db.session.commit()
+
+    dialer_log.info(f"[DIALER] Campaign {campaign.id} '{name}' created with {added} leads ({len(invalid)} invalid)")
+    return jsonify({
+        **campaign.to_dict(lead_counts=dialer.get_lead_counts(campaign.id)),
+        "invalid": invalid
+    }), 201
+
+
+@app.route("/campaigns/<int:campaign_id>", methods=['GET'])
+@jwt_required
+@read_only
+def get_campaign(campaign_id):
+    """
+    Detalhes da campanha e progresso dos leads
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    parameters:
+      - name: campaign_id
+        in: path
+        type: integer
+        required: true
+      - name: lead_status
+        in: query
+        type: string
+        description: Filtrar leads por status
+      - name: limit
+        in: query
+        type: integer
+        default: 100
+    responses:
+      200:
+        description: Campanha, contagem por status e leads
+      404:
+        description: Campanha não encontrada
+    """
+    from models.campaign import Campaign, CampaignLead
+
+    campaign = db.session.get(Campaign, campaign_id)
+    if not campaign:
+        return jsonify({"error": "Campaign not found"}), 404
+
+    query = campaign.leads
+    lead_status = request.args.get('lead_status')
+    if lead_status:
+        query = query.filter_by(status=lead_status)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    leads = query.order_by(CampaignLead.id.asc()).limit(limit).all()
+
+    return jsonify({
+        **campaign.to_dict(lead_counts=dialer.get_lead_counts(campaign.id)),
+        "lead_list": [lead.to_dict() for lead in leads]
+    })
+
+
+@app.route("/campaigns/<int:campaign_id>/leads", methods=['POST'])
+@jwt_required
+def add_campaign_leads(campaign_id):
+    """
+    Adiciona leads a uma campanha (JSON ou upload CSV); números repetidos são ignorados
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    parameters:
+      - name: campaign_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Quantidade de leads adicionados
+      404:
+        description: Campanha não encontrada
+      409:
+        description: Campanha finalizada ou cancelada
+    """
+    from models.campaign import Campaign
+
+    campaign = db.session.get(Campaign, campaign_id)
+    if not campaign:
+        return jsonify({"error": "Campaign not found"}), 404
+    if campaign.status in ('completed', 'canceled'):
+        return jsonify({"error": f"Campaign is {campaign.status}"}), 409
+
+    leads, invalid = _parse_campaign_leads()
+    added = _add_campaign_leads(campaign, leads)
+    db.session.commit()
+    return jsonify({"added": added, "invalid": invalid, "leads": dialer.get_lead_counts(campaign.id)})
+
+
+def _set_campaign_status(campaign_id, status, allowed_from):
+    from models.campaign import Campaign
+
+    campaign = db.session.get(Campaign, campaign_id)
+    if not campaign:
+        return jsonify({"error": "Campaign not found"}), 404
+    if campaign.status not in allowed_from:
+        return jsonify({"error": f"Cannot change campaign from {campaign.status} to {status}"}), 409
+
+    campaign.status = status
+    campaign.lease_owner = None
+    campaign.lease_expires_at = None
+    if status == 'running' and not campaign.started_at:
+        campaign.started_at = datetime.now(timezone.utc)
+    if status == 'canceled':
+        campaign.completed_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+    dialer_log.info(f"[DIALER] Campaign {campaign_id} -> {status}")
+    return jsonify(campaign.to_dict(lead_counts=dialer.get_lead_counts(campaign.id)))
+
+
+@app.route("/campaigns/<int:campaign_id>/start", methods=['POST'])
+@jwt_required
+def start_campaign(campaign_id):
+    """
+    Inicia (ou retoma) a discagem da campanha
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    parameters:
+      - name: campaign_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Campanha em execução
+      404:
+        description: Campanha não encontrada
+      409:
+        description: Transição de status inválida
+    """
+    return _set_campaign_status(campaign_id, 'running', ('draft', 'paused'))
+
+
+@app.route("/campaigns/<int:campaign_id>/pause", methods=['POST'])
+@jwt_required
+def pause_campaign(campaign_id):
+    """
+    Pausa a campanha (chamadas em andamento continuam)
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    parameters:
+      - name: campaign_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Campanha pausada
+      404:
+        description: Campanha não encontrada
+      409:
+        description: Transição de status inválida
+    """
+    return _set_campaign_status(campaign_id, 'paused', ('running',))
+
+
+@app.route("/campaigns/<int:campaign_id>/cancel", methods=['POST'])
+@jwt_required
+def cancel_campaign(campaign_id):
+    """
+    Cancela a campanha (leads pendentes não serão mais discados)
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    parameters:
+      - name: campaign_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Campanha cancelada
+      404:
+        description: Campanha não encontrada
+      409:
+        description: Transição de status inválida
+    """
+    return _set_campaign_status(campaign_id, 'canceled', ('draft', 'running', 'paused'))
+
+
+@app.route("/dialer/stats", methods=['GET'])
+@jwt_required
+def get_dialer_stats():
+    """
+    Métricas do discador neste worker (ritmo, latência de criação, limites)
+    ---
+    tags:
+      - Campaigns
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Contadores, chamadas/segundo e percentis de latência
+    """
+    campaign_dialer = dialer.get_dialer()
+    if campaign_dialer is None:
+        return jsonify({"enabled": False})
+
+    return jsonify({
+        "enabled": True,
+        "scheduler": campaign_dialer.is_scheduler,
+        "account_cps": campaign_dialer.account_cps,
+        "lines_per_agent": campaign_dialer.lines_per_agent,
+        "available_agents": campaign_dialer.available_agents(),
+        "in_flight": campaign_dialer.in_flight(),
+        **campaign_dialer.metrics.snapshot()
+    })
+
+
+# ============== ATTIO CRM INTEGRATION ==============
+
+@app.route("/attio/lead", methods=['GET'])
+@jwt_required
+def get_attio_lead():
+    """
+    Busca dados do lead no Attio pelo número de telefone
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    parameters:
+      - name: phone
+        in: query
+        type: string
+        required: true
+        description: Número de telefone para buscar (formato E.164 ou 10 dígitos)
+    responses:
+      200:
+        description: Dados do lead encontrado
+      404:
+        description: Lead não encontrado
+      500:
+        description: Erro na integração com Attio
+    """
+    phone = request.args.get('phone')
+
+    if not phone:
+        return jsonify({"error": "Missing 'phone' parameter"}), 400
+
+    # Lead pre-warmed while the call was ringing
+    if request.args.get('debug') != 'true':
+        context = get_lead_context_cache().get(phone=phone, wait=Config.LEAD_CONTEXT_WAIT)
+        # Só hits: o lead pode ter sido criado durante a chamada, e um "não encontrado"
+        # do prewarm valeria LEAD_CONTEXT_TTL (mirror e LeadCache reveem misses bem antes)
+        if context and not context.get('errors') and context.get('lead'):
+            attio_log.info(f"[ATTIO] Found lead for {phone}: {context['lead'].get('name', 'Unknown')} (prewarmed)")
+            return jsonify({"found": True, "lead": context['lead'], "source": "prewarm"})
+
+    # Serve from the local mirror while it is within the freshness SLA
+    try:
+        if attio_mirror.is_mirror_fresh():
+            person = attio_mirror.find_person_by_phone(phone)
+            if person:
+                lead = person.to_lead_dict(include_raw=request.args.get('debug') == 'true')
+                attio_log.info(f"[ATTIO] Found lead for {phone}: {lead.get('name', 'Unknown')} (mirror)")
+                return jsonify({"found": True, "lead": lead, "source": "mirror"})
+            if attio_mirror.has_full_sync():
+                attio_log.info(f"[ATTIO] No lead found for {phone} (mirror)")
+                return jsonify({"found": False, "lead": None, "source": "mirror"}), 404
+            # Mirror ainda sem um sync completo: o lead pode só não ter chegado
+            attio_log.info(f"[ATTIO] {phone} not in the mirror yet - asking Attio")
+    except Exception as e:
+        attio_log.warning(f"[ATTIO MIRROR ERROR] {e} - falling back to Attio API")
 
     attio = get_attio_client()
     if attio is None:
         return jsonify({"error": "Attio integration not configured"}), 500
 
     try:
-        success = attio.add_note_to_person(record_id, note)  # type: ignore[union-attr]
+        lead = attio.find_lead_by_phone(phone)  # type: ignore[union-attr]
 
-        if success:
-            print(f"[ATTIO] Note added to record {record_id}")
-            return jsonify({"success": True})
+        if lead:
+            # Include raw if debug param is set
+            if request.args.get('debug') == 'true':
+                attio_log.info(f"[ATTIO] Found lead for {phone}: {lead.get('name', 'Unknown')} (debug mode)")
+                return jsonify({"found": True, "lead": lead})
+            else:
+                # Remove raw data from response (too verbose)
+                lead_response = {k: v for k, v in lead.items() if k != 'raw'}
+                attio_log.info(f"[ATTIO] Found lead for {phone}: {lead_response.get('name', 'Unknown')}")
+                return jsonify({"found": True, "lead": lead_response})
         else:
-            return jsonify({"success": False, "error": "Failed to add note"}), 500
+            attio_log.info(f"[ATTIO] No lead found for {phone}")
+            return jsonify({"found": False, "lead": None}), 404
 
     except Exception as e:
-        print(f"[ATTIO ERROR] {e}")
+        attio_log.error(f"[ATTIO ERROR] {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/attio/cache/stats", methods=['GET'])
+@jwt_required
+def get_attio_cache_stats():
+    """
+    Estatísticas do cache de leads do Attio (hits, misses, tamanho)
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Estatísticas do cache
+    """
+    lead_cache = get_lead_cache()
+    if lead_cache is None:
+        return jsonify({"enabled": False})
+
+    return jsonify({"enabled": True, "stats": lead_cache.stats()})
+
+
+@app.route("/attio/lead/note", methods=['POST'])
+@jwt_required
+def add_attio_note():
+    """
+    Adiciona uma nota ao lead no Attio (para logar resultado da chamada).
+    A nota entra na fila (outbox) e é enviada ao Attio em background.
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    parameters:
+      - name: record_id
+        in: formData
+        type: string
+        required: true
+        description: ID do record no Attio
+      - name: note
+        in: formData
+        type: string
+        required: true
+        description: Conteúdo da nota
+      - name: Idempotency-Key
+        in: header
+        type: string
+        required: false
+        description: Chave para evitar notas duplicadas em reenvios
+    responses:
+      202:
+        description: Nota enfileirada para envio ao Attio
+      400:
+        description: Parâmetros ausentes
+      500:
+        description: Erro na integração com Attio
+    """
+    record_id = request.form.get('record_id')
+    note = request.form.get('note')
+
+    if not record_id or not note:
+        return jsonify({"error": "Missing 'record_id' or 'note' parameter"}), 400
+
+    if get_attio_client() is None:
+        return jsonify({"error": "Attio integration not configured"}), 500
+
+    try:
+        outbox_note, created = enqueue_note(
+            note,
+            record_id=record_id,
+            idempotency_key=request.headers.get('Idempotency-Key')
+        )
+        attio_log.info(f"[ATTIO] Note {'queued' if created else 'already queued'} for record {record_id} (outbox id {outbox_note.id})")
+        return jsonify({
+            "success": True,
+            "queued": True,
+            "note_id": outbox_note.id,
+            "status": outbox_note.status
+        }), 202
+
+    except Exception as e:
+        db.session.rollback()
+        attio_log.error(f"[ATTIO ERROR] {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/attio/notes/outbox", methods=['GET'])
+@jwt_required
+def get_attio_outbox_status():
+    """
+    Status da fila de notas do Attio (pendentes, enviadas, falhas)
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Contagem por status
+    """
+    return jsonify(get_outbox_stats())
+
+
 @app.route("/attio/contacts", methods=['GET'])
 @jwt_required
 def search_attio_contacts():
@@ -2341,20 +2856,144 @@ def search_attio_contacts():
     query = request.args.get('q', '').strip()
     limit = int(request.args.get('limit', 50))
 
+    # In-process index answers typeahead without touching the database or Attio
+    index = contact_index.get_ready_index()
+    if index is not None:
+        contacts = index.search(query, limit)
+        return jsonify({"contacts": contacts, "count": len(contacts), "source": "index"})
+
+    # Serve from the local mirror while it is within the freshness SLA
+    try:
+        if attio_mirror.is_mirror_fresh():
+            contacts = attio_mirror.search_people(query if query else None, limit)
+            attio_log.info(f"[ATTIO] Contacts search (mirror): query='{query}', found={len(contacts)}")
+            return jsonify({"contacts": contacts, "count": len(contacts), "source": "mirror"})
+    except Exception as e:
+        attio_log.warning(f"[ATTIO MIRROR ERROR] {e} - falling back to Attio API")
+
     attio = get_attio_client()
     if attio is None:
         return jsonify({"error": "Attio integration not configured"}), 500
 
     try:
         contacts = attio.search_people(query if query else None, limit)  # type: ignore[union-attr]
-        print(f"[ATTIO] Contacts search: query='{query}', found={len(contacts)}")
+        attio_log.info(f"[ATTIO] Contacts search: query='{query}', found={len(contacts)}")
         return jsonify({"contacts": contacts, "count": len(contacts)})
 
     except Exception as e:
-        print(f"[ATTIO ERROR] {e}")
+        attio_log.error(f"[ATTIO ERROR] {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/attio/mirror/status", methods=['GET'])
+@jwt_required
+def get_attio_mirror_status():
+    """
+    Status do espelho local de pessoas do Attio (cursor, última sincronização, frescor)
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Status da sincronização
+    """
+    return jsonify(attio_mirror.get_mirror_status())
+
+
+@app.route("/attio/mirror/sync", methods=['POST'])
+@jwt_required
+def run_attio_mirror_sync():
+    """
+    Executa uma rodada de sincronização do espelho do Attio agora.
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        schema:
+          properties:
+            full:
+              type: boolean
+              description: Reinicia do começo (resync completo)
+    responses:
+      200:
+        description: Resultado da sincronização
+      400:
+        description: Espelho desabilitado
+    """
+    mirror_sync = attio_mirror.get_mirror_sync()
+    if mirror_sync is None:
+        return jsonify({"error": "Attio mirror not enabled (ATTIO_MIRROR_ENABLED / ATTIO_API_KEY)"}), 400
+
+    data = request.get_json(silent=True) or {}
+    if data.get('full'):
+        mirror_sync.reset()
+
+    result = mirror_sync.run_once()
+    return jsonify(result), (500 if result.get('error') else 200)
+
+
+@app.route("/attio/contacts/index", methods=['GET'])
+@jwt_required
+def get_contact_index_status():
+    """
+    Status do índice de busca de contatos em memória (deste worker)
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Tamanho, idade e se o índice está sendo usado
+    """
+    index = contact_index.get_contact_index()
+    if index is None:
+        return jsonify({"enabled": False})
+    return jsonify({
+        "enabled": True,
+        "ready": contact_index.get_ready_index() is not None,
+        "max_age_seconds": Config.CONTACT_INDEX_MAX_AGE,
+        **index.stats()
+    })
+
+
+@app.route("/attio/contacts/index/refresh", methods=['POST'])
+@jwt_required
+def run_contact_index_refresh():
+    """
+    Recarrega o índice de busca de contatos deste worker agora.
+    ---
+    tags:
+      - Attio
+    security:
+      - Bearer: []
+    parameters:
+      - name: body
+        in: body
+        schema:
+          properties:
+            full:
+              type: boolean
+              description: Recarrega o snapshot completo (default true)
+    responses:
+      200:
+        description: Resultado da recarga
+      400:
+        description: Índice desabilitado
+    """
+    data = request.get_json(silent=True) or {}
+    result = contact_index.refresh_contact_index(full=data.get('full', True))
+    if not result.get('enabled'):
+        return jsonify({"error": "Contact index not enabled (CONTACT_INDEX_ENABLED)"}), 400
+    return jsonify(result), (500 if result.get('error') else 200)
+
+
 # ============== MAIN ==============
 
 if __name__ == "__main__":
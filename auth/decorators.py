@@ -3,6 +3,7 @@ from functools import wraps
 from flask import request, jsonify, g
 import jwt
 from twilio.request_validator import RequestValidator
+from auth.jwt_utils import decode_token_cached
 
 
 def jwt_required(f):
@@ -27,11 +28,8 @@ def jwt_required(f):
             return jsonify({'error': 'Invalid Authorization header format. Use: Bearer TOKEN ou apenas TOKEN'}), 401
 
         try:
-            payload = jwt.decode(
-                token,
-                os.environ.get('JWT_SECRET'),
-                algorithms=['HS256']
-            )
+            # Claims de tokens já verificados ficam em cache (exp ainda é checado)
+            payload = decode_token_cached(token)
             g.current_user_id = payload['user_id']
             g.current_user_email = payload['email']
         except jwt.ExpiredSignatureError:
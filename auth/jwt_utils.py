@@ -1,4 +1,7 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 import jwt
 
@@ -22,3 +25,58 @@ def create_token(user_id, email):
 def decode_token(token):
     """Decode and validate a JWT token"""
     return jwt.decode(token, os.environ.get('JWT_SECRET'), algorithms=['HS256'])
+
+
+class ClaimsCache:
+    """
+    Decoded JWT payloads keyed by token string (thread-safe, LRU bounded).
+
+    Only successfully verified tokens are cached; `exp` is still checked on
+    every hit, and changing JWT_SECRET drops all entries.
+    """
+
+    def __init__(self, max_size, clock=time.time):
+        self.max_size = max_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._secret = None
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, token, secret):
+        """Same result as decode_token(), from cache when possible"""
+        if self.max_size <= 0:
+            return jwt.decode(token, secret, algorithms=['HS256'])
+
+        with self._lock:
+            if secret != self._secret:
+                self._entries.clear()
+                self._secret = secret
+            payload = self._entries.get(token)
+            if payload is not None:
+                exp = payload.get('exp')
+                if exp is not None and exp <= self._clock():
+                    del self._entries[token]
+                    raise jwt.ExpiredSignatureError('Signature has expired')
+                self._entries.move_to_end(token)
+                self.hits += 1
+                return payload
+
+        payload = jwt.decode(token, secret, algorithms=['HS256'])
+
+        with self._lock:
+            self.misses += 1
+            if secret == self._secret:
+                self._entries[token] = payload
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return payload
+
+
+_claims_cache = ClaimsCache(int(os.environ.get('JWT_CLAIMS_CACHE_SIZE', 1024)))
+
+
+def decode_token_cached(token):
+    """Decode and validate a JWT token, reusing claims of recently seen tokens"""
+    return _claims_cache.decode(token, os.environ.get('JWT_SECRET'))
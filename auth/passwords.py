@@ -0,0 +1,177 @@
+"""
+Password hashing off the request path, plus login throttling.
+
+bcrypt is CPU-bound (~250ms at cost 12). Hashes run on a small dedicated
+pool; at most PASSWORD_HASH_MAX_INFLIGHT requests per process may be
+hashing or waiting for the pool, and the rest fail fast (503) instead of
+tying up every gunicorn thread while Twilio webhooks wait.
+
+Failed logins are counted per IP and per email in a sliding window
+(per process); over the limit, /auth/login answers 429 before any bcrypt work.
+Expired keys are swept every SWEEP_EVERY failures and at most MAX_KEYS are
+kept (least recently failed dropped first), so stuffing across many emails
+or IPs cannot grow the map without bound.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import bcrypt
+
+from core.config import Config
+
+MAX_KEYS = 10000
+SWEEP_EVERY = 256
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes in flight - retry later"""
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool with fast-fail admission"""
+
+    def __init__(self, max_workers: int, max_inflight: int, rounds: int):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(max(1, max_inflight))
+        self._lock = threading.Lock()
+        self._stats = {'hashed': 0, 'verified': 0, 'rejected_busy': 0}
+
+    def _run(self, stat: str, func: Callable, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected_busy'] += 1
+            raise PasswordHasherBusy()
+        try:
+            result = self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+        with self._lock:
+            self._stats[stat] += 1
+        return result
+
+    def hash(self, password: str) -> str:
+        """bcrypt hash at the configured cost"""
+        return self._run('hashed', _hash, password, self.rounds)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self._run('verified', _verify, password, password_hash)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True if the hash was made with a different cost factor"""
+        return get_hash_rounds(password_hash) != self.rounds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def get_hash_rounds(password_hash: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ($2b$12$... -> 12)"""
+    parts = (password_hash or '').split('$')
+    if len(parts) >= 4 and parts[2].isdigit():
+        return int(parts[2])
+    return None
+
+
+class LoginThrottle:
+    """Sliding-window count of failed logins per IP and per email (thread-safe)"""
+
+    def __init__(self, max_per_ip: int, max_per_email: int, window: float,
+                 clock: Callable[[], float] = time.monotonic, max_keys: int = MAX_KEYS):
+        self.max_per_ip = max_per_ip
+        self.max_per_email = max_per_email
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures: "OrderedDict[str, deque]" = OrderedDict()  # Least recently failed first
+        self._recorded = 0
+
+    def _prune(self, key: str, now: float) -> deque:
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+
+    def retry_after(self, ip: str, email: str) -> int:
+        """Seconds until another attempt is allowed (0 = allowed now)"""
+        with self._lock:
+            now = self._clock()
+            wait = 0.0
+            for key, limit in ((f'ip:{ip}', self.max_per_ip), (f'email:{email}', self.max_per_email)):
+                failures = self._prune(key, now)
+                if limit and len(failures) >= limit:
+                    wait = max(wait, failures[-limit] + self.window - now)
+            return int(wait) + 1 if wait > 0 else 0
+
+    def record_failure(self, ip: str, email: str) -> None:
+        with self._lock:
+            now = self._clock()
+            for key in (f'ip:{ip}', f'email:{email}'):
+                self._failures.setdefault(key, deque()).append(now)
+                self._failures.move_to_end(key)
+            self._recorded += 1
+            if self._recorded % SWEEP_EVERY == 0:
+                self._sweep(now)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def _sweep(self, now: float) -> None:
+        """Drop the keys whose newest failure left the window"""
+        for key in [key for key, failures in self._failures.items() if failures[-1] <= now - self.window]:
+            del self._failures[key]
+
+    def reset(self, email: str) -> None:
+        """Successful login clears the email's failures (the IP count is kept)"""
+        with self._lock:
+            self._failures.pop(f'email:{email}', None)
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_login_throttle: Optional[LoginThrottle] = None
+_init_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the password hasher singleton"""
+    global _password_hasher
+    if _password_hasher is None:
+        with _init_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasher(
+                    max_workers=Config.PASSWORD_HASH_WORKERS,
+                    max_inflight=Config.PASSWORD_HASH_MAX_INFLIGHT,
+                    rounds=Config.BCRYPT_ROUNDS
+                )
+    return _password_hasher
+
+
+def get_login_throttle() -> LoginThrottle:
+    """Get the login throttle singleton"""
+    global _login_throttle
+    if _login_throttle is None:
+        with _init_lock:
+            if _login_throttle is None:
+                _login_throttle = LoginThrottle(
+                    max_per_ip=Config.LOGIN_MAX_FAILURES_PER_IP,
+                    max_per_email=Config.LOGIN_MAX_FAILURES_PER_EMAIL,
+                    window=Config.LOGIN_THROTTLE_WINDOW
+                )
+    return _login_throttle
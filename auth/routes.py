@@ -4,10 +4,26 @@ from models.user import User
 from core.database import db
 from auth.jwt_utils import create_token
 from auth.decorators import jwt_required
+from auth.passwords import PasswordHasherBusy, get_login_throttle, get_password_hasher
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def _client_ip():
+    """
+    Client IP behind the Railway proxy: the last X-Forwarded-For hop, which
+    the proxy appends (earlier hops come from the client and can be forged)
+    """
+    forwarded = request.headers.get('X-Forwarded-For', '')
+    return forwarded.split(',')[-1].strip() or request.remote_addr or 'unknown'
+
+
+def _busy_response():
+    response = jsonify({'error': 'Too many login requests, try again in a moment'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 def is_valid_email(email):
     """Simple email validation"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -53,6 +69,8 @@ def register():
         description: Dados invalidos
       409:
         description: Email ja registrado
+      503:
+        description: Muitas requisicoes de senha simultaneas (tente novamente)
     """
     data = request.get_json()
 
@@ -75,8 +93,12 @@ def register():
     if existing_user:
         return jsonify({'error': 'Email already registered'}), 409
 
-    user = User(email=email)
-    user.set_password(password)
+    try:
+        password_hash = get_password_hasher().hash(password)
+    except PasswordHasherBusy:
+        return _busy_response()
+
+    user = User(email=email, password_hash=password_hash)
 
     db.session.add(user)
     db.session.commit()
@@ -127,6 +149,10 @@ def login():
               type: object
       401:
         description: Email ou senha invalidos
+      429:
+        description: Muitas tentativas falhas (header Retry-After)
+      503:
+        description: Muitas requisicoes de senha simultaneas (tente novamente)
     """
     data = request.get_json()
 
@@ -139,11 +165,36 @@ def login():
     if not email or not password:
         return jsonify({'error': 'Email and password are required'}), 400
 
+    ip = _client_ip()
+    throttle = get_login_throttle()
+    retry_after = throttle.retry_after(ip, email)
+    if retry_after:
+        response = jsonify({'error': 'Too many failed login attempts, try again later'})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+
     user = User.query.filter_by(email=email).first()
 
-    if not user or not user.check_password(password):
+    hasher = get_password_hasher()
+    try:
+        valid = user is not None and hasher.verify(password, user.password_hash)
+    except PasswordHasherBusy:
+        return _busy_response()
+
+    if not valid:
+        throttle.record_failure(ip, email)
         return jsonify({'error': 'Invalid email or password'}), 401
 
+    throttle.reset(email)
+
+    # Rehash senhas criadas com outro custo (BCRYPT_ROUNDS); se o pool estiver cheio fica para o próximo login
+    if hasher.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hasher.hash(password)
+            db.session.commit()
+        except PasswordHasherBusy:
+            pass
+
     if not user.is_active:
         return jsonify({'error': 'Account is deactivated'}), 403
 
@@ -7,6 +7,7 @@ from dataclasses import dataclass
 import httpx
 
 from core.config import Config
+from core.metrics import external_call
 
 logger = logging.getLogger(__name__)
 
@@ -162,7 +163,7 @@ class SlackNotifier:
         }
 
         try:
-            with httpx.Client(timeout=10.0) as client:
+            with external_call('slack', 'webhook'), httpx.Client(timeout=10.0) as client:
                 response = client.post(self.webhook_url, json=payload)
                 response.raise_for_status()
                 logger.info(f"Slack alert sent for call {alert.call_sid}")
@@ -191,7 +192,7 @@ class SlackNotifier:
         }
 
         try:
-            with httpx.Client(timeout=10.0) as client:
+            with external_call('slack', 'webhook'), httpx.Client(timeout=10.0) as client:
                 response = client.post(self.webhook_url, json=payload)
                 response.raise_for_status()
                 return True
@@ -241,7 +242,7 @@ class AlertManager:
         elif status == 'failed' and self.alert_on_failed:
             result = True
 
-        print(f"[ALERT DEBUG] should_alert(status={status}) -> {result}")
+        logger.debug("should_alert(status=%s) -> %s", status, result)
         return result
 
     def notify_call_status(self, alert: CallAlert) -> dict:
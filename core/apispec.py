@@ -0,0 +1,101 @@
+"""
+Prebuilt OpenAPI spec.
+
+Flasgger builds /apispec.json by walking every route and YAML-parsing the
+docstrings. With APIDOCS_MODE=static the spec is built once - at image build
+(`flask --app app build-apispec`) or on the first /apispec.json request - and
+served from memory as gzip + ETag bytes; Flasgger's spec view is replaced.
+
+APIDOCS_MODE:
+- static: prebuilt spec (default)
+- dynamic: Flasgger builds the spec per request (docstring changes show up
+  without a restart in debug)
+- off: no /apidocs or /apispec.json
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+
+SPEC_ENDPOINT = 'apispec'
+
+
+class PrebuiltSpec:
+    """Serialized spec, its gzip form and ETag"""
+    __slots__ = ('body', 'gzipped', 'etag')
+
+    def __init__(self, body: bytes, gzipped: Optional[bytes] = None):
+        self.body = body
+        self.gzipped = gzipped if gzipped is not None else gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+    @classmethod
+    def from_spec(cls, spec: dict) -> 'PrebuiltSpec':
+        return cls(json.dumps(spec, separators=(',', ':'), sort_keys=True, default=str).encode('utf-8'))
+
+    @classmethod
+    def load(cls, path: str) -> 'PrebuiltSpec':
+        with open(path, 'rb') as f:
+            gzipped = f.read()
+        return cls(gzip.decompress(gzipped), gzipped)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(self.gzipped)
+
+    def response(self) -> Response:
+        if request.if_none_match.contains(self.etag):
+            response = Response(status=304)
+        elif 'gzip' in request.accept_encodings:
+            response = Response(self.gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'  # Revalidate with the ETag (304)
+        return response
+
+
+def build_spec(app) -> PrebuiltSpec:
+    """Run Flasgger's introspection once and serialize the result"""
+    with app.test_request_context('/apispec.json'):
+        return PrebuiltSpec.from_spec(app.swag.get_apispecs(SPEC_ENDPOINT))
+
+
+def serve_prebuilt_spec(app, spec_path: str) -> None:
+    """
+    Replace Flasgger's /apispec.json view with the prebuilt spec.
+
+    Loads spec_path if it exists, otherwise builds the spec on the first
+    request (once per process).
+    """
+    state = {'spec': None}
+    lock = threading.Lock()
+
+    if spec_path and os.path.exists(spec_path):
+        try:
+            state['spec'] = PrebuiltSpec.load(spec_path)
+            logger.info(f"[APIDOCS] Loaded prebuilt spec from {spec_path}")
+        except Exception as e:
+            logger.error(f"[APIDOCS] Failed to load {spec_path}, building at first request: {e}")
+
+    def apispec_view():
+        spec = state['spec']
+        if spec is None:
+            with lock:
+                if state['spec'] is None:
+                    state['spec'] = build_spec(app)
+                spec = state['spec']
+        return spec.response()
+
+    app.view_functions[f'flasgger.{SPEC_ENDPOINT}'] = apispec_view
@@ -10,38 +10,70 @@ import requests
 import logging
 from typing import Optional
 from core.config import Config
+from core.metrics import external_call
+from core.lead_cache import LeadCache, get_lead_cache
+from core.phone_utils import normalize_phone
 
 logger = logging.getLogger(__name__)
 
 ATTIO_API_BASE = "https://api.attio.com/v2"
 
 
+class AttioAPIError(Exception):
+    """Raised when an Attio request fails (network error or non-2xx response)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code  # None for network errors/timeouts
+        self.retry_after = retry_after  # Seconds, from Retry-After on 429
+
+    @property
+    def is_rate_limited(self) -> bool:
+        return self.status_code == 429
+
+    @property
+    def is_retryable(self) -> bool:
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
 class AttioClient:
     """Client for Attio CRM API"""
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, lead_cache: Optional[LeadCache] = None):
         self.api_key = api_key or Config.ATTIO_API_KEY
+        self.lead_cache = lead_cache
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-    def _request(self, method: str, endpoint: str, data: dict = None) -> dict:
-        """Make a request to Attio API"""
+    def _request(self, method: str, endpoint: str, data: dict = None, raise_errors: bool = False) -> dict:
+        """Make a request to Attio API (returns None on failure unless raise_errors)"""
         url = f"{ATTIO_API_BASE}{endpoint}"
 
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                json=data,
-                timeout=10
-            )
-            response.raise_for_status()
+            with external_call('attio', method):
+                response = requests.request(
+                    method=method,
+                    url=url,
+                    headers=self.headers,
+                    json=data,
+                    timeout=10
+                )
+                response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"[ATTIO] API request failed: {e}")
+            if raise_errors:
+                status_code = None
+                retry_after = None
+                if e.response is not None:
+                    status_code = e.response.status_code
+                    try:
+                        retry_after = float(e.response.headers.get('Retry-After', ''))
+                    except ValueError:
+                        retry_after = None
+                raise AttioAPIError(str(e), status_code, retry_after) from e
             return None
 
     def list_objects(self) -> list:
@@ -51,12 +83,35 @@ class AttioClient:
             return result.get("data", [])
         return []
 
-    def search_person_by_phone(self, phone_number: str) -> Optional[dict]:
+    def find_lead_by_phone(self, phone_number: str) -> Optional[dict]:
+        """
+        Search for a person/lead by phone number, going through the lead cache.
+
+        Misses are cached briefly; API failures are raised as AttioAPIError
+        and never cached.
+
+        Args:
+            phone_number: Phone number to search (any format)
+
+        Returns:
+            Lead data dict or None if not found
+        """
+        key = normalize_phone(phone_number)
+        if self.lead_cache is None or not key:
+            return self.search_person_by_phone(phone_number, raise_errors=True)
+
+        return self.lead_cache.get_or_load(
+            key,
+            lambda: self.search_person_by_phone(phone_number, raise_errors=True)
+        )
+
+    def search_person_by_phone(self, phone_number: str, raise_errors: bool = False) -> Optional[dict]:
         """
         Search for a person/lead by phone number.
 
         Args:
             phone_number: Phone number to search (any format)
+            raise_errors: Raise AttioAPIError on API failure instead of returning None
 
         Returns:
             Lead data dict or None if not found
@@ -77,24 +132,28 @@ class AttioClient:
             search_variants.append(f"+1{normalized}")
             search_variants.append(f"1{normalized}")
 
-        # Search in 'people' object
-        for variant in search_variants:
-            result = self._search_records("people", "phone_numbers", variant)
-            if result:
-                return self._format_person(result)
+        # All variants go in a single OR query (one round trip instead of one per variant)
+        result = self._search_records("people", "phone_numbers", search_variants, raise_errors)
+        if result:
+            return self._format_person(result)
 
         return None
 
-    def _search_records(self, object_slug: str, attribute: str, value: str) -> Optional[dict]:
-        """Search records by attribute value"""
+    def _search_records(self, object_slug: str, attribute: str, values: list,
+                        raise_errors: bool = False) -> Optional[dict]:
+        """Search records matching any of the given attribute values"""
         # Attio uses POST for queries
+        if len(values) == 1:
+            query_filter = {attribute: values[0]}
+        else:
+            query_filter = {"or": [{attribute: value} for value in values]}
+
         query_data = {
-            "filter": {
-                attribute: value
-            }
+            "filter": query_filter,
+            "limit": 1
         }
 
-        result = self._request("POST", f"/objects/{object_slug}/records/query", query_data)
+        result = self._request("POST", f"/objects/{object_slug}/records/query", query_data, raise_errors)
 
         if result and result.get("data"):
             records = result["data"]
@@ -103,7 +162,8 @@ class AttioClient:
 
         return None
 
-    def _format_person(self, record: dict) -> dict:
+    @staticmethod
+    def _format_person(record: dict) -> dict:
         """Format Attio person record to simplified dict"""
         values = record.get("values", {})
 
@@ -210,6 +270,37 @@ class AttioClient:
 
         return []
 
+    def list_people_page(self, created_from: Optional[str] = None, offset: int = 0, limit: int = 500) -> list:
+        """
+        List raw people records ordered by creation time (oldest first).
+
+        Used by the local mirror sync to page through the workspace.
+
+        Args:
+            created_from: Only records created at or after this ISO timestamp
+            offset: Records to skip (within the created_from filter)
+            limit: Page size
+
+        Returns:
+            List of raw Attio records (raises AttioAPIError on failure)
+        """
+        query_data = {
+            "limit": limit,
+            "offset": offset,
+            "sorts": [
+                {
+                    "attribute": "created_at",
+                    "direction": "asc"
+                }
+            ]
+        }
+
+        if created_from:
+            query_data["filter"] = {"created_at": {"$gte": created_from}}
+
+        result = self._request("POST", "/objects/people/records/query", query_data, raise_errors=True)
+        return (result or {}).get("data", [])
+
     def _format_person_simple(self, record: dict) -> dict:
         """Format Attio person record to simplified contact dict"""
         values = record.get("values", {})
@@ -257,18 +348,47 @@ class AttioClient:
         Returns:
             True if successful
         """
+        try:
+            self.create_note(record_id, note_content)
+            return True
+        except AttioAPIError:
+            return False
+
+    def create_note(self, record_id: str, note_content: str, title: str = "Call Log") -> dict:
+        """
+        Create a note on a person record.
+
+        Returns:
+            Created note data (raises AttioAPIError on failure)
+        """
         data = {
             "data": {
                 "parent_object": "people",
                 "parent_record_id": record_id,
-                "title": "Call Log",
+                "title": title,
                 "content": note_content,
                 "format": "plaintext"
             }
         }
 
-        result = self._request("POST", "/notes", data)
-        return result is not None
+        result = self._request("POST", "/notes", data, raise_errors=True)
+
+        # Cached lead data for this record is now stale
+        if self.lead_cache is not None:
+            self.lead_cache.invalidate_record(record_id)
+
+        return (result or {}).get("data", {})
+
+    def list_notes(self, record_id: str, limit: int = 50) -> list:
+        """
+        List the most recent notes on a person record.
+
+        Returns:
+            List of note dicts (raises AttioAPIError on failure)
+        """
+        endpoint = f"/notes?parent_object=people&parent_record_id={record_id}&limit={limit}"
+        result = self._request("GET", endpoint, raise_errors=True)
+        return (result or {}).get("data", [])
 
 
 # Singleton instance
@@ -280,7 +400,7 @@ def get_attio_client() -> Optional[AttioClient]:
     global _attio_client
     if _attio_client is None:
         if Config.ATTIO_API_KEY:
-            _attio_client = AttioClient()
+            _attio_client = AttioClient(lead_cache=get_lead_cache())
             logger.info("[ATTIO] Client initialized")
         else:
             logger.warning("[ATTIO] No API key configured")
@@ -0,0 +1,375 @@
+"""
+Local mirror of Attio people.
+
+Keeps the `attio_people` table in sync with Attio so lead lookups and contact
+searches can be served from the local database instead of api.attio.com.
+
+- Incremental: pages through people ordered by created_at, resuming from the
+  cursor saved in `attio_sync_state` after every page
+- Periodic full resync (Attio has no "updated since" filter, so edits to
+  existing records are picked up by re-walking from the start)
+- Only one worker syncs at a time (lease row in `attio_sync_state`)
+- Reads are only trusted while the last successful sync is within
+  ATTIO_MIRROR_MAX_AGE seconds (freshness SLA); otherwise callers fall back
+  to the live API
+- Every phone number of a person is indexed (`attio_person_phones`), like
+  the OR filter of AttioClient.search_person_by_phone; until one full sync
+  has completed, a phone miss may be a record not mirrored yet, so callers
+  ask the API too
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import selectinload
+
+from core.attio import AttioClient
+from core.config import Config
+from core.database import db
+from core.phone_utils import normalize_phone
+from models.attio_person import AttioPerson, AttioPersonPhone, AttioSyncState
+
+logger = logging.getLogger(__name__)
+
+SYNC_NAME = 'people'
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite returns naive datetimes - treat them as UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _phone_keys(record: dict) -> list:
+    """Normalized keys of every phone number on an Attio person record (primary first)"""
+    keys = []
+    for value in record.get('values', {}).get('phone_numbers', []) or []:
+        if not isinstance(value, dict):
+            continue
+        key = normalize_phone(value.get('phone_number') or value.get('original_phone_number') or '')
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def parse_attio_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse Attio ISO timestamps (nanosecond precision, 'Z' suffix)"""
+    if not value:
+        return None
+    try:
+        text = value.replace('Z', '+00:00')
+        if '.' in text:
+            head, rest = text.split('.', 1)
+            digits = ''.join(c for c in rest if c.isdigit())
+            tz_part = rest[len(digits):]
+            text = f"{head}.{digits[:6]}{tz_part}"
+        return _as_utc(datetime.fromisoformat(text))
+    except ValueError:
+        return None
+
+
+class InMemoryPeopleSource:
+    """
+    Local stand-in for AttioClient.list_people_page (tests / development).
+
+    Holds raw Attio person records and serves them with the same ordering,
+    filter and offset semantics as the Attio query endpoint.
+    """
+
+    def __init__(self, records: Optional[list] = None):
+        self.records = list(records or [])
+        self.requests = 0
+
+    def list_people_page(self, created_from: Optional[str] = None, offset: int = 0, limit: int = 500) -> list:
+        self.requests += 1
+        records = sorted(self.records, key=lambda r: r.get('created_at', ''))
+        if created_from:
+            records = [r for r in records if r.get('created_at', '') >= created_from]
+        return records[offset:offset + limit]
+
+
+class AttioMirrorSync:
+    """Resumable, incremental sync of Attio people into attio_people"""
+
+    def __init__(self, source, page_size: int = 500, lease_seconds: int = 300):
+        self.source = source
+        self.page_size = page_size
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.on_people_synced = []  # Callbacks receiving the list of synced AttioPerson rows
+
+    def _get_state(self) -> AttioSyncState:
+        state = db.session.get(AttioSyncState, SYNC_NAME)
+        if state is None:
+            state = AttioSyncState(name=SYNC_NAME, cursor_offset=0, records_synced=0)
+            db.session.add(state)
+            db.session.commit()
+        return state
+
+    def _acquire_lease(self) -> bool:
+        """Take the sync lease (only one worker syncs at a time)"""
+        self._get_state()
+        now = _utcnow()
+        result = db.session.execute(
+            update(AttioSyncState)
+            .where(AttioSyncState.name == SYNC_NAME)
+            .where(or_(
+                AttioSyncState.lease_owner.is_(None),
+                AttioSyncState.lease_owner == self.owner,
+                AttioSyncState.lease_expires_at < now
+            ))
+            .values(lease_owner=self.owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _release_lease(self) -> None:
+        db.session.execute(
+            update(AttioSyncState)
+            .where(AttioSyncState.name == SYNC_NAME)
+            .where(AttioSyncState.lease_owner == self.owner)
+            .values(lease_owner=None, lease_expires_at=None)
+        )
+        db.session.commit()
+
+    def reset(self) -> None:
+        """Restart from the beginning on the next run (full resync)"""
+        state = self._get_state()
+        state.cursor_created_at = None
+        state.cursor_offset = 0
+        state.full_sync_started_at = _utcnow()
+        db.session.commit()
+
+    def run_once(self, max_pages: Optional[int] = None) -> dict:
+        """
+        Sync pages from the saved cursor until caught up (or max_pages).
+
+        Progress is committed after every page, so an interrupted run
+        resumes where it stopped.
+        """
+        if not self._acquire_lease():
+            return {'skipped': True, 'reason': 'lease held by another worker'}
+
+        pages = 0
+        synced = 0
+        try:
+            state = self._get_state()
+            state.last_run_at = _utcnow()
+
+            # Periodic full resync to pick up edits to existing records
+            full_sync_started = _as_utc(state.full_sync_started_at)
+            if (full_sync_started is None or
+                    _utcnow() - full_sync_started > timedelta(seconds=Config.ATTIO_MIRROR_FULL_RESYNC_INTERVAL)):
+                state.cursor_created_at = None
+                state.cursor_offset = 0
+                state.full_sync_started_at = _utcnow()
+            db.session.commit()
+
+            while max_pages is None or pages < max_pages:
+                records = self.source.list_people_page(
+                    created_from=state.cursor_created_at,
+                    offset=state.cursor_offset or 0,
+                    limit=self.page_size
+                )
+                pages += 1
+                if records:
+                    synced += self._apply_page(state, records)
+                if len(records) < self.page_size:
+                    state.last_success_at = _utcnow()
+                    completed = _as_utc(state.full_sync_completed_at)
+                    if completed is None or completed < _as_utc(state.full_sync_started_at):
+                        state.full_sync_completed_at = state.last_success_at
+                    state.last_error = None
+                    db.session.commit()
+                    break
+
+            return {'skipped': False, 'pages': pages, 'records': synced, 'state': state.to_dict()}
+
+        except Exception as e:
+            db.session.rollback()
+            state = self._get_state()
+            state.last_error = str(e)[:500]
+            db.session.commit()
+            logger.error(f"[ATTIO MIRROR] Sync failed after {pages} pages: {e}")
+            return {'skipped': False, 'pages': pages, 'records': synced, 'error': str(e)}
+
+        finally:
+            self._release_lease()
+
+    def _apply_page(self, state: AttioSyncState, records: list) -> int:
+        """Upsert one page and advance the cursor in the same transaction"""
+        record_ids = [r.get('id', {}).get('record_id', '') for r in records]
+        existing = {
+            p.record_id: p
+            for p in AttioPerson.query.options(selectinload(AttioPerson.phones))
+            .filter(AttioPerson.record_id.in_(record_ids)).all()
+        }
+
+        synced_people = []
+        for record in records:
+            lead = AttioClient._format_person(record)
+            if not lead['id']:
+                continue
+            person = existing.get(lead['id'])
+            if person is None:
+                person = AttioPerson(record_id=lead['id'])
+                db.session.add(person)
+                existing[lead['id']] = person
+
+            person.name = lead['name']
+            person.email = lead['email']
+            person.phone = lead['phone']
+            person.phone_normalized = normalize_phone(lead['phone']) or None
+            phone_keys = _phone_keys(record)
+            for phone in [phone for phone in person.phones if phone.phone_normalized not in phone_keys]:
+                person.phones.remove(phone)
+            known = {phone.phone_normalized for phone in person.phones}
+            person.phones.extend(AttioPersonPhone(phone_normalized=key) for key in phone_keys if key not in known)
+            person.state = lead['state']
+            person.city = lead['city']
+            person.case_type = lead['case_type']
+            person.classification = lead['classification']
+            person.description = lead['description']
+            person.attorney_info = lead['attorney_info']
+            person.has_attorney = lead['has_attorney']
+            person.advance_seeking = lead['advance_seeking']
+            person.advance_value = lead['advance_value']
+            person.workers_comp = lead['workers_comp']
+            person.raw = record
+            person.record_created_at = parse_attio_timestamp(record.get('created_at'))
+            synced_people.append(person)
+
+        # Advance cursor: everything before the last timestamp is done,
+        # plus the records seen so far at exactly that timestamp
+        last_created = records[-1].get('created_at')
+        at_last = sum(1 for r in records if r.get('created_at') == last_created)
+        if last_created == state.cursor_created_at:
+            state.cursor_offset = (state.cursor_offset or 0) + len(records)
+        else:
+            state.cursor_created_at = last_created
+            state.cursor_offset = at_last
+        state.records_synced = (state.records_synced or 0) + len(synced_people)
+
+        db.session.commit()
+
+        for callback in self.on_people_synced:
+            try:
+                callback(synced_people)
+            except Exception as e:
+                logger.error(f"[ATTIO MIRROR] Sync callback failed: {e}")
+
+        return len(synced_people)
+
+
+# ============== READS ==============
+
+def is_mirror_fresh() -> bool:
+    """True if the mirror is enabled and synced within the freshness SLA"""
+    if not Config.ATTIO_MIRROR_ENABLED:
+        return False
+    state = db.session.get(AttioSyncState, SYNC_NAME)
+    if state is None or state.last_success_at is None:
+        return False
+    age = _utcnow() - _as_utc(state.last_success_at)
+    return age.total_seconds() <= Config.ATTIO_MIRROR_MAX_AGE
+
+
+def has_full_sync() -> bool:
+    """True once a full sync completed (a phone miss then means the lead is not in Attio)"""
+    state = db.session.get(AttioSyncState, SYNC_NAME)
+    return state is not None and state.full_sync_completed_at is not None
+
+
+def find_person_by_phone(phone_number: str) -> Optional[AttioPerson]:
+    """Look up a mirrored person by any of their phone numbers (any format)"""
+    key = normalize_phone(phone_number)
+    if not key:
+        return None
+    return AttioPerson.query.filter(or_(
+        AttioPerson.phone_normalized == key,
+        AttioPerson.id.in_(db.session.query(AttioPersonPhone.person_id).filter(AttioPersonPhone.phone_normalized == key))
+    )).order_by(AttioPerson.record_created_at.asc()).first()
+
+
+def search_people(query: Optional[str] = None, limit: int = 100) -> list:
+    """Mirror equivalent of AttioClient.search_people (most recent first)"""
+    people_query = AttioPerson.query
+    if query and query.strip():
+        term = query.strip()
+        filters = [AttioPerson.name.ilike(f"%{term}%"), AttioPerson.phone.contains(term)]
+        digits = normalize_phone(term)
+        if digits and digits != term:
+            filters.append(AttioPerson.phone_normalized.contains(digits))
+        people_query = people_query.filter(or_(*filters))
+
+    people = people_query.order_by(AttioPerson.record_created_at.desc()).limit(limit).all()
+    return [p.to_contact_dict() for p in people]
+
+
+def get_mirror_status() -> dict:
+    """Sync state plus freshness, for the admin endpoint"""
+    state = db.session.get(AttioSyncState, SYNC_NAME)
+    return {
+        'enabled': Config.ATTIO_MIRROR_ENABLED,
+        'fresh': is_mirror_fresh(),
+        'full_sync': has_full_sync(),
+        'max_age_seconds': Config.ATTIO_MIRROR_MAX_AGE,
+        'people': AttioPerson.query.count(),
+        'state': state.to_dict() if state else None,
+    }
+
+
+# ============== BACKGROUND JOB ==============
+
+_mirror_sync: Optional[AttioMirrorSync] = None
+_sync_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def get_mirror_sync() -> Optional[AttioMirrorSync]:
+    """Get the mirror sync singleton (None if mirror disabled or Attio not configured)"""
+    global _mirror_sync
+    if _mirror_sync is None and Config.ATTIO_MIRROR_ENABLED and Config.ATTIO_API_KEY:
+        _mirror_sync = AttioMirrorSync(AttioClient(), page_size=Config.ATTIO_MIRROR_PAGE_SIZE)
+    return _mirror_sync
+
+
+def start_mirror_sync(app) -> bool:
+    """Start the background sync thread for this worker (no-op if disabled)"""
+    global _sync_thread
+    mirror_sync = get_mirror_sync()
+    if mirror_sync is None or (_sync_thread is not None and _sync_thread.is_alive()):
+        return False
+
+    def _loop():
+        while not _stop_event.is_set():
+            try:
+                with app.app_context():
+                    result = mirror_sync.run_once()
+                    if not result.get('skipped'):
+                        logger.info(f"[ATTIO MIRROR] Synced {result.get('records', 0)} people "
+                                    f"in {result.get('pages', 0)} pages")
+            except Exception as e:
+                logger.error(f"[ATTIO MIRROR] Sync loop error: {e}")
+            _stop_event.wait(Config.ATTIO_MIRROR_SYNC_INTERVAL)
+
+    _stop_event.clear()
+    _sync_thread = threading.Thread(target=_loop, name='attio-mirror-sync', daemon=True)
+    _sync_thread.start()
+    logger.info(f"[ATTIO MIRROR] Background sync started (every {Config.ATTIO_MIRROR_SYNC_INTERVAL}s)")
+    return True
+
+
+def stop_mirror_sync() -> None:
+    """Stop the background sync thread"""
+    _stop_event.set()
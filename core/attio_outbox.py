@@ -0,0 +1,324 @@
+"""
+Write-behind outbox for Attio notes.
+
+Note writes are stored in the `attio_note_outbox` table and the request
+returns immediately; a background worker flushes them to Attio.
+
+- Idempotency keys: enqueueing the same key twice returns the existing row;
+  without a key every request is a new note
+- Rate-limit aware: sends are paced to ATTIO_OUTBOX_RATE_PER_SECOND and the
+  worker pauses for Retry-After when Attio answers 429
+- Retries with exponential backoff for network errors and 5xx; other 4xx
+  fail immediately
+- Rows are claimed with a conditional UPDATE, so several gunicorn workers
+  can flush the same table without sending a note twice
+- Before retrying an ambiguous failure (timeout, 5xx, crashed worker) the
+  worker checks whether the note already exists on the record: same
+  content, created after its first send attempt
+"""
+
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from core.attio import AttioAPIError, get_attio_client
+from core.attio_mirror import parse_attio_timestamp
+from core.config import Config
+from core.database import db
+from models.attio_note import AttioNoteOutbox
+
+logger = logging.getLogger(__name__)
+
+# Rows stuck in 'sending' longer than this (worker died mid-send) are retried
+CLAIM_TIMEOUT_SECONDS = 120
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 900
+CLOCK_SKEW_SECONDS = 60  # Attio's created_at vs our first_attempt_at
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def make_idempotency_key(*parts) -> str:
+    """Stable key from the parts that identify a note (ex: call_sid + content)"""
+    digest = hashlib.sha256('\x1f'.join(str(p or '') for p in parts).encode('utf-8')).hexdigest()
+    return digest[:40]
+
+
+def build_resumo_note(call, resumo: str) -> str:
+    """Note text for a call resumo (header with call info + the resumo)"""
+    direction = 'Inbound' if call.direction == 'inbound' else 'Outbound'
+    when = call.started_at.strftime('%Y-%m-%d %H:%M UTC') if call.started_at else ''
+    header = f"{direction} call {when}".strip()
+    details = [call.disposition or '']
+    if call.duration:
+        details.append(f"{call.duration}s")
+    if call.worker_name:
+        details.append(f"SDR: {call.worker_name}")
+    details = ' | '.join(d for d in details if d)
+    if details:
+        header = f"{header} - {details}"
+    return f"{header}\n\n{resumo}"
+
+
+def enqueue_note(content: str, record_id: Optional[str] = None, lead_phone: Optional[str] = None,
+                 call_sid: Optional[str] = None, idempotency_key: Optional[str] = None,
+                 title: str = 'Call Log') -> Tuple[AttioNoteOutbox, bool]:
+    """
+    Queue a note for Attio.
+
+    Either record_id or lead_phone must be given (the worker resolves the
+    record by phone when record_id is missing). Without idempotency_key the
+    note is always queued (the same text twice is two notes).
+
+    Returns:
+        (outbox row, created) - created is False if the key was already queued
+    """
+    if not record_id and not lead_phone:
+        raise ValueError("record_id or lead_phone is required")
+
+    key = idempotency_key or f"auto:{uuid.uuid4().hex}"
+
+    existing = AttioNoteOutbox.query.filter_by(idempotency_key=key).first()
+    if existing:
+        return existing, False
+
+    note = AttioNoteOutbox(
+        idempotency_key=key,
+        record_id=record_id,
+        lead_phone=lead_phone,
+        call_sid=call_sid,
+        title=title,
+        content=content,
+        status='pending',
+        attempts=0,
+        next_attempt_at=_utcnow()
+    )
+    db.session.add(note)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Same key enqueued concurrently
+        db.session.rollback()
+        return AttioNoteOutbox.query.filter_by(idempotency_key=key).first(), False
+
+    _wake_event.set()
+    return note, True
+
+
+def get_outbox_stats() -> dict:
+    """Row counts per status"""
+    from sqlalchemy import func
+    rows = db.session.query(AttioNoteOutbox.status, func.count(AttioNoteOutbox.id)).group_by(
+        AttioNoteOutbox.status
+    ).all()
+    counts = {status: count for status, count in rows}
+    oldest = AttioNoteOutbox.query.filter_by(status='pending').order_by(AttioNoteOutbox.created_at.asc()).first()
+    return {
+        'counts': counts,
+        'oldest_pending_at': oldest.created_at.isoformat() if oldest and oldest.created_at else None,
+    }
+
+
+class AttioNoteOutboxWorker:
+    """Flushes due outbox rows to Attio"""
+
+    def __init__(self, attio, rate_per_second: float, batch_size: int, max_attempts: int,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.attio = attio
+        self.min_interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._sleep = sleep
+        self._next_send_at = 0.0
+        self._paused_until = 0.0
+
+    def _pace(self) -> None:
+        """Space out sends to stay under the Attio write rate limit"""
+        now = self._clock()
+        wait = self._next_send_at - now
+        if wait > 0:
+            self._sleep(wait)
+            now = self._clock()
+        self._next_send_at = max(now, self._next_send_at) + self.min_interval
+
+    def _reclaim_stale(self) -> None:
+        cutoff = _utcnow() - timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+        db.session.execute(
+            update(AttioNoteOutbox)
+            .where(AttioNoteOutbox.status == 'sending')
+            .where(AttioNoteOutbox.claimed_at < cutoff)
+            .values(status='pending', last_error='reclaimed: worker did not finish sending')
+        )
+        db.session.commit()
+
+    def _claim(self, note_id: int) -> bool:
+        result = db.session.execute(
+            update(AttioNoteOutbox)
+            .where(AttioNoteOutbox.id == note_id)
+            .where(AttioNoteOutbox.status == 'pending')
+            .values(status='sending', claimed_at=_utcnow())
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def flush(self) -> dict:
+        """Send due notes (up to batch_size). Returns counters for this run."""
+        result = {'sent': 0, 'retried': 0, 'failed': 0, 'paused': False}
+
+        if self._clock() < self._paused_until:
+            result['paused'] = True
+            return result
+
+        self._reclaim_stale()
+
+        due_ids = [
+            row.id for row in db.session.query(AttioNoteOutbox.id)
+            .filter(AttioNoteOutbox.status == 'pending')
+            .filter(AttioNoteOutbox.next_attempt_at <= _utcnow())
+            .order_by(AttioNoteOutbox.id.asc())
+            .limit(self.batch_size)
+            .all()
+        ]
+
+        for note_id in due_ids:
+            if not self._claim(note_id):
+                continue  # Another worker took it
+            note = db.session.get(AttioNoteOutbox, note_id)
+            outcome = self._send(note)
+            result[outcome] += 1
+            if outcome == 'retried' and self._clock() < self._paused_until:
+                result['paused'] = True
+                break
+
+        return result
+
+    def _send(self, note: AttioNoteOutbox) -> str:
+        """Send one claimed note. Returns 'sent', 'retried' or 'failed'."""
+        ambiguous_retry = note.attempts > 0 and note.last_error and not note.last_error.startswith('429')
+        note.attempts = (note.attempts or 0) + 1
+        if note.first_attempt_at is None:
+            note.first_attempt_at = _utcnow()
+        db.session.commit()  # A worker dying mid-send leaves attempts > 0: the next one checks Attio first
+
+        try:
+            if not note.record_id:
+                lead = self.attio.find_lead_by_phone(note.lead_phone)
+                if not lead:
+                    return self._fail(note, f"No Attio lead found for {note.lead_phone}")
+                note.record_id = lead['id']
+
+            # The previous attempt may have reached Attio before failing
+            if ambiguous_retry:
+                self._pace()
+                sent_after = note.first_attempt_at - timedelta(seconds=CLOCK_SKEW_SECONDS)
+                for existing in self.attio.list_notes(note.record_id):
+                    created_at = parse_attio_timestamp(existing.get('created_at'))
+                    if (existing.get('content_plaintext') == note.content
+                            and created_at is not None and created_at >= sent_after):
+                        return self._mark_sent(note, existing.get('id', {}).get('note_id'))
+
+            self._pace()
+            created = self.attio.create_note(note.record_id, note.content, note.title or 'Call Log')
+            return self._mark_sent(note, (created.get('id') or {}).get('note_id'))
+
+        except AttioAPIError as e:
+            if e.is_rate_limited:
+                retry_after = e.retry_after or BACKOFF_BASE_SECONDS
+                self._paused_until = self._clock() + retry_after
+                note.attempts -= 1  # Rate limiting doesn't count as a failed attempt
+                return self._retry(note, f"429 rate limited (retry after {retry_after}s)", retry_after)
+            if not e.is_retryable:
+                return self._fail(note, str(e))
+            return self._retry(note, str(e))
+
+    def _mark_sent(self, note: AttioNoteOutbox, attio_note_id: Optional[str]) -> str:
+        note.status = 'sent'
+        note.sent_at = _utcnow()
+        note.attio_note_id = attio_note_id
+        note.last_error = None
+        db.session.commit()
+        logger.info(f"[ATTIO OUTBOX] Note {note.id} sent to record {note.record_id}")
+        return 'sent'
+
+    def _retry(self, note: AttioNoteOutbox, error: str, delay: Optional[float] = None) -> str:
+        if note.attempts >= self.max_attempts:
+            return self._fail(note, error)
+        if delay is None:
+            delay = min(BACKOFF_BASE_SECONDS * (2 ** (note.attempts - 1)), BACKOFF_MAX_SECONDS)
+        note.status = 'pending'
+        note.last_error = error[:500]
+        note.next_attempt_at = _utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+        logger.warning(f"[ATTIO OUTBOX] Note {note.id} retry in {delay:.0f}s: {error}")
+        return 'retried'
+
+    def _fail(self, note: AttioNoteOutbox, error: str) -> str:
+        note.status = 'failed'
+        note.last_error = error[:500]
+        db.session.commit()
+        logger.error(f"[ATTIO OUTBOX] Note {note.id} failed after {note.attempts} attempts: {error}")
+        return 'failed'
+
+
+# ============== BACKGROUND WORKER ==============
+
+_outbox_worker: Optional[AttioNoteOutboxWorker] = None
+_worker_thread: Optional[threading.Thread] = None
+_wake_event = threading.Event()
+_stop_event = threading.Event()
+
+
+def get_outbox_worker() -> Optional[AttioNoteOutboxWorker]:
+    """Get the outbox worker singleton (None if Attio not configured)"""
+    global _outbox_worker
+    if _outbox_worker is None:
+        attio = get_attio_client()
+        if attio is not None:
+            _outbox_worker = AttioNoteOutboxWorker(
+                attio,
+                rate_per_second=Config.ATTIO_OUTBOX_RATE_PER_SECOND,
+                batch_size=Config.ATTIO_OUTBOX_BATCH_SIZE,
+                max_attempts=Config.ATTIO_OUTBOX_MAX_ATTEMPTS
+            )
+    return _outbox_worker
+
+
+def start_outbox_worker(app) -> bool:
+    """Start the background flush thread for this worker (no-op if Attio not configured)"""
+    global _worker_thread
+    worker = get_outbox_worker()
+    if worker is None or (_worker_thread is not None and _worker_thread.is_alive()):
+        return False
+
+    def _loop():
+        while not _stop_event.is_set():
+            try:
+                with app.app_context():
+                    worker.flush()
+            except Exception as e:
+                logger.error(f"[ATTIO OUTBOX] Flush loop error: {e}")
+            # Wake up early when a note is enqueued in this process
+            _wake_event.wait(Config.ATTIO_OUTBOX_FLUSH_INTERVAL)
+            _wake_event.clear()
+
+    _stop_event.clear()
+    _worker_thread = threading.Thread(target=_loop, name='attio-note-outbox', daemon=True)
+    _worker_thread.start()
+    logger.info(f"[ATTIO OUTBOX] Worker started ({Config.ATTIO_OUTBOX_RATE_PER_SECOND} notes/s)")
+    return True
+
+
+def stop_outbox_worker() -> None:
+    """Stop the background flush thread"""
+    _stop_event.set()
+    _wake_event.set()
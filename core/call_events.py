@@ -0,0 +1,1131 @@
+"""
+Append-only webhook journal and the Call projection.
+
+The Twilio status webhooks (/call_status, /inbound_status, /amd_status,
+/amd_callback, /recording_status, /voicemail_recorded, /taskrouter_event,
+plus /voice) only INSERT their raw payload into `call_events` and return.
+The projector folds the journal, in received_at order, into the `calls`
+rows through one state machine (CallProjection), then fires the side
+effects (Slack alerts, campaign dialer outcome). Each event is marked
+(projected_at) in the same transaction as its change to the row, and the
+projector reads the unmarked ones.
+
+- CALL_EVENTS_PROJECTION=async (default): a background thread per worker;
+  a lease on the `projector_checkpoints` row lets one process project at a
+  time, so events are folded in order across gunicorn workers
+- Order is received_at, not id: an event replayed from the disk spool gets
+  a higher id than the later webhooks other workers journaled directly.
+  Calls with events still in this host's spool are held back until the
+  replay; an event that arrives after later ones of its call were folded
+  anyway (ex: spooled on another host) refolds the call in order
+- CALL_EVENTS_PROJECTION=inline: the webhook folds the pending events
+  itself before returning (single process / development)
+- Events journaled less than CALL_EVENTS_SETTLE_MS ago wait for the next
+  pass: ids are assigned at INSERT but only become visible at COMMIT, so a
+  lower id may still be in flight. One that commits later anyway (slow
+  commit, timed-out write) is still unmarked and folded on a later pass
+- If the INSERT fails or exceeds WEBHOOK_DB_DEADLINE_MS the event goes to
+  the local disk spool (core.webhook_spool) and reaches the journal when the
+  replayer drains it
+- Timestamps (answered_at, ended_at) come from the event's received_at, not
+  from when it is projected, so a replay produces the same row
+- rebuild() resets a call's webhook-derived columns and refolds its events
+  with side effects off (replaces the one-off /admin/fix_* repairs). It
+  takes the lease over from whichever worker is projecting, which stops at
+  its next event and resumes after the rebuild releases it
+
+Calls to the Twilio API (AMD redirect, starting the TaskRouter recording)
+stay in the webhooks: they must happen while the call is live.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, false, func, not_, or_, update
+from flask import current_app
+from sqlalchemy.exc import DBAPIError, IntegrityError, TimeoutError as PoolTimeoutError
+
+from core import dialer
+from core.alerts import CallAlert, get_alert_manager
+from core.config import Config
+from core.database import db
+from core.phone_utils import get_state_from_phone
+from core.webhook_spool import get_webhook_spool, spool_event
+from models.call import Call
+from models.call_event import CallEvent, ProjectorCheckpoint
+
+logger = logging.getLogger(__name__)
+
+PROJECTOR_NAME = 'calls'
+LEASE_SECONDS = 30
+REBUILD_BATCH_SIZE = 100
+REBUILD_OWNER_SUFFIX = '#rebuild'  # Lease owner suffix while a rebuild runs (not taken over)
+JOURNAL_WRITERS = 8  # Threads for deadline-bounded journal INSERTs
+
+MACHINE_TYPES = ('machine_start', 'machine_end_beep', 'machine_end_silence', 'machine_end_other', 'fax')
+TERMINAL_STATUSES = ('completed', 'busy', 'no-answer', 'failed', 'canceled')
+
+# Columns the projection writes (reset to these values before a rebuild)
+PROJECTED_COLUMNS = {
+    'disposition': None,
+    'duration': 0,
+    'queue_time': 0,
+    'recording_url': None,
+    'recording_sid': None,
+    'worker_name': None,
+    'worker_email': None,
+    'answered_at': None,
+    'ended_at': None,
+}
+
+# (AlertManager method or 'record_call_outcome', argument) - run after the commit
+Effect = Tuple[str, object]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def task_call_sid(attributes: dict) -> str:
+    """CallSid from TaskRouter task attributes (call_sid or conference.participants.customer)"""
+    if attributes.get('call_sid'):
+        return attributes['call_sid']
+    customer = attributes.get('conference', {}).get('participants', {}).get('customer', '')
+    # customer pode ser o call_sid direto ou um objeto
+    if isinstance(customer, str) and customer.startswith('CA'):
+        return customer
+    if isinstance(customer, dict):
+        return customer.get('call_sid', '')
+    return ''
+
+
+def parse_task_attributes(raw: Optional[str]) -> dict:
+    try:
+        attributes = json.loads(raw or '{}')
+    except (TypeError, ValueError):
+        return {}
+    return attributes if isinstance(attributes, dict) else {}
+
+
+def event_keys(source: str, form: dict) -> Tuple[Optional[str], Optional[str]]:
+    """(call_sid, task_sid) an event is filed under - the row it folds into"""
+    if source == 'taskrouter_event':
+        task_sid = form.get('TaskSid') or None
+        call_sid = task_call_sid(parse_task_attributes(form.get('TaskAttributes')))
+        return call_sid or (f"TASK:{task_sid}" if task_sid else None), task_sid
+    parent_call_sid = form.get('ParentCallSid', '')
+    if source == 'amd_callback' and parent_call_sid:
+        return parent_call_sid, None
+    if source == 'call_status' and parent_call_sid and form.get('Direction') == 'outbound-dial':
+        return parent_call_sid, None
+    return form.get('CallSid') or None, None
+
+
+def _event_from_record(record: dict) -> CallEvent:
+    return CallEvent(
+        source=record['source'],
+        call_sid=record['call_sid'],
+        task_sid=record['task_sid'],
+        dedupe_key=record['dedupe_key'],
+        payload=record['payload'],
+        received_at=datetime.fromisoformat(record['received_at'])
+    )
+
+
+_journal_writer: Optional[ThreadPoolExecutor] = None
+_journal_writer_lock = threading.Lock()
+
+
+def _insert_with_deadline(record: dict, deadline: float) -> int:
+    """
+    INSERT + COMMIT on a writer thread, waiting at most `deadline` seconds
+    (bounds pool checkout, reconnects and lock waits, not only the statement).
+    On timeout the write may still commit later: it is projected like any
+    other unmarked event, and the spooled copy has the same dedupe key and is
+    dropped on replay.
+    """
+    global _journal_writer
+    if _journal_writer is None:
+        with _journal_writer_lock:
+            if _journal_writer is None:
+                _journal_writer = ThreadPoolExecutor(max_workers=JOURNAL_WRITERS, thread_name_prefix='journal-write')
+    app = current_app._get_current_object()
+
+    def _insert() -> int:
+        with app.app_context():
+            event = _event_from_record(record)
+            db.session.add(event)
+            db.session.commit()
+            return event.id
+
+    return _journal_writer.submit(_insert).result(timeout=deadline)
+
+
+def record_event(source: str, form: dict, dedupe_key: Optional[str] = None,
+                 deadline: Optional[float] = None) -> Optional[CallEvent]:
+    """
+    Append a webhook payload to the journal (or to the disk spool when the
+    database is failing or slow).
+
+    deadline (seconds) shortens WEBHOOK_DB_DEADLINE_MS for this write (ex:
+    what is left of /voice's budget). It applies with the spool disabled
+    too: past it the caller stops waiting and the INSERT finishes (or
+    fails) on its writer thread. Returns the event - without an id if it
+    was spooled or not waited for - or None if dedupe_key was already
+    journaled (Twilio retried the webhook).
+    """
+    call_sid, task_sid = event_keys(source, form)
+    record = {
+        'source': source,
+        'call_sid': call_sid,
+        'task_sid': task_sid,
+        # Every event gets a key: replaying a spooled copy of a write that did commit is a no-op
+        'dedupe_key': dedupe_key or f"local:{uuid.uuid4().hex}",
+        'payload': json.dumps(form, separators=(',', ':')),
+        'received_at': _utcnow().isoformat(),
+    }
+    event = _event_from_record(record)
+
+    spool = get_webhook_spool()
+    if spool is not None and spool.degraded is not None:
+        spool_event(record, spool.degraded)
+        return event
+
+    timeout = Config.WEBHOOK_DB_DEADLINE_MS / 1000
+    if deadline is not None:
+        timeout = min(timeout, deadline) if timeout > 0 else deadline
+    try:
+        if timeout <= 0 or (spool is None and deadline is None):
+            db.session.add(event)
+            db.session.commit()
+        else:
+            event.id = _insert_with_deadline(record, timeout)
+    except IntegrityError:
+        db.session.rollback()
+        logger.info(f"[CALL EVENTS] Duplicate {source} for {call_sid} ignored ({dedupe_key})")
+        return None
+    except (DBAPIError, PoolTimeoutError, FutureTimeoutError) as e:
+        db.session.rollback()
+        if spool is None:
+            if isinstance(e, FutureTimeoutError):
+                # No spool to fall back on: stop waiting (the INSERT may still commit)
+                logger.error(f"[CALL EVENTS] Journal write for {source} {call_sid} not done within "
+                             f"{timeout:.3f}s and the spool is disabled - not waiting for it")
+                return event
+            raise
+        reason = 'deadline exceeded' if isinstance(e, FutureTimeoutError) else f"{type(e).__name__}: {e}"
+        logger.error(f"[CALL EVENTS] Journal write failed for {source} {call_sid}, spooling: {reason[:300]}")
+        spool_event(record, reason[:200])
+        return event
+
+    if Config.CALL_EVENTS_PROJECTION == 'inline':
+        project_inline()
+    return event
+
+
+def project_inline() -> None:
+    """CALL_EVENTS_PROJECTION=inline: fold what is pending now (errors are logged, not raised)"""
+    try:
+        get_call_projector().project_pending(settle_seconds=0)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"[CALL EVENTS] Inline projection failed: {e}")
+
+
+def insert_spooled_events(records: List[dict]) -> None:
+    """Replayer callback: journal spooled events, skipping those already there (idempotent)"""
+    valid = {}
+    for record in records:
+        try:
+            _event_from_record(record)
+            valid.setdefault(record['dedupe_key'], record)
+        except (KeyError, TypeError, ValueError) as e:
+            # Dropped, not retried: a bad record would hold the whole spool back
+            logger.error(f"[CALL EVENTS] Dropping malformed spooled event ({type(e).__name__}: {e}): {str(record)[:300]}")
+    existing = {
+        row[0] for row in db.session.query(CallEvent.dedupe_key).filter(CallEvent.dedupe_key.in_(list(valid)))
+    }
+    fresh = [record for key, record in valid.items() if key not in existing]
+    db.session.add_all(_event_from_record(record) for record in fresh)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A late direct write raced us: one by one
+        db.session.rollback()
+        for record in fresh:
+            db.session.add(_event_from_record(record))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+
+
+# ============== STATE MACHINE ==============
+
+def sanitize_disposition(call: Call) -> None:
+    """
+    Sanitize and fix disposition based on call data.
+
+    REGRA CRÍTICA para inbound calls:
+    - Se worker_name/worker_email está NULL = NINGUÉM ATENDEU
+    - Duration > 0 sem worker = tempo que ficou tocando/na fila, NÃO é "answered"
+
+    Lógica correta:
+    1. Se worker atendeu (worker_name tem valor) → answered
+    2. Se ninguém atendeu mas tem voicemail recording → voicemail
+    3. Se ninguém atendeu e sem voicemail → no-answer
+    4. busy, failed, canceled → manter como está
+    """
+    # Para inbound calls via Lovable: worker_name NULL = ninguém atendeu
+    if call.direction == 'inbound' and not call.worker_name and not call.worker_email:
+        # NINGUÉM ATENDEU esta chamada inbound
+        if call.disposition == 'answered':
+            # ERRO: marcada como answered mas worker é NULL
+            if call.recording_url and 'voicemail' in call.recording_url.lower():
+                call.disposition = 'voicemail'
+                logger.info("[SANITIZE] Fixed: inbound 'answered' with NULL worker + voicemail → voicemail")
+            else:
+                call.disposition = 'no-answer'
+                call.answered_at = None  # Remove answered_at incorreto
+                logger.info("[SANITIZE] Fixed: inbound 'answered' with NULL worker → no-answer")
+            return
+        elif call.disposition in ('voicemail', 'no-answer', 'busy', 'failed', 'canceled'):
+            # Já está correto
+            return
+        elif call.disposition is None or call.disposition == '':
+            # NULL disposition em inbound sem worker
+            call.disposition = 'no-answer'
+            call.answered_at = None
+            logger.info("[SANITIZE] Fixed: inbound NULL disposition with NULL worker → no-answer")
+            return
+
+    # Para outbound calls ou inbound com worker: lógica antiga
+    valid_dispositions = ('answered', 'voicemail', 'busy', 'failed', 'canceled')
+    if call.disposition in valid_dispositions:
+        # Não mexe se já tem disposition válida
+        return
+
+    if call.disposition == 'no-answer':
+        # no-answer pode estar correto, não mexe
+        return
+
+    # Disposition é NULL ou inválido - determinar baseado na duração
+    if call.duration and call.duration > 0:
+        # Teve duração > 0, provavelmente foi atendida (só para outbound)
+        if call.direction == 'outbound':
+            call.disposition = 'answered'
+            if not call.answered_at and call.started_at:
+                call.answered_at = call.started_at
+            logger.info(f"[SANITIZE] Fixed NULL disposition (outbound) with duration {call.duration}s → answered")
+        else:
+            # Inbound com duration mas sem worker já foi tratado acima
+            call.disposition = 'no-answer'
+            logger.info(f"[SANITIZE] Fixed NULL disposition (inbound, no worker) with duration {call.duration}s → no-answer")
+    else:
+        # Duração 0 ou NULL, não foi atendida
+        call.disposition = 'no-answer'
+        logger.info("[SANITIZE] Fixed NULL disposition with no duration → no-answer")
+
+
+def calculate_duration(call: Call) -> int:
+    """
+    Calculate call duration based on timestamps.
+    For answered calls: ended_at - answered_at (talk time)
+    For unanswered calls: ended_at - started_at (total time)
+    Returns 0 if timestamps are missing or result is negative.
+    """
+    if not call.ended_at:
+        return 0
+
+    if call.answered_at:
+        # Answered call: duration = talk time
+        duration = int((call.ended_at - call.answered_at).total_seconds())
+    elif call.started_at:
+        # Unanswered call: duration = total time
+        duration = int((call.ended_at - call.started_at).total_seconds())
+    else:
+        return 0
+
+    # Never return negative values
+    return max(duration, 0)
+
+
+def _queue_seconds(call: Call) -> int:
+    if not call.started_at or not call.answered_at:
+        return 0
+    return int((call.answered_at - call.started_at).total_seconds())
+
+
+def _client_identity(email: str) -> str:
+    """Twilio Client identity for a user (same format as /token)"""
+    return ''.join(c for c in email if c.isalnum() or c in '_-')
+
+
+class CallProjection:
+    """
+    The state machine: folds one journal event into its Call row.
+
+    apply(event) looks the row up by the event's keys (creating or renaming
+    it like the webhooks used to). apply(event, call=row) folds onto a given
+    row - used by rebuild, where creations and TASK: renames already happened.
+    Returns the side effects to run once the change is committed.
+    """
+
+    def __init__(self, track_call: Optional[Callable[[Call], None]] = None):
+        self.track_call = track_call
+
+    def apply(self, event: CallEvent, call: Optional[Call] = None) -> List[Effect]:
+        fold = getattr(self, f'_fold_{event.source}', None)
+        if fold is None:
+            logger.warning(f"[CALL EVENTS] No fold for source '{event.source}' (event {event.id})")
+            return []
+        return fold(json.loads(event.payload), _as_utc(event.received_at), call)
+
+    @staticmethod
+    def _find(call_sid: Optional[str]) -> Optional[Call]:
+        if not call_sid:
+            return None
+        return Call.query.filter_by(call_sid=call_sid).first()
+
+    # ---------- /voice ----------
+
+    def _fold_voice(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        """
+        /voice saves the row itself unless it ran out of time (VOICE_DEADLINE_MS):
+        then the row is created here. The journal also keeps the browser call's SDR for rebuilds.
+        """
+        call = call or self._find(form.get('CallSid'))
+        is_browser_call = form.get('From', '').startswith('client:')
+        if call is None:
+            self._create_voice_call(form, at, is_browser_call)
+        elif is_browser_call:
+            call.worker_email = call.worker_email or form.get('workerEmail', '')
+            call.worker_name = call.worker_name or form.get('workerName', '')
+        return []
+
+    def _create_voice_call(self, form: dict, at: datetime, is_browser_call: bool) -> Optional[Call]:
+        """The row /voice would have saved (SelectedCallerId: the caller ID it dialed with)"""
+        if is_browser_call:
+            dest_number = form.get('To', '')
+            if not dest_number.startswith('+'):
+                return None  # /voice answered "Invalid destination number"
+            call = Call(
+                call_sid=form.get('CallSid', ''),
+                from_number=form.get('SelectedCallerId', ''),
+                to_number=dest_number,
+                lead_state=get_state_from_phone(dest_number),
+                direction='outbound',
+                worker_email=form.get('workerEmail', ''),
+                worker_name=form.get('workerName', ''),
+                started_at=at
+            )
+        else:
+            call = Call(
+                call_sid=form.get('CallSid', ''),
+                from_number=form.get('From', ''),
+                to_number=form.get('To', ''),
+                lead_state=get_state_from_phone(form.get('From', '')),
+                direction=form.get('Direction', 'inbound'),
+                caller_city=form.get('FromCity', ''),
+                started_at=at
+            )
+        db.session.add(call)
+        if self.track_call is not None:
+            self.track_call(call)
+        logger.info(f"[CALL EVENTS] Created call {call.call_sid} deferred by /voice")
+        return call
+
+    # ---------- /call_status ----------
+
+    def _fold_call_status(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        call_sid = form.get('CallSid', '')
+        parent_call_sid = form.get('ParentCallSid', '')
+        status = form.get('CallStatus', '')
+        from_number = form.get('From', '')
+        to_number = form.get('To', '')
+        direction = form.get('Direction', '')
+        answered_by = form.get('AnsweredBy', '')
+
+        if call is None:
+            # Para chamadas outbound-dial (perna do lead), atualiza a chamada pai
+            # Não cria registro novo para evitar duplicatas
+            if direction == 'outbound-dial' and parent_call_sid:
+                call = self._find(parent_call_sid)
+                if not call:
+                    logger.info(f"[CALL EVENTS] Parent call {parent_call_sid} not found, ignoring outbound-dial status")
+                    return []
+            else:
+                call = self._find(call_sid)
+                if not call:
+                    # Não cria registros para outbound-dial sem pai
+                    if direction == 'outbound-dial':
+                        logger.info(f"[CALL EVENTS] Ignoring orphan outbound-dial call {call_sid}")
+                        return []
+                    call = self._create_call(form, at)
+
+        # AMD Detection: Se detectou máquina/voicemail, marca como voicemail
+        if answered_by in MACHINE_TYPES:
+            call.disposition = 'voicemail'
+            logger.info(f"[AMD] Call {call_sid}: Detected {answered_by} - setting disposition to voicemail")
+
+        twilio_duration = int(form.get('CallDuration') or 0)
+
+        # in-progress = chamada foi atendida (para outbound, significa que o lead atendeu)
+        if status == 'in-progress':
+            if not call.answered_at:
+                call.answered_at = at
+                call.queue_time = _queue_seconds(call)
+            return []
+
+        if status == 'completed':
+            call.ended_at = at
+            # Use o maior valor entre calculado e Twilio (fallback)
+            call.duration = max(calculate_duration(call), twilio_duration, 0)
+
+            # Não sobrescrever disposition se já foi setado pelo AMD (voicemail, etc)
+            if call.disposition not in ('voicemail', 'busy', 'failed', 'canceled'):
+                if call.answered_at:
+                    # Fallback: chamadas outbound muito curtas (< 15s) são provavelmente voicemail
+                    # AMD não funciona bem para números internacionais
+                    if call.direction == 'outbound' and call.duration < 15:
+                        call.disposition = 'voicemail'
+                        logger.info(f"[VOICEMAIL FALLBACK] Call {call.call_sid}: Short duration ({call.duration}s) - likely voicemail")
+                    else:
+                        call.disposition = 'answered'
+                else:
+                    call.disposition = 'no-answer'
+        elif status in ('busy', 'no-answer', 'failed', 'canceled'):
+            call.ended_at = at
+            call.disposition = status
+            call.duration = calculate_duration(call)
+
+        sanitize_disposition(call)
+        logger.info(f"[STATUS] Call {call.call_sid}: {status} | Disposition: {call.disposition} | "
+                    f"Duration: {call.duration}s (Twilio sent: {twilio_duration}s)")
+
+        if status not in TERMINAL_STATUSES:
+            return []
+
+        effects: List[Effect] = []
+        # Campaign dialer: libera o lead para a próxima tentativa (ou finaliza)
+        if call.direction == 'outbound':
+            effects.append(('record_call_outcome', (call.call_sid, call.disposition)))
+        effects.append(('notify_call_status', CallAlert(
+            call_sid=call_sid,
+            from_number=from_number,
+            to_number=to_number,
+            status=call.disposition or status,
+            duration=call.duration or 0,
+            disposition=call.disposition,
+            lead_state=call.lead_state,
+            recording_url=call.recording_url,
+            direction=call.direction or direction,
+            worker_name=call.worker_name,
+            caller_city=call.caller_city
+        )))
+        return effects
+
+    def _create_call(self, form: dict, at: datetime) -> Call:
+        """Row for a status callback of a call no route saved (ex: placed outside this app)"""
+        direction = form.get('Direction', '')
+        # Determina o número do lead (depende da direção)
+        lead_number = form.get('From', '') if direction == 'inbound' else form.get('To', '')
+        call = Call(
+            call_sid=form.get('CallSid', ''),
+            from_number=form.get('From', ''),
+            to_number=form.get('To', ''),
+            lead_state=get_state_from_phone(lead_number),
+            direction=direction,
+            caller_city=form.get('FromCity', '') if direction == 'inbound' else '',
+            started_at=at
+        )
+        db.session.add(call)
+        if self.track_call is not None:
+            self.track_call(call)
+        return call
+
+    # ---------- /inbound_status ----------
+
+    def _fold_inbound_status(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        call = call or self._find(form.get('CallSid'))
+        if not call:
+            return []
+        dial_call_status = form.get('DialCallStatus', '')
+
+        if dial_call_status in ('completed', 'answered'):
+            # Dial completou - mas alguém realmente atendeu?
+            called_via = form.get('Called', '')
+            user = self._match_user(called_via[len('client:'):]) if called_via.startswith('client:') else None
+            if user is None:
+                logger.info(f"[INBOUND STATUS] ✗ No SDR matched '{called_via}' - NOT marking as answered")
+                call.disposition = 'no-answer'
+                return []
+
+            call.worker_email = user.email
+            call.worker_name = user.name or user.email.split('@')[0].capitalize()
+            call.answered_at = at
+            call.disposition = 'answered'
+            logger.info(f"[INBOUND STATUS] ✓ Call answered by {call.worker_name} ({call.worker_email})")
+            return [('notify_call_status', CallAlert(
+                call_sid=call.call_sid,
+                from_number=call.from_number,
+                to_number=call.to_number,
+                status='in-progress',
+                duration=0,
+                disposition='answered',
+                lead_state=call.lead_state,
+                recording_url=None,
+                direction='inbound',
+                worker_name=call.worker_name,
+                caller_city=call.caller_city
+            ))]
+
+        if dial_call_status in ('no-answer', 'busy', 'failed', 'canceled'):
+            call.disposition = dial_call_status
+        return []
+
+    @staticmethod
+    def _match_user(client_identity: str):
+        from models.user import User
+        for user in User.query.filter_by(is_active=True).all():
+            if _client_identity(user.email) == client_identity:
+                return user
+        return None
+
+    # ---------- /voicemail_recorded ----------
+
+    def _fold_voicemail_recorded(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        call = call or self._find(form.get('CallSid'))
+        if call:
+            call.disposition = 'voicemail'
+            if form.get('RecordingUrl'):
+                call.recording_url = form['RecordingUrl']
+        return []
+
+    # ---------- AMD ----------
+
+    def _fold_amd_status(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        # Fax não entra aqui: /amd_status só redireciona caixas postais
+        if form.get('AnsweredBy', '') in MACHINE_TYPES[:-1]:
+            call = call or self._find(form.get('CallSid'))
+            if call:
+                call.disposition = 'voicemail'
+                logger.info(f"[AMD] Updated call {call.call_sid} disposition to 'voicemail'")
+        return []
+
+    def _fold_amd_callback(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        if form.get('AnsweredBy', '') in MACHINE_TYPES:
+            # Usa o ParentCallSid para encontrar a chamada pai (outbound)
+            call = call or self._find(form.get('ParentCallSid') or form.get('CallSid'))
+            if call:
+                call.disposition = 'voicemail'
+                logger.info(f"[AMD CALLBACK] Call {call.call_sid} marked as voicemail (AnsweredBy: {form['AnsweredBy']})")
+        return []
+
+    # ---------- /recording_status ----------
+
+    def _fold_recording_status(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        recording_url = form.get('RecordingUrl', '')
+        if form.get('RecordingStatus') != 'completed' or not recording_url:
+            return []
+        call = call or self._find(form.get('CallSid'))
+        if not call:
+            logger.warning(f"[RECORDING] Call {form.get('CallSid')} not found in database")
+            return []
+
+        # URL com formato .mp3 para facilitar reprodução
+        call.recording_url = f"{recording_url}.mp3"
+        call.recording_sid = form.get('RecordingSid', '')
+        return [('notify_recording_ready', CallAlert(
+            call_sid=call.call_sid,
+            from_number=call.from_number,
+            to_number=call.to_number,
+            status=call.disposition or 'completed',
+            duration=call.duration or 0,
+            disposition=call.disposition,
+            lead_state=call.lead_state,
+            recording_url=call.recording_url,
+            direction=call.direction or '',
+            worker_name=call.worker_name,
+            caller_city=call.caller_city
+        ))]
+
+    # ---------- /taskrouter_event ----------
+
+    def _fold_taskrouter_event(self, form: dict, at: datetime, call: Optional[Call]) -> List[Effect]:
+        event_type = form.get('EventType', '')
+        task_sid = form.get('TaskSid', '')
+        attrs = parse_task_attributes(form.get('TaskAttributes'))
+        call_sid = task_call_sid(attrs)
+        rebuilding = call is not None
+
+        # Quando uma task é criada (captura chamadas outbound do Flex)
+        if event_type == 'task.created':
+            to_number = attrs.get('outbound_to', '') or attrs.get('to', '')
+            if rebuilding or attrs.get('direction', '') != 'outbound' or not to_number:
+                return []
+            # Usa task_sid como identificador se call_sid ainda não existe
+            identifier = call_sid or f"TASK:{task_sid}"
+            if self._find(identifier):
+                return []
+            call = Call(
+                call_sid=identifier,
+                from_number=attrs.get('from', ''),
+                to_number=to_number,
+                lead_state=get_state_from_phone(to_number),
+                direction='outbound',
+                started_at=at
+            )
+            db.session.add(call)
+            logger.info(f"[OUTBOUND] Saved call {identifier} - To: {to_number}, State: {call.lead_state}")
+            return [('notify_call_status', CallAlert(
+                call_sid=identifier,
+                from_number=call.from_number,
+                to_number=to_number,
+                status='initiated',
+                duration=0,
+                lead_state=call.lead_state,
+                direction='outbound'
+            ))]
+
+        # Quando a task é atualizada (pode conter o call_sid real)
+        if event_type == 'task.updated':
+            if not rebuilding and call_sid and task_sid:
+                call = self._find(f"TASK:{task_sid}")
+                if call:
+                    call.call_sid = call_sid
+                    logger.info(f"[OUTBOUND] Updated call_sid from TASK:{task_sid} to {call_sid}")
+            return []
+
+        if event_type not in ('reservation.accepted', 'task.completed'):
+            return []
+
+        # Tenta encontrar a chamada pelo call_sid ou pelo task_sid temporário
+        if call is None:
+            call = self._find(call_sid)
+            if not call and task_sid:
+                call = self._find(f"TASK:{task_sid}")
+                if call and call_sid and event_type == 'reservation.accepted':
+                    call.call_sid = call_sid
+                    logger.info(f"[OUTBOUND] Updated call_sid to {call_sid}")
+        if not call:
+            return []
+
+        # Quando a task é completada (chamada encerrada)
+        if event_type == 'task.completed':
+            if not call.ended_at:
+                call.ended_at = at
+                if not call.disposition:
+                    call.disposition = 'completed'
+                if not call.duration:
+                    call.duration = calculate_duration(call)
+                logger.info(f"[TASK COMPLETED] Call {call.call_sid} marked as completed - Duration: {call.duration}s")
+            return []
+
+        # Quando o agente aceita a reserva (chamada atendida)
+        worker_name = form.get('WorkerName', '')
+        call.answered_at = at
+        call.disposition = 'answered'
+        call.worker_name = worker_name
+        call.queue_time = _queue_seconds(call)
+        return [('notify_call_status', CallAlert(
+            call_sid=call.call_sid,
+            from_number=call.from_number,
+            to_number=call.to_number,
+            status='in-progress',
+            duration=0,
+            lead_state=call.lead_state,
+            direction=call.direction or 'inbound',
+            worker_name=worker_name,
+            caller_city=call.caller_city
+        ))]
+
+
+# ============== PROJECTOR ==============
+
+class LeaseHeldError(RuntimeError):
+    """Another process holds the projector lease"""
+
+
+class CallProjector:
+    """Folds new journal events into calls, in id order, under a lease"""
+
+    def __init__(self, settle_seconds: float, batch_size: int, track_call: Optional[Callable] = None,
+                 lease_seconds: int = LEASE_SECONDS):
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self.projection = CallProjection(track_call)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.projected = 0
+        self.skipped = 0
+        self._renew_at = 0.0  # monotonic time after which the lease is renewed
+        # One projecting thread per process (the lease covers other processes)
+        self._lock = threading.Lock()
+
+    # ---------- lease / checkpoint ----------
+
+    def _acquire_lease(self) -> bool:
+        if time.monotonic() < self._renew_at:
+            return True  # Held for at least another half lease
+        if not self._take_lease(self.owner):
+            return False
+        self._renew_at = time.monotonic() + self.lease_seconds / 2
+        return True
+
+    def _take_lease(self, owner: str, take_over: bool = False) -> bool:
+        """
+        Claim the lease for owner (commits). take_over also claims it from a
+        live projecting worker - not from a running rebuild.
+        """
+        if db.session.get(ProjectorCheckpoint, PROJECTOR_NAME) is None:
+            db.session.add(ProjectorCheckpoint(name=PROJECTOR_NAME, last_event_id=0))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # Created concurrently
+
+        now = _utcnow()
+        claimable = [
+            ProjectorCheckpoint.lease_owner.is_(None),
+            ProjectorCheckpoint.lease_owner == owner,
+            ProjectorCheckpoint.lease_expires_at < now
+        ]
+        if take_over:
+            claimable.append(not_(ProjectorCheckpoint.lease_owner.endswith(REBUILD_OWNER_SUFFIX)))
+        result = db.session.execute(
+            update(ProjectorCheckpoint)
+            .where(ProjectorCheckpoint.name == PROJECTOR_NAME)
+            .where(or_(*claimable))
+            .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _hold_lease(self, owner: str, **values) -> bool:
+        """
+        Renew owner's lease in the current transaction (False if it was lost).
+        Every projected write commits together with this UPDATE, so a worker
+        whose lease was taken over can't commit a stale fold.
+        """
+        result = db.session.execute(
+            update(ProjectorCheckpoint)
+            .where(ProjectorCheckpoint.name == PROJECTOR_NAME)
+            .where(ProjectorCheckpoint.lease_owner == owner)
+            .values(lease_expires_at=_utcnow() + timedelta(seconds=self.lease_seconds), **values)
+        )
+        return result.rowcount == 1
+
+    def _mark_projected(self, event_id: int, error: Optional[str] = None) -> bool:
+        """Mark event_id as folded in the current transaction (False if the lease was lost)"""
+        values = {
+            'last_event_id': case(
+                (ProjectorCheckpoint.last_event_id < event_id, event_id),
+                else_=ProjectorCheckpoint.last_event_id
+            ),
+        }
+        if error is not None:
+            values['last_error'] = error[:500]
+        if not self._hold_lease(self.owner, **values):
+            return False
+        db.session.execute(update(CallEvent).where(CallEvent.id == event_id).values(projected_at=_utcnow()))
+        return True
+
+    def release_lease(self, owner: Optional[str] = None) -> None:
+        self._renew_at = 0.0
+        db.session.execute(
+            update(ProjectorCheckpoint)
+            .where(ProjectorCheckpoint.name == PROJECTOR_NAME)
+            .where(ProjectorCheckpoint.lease_owner == (owner or self.owner))
+            .values(lease_owner=None, lease_expires_at=None)
+        )
+        db.session.commit()
+
+    # ---------- projection ----------
+
+    def project_pending(self, settle_seconds: Optional[float] = None) -> dict:
+        """
+        Fold the unmarked events (one batch). Each event commits together
+        with its projected_at mark, so the calls table never sees an event
+        twice; effects run after that commit.
+        """
+        result = {'leased': False, 'projected': 0, 'skipped': 0, 'held': 0}
+        settle = self.settle_seconds if settle_seconds is None else settle_seconds
+        with self._lock:
+            if not self._acquire_lease():
+                return result
+            result['leased'] = True
+
+            cutoff = _utcnow() - timedelta(seconds=settle)
+            query = CallEvent.query.filter(
+                CallEvent.projected_at.is_(None),
+                or_(CallEvent.journaled_at <= cutoff, CallEvent.journaled_at.is_(None))
+            )
+            spool = get_webhook_spool()
+            held = spool.pending_call_sids() if spool is not None else set()
+            if held:
+                # Their spooled events go first: fold these calls after the replay
+                result['held'] = len(held)
+                query = query.filter(or_(CallEvent.call_sid.is_(None), CallEvent.call_sid.notin_(held)))
+            events = (
+                query
+                .order_by(CallEvent.received_at.asc(), CallEvent.id.asc())
+                .limit(self.batch_size)
+                .all()
+            )
+            for event in events:
+                try:
+                    late_call = self._folded_past(event)
+                    if late_call is None:
+                        effects = self.projection.apply(event)
+                    else:
+                        effects = self._fold_late(late_call, event)
+                    if not self._mark_projected(event.id):
+                        db.session.rollback()
+                        self._renew_at = 0.0
+                        logger.warning(f"[CALL EVENTS] Lost the projector lease at event {event.id}")
+                        break
+                    db.session.commit()
+                except DBAPIError as e:
+                    # Database trouble: retry the same event on the next pass
+                    db.session.rollback()
+                    logger.error(f"[CALL EVENTS] Database error projecting event {event.id}: {e}")
+                    break
+                except Exception as e:
+                    # A payload the state machine cannot fold must not stall the journal:
+                    # skip it (recorded in last_error) and refold later with rebuild()
+                    db.session.rollback()
+                    logger.error(f"[CALL EVENTS] Skipping event {event.id} ({event.source} {event.call_sid}): {e}")
+                    if self._mark_projected(event.id, error=f"event {event.id}: {e}"):
+                        db.session.commit()
+                        result['skipped'] += 1
+                        self.skipped += 1
+                        continue
+                    db.session.rollback()
+                    break
+
+                result['projected'] += 1
+                self.projected += 1
+                self._run_effects(effects)
+        return result
+
+    @staticmethod
+    def _run_effects(effects: Iterable[Effect]) -> None:
+        alert_manager = get_alert_manager()
+        for name, argument in effects:
+            try:
+                if name == 'record_call_outcome':
+                    dialer.record_call_outcome(*argument)
+                elif alert_manager is not None:
+                    getattr(alert_manager, name)(argument)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"[CALL EVENTS] Effect {name} failed: {e}")
+
+    # ---------- out-of-order events ----------
+
+    @staticmethod
+    def _folded_past(event: CallEvent) -> Optional[Call]:
+        """The event's call if events received after it were already folded into the row (else None)"""
+        if not event.call_sid:
+            return None
+        later = db.session.query(CallEvent.id).filter(
+            CallEvent.call_sid == event.call_sid,
+            CallEvent.projected_at.isnot(None),
+            CallEvent.received_at > event.received_at
+        ).first()
+        return CallProjection._find(event.call_sid) if later is not None else None
+
+    def _fold_late(self, call: Call, event: CallEvent) -> List[Effect]:
+        """
+        Refold the call with the late event in its place. Returns the late
+        event's effects; those of the events after it already ran.
+        """
+        logger.warning(f"[CALL EVENTS] Event {event.id} ({event.source} {event.call_sid}) arrived after later "
+                       f"events of its call were folded - refolding the call in received_at order")
+        effects: List[Effect] = []
+        for folded in self._call_events(call, also_event_id=event.id):
+            folded_effects = self.projection.apply(folded, call=call)
+            if folded.id == event.id:
+                effects = folded_effects
+        return effects
+
+    # ---------- rebuild ----------
+
+    def _call_events(self, call: Call, also_event_id: Optional[int] = None) -> List[CallEvent]:
+        """
+        The projected events of a call (plus also_event_id), in fold order,
+        with its projected columns reset - apply them with call=call.
+        """
+        task_sids = [
+            row[0] for row in db.session.query(CallEvent.task_sid)
+            .filter(CallEvent.call_sid == call.call_sid, CallEvent.task_sid.isnot(None))
+            .distinct()
+        ]
+        projected = CallEvent.projected_at.isnot(None)
+        events = (
+            CallEvent.query
+            .filter(or_(projected, CallEvent.id == also_event_id) if also_event_id is not None else projected)
+            .filter(or_(
+                CallEvent.call_sid == call.call_sid,
+                CallEvent.task_sid.in_(task_sids) if task_sids else false()
+            ))
+            .order_by(CallEvent.received_at.asc(), CallEvent.id.asc())
+            .all()
+        )
+        if events:
+            for column, value in PROJECTED_COLUMNS.items():
+                setattr(call, column, value)
+        return events
+
+    def rebuild_call(self, call: Call) -> int:
+        """Reset the projected columns of one call and refold its projected events (no effects). Returns events folded."""
+        events = self._call_events(call)
+        for event in events:
+            self.projection.apply(event, call=call)
+        return len(events)
+
+    def rebuild(self, call_sids: Optional[List[str]] = None, since: Optional[datetime] = None) -> dict:
+        """
+        Recompute calls from the journal's projected events (the pending ones
+        are still folded live). Without call_sids: every call with journaled
+        events, optionally only those created since `since`.
+
+        Takes the lease over from the projecting worker (it stops at its next
+        event and picks the lease up again once this returns). Raises
+        LeaseHeldError if another rebuild is running.
+        """
+        result = {'calls': 0, 'events': 0, 'changed': 0}
+        owner = self.owner + REBUILD_OWNER_SUFFIX
+        with self._lock:
+            self._renew_at = 0.0  # This process's projector re-checks the lease after the rebuild
+            if not self._take_lease(owner, take_over=True):
+                raise LeaseHeldError("another rebuild is running")
+            try:
+                query = Call.query.filter(
+                    Call.call_sid.in_(db.session.query(CallEvent.call_sid).filter(CallEvent.projected_at.isnot(None)))
+                )
+                if call_sids:
+                    query = query.filter(Call.call_sid.in_(call_sids))
+                if since is not None:
+                    query = query.filter(Call.created_at >= since)
+
+                last_id = 0
+                while True:
+                    calls = query.filter(Call.id > last_id).order_by(Call.id.asc()).limit(REBUILD_BATCH_SIZE).all()
+                    if not calls:
+                        break
+                    for call in calls:
+                        before = {column: getattr(call, column) for column in PROJECTED_COLUMNS}
+                        folded = self.rebuild_call(call)
+                        result['calls'] += 1
+                        result['events'] += folded
+                        if any(getattr(call, column) != value for column, value in before.items()):
+                            result['changed'] += 1
+                            logger.info(f"[CALL EVENTS] Rebuilt {call.call_sid}: {before.get('disposition')} -> {call.disposition}")
+                    last_id = calls[-1].id
+                    if not self._hold_lease(owner):
+                        db.session.rollback()
+                        raise LeaseHeldError(f"lost the projector lease after {result['calls']} calls")
+                    db.session.commit()
+                    db.session.expunge_all()  # Keep memory flat on full rebuilds
+            finally:
+                db.session.rollback()
+                self.release_lease(owner)
+
+        logger.info(f"[CALL EVENTS] Rebuild: {result['calls']} calls, {result['events']} events, {result['changed']} changed")
+        return result
+
+
+def get_journal_stats() -> dict:
+    """Checkpoint, backlog and lag of the projection"""
+    checkpoint = db.session.get(ProjectorCheckpoint, PROJECTOR_NAME)
+    latest = db.session.query(func.max(CallEvent.id)).scalar() or 0
+    oldest_pending = db.session.query(func.min(CallEvent.received_at)).filter(CallEvent.projected_at.is_(None)).scalar()
+    projector = get_call_projector()
+    spool = get_webhook_spool()
+    return {
+        'mode': Config.CALL_EVENTS_PROJECTION,
+        'checkpoint': checkpoint.to_dict() if checkpoint else None,
+        'latest_event_id': latest,
+        'pending': db.session.query(func.count(CallEvent.id)).filter(CallEvent.projected_at.is_(None)).scalar(),
+        'lag_seconds': round((_utcnow() - _as_utc(oldest_pending)).total_seconds(), 3) if oldest_pending else 0,
+        'this_process': {'owner': projector.owner, 'projected': projector.projected, 'skipped': projector.skipped},
+        'spool': spool.stats() if spool is not None else None,
+    }
+
+
+# ============== BACKGROUND WORKER ==============
+
+_projector: Optional[CallProjector] = None
+_projector_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def get_call_projector() -> CallProjector:
+    """Get the projector singleton"""
+    global _projector
+    if _projector is None:
+        _projector = CallProjector(
+            settle_seconds=Config.CALL_EVENTS_SETTLE_MS / 1000,
+            batch_size=Config.CALL_EVENTS_BATCH_SIZE
+        )
+    return _projector
+
+
+def start_call_projector(app, track_call: Optional[Callable] = None) -> bool:
+    """
+    Set up the projection for this worker and, in async mode, start its thread.
+
+    track_call is called with each Call row the projection creates, before
+    commit (ex: contact tracking).
+    """
+    global _projector_thread
+    projector = get_call_projector()
+    projector.projection.track_call = track_call
+    if Config.CALL_EVENTS_PROJECTION == 'inline':
+        return False
+    if _projector_thread is not None and _projector_thread.is_alive():
+        return False
+
+    def _loop():
+        while not _stop_event.is_set():
+            leased = True
+            try:
+                with app.app_context():
+                    leased = projector.project_pending()['leased']
+            except Exception as e:
+                logger.error(f"[CALL EVENTS] Projector loop error: {e}")
+            # Standby workers only check whether the lease expired
+            _stop_event.wait(Config.CALL_EVENTS_POLL_INTERVAL if leased else LEASE_SECONDS / 3)
+        try:
+            with app.app_context():
+                projector.release_lease()
+        except Exception as e:
+            logger.warning(f"[CALL EVENTS] Could not release the projector lease: {e}")
+
+    _stop_event.clear()
+    _projector_thread = threading.Thread(target=_loop, name='call-projector', daemon=True)
+    _projector_thread.start()
+    logger.info(f"[CALL EVENTS] Projector started (poll {Config.CALL_EVENTS_POLL_INTERVAL}s, "
+                f"settle {Config.CALL_EVENTS_SETTLE_MS}ms)")
+    return True
+
+
+def stop_call_projector() -> None:
+    """Stop the projector thread (releases the lease so another worker takes over)"""
+    _stop_event.set()
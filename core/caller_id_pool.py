@@ -0,0 +1,279 @@
+"""
+Outbound caller ID pool.
+
+Numbers from the `phone_numbers` table are loaded into an in-memory
+selector so each outbound call picks a caller ID without a database query:
+
+- Match sets, tried in order: same area code -> same state -> same timezone
+  (nearby states) -> whole pool
+- Round-robin inside a match set, so load spreads evenly across numbers
+- Per-number calls-per-minute cap (sliding 60s window); saturated numbers
+  are skipped and the next match set is tried
+- Empty pool (or every number saturated) falls back to the static
+  CALLER_ID_FL / CALLER_ID_TX / CALLER_ID_DEFAULT routing
+- Loaded and reloaded by a background thread per worker (warmed at
+  startup); callers never query phone_numbers, and until the first load
+  succeeds they get the static routing
+
+Caps are enforced per process: with several gunicorn workers, set
+CALLER_ID_POOL_PROCESSES so each worker gets its share of the cap.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+from core.config import Config
+from core.phone_utils import (
+    STATE_TO_TIMEZONE, format_phone_number, get_state_from_phone, normalize_phone
+)
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SECONDS = 60
+
+
+class _PoolNumber:
+    __slots__ = ('phone_number', 'area_code', 'state', 'max_per_window', 'recent')
+
+    def __init__(self, phone_number: str, area_code: str, state: Optional[str], max_per_window: int):
+        self.phone_number = phone_number
+        self.area_code = area_code
+        self.state = state
+        self.max_per_window = max_per_window
+        self.recent: deque = deque()  # Timestamps of calls in the current window
+
+    def has_capacity(self, now: float) -> bool:
+        cutoff = now - WINDOW_SECONDS
+        recent = self.recent
+        while recent and recent[0] <= cutoff:
+            recent.popleft()
+        return len(recent) < self.max_per_window
+
+
+class _MatchSet:
+    """Numbers sharing a key (area code, state, timezone) with a round-robin cursor"""
+    __slots__ = ('numbers', 'cursor')
+
+    def __init__(self):
+        self.numbers: list = []
+        self.cursor = 0
+
+    def take(self, now: float) -> Optional[_PoolNumber]:
+        """Next number with capacity (round-robin), or None if all are saturated"""
+        size = len(self.numbers)
+        for _ in range(size):
+            number = self.numbers[self.cursor]
+            self.cursor = (self.cursor + 1) % size
+            if number.has_capacity(now):
+                number.recent.append(now)
+                return number
+        return None
+
+
+class CallerIdPool:
+    """In-memory caller ID selector (thread-safe)"""
+
+    def __init__(self, numbers: Iterable[dict], default_max_per_minute: int,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            numbers: dicts with phone_number and optional area_code, state and
+                max_calls_per_minute (ex: PhoneNumber.to_dict())
+            default_max_per_minute: cap for numbers without their own
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._by_area_code: dict = {}
+        self._by_state: dict = {}
+        self._by_timezone: dict = {}
+        self._all = _MatchSet()
+        self._numbers: dict = {}
+        self.selections = {'area_code': 0, 'state': 0, 'timezone': 0, 'pool': 0, 'fallback': 0}
+
+        for row in numbers:
+            phone_number = format_phone_number(row['phone_number'])
+            area_code = row.get('area_code') or normalize_phone(phone_number)[:3]
+            state = row.get('state') or get_state_from_phone(phone_number)
+            number = _PoolNumber(
+                phone_number, area_code, state,
+                row.get('max_calls_per_minute') or default_max_per_minute
+            )
+            self._numbers[normalize_phone(phone_number)] = number
+            self._all.numbers.append(number)
+            self._by_area_code.setdefault(area_code, _MatchSet()).numbers.append(number)
+            if state:
+                self._by_state.setdefault(state, _MatchSet()).numbers.append(number)
+                tz_name = STATE_TO_TIMEZONE.get(state)
+                if tz_name:
+                    self._by_timezone.setdefault(tz_name, _MatchSet()).numbers.append(number)
+
+    def __len__(self) -> int:
+        return len(self._all.numbers)
+
+    def carry_over(self, previous: 'CallerIdPool') -> None:
+        """
+        Keep the state of the pool this one replaces (reloads): calls in the
+        current window per number and the round-robin cursors, so a reload
+        neither resets the caps nor restarts rotation at the first number.
+        """
+        with previous._lock, self._lock:
+            for key, number in self._numbers.items():
+                old = previous._numbers.get(key)
+                if old is not None:
+                    number.recent = deque(old.recent)
+            pairs = [(self._all, previous._all)]
+            for attr in ('_by_area_code', '_by_state', '_by_timezone'):
+                old_sets = getattr(previous, attr)
+                pairs.extend((match_set, old_sets.get(key)) for key, match_set in getattr(self, attr).items())
+            for match_set, old_set in pairs:
+                if old_set is not None and match_set.numbers:
+                    match_set.cursor = old_set.cursor % len(match_set.numbers)
+            self.selections = dict(previous.selections)
+
+    def contains(self, phone_number: str) -> bool:
+        return normalize_phone(phone_number) in self._numbers
+
+    @property
+    def phone_numbers(self) -> list:
+        return [n.phone_number for n in self._all.numbers]
+
+    def select(self, to_number: str) -> Optional[str]:
+        """
+        Caller ID for a destination, or None if the pool is empty or every
+        candidate is at its calls-per-minute cap.
+        """
+        if not self._all.numbers:
+            return None
+
+        digits = normalize_phone(to_number)
+        area_code = digits[:3] if len(digits) == 10 else None
+        state = get_state_from_phone(to_number)
+        tz_name = STATE_TO_TIMEZONE.get(state) if state else None
+
+        candidates = (
+            ('area_code', self._by_area_code.get(area_code)),
+            ('state', self._by_state.get(state)),
+            ('timezone', self._by_timezone.get(tz_name)),
+            ('pool', self._all),
+        )
+        with self._lock:
+            now = self._clock()
+            for tier, match_set in candidates:
+                if match_set is None:
+                    continue
+                number = match_set.take(now)
+                if number is not None:
+                    self.selections[tier] += 1
+                    return number.phone_number
+            self.selections['fallback'] += 1
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            numbers = []
+            for number in self._all.numbers:
+                number.has_capacity(now)  # Drop expired timestamps
+                numbers.append({
+                    'phone_number': number.phone_number,
+                    'area_code': number.area_code,
+                    'state': number.state,
+                    'calls_last_minute': len(number.recent),
+                    'max_calls_per_minute': number.max_per_window,
+                })
+            return {'size': len(numbers), 'selections': dict(self.selections), 'numbers': numbers}
+
+
+# ============== SINGLETON ==============
+
+_caller_id_pool: Optional[CallerIdPool] = None
+_load_lock = threading.Lock()
+_reload_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+LOAD_RETRY_SECONDS = 5  # Until the first load succeeds
+
+
+def _per_process_cap(max_calls_per_minute: int) -> int:
+    return max(1, max_calls_per_minute // max(1, Config.CALLER_ID_POOL_PROCESSES))
+
+
+def load_caller_id_pool() -> CallerIdPool:
+    """(Re)build the pool from active rows in phone_numbers (needs an app context)"""
+    global _caller_id_pool
+    from models.phone_number import PhoneNumber
+
+    rows = PhoneNumber.query.filter_by(is_active=True).order_by(PhoneNumber.id.asc()).all()
+    numbers = []
+    for row in rows:
+        number = row.to_dict()
+        if number['max_calls_per_minute']:
+            number['max_calls_per_minute'] = _per_process_cap(number['max_calls_per_minute'])
+        numbers.append(number)
+
+    pool = CallerIdPool(numbers, default_max_per_minute=_per_process_cap(Config.CALLER_ID_MAX_CALLS_PER_MINUTE))
+    with _load_lock:
+        if _caller_id_pool is not None:
+            pool.carry_over(_caller_id_pool)
+        _caller_id_pool = pool
+    logger.info(f"[CALLER ID] Pool loaded with {len(pool)} numbers")
+    return pool
+
+
+def get_caller_id_pool() -> Optional[CallerIdPool]:
+    """The loaded pool, or None before the first successful load (never queries the database)"""
+    return _caller_id_pool
+
+
+def start_caller_id_pool(app) -> bool:
+    """
+    Load the pool now in a background thread and reload it every
+    CALLER_ID_POOL_RELOAD_INTERVAL seconds (failed first loads are retried
+    every LOAD_RETRY_SECONDS; a failed reload keeps the loaded pool).
+    """
+    global _reload_thread
+    if _reload_thread is not None and _reload_thread.is_alive():
+        return False
+
+    def _loop():
+        while not _stop_event.is_set():
+            try:
+                with app.app_context():
+                    load_caller_id_pool()
+            except Exception as e:
+                if _caller_id_pool is None:
+                    logger.error(f"[CALLER ID] Failed to load pool, using static caller IDs meanwhile: {e}")
+                else:
+                    logger.error(f"[CALLER ID] Failed to reload pool, keeping the loaded one: {e}")
+            loaded = _caller_id_pool is not None
+            _stop_event.wait(Config.CALLER_ID_POOL_RELOAD_INTERVAL if loaded else LOAD_RETRY_SECONDS)
+
+    _stop_event.clear()
+    _reload_thread = threading.Thread(target=_loop, name='caller-id-pool-reload', daemon=True)
+    _reload_thread.start()
+    return True
+
+
+def stop_caller_id_pool() -> None:
+    """Stop the reload thread"""
+    _stop_event.set()
+
+
+def select_caller_id(to_number: str) -> Optional[str]:
+    """Caller ID from the pool, or None (use the static routing)"""
+    pool = get_caller_id_pool()
+    if pool is None:
+        return None
+    return pool.select(to_number)
+
+
+def get_own_numbers_normalized() -> set:
+    """Our numbers (static caller IDs + pool), normalized - never counted as leads"""
+    numbers = [Config.TWILIO_NUMBER, Config.CALLER_ID_FL, Config.CALLER_ID_TX, Config.CALLER_ID_DEFAULT]
+    pool = get_caller_id_pool()
+    if pool is not None:
+        numbers.extend(pool.phone_numbers)
+    return {normalize_phone(n) for n in numbers if n}
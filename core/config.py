@@ -16,15 +16,44 @@ def get_jwt_secret():
     return secret
 
 
-def get_database_url():
+def get_database_url(env_var='DATABASE_URL', default='sqlite:///twilio_app.db'):
     """Get database URL, fixing postgres:// to postgresql:// for SQLAlchemy."""
-    url = os.environ.get('DATABASE_URL', 'sqlite:///twilio_app.db')
+    url = os.environ.get(env_var, default)
     # Railway/Heroku use postgres:// but SQLAlchemy needs postgresql://
     if url.startswith('postgres://'):
         url = url.replace('postgres://', 'postgresql://', 1)
     return url
 
 
+def get_engine_options(url, prefix='DB'):
+    """
+    SQLAlchemy engine options from {prefix}_POOL_SIZE, _MAX_OVERFLOW,
+    _POOL_PRE_PING, _POOL_RECYCLE and _STATEMENT_TIMEOUT_MS (ms, 0 = off).
+    Pool sizing and statement timeouts only apply to PostgreSQL.
+    """
+    options = {
+        'pool_pre_ping': os.environ.get(f'{prefix}_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    if url.startswith('sqlite'):
+        return options
+
+    options['pool_size'] = int(os.environ.get(f'{prefix}_POOL_SIZE', '5'))
+    options['max_overflow'] = int(os.environ.get(f'{prefix}_MAX_OVERFLOW', '10'))
+    options['pool_recycle'] = int(os.environ.get(f'{prefix}_POOL_RECYCLE', '1800'))  # seconds, -1 = never
+    statement_timeout = int(os.environ.get(f'{prefix}_STATEMENT_TIMEOUT_MS', '0'))
+    if statement_timeout > 0:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def get_database_binds():
+    """Extra engines: 'replica' when DATABASE_READ_URL is set (see core.database.read_only)"""
+    read_url = get_database_url('DATABASE_READ_URL', '')
+    if not read_url:
+        return {}
+    return {'replica': {'url': read_url, **get_engine_options(read_url, 'DB_READ')}}
+
+
 class Config:
     # Twilio
     TWILIO_ACCOUNT_SID: str = os.environ.get('TWILIO_ACCOUNT_SID', '')
@@ -33,15 +62,67 @@ class Config:
     TWILIO_WORKFLOW_SID: str = os.environ.get('TWILIO_WORKFLOW_SID', '')
     TWILIO_WORKSPACE_SID: str = os.environ.get('TWILIO_WORKSPACE_SID', '')
     BASE_URL: str = os.environ.get('BASE_URL', '')
+    # Send Twilio REST requests (and recording downloads) here instead of
+    # https://*.twilio.com - e.g. scripts/twilio_simulator.py for load tests
+    TWILIO_API_BASE_URL: str = os.environ.get('TWILIO_API_BASE_URL', '').rstrip('/')
+
+    # Startup: lazy = no create_all at import (use `flask --app app init-db` or the
+    # gunicorn master hook) and background workers start after fork / on first request
+    LAZY_STARTUP: bool = os.environ.get('LAZY_STARTUP', 'false').lower() == 'true'
+
+    # Logging: queued and written by a background thread (see core/logging_setup.py)
+    LOG_LEVEL: str = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS: str = os.environ.get('LOG_LEVELS', '')  # e.g. "app.inbound=DEBUG,core.attio=WARNING"
+    LOG_FORMAT: str = os.environ.get('LOG_FORMAT', 'json').lower()  # json or text
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+    LOG_QUEUE_SIZE: int = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+    # Prometheus /metrics (optional bearer token; snapshots shared by workers via METRICS_DIR)
+    METRICS_ENABLED: bool = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN: str = os.environ.get('METRICS_TOKEN', '')
+    METRICS_FLUSH_INTERVAL: float = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+    METRICS_SCRAPE_ACTIVE_WINDOW: float = float(os.environ.get('METRICS_SCRAPE_ACTIVE_WINDOW', '300'))
+
+    # Request profiling (X-Profile-Token header or sampling) and SQL statements per request
+    PROFILE_TOKEN: str = os.environ.get('PROFILE_TOKEN', '')
+    PROFILE_SAMPLE_RATE: float = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_INTERVAL_MS: float = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+    PROFILE_MAX_STORED: int = int(os.environ.get('PROFILE_MAX_STORED', '200'))
+    SQL_QUERY_BUDGET: int = int(os.environ.get('SQL_QUERY_BUDGET', '25'))  # 0 = no default budget
+    SQL_QUERY_BUDGETS: str = os.environ.get('SQL_QUERY_BUDGETS', '')  # e.g. "/inbound_status=5,/call_status=8"
+
+    # Memory watchdog: log RSS growth per worker; above MEMORY_RECYCLE_RSS_MB (0 = never)
+    # the gunicorn worker is recycled gracefully
+    MEMORY_WATCHDOG_INTERVAL: float = float(os.environ.get('MEMORY_WATCHDOG_INTERVAL', '300'))
+    MEMORY_RECYCLE_RSS_MB: int = int(os.environ.get('MEMORY_RECYCLE_RSS_MB', '0'))
+
+    # API docs: static (prebuilt spec, gzip + ETag), dynamic (Flasgger per request) or off
+    APIDOCS_MODE: str = os.environ.get('APIDOCS_MODE', 'static').lower()
+    APIDOCS_SPEC_PATH: str = os.environ.get('APIDOCS_SPEC_PATH', 'build/apispec.json.gz')  # from `flask build-apispec`
 
     # Database
     SQLALCHEMY_DATABASE_URI: str = get_database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
+    SQLALCHEMY_ENGINE_OPTIONS: dict = get_engine_options(SQLALCHEMY_DATABASE_URI)
+    # Optional read replica (DATABASE_READ_URL) for routes marked @read_only
+    SQLALCHEMY_BINDS: dict = get_database_binds()
+    # After a user writes, their reads stay on the primary for this long (replication lag)
+    DB_READ_YOUR_WRITES_WINDOW: float = float(os.environ.get('DB_READ_YOUR_WRITES_WINDOW', '5'))
 
     # JWT
     JWT_SECRET: str = get_jwt_secret()
     JWT_EXPIRATION_HOURS: int = int(os.environ.get('JWT_EXPIRATION_HOURS', '720'))  # 30 days default
 
+    # Password hashing (bcrypt runs on a small pool; extra requests get 503)
+    BCRYPT_ROUNDS: int = int(os.environ.get('BCRYPT_ROUNDS', '12'))  # hashes with another cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get('PASSWORD_HASH_WORKERS', '1'))
+    PASSWORD_HASH_MAX_INFLIGHT: int = int(os.environ.get('PASSWORD_HASH_MAX_INFLIGHT', '2'))  # < gunicorn --threads
+
+    # Login throttling (failed attempts per sliding window)
+    LOGIN_MAX_FAILURES_PER_IP: int = int(os.environ.get('LOGIN_MAX_FAILURES_PER_IP', '20'))
+    LOGIN_MAX_FAILURES_PER_EMAIL: int = int(os.environ.get('LOGIN_MAX_FAILURES_PER_EMAIL', '5'))
+    LOGIN_THROTTLE_WINDOW: int = int(os.environ.get('LOGIN_THROTTLE_WINDOW', '900'))  # 15 minutes
+
     # Development
     SKIP_TWILIO_VALIDATION: bool = os.environ.get('SKIP_TWILIO_VALIDATION', 'false').lower() == 'true'
 
@@ -68,15 +149,80 @@ class Config:
     CALLER_ID_FL: str = os.environ.get('CALLER_ID_FL', '+13212700236')  # Florida
     CALLER_ID_TX: str = os.environ.get('CALLER_ID_TX', '+17269003839')  # Texas
     CALLER_ID_DEFAULT: str = os.environ.get('CALLER_ID_DEFAULT', '+18336411602')  # Toll-free (outros estados)
+    # Caller ID pool (phone_numbers table); the numbers above are the fallback
+    CALLER_ID_MAX_CALLS_PER_MINUTE: int = int(os.environ.get('CALLER_ID_MAX_CALLS_PER_MINUTE', '6'))  # per number
+    CALLER_ID_POOL_RELOAD_INTERVAL: int = int(os.environ.get('CALLER_ID_POOL_RELOAD_INTERVAL', '60'))  # seconds
+    CALLER_ID_POOL_PROCESSES: int = int(os.environ.get('CALLER_ID_POOL_PROCESSES', '2'))  # gunicorn --workers
+
+    # Campaign dialer (outbound calls for campaign leads)
+    DIALER_ENABLED: bool = os.environ.get('DIALER_ENABLED', 'false').lower() == 'true'
+    DIALER_ACCOUNT_CPS: float = float(os.environ.get('DIALER_ACCOUNT_CPS', '1'))  # Twilio account calls/second
+    DIALER_MAX_CONCURRENT_REQUESTS: int = int(os.environ.get('DIALER_MAX_CONCURRENT_REQUESTS', '4'))
+    DIALER_LINES_PER_AGENT: float = float(os.environ.get('DIALER_LINES_PER_AGENT', '1'))  # calls in flight per agent
+    DIALER_TICK_INTERVAL: float = float(os.environ.get('DIALER_TICK_INTERVAL', '1'))  # seconds
+    DIALER_CALL_WINDOW_START: int = int(os.environ.get('DIALER_CALL_WINDOW_START', '9'))  # lead local hour
+    DIALER_CALL_WINDOW_END: int = int(os.environ.get('DIALER_CALL_WINDOW_END', '20'))  # lead local hour (exclusive)
 
     # Attio CRM Integration
     ATTIO_API_KEY: str = os.environ.get('ATTIO_API_KEY', '')
 
+    # Attio lead cache (lookups by phone). TTL 0 disables the cache.
+    ATTIO_LEAD_CACHE_TTL: int = int(os.environ.get('ATTIO_LEAD_CACHE_TTL', '300'))  # 5 minutes
+    ATTIO_LEAD_CACHE_NEGATIVE_TTL: int = int(os.environ.get('ATTIO_LEAD_CACHE_NEGATIVE_TTL', '30'))  # misses
+    ATTIO_LEAD_CACHE_MAX_SIZE: int = int(os.environ.get('ATTIO_LEAD_CACHE_MAX_SIZE', '5000'))
+
+    # Attio local mirror (attio_people table synced in background)
+    ATTIO_MIRROR_ENABLED: bool = os.environ.get('ATTIO_MIRROR_ENABLED', 'false').lower() == 'true'
+    ATTIO_MIRROR_SYNC_INTERVAL: int = int(os.environ.get('ATTIO_MIRROR_SYNC_INTERVAL', '60'))  # seconds
+    ATTIO_MIRROR_MAX_AGE: int = int(os.environ.get('ATTIO_MIRROR_MAX_AGE', '300'))  # freshness SLA (seconds)
+    ATTIO_MIRROR_FULL_RESYNC_INTERVAL: int = int(os.environ.get('ATTIO_MIRROR_FULL_RESYNC_INTERVAL', '86400'))
+    ATTIO_MIRROR_PAGE_SIZE: int = int(os.environ.get('ATTIO_MIRROR_PAGE_SIZE', '500'))
+
+    # Attio note outbox (notes are queued and sent in background)
+    ATTIO_OUTBOX_RATE_PER_SECOND: float = float(os.environ.get('ATTIO_OUTBOX_RATE_PER_SECOND', '5'))
+    ATTIO_OUTBOX_BATCH_SIZE: int = int(os.environ.get('ATTIO_OUTBOX_BATCH_SIZE', '20'))
+    ATTIO_OUTBOX_MAX_ATTEMPTS: int = int(os.environ.get('ATTIO_OUTBOX_MAX_ATTEMPTS', '8'))
+    ATTIO_OUTBOX_FLUSH_INTERVAL: float = float(os.environ.get('ATTIO_OUTBOX_FLUSH_INTERVAL', '2'))
+    # Enqueue an Attio note automatically whenever a call resumo is saved
+    ATTIO_SYNC_RESUMO: bool = os.environ.get('ATTIO_SYNC_RESUMO', 'false').lower() == 'true'
+
+    # Webhook journal: status webhooks append to call_events, a projector folds them into calls
+    CALL_EVENTS_PROJECTION: str = os.environ.get('CALL_EVENTS_PROJECTION', 'async').lower()  # async, inline
+    CALL_EVENTS_POLL_INTERVAL: float = float(os.environ.get('CALL_EVENTS_POLL_INTERVAL', '0.25'))  # seconds
+    CALL_EVENTS_SETTLE_MS: int = int(os.environ.get('CALL_EVENTS_SETTLE_MS', '500'))  # wait for in-flight commits
+    CALL_EVENTS_BATCH_SIZE: int = int(os.environ.get('CALL_EVENTS_BATCH_SIZE', '200'))
+
+    # Webhook disk spool: journal writes that fail or exceed the deadline go to local disk (WEBHOOK_SPOOL_DIR)
+    WEBHOOK_SPOOL_ENABLED: bool = os.environ.get('WEBHOOK_SPOOL_ENABLED', 'true').lower() == 'true'
+    WEBHOOK_DB_DEADLINE_MS: int = int(os.environ.get('WEBHOOK_DB_DEADLINE_MS', '1500'))  # 0 = no deadline
+    WEBHOOK_SPOOL_FSYNC_MS: float = float(os.environ.get('WEBHOOK_SPOOL_FSYNC_MS', '2'))  # group commit window
+    WEBHOOK_SPOOL_REPLAY_INTERVAL: float = float(os.environ.get('WEBHOOK_SPOOL_REPLAY_INTERVAL', '2'))  # seconds
+
+    # /voice answers within this budget: DB steps that overrun are deferred or replaced by cached routing (0 = none)
+    VOICE_DEADLINE_MS: int = int(os.environ.get('VOICE_DEADLINE_MS', '1000'))
+
+    # In-process typeahead index for /attio/contacts
+    CONTACT_INDEX_ENABLED: bool = os.environ.get('CONTACT_INDEX_ENABLED', 'false').lower() == 'true'
+    CONTACT_INDEX_REFRESH_INTERVAL: int = int(os.environ.get('CONTACT_INDEX_REFRESH_INTERVAL', '60'))  # seconds
+    CONTACT_INDEX_SNAPSHOT_INTERVAL: int = int(os.environ.get('CONTACT_INDEX_SNAPSHOT_INTERVAL', '3600'))  # full reload
+    CONTACT_INDEX_MAX_AGE: int = int(os.environ.get('CONTACT_INDEX_MAX_AGE', '300'))  # stale index -> live search
+
+    # Resolve Attio lead + contact history while inbound calls ring
+    LEAD_PREWARM_ENABLED: bool = os.environ.get('LEAD_PREWARM_ENABLED', 'true').lower() == 'true'
+    LEAD_PREWARM_WORKERS: int = int(os.environ.get('LEAD_PREWARM_WORKERS', '4'))
+    LEAD_CONTEXT_TTL: int = int(os.environ.get('LEAD_CONTEXT_TTL', '1800'))  # 30 minutes (ring + talk time)
+    LEAD_CONTEXT_MAX_SIZE: int = int(os.environ.get('LEAD_CONTEXT_MAX_SIZE', '1000'))
+    # Max seconds a request waits for a lookup that is still running
+    LEAD_CONTEXT_WAIT: float = float(os.environ.get('LEAD_CONTEXT_WAIT', '2'))
+
     # Twilio Voice SDK (for browser-based calling)
     TWILIO_TWIML_APP_SID: str = os.environ.get('TWILIO_TWIML_APP_SID', '')
     TWILIO_API_KEY: str = os.environ.get('TWILIO_API_KEY', '')
     TWILIO_API_SECRET: str = os.environ.get('TWILIO_API_SECRET', '')
     VOICE_TOKEN_TTL: int = int(os.environ.get('VOICE_TOKEN_TTL', '86400'))  # 24 hours (max allowed by Twilio)
+    # /token reuses an identity's token until this fraction of VOICE_TOKEN_TTL has elapsed
+    VOICE_TOKEN_REFRESH_FRACTION: float = float(os.environ.get('VOICE_TOKEN_REFRESH_FRACTION', '0.5'))
+    VOICE_TOKEN_CACHE_MAX_SIZE: int = int(os.environ.get('VOICE_TOKEN_CACHE_MAX_SIZE', '1000'))
 
     # Inbound routing: True = Lovable, False = Flex/TaskRouter
     INBOUND_USE_LOVABLE: bool = os.environ.get('INBOUND_USE_LOVABLE', 'false').lower() == 'true'
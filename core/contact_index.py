@@ -0,0 +1,420 @@
+"""
+In-memory search index for the /attio/contacts typeahead.
+
+Built from a snapshot of Attio people (local mirror table when enabled,
+otherwise paged from the Attio API) and refreshed incrementally, so each
+keystroke is answered from memory instead of a `$contains` query to Attio.
+Every worker refreshes its own copy: from the mirror it re-reads the rows
+synced since its last refresh (attio_people.synced_at).
+
+Ranking (results stop as soon as `limit` is reached):
+- name queries: full name prefix > any name token prefix > substring
+- digit queries: phone prefix > phone suffix (reversed-digit index) > substring
+
+Substring matches (3+ characters) use trigram posting lists, verified
+against the current contact so stale postings from updates are harmless.
+"""
+
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from core.config import Config
+from core.phone_utils import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on candidates examined for multi-word queries
+MAX_MULTI_TOKEN_CANDIDATES = 2000
+# Substring search needs at least one trigram
+MIN_SUBSTRING_LENGTH = 3
+# Mirror refreshes re-read this window: a sync page committed late keeps an older synced_at
+MIRROR_OVERLAP_SECONDS = 120
+_HIGH = '￿'
+
+
+class _Contact:
+    __slots__ = ('id', 'name', 'phone', 'state', 'created_at', 'name_key', 'padded', 'tokens', 'digits')
+
+    def __init__(self, contact: dict, created_at: Optional[str]):
+        self.id = contact['id']
+        self.name = contact.get('name') or 'Sem nome'
+        self.phone = contact.get('phone') or ''
+        self.state = contact.get('state') or ''
+        self.created_at = created_at or ''
+        self.name_key = ' '.join(self.name.lower().split())
+        self.padded = ' ' + self.name_key  # ' word' in padded == some token starts with word
+        self.tokens = tuple(sorted(set(self.name_key.split())))
+        self.digits = normalize_phone(self.phone)
+
+    def to_dict(self) -> dict:
+        return {'id': self.id, 'name': self.name, 'phone': self.phone, 'state': self.state}
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _prefix_range(items: list, prefix: str):
+    """Yield items of a sorted (key, id) list whose key starts with prefix"""
+    index = bisect_left(items, (prefix, ''))
+    end = bisect_left(items, (prefix + _HIGH, ''))
+    for i in range(index, end):
+        yield items[i]
+
+
+class ContactSearchIndex:
+    """Sorted name-token and phone indexes plus trigram postings for substrings"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._contacts: dict = {}
+        self._full_names: list = []   # (normalized full name, id)
+        self._name_tokens: list = []  # (token, id)
+        self._phone_fwd: list = []    # (10 digits, id)
+        self._phone_rev: list = []    # (10 digits reversed, id) - suffix search
+        self._ordinals: list = []     # ordinal -> id (None once replaced/removed)
+        self._ordinal_of: dict = {}   # id -> current ordinal
+        self._name_grams: dict = {}   # trigram -> array of ordinals
+        self._digit_grams: dict = {}  # trigram -> array of ordinals
+        self._recent = None           # ids sorted by created_at desc
+        self.built_at: Optional[float] = None
+        self.max_created_at: str = ''
+        self.mirror_synced_at: Optional[datetime] = None  # Mirror rows synced before this are indexed
+
+    def __len__(self) -> int:
+        return len(self._contacts)
+
+    @property
+    def age_seconds(self) -> Optional[float]:
+        return time.monotonic() - self.built_at if self.built_at is not None else None
+
+    # ---------- building ----------
+
+    def rebuild(self, contacts: Iterable[tuple]) -> None:
+        """Replace the whole index from (contact dict, created_at ISO) pairs"""
+        entries = {}
+        for contact, created_at in contacts:
+            if contact.get('id'):
+                entries[contact['id']] = _Contact(contact, created_at)
+
+        full_names = sorted((c.name_key, c.id) for c in entries.values())
+        name_tokens = sorted((t, c.id) for c in entries.values() for t in c.tokens)
+        phone_fwd = sorted((c.digits, c.id) for c in entries.values() if c.digits)
+        phone_rev = sorted((c.digits[::-1], c.id) for c in entries.values() if c.digits)
+
+        with self._lock:
+            self._contacts = entries
+            self._full_names = full_names
+            self._name_tokens = name_tokens
+            self._phone_fwd = phone_fwd
+            self._phone_rev = phone_rev
+            self._ordinals = []
+            self._ordinal_of = {}
+            self._name_grams = {}
+            self._digit_grams = {}
+            for entry in entries.values():
+                self._add_grams(entry)
+            self._recent = None
+            self.max_created_at = max((c.created_at for c in entries.values()), default='')
+            self.built_at = time.monotonic()
+
+    def upsert(self, contacts: Iterable[tuple]) -> int:
+        """Add or replace contacts from (contact dict, created_at ISO) pairs"""
+        count = 0
+        with self._lock:
+            for contact, created_at in contacts:
+                if not contact.get('id'):
+                    continue
+                self._remove(contact['id'])
+                entry = _Contact(contact, created_at)
+                self._contacts[entry.id] = entry
+                insort(self._full_names, (entry.name_key, entry.id))
+                for token in entry.tokens:
+                    insort(self._name_tokens, (token, entry.id))
+                if entry.digits:
+                    insort(self._phone_fwd, (entry.digits, entry.id))
+                    insort(self._phone_rev, (entry.digits[::-1], entry.id))
+                self._add_grams(entry)
+                if entry.created_at > self.max_created_at:
+                    self.max_created_at = entry.created_at
+                count += 1
+            if count:
+                self._recent = None
+                if self.built_at is None:
+                    self.built_at = time.monotonic()
+        return count
+
+    def remove(self, record_id: str) -> None:
+        with self._lock:
+            if self._remove(record_id):
+                self._recent = None
+
+    def _remove(self, record_id: str) -> bool:
+        entry = self._contacts.pop(record_id, None)
+        if entry is None:
+            return False
+        # Postings are append-only; the old ordinal just stops resolving
+        ordinal = self._ordinal_of.pop(record_id, None)
+        if ordinal is not None:
+            self._ordinals[ordinal] = None
+        self._delete(self._full_names, (entry.name_key, entry.id))
+        for token in entry.tokens:
+            self._delete(self._name_tokens, (token, entry.id))
+        if entry.digits:
+            self._delete(self._phone_fwd, (entry.digits, entry.id))
+            self._delete(self._phone_rev, (entry.digits[::-1], entry.id))
+        return True
+
+    @staticmethod
+    def _delete(items: list, item: tuple) -> None:
+        i = bisect_left(items, item)
+        if i < len(items) and items[i] == item:
+            del items[i]
+
+    def _add_grams(self, entry: _Contact) -> None:
+        ordinal = len(self._ordinals)
+        self._ordinals.append(entry.id)
+        self._ordinal_of[entry.id] = ordinal
+        for gram in _trigrams(entry.name_key):
+            self._name_grams.setdefault(gram, array('i')).append(ordinal)
+        for gram in _trigrams(entry.digits):
+            self._digit_grams.setdefault(gram, array('i')).append(ordinal)
+
+    # ---------- searching ----------
+
+    def search(self, query: Optional[str], limit: int = 50) -> list:
+        """Ranked contacts matching query (most recent contacts if empty)"""
+        with self._lock:
+            if limit <= 0:
+                return []
+            term = ' '.join((query or '').lower().split())
+            if not term:
+                return [self._contacts[i].to_dict() for i in self._recent_ids()[:limit]]
+
+            digits = ''.join(c for c in term if c.isdigit())
+            is_phone_query = digits and all(c.isdigit() or c in '+-() .' for c in term)
+            # Drop the country code: "+1 (305" -> "305"
+            if is_phone_query and digits.startswith('1') and (term.startswith('+1') or len(digits) == 11):
+                digits = digits[1:]
+
+            results: list = []
+            seen: set = set()
+            if is_phone_query:
+                key = digits[-10:]
+                self._collect(results, seen, limit, (i for _, i in _prefix_range(self._phone_fwd, key)))
+                self._collect(results, seen, limit, (i for _, i in _prefix_range(self._phone_rev, key[::-1])))
+                self._collect_substring(results, seen, limit, key, self._digit_grams, 'digits')
+            else:
+                self._collect(results, seen, limit, (i for _, i in _prefix_range(self._full_names, term)))
+                words = term.split()
+                if len(words) == 1:
+                    self._collect(results, seen, limit, (i for _, i in _prefix_range(self._name_tokens, term)))
+                else:
+                    self._collect(results, seen, limit, self._multi_token_candidates(words))
+                self._collect_substring(results, seen, limit, term, self._name_grams, 'name_key')
+
+            return [self._contacts[i].to_dict() for i in results]
+
+    def _prefix_count(self, items: list, prefix: str) -> int:
+        return bisect_left(items, (prefix + _HIGH, '')) - bisect_left(items, (prefix, ''))
+
+    def _multi_token_candidates(self, words: list):
+        """Contacts where every query word prefixes some name token"""
+        # Drive from the most selective word
+        words = sorted(words, key=lambda w: self._prefix_count(self._name_tokens, w))
+        first, rest = words[0], [' ' + w for w in words[1:]]
+        examined = 0
+        for _, record_id in _prefix_range(self._name_tokens, first):
+            examined += 1
+            if examined > MAX_MULTI_TOKEN_CANDIDATES:
+                return
+            padded = self._contacts[record_id].padded
+            if all(w in padded for w in rest):
+                yield record_id
+
+    @staticmethod
+    def _collect(results: list, seen: set, limit: int, ids) -> None:
+        if len(results) >= limit:
+            return
+        for record_id in ids:
+            if record_id not in seen:
+                seen.add(record_id)
+                results.append(record_id)
+                if len(results) >= limit:
+                    return
+
+    def _collect_substring(self, results: list, seen: set, limit: int, term: str,
+                           grams: dict, field: str) -> None:
+        if len(results) >= limit or len(term) < MIN_SUBSTRING_LENGTH:
+            return
+        postings = [grams.get(gram) for gram in _trigrams(term)]
+        if not all(postings):
+            return
+        # Walk the shortest posting list and verify against the live contact
+        for ordinal in min(postings, key=len):
+            record_id = self._ordinals[ordinal]
+            if record_id is None or record_id in seen:
+                continue
+            if term in getattr(self._contacts[record_id], field):
+                seen.add(record_id)
+                results.append(record_id)
+                if len(results) >= limit:
+                    return
+
+    def _recent_ids(self) -> list:
+        if self._recent is None:
+            self._recent = sorted(self._contacts, key=lambda i: self._contacts[i].created_at, reverse=True)
+        return self._recent
+
+    def stats(self) -> dict:
+        return {
+            'contacts': len(self._contacts),
+            'name_tokens': len(self._name_tokens),
+            'age_seconds': round(self.age_seconds, 1) if self.age_seconds is not None else None,
+            'max_created_at': self.max_created_at or None,
+        }
+
+
+# ============== SNAPSHOT / REFRESH ==============
+
+def _iso(value) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value or ''
+
+
+def load_snapshot_from_mirror(synced_since: Optional[datetime] = None) -> list:
+    """(contact, created_at) pairs from the attio_people mirror table (only rows synced since, if given)"""
+    from models.attio_person import AttioPerson
+    query = AttioPerson.query.with_entities(
+        AttioPerson.record_id, AttioPerson.name, AttioPerson.phone,
+        AttioPerson.state, AttioPerson.record_created_at
+    )
+    if synced_since is not None:
+        query = query.filter(AttioPerson.synced_at >= synced_since)
+    people = query.all()
+    return [
+        ({'id': p.record_id, 'name': p.name, 'phone': p.phone, 'state': p.state}, _iso(p.record_created_at))
+        for p in people
+    ]
+
+
+def load_snapshot_from_attio(attio, created_from: Optional[str] = None, page_size: int = 500) -> list:
+    """(contact, created_at) pairs paged from the Attio API (oldest first)"""
+    pairs = []
+    offset = 0
+    while True:
+        records = attio.list_people_page(created_from=created_from, offset=offset, limit=page_size)
+        pairs.extend((attio._format_person_simple(r), r.get('created_at', '')) for r in records)
+        if len(records) < page_size:
+            return pairs
+        offset += len(records)
+
+
+_contact_index: Optional[ContactSearchIndex] = None
+_refresh_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def get_contact_index() -> Optional[ContactSearchIndex]:
+    """Get the contact index singleton (None if disabled)"""
+    global _contact_index
+    if _contact_index is None and Config.CONTACT_INDEX_ENABLED:
+        _contact_index = ContactSearchIndex()
+    return _contact_index
+
+
+def get_ready_index() -> Optional[ContactSearchIndex]:
+    """The contact index if it has been built and is not older than CONTACT_INDEX_MAX_AGE"""
+    index = get_contact_index()
+    if index is None or index.age_seconds is None:
+        return None
+    if index.age_seconds > Config.CONTACT_INDEX_MAX_AGE:
+        return None
+    return index
+
+
+def refresh_contact_index(full: bool = False) -> dict:
+    """
+    Refresh the index (needs an app context when reading the mirror).
+
+    Full refresh reloads the whole snapshot; otherwise the mirror rows
+    synced since the last refresh are upserted, or (no fresh mirror) the
+    contacts created after the newest indexed one are fetched from Attio.
+    """
+    from core import attio_mirror
+    from core.attio import get_attio_client
+
+    index = get_contact_index()
+    if index is None:
+        return {'enabled': False}
+
+    started = time.perf_counter()
+    use_mirror = attio_mirror.is_mirror_fresh()
+    read_at = datetime.now(timezone.utc)
+
+    if use_mirror and index.mirror_synced_at is None:
+        full = True  # Built from Attio until now: no mirror watermark yet
+
+    if full or index.built_at is None:
+        if use_mirror:
+            pairs = load_snapshot_from_mirror()
+            index.mirror_synced_at = read_at
+        else:
+            attio = get_attio_client()
+            if attio is None:
+                return {'enabled': True, 'error': 'Attio not configured'}
+            pairs = load_snapshot_from_attio(attio)
+            index.mirror_synced_at = None
+        index.rebuild(pairs)
+        mode = 'full'
+        count = len(pairs)
+    elif use_mirror:
+        since = index.mirror_synced_at - timedelta(seconds=MIRROR_OVERLAP_SECONDS)
+        count = index.upsert(load_snapshot_from_mirror(synced_since=since))
+        index.mirror_synced_at = read_at
+        index.built_at = time.monotonic()
+        mode = 'mirror'
+    else:
+        attio = get_attio_client()
+        if attio is None:
+            return {'enabled': True, 'error': 'Attio not configured'}
+        count = index.upsert(load_snapshot_from_attio(attio, created_from=index.max_created_at or None))
+        index.built_at = time.monotonic()
+        mode = 'incremental'
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(f"[CONTACT INDEX] {mode} refresh: {count} contacts in {elapsed_ms:.0f}ms "
+                f"(total {len(index)}, source={'mirror' if use_mirror else 'attio'})")
+    return {'enabled': True, 'mode': mode, 'contacts': count, 'elapsed_ms': round(elapsed_ms, 1)}
+
+
+def start_contact_index(app) -> bool:
+    """Start the background refresh thread for this worker (no-op if disabled)"""
+    global _refresh_thread
+    if get_contact_index() is None or (_refresh_thread is not None and _refresh_thread.is_alive()):
+        return False
+
+    def _loop():
+        last_full = 0.0
+        while not _stop_event.is_set():
+            try:
+                with app.app_context():
+                    full = time.monotonic() - last_full >= Config.CONTACT_INDEX_SNAPSHOT_INTERVAL
+                    result = refresh_contact_index(full=full)
+                    if full and not result.get('error'):
+                        last_full = time.monotonic()
+            except Exception as e:
+                logger.error(f"[CONTACT INDEX] Refresh error: {e}")
+            _stop_event.wait(Config.CONTACT_INDEX_REFRESH_INTERVAL)
+
+    _stop_event.clear()
+    _refresh_thread = threading.Thread(target=_loop, name='contact-index-refresh', daemon=True)
+    _refresh_thread.start()
+    logger.info("[CONTACT INDEX] Background refresh started")
+    return True
@@ -1,21 +1,154 @@
 import logging
+from datetime import timezone
+from functools import wraps
+
+from flask import g, has_request_context, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import DateTime, Delete, Insert, Update, event
+from sqlalchemy.types import TypeDecorator
 
 logger = logging.getLogger(__name__)
 
-db = SQLAlchemy()
+REPLICA_BIND = 'replica'
+# Read-your-writes: a response that committed a write carries a signed token
+# (user id + time); the client echoes it and its reads stay on the primary
+# for DB_READ_YOUR_WRITES_WINDOW seconds, whichever instance they reach
+WRITE_TOKEN_HEADER = 'X-DB-Write-Token'
+
+
+class RoutingSession(Session):
+    """
+    Sends reads of @read_only requests to the replica engine (if configured).
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not isinstance(clause, (Insert, Update, Delete))
+                and _use_replica()):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    DateTime(timezone=True) that always loads timezone-aware values.
+
+    PostgreSQL already returns aware datetimes; SQLite drops the offset, which
+    made naive-minus-aware arithmetic fail on the development database. Values
+    without an offset are stored as UTC.
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+
+def _write_token_serializer() -> URLSafeTimedSerializer:
+    from core.config import Config
+
+    return URLSafeTimedSerializer(Config.JWT_SECRET, salt='db-write')
+
+
+def _use_replica() -> bool:
+    if not has_request_context() or not g.get('db_read_only'):
+        return False
+    route = g.get('db_route')
+    if route is None:
+        route = g.db_route = _choose_route()
+    return route == REPLICA_BIND
+
 
+def _choose_route() -> str:
+    from core.config import Config
 
-def init_db(app):
-    """Initialize database with Flask app"""
+    if REPLICA_BIND not in db.engines:
+        return 'primary'
+    user_id = g.get('current_user_id')
+    token = request.headers.get(WRITE_TOKEN_HEADER)
+    if user_id is not None and token:
+        try:
+            wrote_user_id = _write_token_serializer().loads(token, max_age=Config.DB_READ_YOUR_WRITES_WINDOW)
+        except BadSignature:  # Includes expired tokens
+            wrote_user_id = None
+        if wrote_user_id == user_id:
+            return 'primary'  # Read-your-writes: replica may not have the user's last change yet
+    return REPLICA_BIND
+
+
+def add_write_token(response):
+    """after_request: hand the client a write token if this request committed a write for its user"""
+    user_id = g.get('current_user_id')
+    if g.get('db_wrote') and user_id is not None:
+        response.headers[WRITE_TOKEN_HEADER] = _write_token_serializer().dumps(user_id)
+    return response
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_session_wrote(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _record_request_write(session):
+    if not session.info.pop('wrote', False) or not has_request_context():
+        return
+    g.db_wrote = True
+    g.db_route = 'primary'
+
+
+def read_only(f):
+    """
+    Decorator for endpoints that only read: their queries may use the read
+    replica (DATABASE_READ_URL). Place it below @jwt_required so the current
+    user is known for read-your-writes.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+def create_tables(app):
+    """db.create_all() for the primary database (new tables only; ALTERs live in migrations/)"""
+    with app.app_context():
+        db.create_all()
+        logger.info("[DATABASE] Initialized successfully")
+
+
+def init_db(app, create_tables_on_startup=True):
+    """
+    Initialize database with Flask app.
+
+    With create_tables_on_startup=False the schema is created outside the
+    import path (`flask --app app init-db` or the gunicorn master hook).
+    """
     db.init_app(app)
+    app.after_request(add_write_token)
 
     try:
+        if create_tables_on_startup:
+            create_tables(app)
         with app.app_context():
-            db.create_all()
-            logger.info("Database initialized successfully")
-            print("[DATABASE] Initialized successfully")
+            if REPLICA_BIND in db.engines:
+                logger.info("[DATABASE] Read replica configured for @read_only routes")
     except Exception as e:
-        logger.error(f"Database initialization error: {e}")
-        print(f"[DATABASE ERROR] {e}")
+        logger.error(f"[DATABASE ERROR] Database initialization error: {e}")
         # Don't crash - app can still serve health checks
+
+
+def dispose_engines(app):
+    """Drop pooled connections inherited from a preloading parent process (call after fork)"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
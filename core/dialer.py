@@ -0,0 +1,750 @@
+"""
+Campaign dialer.
+
+Places outbound calls for the leads of running campaigns through
+`client.calls.create` (same call parameters as /make_call):
+
+- Pacing: token bucket at min(campaign.calls_per_second, DIALER_ACCOUNT_CPS)
+- Concurrency: calls in flight never exceed available agents x
+  DIALER_LINES_PER_AGENT; REST requests run on a bounded executor so a slow
+  Twilio response does not stall the pacing
+- Attempt caps: campaign.max_attempts per lead, and
+  campaign.max_attempts_per_day against contact_number_today (lead's local
+  day); leads are only dialed inside the local calling window
+- Progress is persisted on campaign_leads; leads are claimed with a
+  conditional UPDATE and campaigns with a lease. Only the worker holding the
+  dialer-wide lease (`dialer_leases`) schedules, so the account CPS and the
+  line capacity are not multiplied by the number of gunicorn workers
+- Outcomes come from /call_status (record_call_outcome), with a
+  reconciliation pass for missed callbacks
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.exc import IntegrityError
+from twilio.base.exceptions import TwilioRestException
+
+from core.config import Config
+from core.database import db
+from core.phone_utils import (
+    get_caller_id_for_number, get_local_date, get_local_datetime, get_state_from_phone, normalize_phone
+)
+from models.call import Call
+from models.campaign import Campaign, CampaignLead, DialerLease
+
+logger = logging.getLogger(__name__)
+
+CLAIM_TIMEOUT_SECONDS = 120  # 'dialing' rows older than this were left by a dead worker
+CALL_TIMEOUT_SECONDS = 1800  # 'in_progress' without an outcome after this counts as no-answer
+RATE_LIMIT_PAUSE_SECONDS = 1.0
+BACKOFF_BASE_SECONDS = 30
+SCHEDULER_LEASE = 'scheduler'
+ACTIVE_STATUSES = ('dialing', 'in_progress')
+# Twilio errors that will never succeed for this number
+PERMANENT_ERROR_CODES = {21211, 21214, 21215, 21216, 21217, 21401, 21610, 13224, 13223}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """SQLite returns naive datetimes - treat them as UTC"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def build_outbound_call_params(to_number: str, caller_id: str) -> dict:
+    """Parameters for client.calls.create (shared by /make_call and the dialer)"""
+    params = {
+        'url': f"{Config.BASE_URL}/outbound_connect",
+        'to': to_number,
+        'from_': caller_id,
+        'record': True,
+        'recording_channels': 'dual',
+        'recording_status_callback': f"{Config.BASE_URL}/recording_status",
+        'recording_status_callback_event': ['completed'],
+        'status_callback': f"{Config.BASE_URL}/call_status",
+        'status_callback_event': ['initiated', 'ringing', 'in-progress', 'completed', 'busy', 'no-answer', 'canceled', 'failed']
+    }
+
+    if Config.AMD_ENABLED:
+        params['machine_detection'] = 'DetectMessageEnd'
+        params['machine_detection_timeout'] = 30
+        params['async_amd'] = True
+        params['async_amd_status_callback'] = f"{Config.BASE_URL}/amd_status"
+        params['async_amd_status_callback_method'] = 'POST'
+
+    return params
+
+
+# ============== LOCAL TWILIO STAND-IN ==============
+
+class _LocalCall:
+    def __init__(self, sid: str, params: dict):
+        self.sid = sid
+        self.status = 'queued'
+        self.to = params.get('to')
+        self.from_ = params.get('from_')
+
+
+class _LocalRecordings:
+    def __init__(self, owner: 'LocalTwilioClient', call_sid: str):
+        self._owner = owner
+        self._call_sid = call_sid
+
+    def create(self, **params) -> dict:
+        self._owner._simulate_latency()
+        return {'call_sid': self._call_sid, 'status': 'in-progress'}
+
+
+class _LocalCallContext:
+    def __init__(self, owner: 'LocalTwilioClient', sid: str):
+        self._owner = owner
+        self.sid = sid
+        self.recordings = _LocalRecordings(owner, sid)
+
+    def fetch(self) -> _LocalCall:
+        self._owner._simulate_latency()
+        call = _LocalCall(self.sid, {})
+        call.status = 'in-progress'
+        return call
+
+    def update(self, **params) -> _LocalCall:
+        self._owner._simulate_latency()
+        with self._owner._lock:
+            self._owner.updated.append((self.sid, params))
+        return _LocalCall(self.sid, params)
+
+
+class _LocalCalls:
+    def __init__(self, owner: 'LocalTwilioClient'):
+        self._owner = owner
+
+    def create(self, **params) -> _LocalCall:
+        return self._owner._create_call(params)
+
+    def __call__(self, sid: str) -> _LocalCallContext:
+        return _LocalCallContext(self._owner, sid)
+
+
+class LocalTwilioClient:
+    """
+    Local stand-in for twilio.rest.Client (tests / benchmarks).
+
+    Supports client.calls.create(**params) with a simulated request latency,
+    the account CPS limit (token bucket holding one second of calls; HTTP 429 /
+    error 20429 when empty) and invalid numbers (error 21211 for destinations
+    ending in '0000'). client.calls(sid).fetch() / .update() /
+    .recordings.create() only add the latency.
+    """
+
+    def __init__(self, latency: float = 0.15, cps_limit: Optional[float] = 1.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.latency = latency
+        self.cps_limit = cps_limit
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(cps_limit or 0)
+        self._refilled_at = clock()
+        self._counter = 0
+        self.created: list = []
+        self.updated: list = []
+        self.rejected = 0
+        self.calls = _LocalCalls(self)
+
+    def _create_call(self, params: dict) -> _LocalCall:
+        with self._lock:
+            if self.cps_limit:
+                now = self._clock()
+                capacity = max(1.0, float(self.cps_limit))
+                self._tokens = min(capacity, self._tokens + (now - self._refilled_at) * self.cps_limit)
+                self._refilled_at = now
+                if self._tokens < 1:
+                    self.rejected += 1
+                    raise TwilioRestException(429, '/Calls.json', 'Too Many Requests', code=20429, method='POST')
+                self._tokens -= 1
+            self._counter += 1
+            sid = f"CA{self._counter:032x}"
+
+        self._simulate_latency()
+
+        if str(params.get('to', '')).endswith('0000'):
+            raise TwilioRestException(400, '/Calls.json', "The 'To' number is not a valid phone number.",
+                                      code=21211, method='POST')
+
+        call = _LocalCall(sid, params)
+        with self._lock:
+            self.created.append(params)
+        return call
+
+    def _simulate_latency(self) -> None:
+        if self.latency:
+            self._sleep(self.latency)
+
+
+# ============== PACING / METRICS / AGENTS ==============
+
+class _Pacer:
+    """Spaces out dispatches at `rate` per second (no bursts)"""
+
+    def __init__(self, rate: float, clock: Callable[[], float], sleep: Callable[[float], None]):
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next_at = 0.0
+
+    def acquire(self) -> float:
+        """Wait for the next slot. Returns the slot's scheduled time."""
+        now = self._clock()
+        slot = max(now, self._next_at)
+        if slot > now:
+            self._sleep(slot - now)
+        self._next_at = slot + (1.0 / self.rate if self.rate > 0 else 0.0)
+        return slot
+
+    def pause(self, seconds: float) -> None:
+        self._next_at = max(self._next_at, self._clock() + seconds)
+
+
+class DialerMetrics:
+    """Dispatch counters, throughput and latency percentiles"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, samples: int = 2000):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.started_at = clock()
+        self.counters = {
+            'dispatched': 0, 'created': 0, 'failed': 0, 'rate_limited': 0, 'retried': 0,
+            'deferred_daily_cap': 0, 'deferred_call_window': 0, 'exhausted': 0,
+        }
+        self._create_latency = deque(maxlen=samples)
+        self._dispatch_lag = deque(maxlen=samples)
+        self._created_at = deque()
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_created(self, create_latency: float, dispatch_lag: float) -> None:
+        with self._lock:
+            now = self._clock()
+            self.counters['created'] += 1
+            self._create_latency.append(create_latency)
+            self._dispatch_lag.append(dispatch_lag)
+            self._created_at.append(now)
+            while self._created_at and self._created_at[0] <= now - 60:
+                self._created_at.popleft()
+
+    @staticmethod
+    def _percentiles(samples) -> dict:
+        if not samples:
+            return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)  # noqa: E731
+        return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': round(ordered[-1] * 1000, 1)}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            while self._created_at and self._created_at[0] <= now - 60:
+                self._created_at.popleft()
+            elapsed = max(now - self.started_at, 1e-9)
+            return {
+                'counters': dict(self.counters),
+                'calls_per_second_last_minute': round(len(self._created_at) / min(60.0, elapsed), 3),
+                'calls_per_second_overall': round(self.counters['created'] / elapsed, 3),
+                'create_latency_ms': self._percentiles(self._create_latency),
+                'dispatch_lag_ms': self._percentiles(self._dispatch_lag),
+            }
+
+
+class AgentAvailability:
+    """
+    Number of agents that can take a dialed call, cached for a few seconds.
+
+    Uses TaskRouter available workers when TWILIO_WORKSPACE_SID is set,
+    otherwise the number of active users.
+    """
+
+    def __init__(self, twilio_client=None, ttl: float = 5.0, clock: Callable[[], float] = time.monotonic):
+        self.twilio_client = twilio_client
+        self.ttl = ttl
+        self._clock = clock
+        self._value = 0
+        self._expires_at = 0.0
+
+    def _count(self) -> int:
+        if self.twilio_client is not None and Config.TWILIO_WORKSPACE_SID:
+            workers = self.twilio_client.taskrouter.v1.workspaces(Config.TWILIO_WORKSPACE_SID).workers.list(
+                available='true'
+            )
+            return len(workers)
+        from models.user import User
+        return User.query.filter_by(is_active=True).count()
+
+    def __call__(self) -> int:
+        now = self._clock()
+        if now >= self._expires_at:
+            try:
+                self._value = self._count()
+            except Exception as e:
+                logger.error(f"[DIALER] Agent availability check failed: {e}")
+                self._value = 0
+            self._expires_at = now + self.ttl
+        return self._value
+
+
+# ============== OUTCOMES ==============
+
+def _seconds_until_window(lead_state: Optional[str], now: datetime) -> float:
+    """0 if the lead's local time is inside the calling window, else seconds until it opens"""
+    local = get_local_datetime(now, lead_state)
+    start, end = Config.DIALER_CALL_WINDOW_START, Config.DIALER_CALL_WINDOW_END
+    if start <= local.hour < end:
+        return 0.0
+    opens = local.replace(hour=start, minute=0, second=0, microsecond=0)
+    if local.hour >= end:
+        opens += timedelta(days=1)
+    return (opens - local).total_seconds()
+
+
+def _finish_attempt(lead: CampaignLead, campaign: Campaign, disposition: Optional[str], now: datetime) -> None:
+    """Move an in-progress lead to its next state after a call ended"""
+    lead.last_disposition = disposition
+    if disposition == 'answered':
+        lead.status = 'completed'
+    elif (lead.attempts or 0) >= (campaign.max_attempts or 1):
+        lead.status = 'exhausted'
+    else:
+        lead.status = 'pending'
+        lead.next_attempt_at = now + timedelta(minutes=campaign.retry_delay_minutes or 0)
+
+
+def record_call_outcome(call_sid: str, disposition: Optional[str]) -> bool:
+    """
+    Called from /call_status when a call reaches a terminal status.
+
+    Returns True if the call belonged to a campaign lead.
+    """
+    lead = CampaignLead.query.filter_by(last_call_sid=call_sid, status='in_progress').first()
+    if lead is None:
+        return False
+    _finish_attempt(lead, lead.campaign, disposition, _utcnow())
+    db.session.commit()
+    logger.info(f"[DIALER] Lead {lead.id} ({lead.phone_number}) -> {lead.status} ({disposition})")
+    return True
+
+
+def get_lead_counts(campaign_id: int) -> dict:
+    """Lead count per status for a campaign"""
+    rows = db.session.query(CampaignLead.status, func.count(CampaignLead.id)).filter(
+        CampaignLead.campaign_id == campaign_id
+    ).group_by(CampaignLead.status).all()
+    return {status: count for status, count in rows}
+
+
+# ============== DIALER ==============
+
+class CampaignDialer:
+    """Schedules and places campaign calls"""
+
+    def __init__(self, app, twilio_client, account_cps: float, max_workers: int, lines_per_agent: float,
+                 available_agents: Callable[[], int], track_call: Optional[Callable] = None,
+                 lease_seconds: int = 60, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            twilio_client: twilio.rest.Client or LocalTwilioClient
+            account_cps: account-wide calls-per-second limit
+            max_workers: concurrent calls.create requests
+            lines_per_agent: calls in flight allowed per available agent
+            available_agents: callable returning the number of available agents
+            track_call: called with each new Call row before commit
+                (ex: contact tracking)
+        """
+        self.app = app
+        self.twilio_client = twilio_client
+        self.account_cps = account_cps
+        self.lines_per_agent = lines_per_agent
+        self.available_agents = available_agents
+        self.track_call = track_call
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.metrics = DialerMetrics(clock=clock)
+        self._clock = clock
+        self._pacer = _Pacer(account_cps, clock, sleep)
+        self._renew_at: Optional[float] = None  # clock time after which the scheduler lease is renewed
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dialer')
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    # ---------- leases / claims ----------
+
+    def _acquire_scheduler(self) -> bool:
+        """Take or renew the dialer-wide lease (only one worker schedules at a time)"""
+        if self._renew_at is not None and self._clock() < self._renew_at:
+            return True  # Held for at least another half lease
+        if db.session.get(DialerLease, SCHEDULER_LEASE) is None:
+            db.session.add(DialerLease(name=SCHEDULER_LEASE))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # Created concurrently
+
+        now = _utcnow()
+        result = db.session.execute(
+            update(DialerLease)
+            .where(DialerLease.name == SCHEDULER_LEASE)
+            .where(or_(
+                DialerLease.lease_owner.is_(None),
+                DialerLease.lease_owner == self.owner,
+                DialerLease.lease_expires_at < now
+            ))
+            .values(lease_owner=self.owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            self._renew_at = None
+            return False
+        self._renew_at = self._clock() + self.lease_seconds / 2
+        return True
+
+    def release_scheduler(self) -> None:
+        """Hand the dialer-wide lease over (the next worker's tick takes it)"""
+        self._renew_at = None
+        db.session.execute(
+            update(DialerLease)
+            .where(DialerLease.name == SCHEDULER_LEASE)
+            .where(DialerLease.lease_owner == self.owner)
+            .values(lease_owner=None, lease_expires_at=None)
+        )
+        db.session.commit()
+
+    @property
+    def is_scheduler(self) -> bool:
+        """Whether this worker held the dialer-wide lease at its last tick"""
+        return self._renew_at is not None
+
+    def _acquire_campaign(self, campaign_id: int) -> bool:
+        now = _utcnow()
+        result = db.session.execute(
+            update(Campaign)
+            .where(Campaign.id == campaign_id)
+            .where(Campaign.status == 'running')
+            .where(or_(
+                Campaign.lease_owner.is_(None),
+                Campaign.lease_owner == self.owner,
+                Campaign.lease_expires_at < now
+            ))
+            .values(lease_owner=self.owner, lease_expires_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _claim(self, lead_id: int) -> bool:
+        result = db.session.execute(
+            update(CampaignLead)
+            .where(CampaignLead.id == lead_id)
+            .where(CampaignLead.status == 'pending')
+            # last_call_sid is cleared so reconcile() can tell an attempt that never got a SID
+            .values(status='dialing', claimed_at=_utcnow(), attempts=CampaignLead.attempts + 1, last_call_sid=None)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def in_flight(self) -> int:
+        return CampaignLead.query.filter(CampaignLead.status.in_(ACTIVE_STATUSES)).count()
+
+    # ---------- scheduling ----------
+
+    def run_once(self) -> dict:
+        """One scheduling pass over running campaigns (needs an app context)"""
+        if not self._acquire_scheduler():
+            return {'scheduler': False, 'dispatched': 0}
+        self.reconcile()
+
+        agents = self.available_agents()
+        capacity = int(agents * self.lines_per_agent) - self.in_flight()
+        result = {'scheduler': True, 'agents': agents, 'capacity': max(capacity, 0), 'dispatched': 0}
+        if capacity <= 0:
+            return result
+
+        campaigns = Campaign.query.filter_by(status='running').order_by(Campaign.id.asc()).all()
+        for campaign in campaigns:
+            if capacity <= 0:
+                break
+            if not self._acquire_campaign(campaign.id):
+                continue
+            dispatched = self._dispatch_campaign(campaign, capacity)
+            capacity -= dispatched
+            result['dispatched'] += dispatched
+        return result
+
+    def _dispatch_campaign(self, campaign: Campaign, capacity: int) -> int:
+        now = _utcnow()
+        due = CampaignLead.query.filter(
+            CampaignLead.campaign_id == campaign.id,
+            CampaignLead.status == 'pending',
+            CampaignLead.next_attempt_at <= now
+        ).order_by(CampaignLead.next_attempt_at.asc(), CampaignLead.id.asc()).limit(capacity).all()
+
+        if not due:
+            remaining = CampaignLead.query.filter(
+                CampaignLead.campaign_id == campaign.id,
+                CampaignLead.status.in_(('pending',) + ACTIVE_STATUSES)
+            ).count()
+            if remaining == 0:
+                campaign.status = 'completed'
+                campaign.completed_at = now
+                db.session.commit()
+                logger.info(f"[DIALER] Campaign {campaign.id} completed")
+            return 0
+
+        # Campaign pacing cannot exceed the account CPS
+        rate = min(campaign.calls_per_second or self.account_cps, self.account_cps)
+        self._pacer.rate = rate
+
+        dispatched = 0
+        for lead in due:
+            # Pacing can outlast the lease: stop if another worker took over
+            if not self._acquire_scheduler():
+                break
+            if self._defer_if_not_callable(lead, campaign, now):
+                continue
+            if not self._claim(lead.id):
+                continue  # Another worker took it
+
+            self._slots.acquire()  # Backpressure: wait for a free request slot
+            slot = self._pacer.acquire()
+            self.metrics.incr('dispatched')
+            self._executor.submit(self._place_call, lead.id, lead.phone_number, lead.lead_state, slot)
+            dispatched += 1
+        return dispatched
+
+    def _defer_if_not_callable(self, lead: CampaignLead, campaign: Campaign, now: datetime) -> bool:
+        """Reschedule leads outside the calling window or over the daily cap"""
+        wait = _seconds_until_window(lead.lead_state, now)
+        if wait > 0:
+            lead.next_attempt_at = now + timedelta(seconds=wait)
+            db.session.commit()
+            self.metrics.incr('deferred_call_window')
+            return True
+
+        if campaign.max_attempts_per_day and self._attempts_today(lead, now) >= campaign.max_attempts_per_day:
+            # Try again when the next local calling window opens
+            local = get_local_datetime(now, lead.lead_state)
+            opens = (local + timedelta(days=1)).replace(
+                hour=Config.DIALER_CALL_WINDOW_START, minute=0, second=0, microsecond=0
+            )
+            lead.next_attempt_at = now + (opens - local)
+            db.session.commit()
+            self.metrics.incr('deferred_daily_cap')
+            return True
+
+        return False
+
+    @staticmethod
+    def _attempts_today(lead: CampaignLead, now: datetime) -> int:
+        """contact_number_today of the lead's latest call, if it was on the lead's current local day"""
+        key = normalize_phone(lead.phone_number)
+        latest = Call.query.filter(
+            or_(Call.to_number.contains(key), Call.from_number.contains(key))
+        ).order_by(Call.started_at.desc()).first()
+        if latest is None or latest.started_at is None:
+            return 0
+        if get_local_date(latest.started_at, lead.lead_state) != get_local_date(now, lead.lead_state):
+            return 0
+        return latest.contact_number_today or 0
+
+    # ---------- placing calls ----------
+
+    def _place_call(self, lead_id: int, phone_number: str, lead_state: Optional[str], slot: float) -> None:
+        try:
+            with self.app.app_context():
+                self._create_call(lead_id, phone_number, lead_state, slot)
+        except Exception as e:
+            logger.error(f"[DIALER] Lead {lead_id} dispatch error: {e}")
+        finally:
+            self._slots.release()
+
+    def _create_call(self, lead_id: int, phone_number: str, lead_state: Optional[str], slot: float) -> None:
+        caller_id = get_caller_id_for_number(phone_number)
+        started = self._clock()
+        try:
+            twilio_call = self.twilio_client.calls.create(**build_outbound_call_params(phone_number, caller_id))
+        except TwilioRestException as e:
+            self._handle_create_error(lead_id, e)
+            return
+        except Exception as e:
+            self._retry_lead(lead_id, f"{type(e).__name__}: {e}")
+            return
+        self.metrics.record_created(self._clock() - started, started - slot)
+
+        # The call exists at Twilio: save the SID first, so a failure below
+        # cannot put the lead back to pending and dial it again
+        now = _utcnow()
+        db.session.execute(
+            update(CampaignLead)
+            .where(CampaignLead.id == lead_id)
+            .values(status='in_progress', last_call_sid=twilio_call.sid, last_attempt_at=now, last_error=None)
+        )
+        db.session.commit()
+
+        call = Call(
+            call_sid=twilio_call.sid,
+            from_number=caller_id,
+            to_number=phone_number,
+            lead_state=lead_state or get_state_from_phone(phone_number),
+            direction='outbound',
+            started_at=now
+        )
+        try:
+            db.session.add(call)
+            if self.track_call is not None:
+                self.track_call(call)
+            db.session.commit()
+        except Exception as e:
+            # The projection creates the row from /call_status if it is still missing
+            db.session.rollback()
+            logger.warning(f"[DIALER] Lead {lead_id}: call {twilio_call.sid} placed but its row was not saved: {e}")
+
+    def _handle_create_error(self, lead_id: int, error: TwilioRestException) -> None:
+        if error.status == 429 or error.code == 20429:
+            # Over the account CPS: slow down and put the lead back without using an attempt
+            self.metrics.incr('rate_limited')
+            self._pacer.pause(RATE_LIMIT_PAUSE_SECONDS)
+            lead = db.session.get(CampaignLead, lead_id)
+            lead.status = 'pending'
+            lead.attempts = max((lead.attempts or 1) - 1, 0)
+            lead.last_error = f"429 rate limited ({error.code})"
+            db.session.commit()
+        elif error.code in PERMANENT_ERROR_CODES or (error.status and 400 <= error.status < 500):
+            self.metrics.incr('failed')
+            lead = db.session.get(CampaignLead, lead_id)
+            lead.status = 'failed'
+            lead.last_error = f"{error.code}: {error.msg}"[:500]
+            db.session.commit()
+            logger.warning(f"[DIALER] Lead {lead_id} failed: {error.code} {error.msg}")
+        else:
+            self._retry_lead(lead_id, f"{error.status} {error.code}: {error.msg}")
+
+    def _retry_lead(self, lead_id: int, error: str) -> None:
+        lead = db.session.get(CampaignLead, lead_id)
+        campaign = lead.campaign
+        if (lead.attempts or 0) >= (campaign.max_attempts or 1):
+            lead.status = 'failed'
+            self.metrics.incr('failed')
+        else:
+            lead.status = 'pending'
+            lead.next_attempt_at = _utcnow() + timedelta(seconds=BACKOFF_BASE_SECONDS * (2 ** ((lead.attempts or 1) - 1)))
+            self.metrics.incr('retried')
+        lead.last_error = error[:500]
+        db.session.commit()
+        logger.warning(f"[DIALER] Lead {lead_id} create failed: {error}")
+
+    # ---------- reconciliation ----------
+
+    def reconcile(self) -> int:
+        """
+        Fix leads whose outcome callback was missed:
+        - 'dialing' left by a dead worker -> pending
+        - 'in_progress' whose Call already has a final disposition -> apply it
+        - 'in_progress' with no outcome after CALL_TIMEOUT_SECONDS -> no-answer
+        """
+        now = _utcnow()
+        fixed = db.session.execute(
+            update(CampaignLead)
+            .where(CampaignLead.status == 'dialing')
+            .where(CampaignLead.claimed_at < now - timedelta(seconds=CLAIM_TIMEOUT_SECONDS))
+            .where(CampaignLead.last_call_sid.is_(None))
+            .values(status='pending', attempts=CampaignLead.attempts - 1,
+                    last_error='reclaimed: worker did not finish dialing')
+        ).rowcount
+        db.session.commit()
+
+        stale = CampaignLead.query.filter(
+            CampaignLead.status == 'in_progress',
+            CampaignLead.last_attempt_at < now - timedelta(seconds=60)
+        ).all()
+        for lead in stale:
+            call = Call.query.filter_by(call_sid=lead.last_call_sid).first()
+            if call is not None and call.ended_at is not None:
+                _finish_attempt(lead, lead.campaign, call.disposition, now)
+                fixed += 1
+            elif _as_utc(lead.last_attempt_at) < now - timedelta(seconds=CALL_TIMEOUT_SECONDS):
+                _finish_attempt(lead, lead.campaign, 'no-answer', now)
+                fixed += 1
+        if stale:
+            db.session.commit()
+        return fixed
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+# ============== BACKGROUND WORKER ==============
+
+_dialer: Optional[CampaignDialer] = None
+_dialer_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+
+def get_dialer() -> Optional[CampaignDialer]:
+    """Get the dialer singleton (None until start_dialer)"""
+    return _dialer
+
+
+def start_dialer(app, twilio_client, track_call: Optional[Callable] = None) -> bool:
+    """Start the scheduler thread for this worker (no-op if DIALER_ENABLED is false)"""
+    global _dialer, _dialer_thread
+    if not Config.DIALER_ENABLED or twilio_client is None:
+        return False
+    if _dialer_thread is not None and _dialer_thread.is_alive():
+        return False
+
+    _dialer = CampaignDialer(
+        app,
+        twilio_client,
+        account_cps=Config.DIALER_ACCOUNT_CPS,
+        max_workers=Config.DIALER_MAX_CONCURRENT_REQUESTS,
+        lines_per_agent=Config.DIALER_LINES_PER_AGENT,
+        available_agents=AgentAvailability(twilio_client),
+        track_call=track_call
+    )
+    dialer = _dialer
+
+    def _loop():
+        while not _stop_event.is_set():
+            try:
+                with app.app_context():
+                    dialer.run_once()
+            except Exception as e:
+                logger.error(f"[DIALER] Scheduler error: {e}")
+            _stop_event.wait(Config.DIALER_TICK_INTERVAL)
+        try:
+            with app.app_context():
+                dialer.release_scheduler()
+        except Exception as e:
+            logger.warning(f"[DIALER] Could not release the scheduler lease: {e}")
+
+    _stop_event.clear()
+    _dialer_thread = threading.Thread(target=_loop, name='campaign-dialer', daemon=True)
+    _dialer_thread.start()
+    logger.info(f"[DIALER] Scheduler started ({Config.DIALER_ACCOUNT_CPS} CPS account limit)")
+    return True
+
+
+def stop_dialer() -> None:
+    """Stop the scheduler thread"""
+    _stop_event.set()
@@ -0,0 +1,201 @@
+"""
+Lead cache for Attio lookups.
+
+Keeps recently resolved leads in memory, keyed by normalized phone number, so
+repeated lookups from the dashboard (dial, redial, history click, incoming
+call) don't each cost a round trip to Attio.
+
+- Positive entries live for ATTIO_LEAD_CACHE_TTL seconds
+- Misses are cached for ATTIO_LEAD_CACHE_NEGATIVE_TTL seconds
+- Size is bounded (LRU eviction)
+- Concurrent lookups for the same phone share a single Attio request
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Cached lookup result (lead dict or None for a miss)."""
+    __slots__ = ('value', 'expires_at')
+
+    def __init__(self, value: Optional[dict], expires_at: float):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class _Flight:
+    """In-progress load shared by concurrent callers of the same key."""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LeadCache:
+    """Thread-safe TTL + LRU cache with negative caching and single-flight loads."""
+
+    def __init__(self, ttl: float, negative_ttl: float, max_size: int,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max(1, max_size)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._flights: dict = {}
+        self._record_keys: dict = {}  # Attio record_id -> set of keys
+        self._generation = 0
+        self._stats = {
+            'hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'load_errors': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def get_or_load(self, key: str, loader: Callable[[], Optional[dict]]) -> Optional[dict]:
+        """
+        Return the cached lead for key, calling loader() on a miss.
+
+        Only one loader runs per key at a time; other callers wait for its
+        result. Loader exceptions are propagated and never cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    if entry.value is None:
+                        self._stats['negative_hits'] += 1
+                    else:
+                        self._stats['hits'] += 1
+                    return entry.value
+                self._remove(key)
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._stats['misses'] += 1
+                generation = self._generation
+                leader = True
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats['load_errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                # Skip storing if an invalidation happened while loading
+                if flight.error is None and generation == self._generation:
+                    self._store(key, flight.value)
+            flight.event.set()
+
+        return flight.value
+
+    def invalidate(self, key: str) -> None:
+        """Drop the cached entry for a phone key."""
+        with self._lock:
+            self._generation += 1
+            if key in self._entries:
+                self._remove(key)
+                self._stats['invalidations'] += 1
+
+    def invalidate_record(self, record_id: str) -> None:
+        """Drop every cached entry pointing at an Attio record."""
+        if not record_id:
+            return
+        with self._lock:
+            self._generation += 1
+            for key in list(self._record_keys.get(record_id, ())):
+                self._remove(key)
+                self._stats['invalidations'] += 1
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._record_keys.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['max_size'] = self.max_size
+        lookups = stats['hits'] + stats['negative_hits'] + stats['misses'] + stats['coalesced']
+        served = stats['hits'] + stats['negative_hits'] + stats['coalesced']
+        stats['hit_ratio'] = round(served / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _store(self, key: str, value: Optional[dict]) -> None:
+        """Insert entry and evict least recently used ones. Caller holds the lock."""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, self._clock() + ttl)
+        record_id = (value or {}).get('id')
+        if record_id:
+            self._record_keys.setdefault(record_id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove(self, key: str) -> None:
+        """Remove entry and its record index. Caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        record_id = (entry.value or {}).get('id') if entry else None
+        if record_id:
+            keys = self._record_keys.get(record_id)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._record_keys[record_id]
+
+
+# Singleton instance
+_lead_cache: Optional[LeadCache] = None
+
+
+def get_lead_cache() -> Optional[LeadCache]:
+    """Get or create the lead cache singleton (None if disabled via TTL <= 0)"""
+    global _lead_cache
+    if _lead_cache is None and Config.ATTIO_LEAD_CACHE_TTL > 0:
+        _lead_cache = LeadCache(
+            ttl=Config.ATTIO_LEAD_CACHE_TTL,
+            negative_ttl=Config.ATTIO_LEAD_CACHE_NEGATIVE_TTL,
+            max_size=Config.ATTIO_LEAD_CACHE_MAX_SIZE
+        )
+        logger.info(f"[LEAD CACHE] Initialized (ttl={Config.ATTIO_LEAD_CACHE_TTL}s, "
+                    f"negative_ttl={Config.ATTIO_LEAD_CACHE_NEGATIVE_TTL}s, "
+                    f"max_size={Config.ATTIO_LEAD_CACHE_MAX_SIZE})")
+    return _lead_cache
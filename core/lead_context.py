@@ -0,0 +1,258 @@
+"""
+Lead context pre-warming for inbound calls.
+
+When /voice receives an inbound call, a background task resolves the Attio
+lead and the local contact history while the call is still ringing. The
+result is kept in a shared cache keyed by CallSid and by phone, so:
+
+- the agent's lead card is ready the moment they answer
+- the Slack "Incoming Call" alert carries the lead name
+- the TwiML response is not delayed by Attio or Slack
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from core.config import Config
+from core.phone_utils import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+HISTORY_LIMIT = 5
+
+
+class _ContextEntry:
+    __slots__ = ('call_sid', 'phone', 'phone_key', 'context', 'ready', 'expires_at')
+
+    def __init__(self, call_sid: str, phone: str, expires_at: float):
+        self.call_sid = call_sid
+        self.phone = phone
+        self.phone_key = normalize_phone(phone)
+        self.context: Optional[dict] = None
+        self.ready = threading.Event()
+        self.expires_at = expires_at
+
+
+class LeadContextCache:
+    """Resolved lead contexts by CallSid and normalized phone (TTL, bounded)"""
+
+    def __init__(self, ttl: float, max_size: int = 1000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._by_call: 'OrderedDict[str, _ContextEntry]' = OrderedDict()
+        self._by_phone: dict = {}
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._by_call:
+            call_sid, entry = next(iter(self._by_call.items()))
+            if entry.expires_at > now and len(self._by_call) <= self.max_size:
+                break
+            del self._by_call[call_sid]
+            if self._by_phone.get(entry.phone_key) is entry:
+                del self._by_phone[entry.phone_key]
+
+    def reserve(self, call_sid: str, phone: str) -> Optional[_ContextEntry]:
+        """New pending entry for this call (None if the call is already cached)"""
+        now = self._clock()
+        with self._lock:
+            self._evict(now)
+            if call_sid in self._by_call:
+                return None
+            entry = _ContextEntry(call_sid, phone, now + self.ttl)
+            self._by_call[call_sid] = entry
+            if entry.phone_key:
+                self._by_phone[entry.phone_key] = entry
+            return entry
+
+    def _lookup(self, call_sid: Optional[str], phone: Optional[str]) -> Optional[_ContextEntry]:
+        now = self._clock()
+        with self._lock:
+            entry = self._by_call.get(call_sid) if call_sid else None
+            if entry is None and phone:
+                entry = self._by_phone.get(normalize_phone(phone))
+            if entry is None or entry.expires_at <= now:
+                return None
+            return entry
+
+    def get(self, call_sid: Optional[str] = None, phone: Optional[str] = None,
+            wait: float = 0) -> Optional[dict]:
+        """
+        Cached context for a call (or phone).
+
+        If the lookup is still running, waits up to `wait` seconds for it.
+        Returns None when nothing is cached or the lookup did not finish.
+        """
+        entry = self._lookup(call_sid, phone)
+        if entry is None:
+            return None
+        if not entry.ready.is_set() and wait > 0:
+            entry.ready.wait(wait)
+        return entry.context
+
+    def is_pending(self, call_sid: Optional[str] = None, phone: Optional[str] = None) -> bool:
+        entry = self._lookup(call_sid, phone)
+        return entry is not None and not entry.ready.is_set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(1 for e in self._by_call.values() if not e.ready.is_set())
+            return {'calls': len(self._by_call), 'phones': len(self._by_phone), 'pending': pending}
+
+
+def resolve_lead(phone: str) -> tuple:
+    """(lead dict or None, source) - mirror when fresh, else Attio (through the lead cache)"""
+    from core import attio_mirror
+    from core.attio import get_attio_client
+
+    if attio_mirror.is_mirror_fresh():
+        person = attio_mirror.find_person_by_phone(phone)
+        if person is not None or attio_mirror.has_full_sync():
+            return (person.to_lead_dict() if person else None), 'mirror'
+
+    attio = get_attio_client()
+    if attio is None:
+        return None, None
+    lead = attio.find_lead_by_phone(phone)
+    if lead:
+        lead = {k: v for k, v in lead.items() if k != 'raw'}
+    return lead, 'attio'
+
+
+def load_contact_history(phone: str, exclude_call_sid: Optional[str] = None, limit: int = HISTORY_LIMIT) -> dict:
+    """Previous calls with this phone (most recent first) plus totals"""
+    from sqlalchemy import or_
+    from models.call import Call
+
+    key = normalize_phone(phone)
+    if not key:
+        return {'total_calls': 0, 'answered_calls': 0, 'recent_calls': []}
+
+    query = Call.query.filter(or_(Call.from_number.contains(key), Call.to_number.contains(key)))
+    if exclude_call_sid:
+        query = query.filter(Call.call_sid != exclude_call_sid)
+
+    total = query.count()
+    answered = query.filter(Call.disposition == 'answered').count()
+    recent = query.order_by(Call.started_at.desc()).limit(limit).all()
+    return {
+        'total_calls': total,
+        'answered_calls': answered,
+        'recent_calls': [
+            {
+                'call_sid': c.call_sid,
+                'direction': c.direction,
+                'disposition': c.disposition,
+                'duration': c.duration,
+                'worker_name': c.worker_name,
+                'resumo': c.resumo,
+                'started_at': c.started_at.isoformat() if c.started_at else None,
+            }
+            for c in recent
+        ],
+    }
+
+
+def build_lead_context(call_sid: str, phone: str) -> dict:
+    """Lead + contact history for one call (needs an app context)"""
+    started = time.perf_counter()
+    context = {'call_sid': call_sid, 'phone': phone, 'lead': None, 'source': None, 'errors': []}
+
+    try:
+        context['lead'], context['source'] = resolve_lead(phone)
+    except Exception as e:
+        context['errors'].append(f"lead: {e}")
+
+    try:
+        context['history'] = load_contact_history(phone, exclude_call_sid=call_sid)
+    except Exception as e:
+        context['errors'].append(f"history: {e}")
+        context['history'] = None
+
+    context['found'] = context['lead'] is not None
+    context['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return context
+
+
+class LeadContextPrewarmer:
+    """Runs build_lead_context on a small thread pool and stores the result"""
+
+    def __init__(self, app, cache: LeadContextCache, max_workers: int = 4):
+        self.app = app
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='lead-prewarm')
+
+    def prewarm(self, call_sid: str, phone: str,
+                on_ready: Optional[Callable[[dict], None]] = None) -> bool:
+        """
+        Start resolving the context for a ringing call (returns immediately).
+
+        on_ready runs on the worker thread with the finished context (ex:
+        send the Slack alert with the lead name). Returns False if this call
+        is already being pre-warmed.
+        """
+        entry = self.cache.reserve(call_sid, phone)
+        if entry is None:
+            return False
+        # Copy the context so the worker's log lines keep the call's correlation ID
+        self._executor.submit(contextvars.copy_context().run, self._run, entry, on_ready)
+        return True
+
+    def _run(self, entry: _ContextEntry, on_ready: Optional[Callable[[dict], None]]) -> None:
+        try:
+            with self.app.app_context():
+                entry.context = build_lead_context(entry.call_sid, entry.phone)
+        except Exception as e:
+            logger.error(f"[LEAD PREWARM] {entry.call_sid} failed: {e}")
+            entry.context = {'call_sid': entry.call_sid, 'phone': entry.phone, 'lead': None,
+                             'found': False, 'errors': [str(e)]}
+        finally:
+            entry.ready.set()
+
+        lead = entry.context.get('lead') or {}
+        logger.info(f"[LEAD PREWARM] {entry.call_sid}: {lead.get('name') or 'no lead'} "
+                    f"({entry.context.get('elapsed_ms', '?')}ms)")
+
+        if on_ready is not None:
+            try:
+                with self.app.app_context():
+                    on_ready(entry.context)
+            except Exception as e:
+                logger.error(f"[LEAD PREWARM] on_ready callback failed for {entry.call_sid}: {e}")
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_lead_context_cache: Optional[LeadContextCache] = None
+_prewarmer: Optional[LeadContextPrewarmer] = None
+
+
+def get_lead_context_cache() -> LeadContextCache:
+    """Get the lead context cache singleton"""
+    global _lead_context_cache
+    if _lead_context_cache is None:
+        _lead_context_cache = LeadContextCache(
+            ttl=Config.LEAD_CONTEXT_TTL,
+            max_size=Config.LEAD_CONTEXT_MAX_SIZE
+        )
+    return _lead_context_cache
+
+
+def init_lead_prewarmer(app) -> Optional[LeadContextPrewarmer]:
+    """Create the prewarmer for this worker (None if LEAD_PREWARM_ENABLED is false)"""
+    global _prewarmer
+    if _prewarmer is None and Config.LEAD_PREWARM_ENABLED:
+        _prewarmer = LeadContextPrewarmer(app, get_lead_context_cache(), max_workers=Config.LEAD_PREWARM_WORKERS)
+    return _prewarmer
+
+
+def get_lead_prewarmer() -> Optional[LeadContextPrewarmer]:
+    """Get the prewarmer singleton (None until init_lead_prewarmer, or if disabled)"""
+    return _prewarmer
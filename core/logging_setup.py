@@ -0,0 +1,197 @@
+"""
+Non-blocking structured logging.
+
+Request threads only put LogRecords on a bounded queue; a background
+listener thread formats them (JSON lines or text) and writes to stdout. If
+the queue is full the record is dropped and counted instead of blocking a
+Twilio webhook on a slow log pipe.
+
+- Per-category levels: app.py logs through child loggers (app.inbound,
+  app.webhook, app.attio, ...) and LOG_LEVELS can raise or lower any logger,
+  e.g. LOG_LEVELS="app.inbound=DEBUG,core.attio=WARNING".
+- Sampling: DEBUG records are kept at LOG_DEBUG_SAMPLE_RATE. The decision is
+  made per correlation ID, so a sampled call keeps all of its debug lines.
+- Correlation ID: the CallSid of a Twilio webhook, else the X-Request-ID
+  header, else a random ID; attached to every record of the request.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import zlib
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+NO_CORRELATION_ID = '-'
+_correlation_id: ContextVar[str] = ContextVar('correlation_id', default=NO_CORRELATION_ID)
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(name)s] [%(correlation_id)s] %(message)s'
+
+
+def get_correlation_id() -> str:
+    return _correlation_id.get()
+
+
+def set_correlation_id(value: str) -> Token:
+    return _correlation_id.set(value or NO_CORRELATION_ID)
+
+
+def reset_correlation_id(token: Token) -> None:
+    _correlation_id.reset(token)
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps the current correlation ID on the record (runs on the calling thread)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'correlation_id'):
+            record.correlation_id = _correlation_id.get()
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps a fraction of DEBUG records; all-or-nothing per correlation ID"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = min(1.0, max(0.0, rate))
+        self._threshold = int(self.rate * 10000)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        correlation_id = getattr(record, 'correlation_id', NO_CORRELATION_ID)
+        if correlation_id == NO_CORRELATION_ID:
+            return random.random() < self.rate
+        return zlib.crc32(correlation_id.encode('utf-8')) % 10000 < self._threshold
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'correlation_id': getattr(record, 'correlation_id', NO_CORRELATION_ID),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks and never formats on the caller's thread.
+
+    The stdlib QueueHandler formats the message in prepare(); here the record
+    goes on the queue as-is (args are merged by the listener), so callers
+    should pass snapshots, not objects they keep mutating.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Pipeline:
+    def __init__(self, handler: NonBlockingQueueHandler, output: logging.Handler, queue_size: int):
+        self.handler = handler
+        self.output = output
+        self.queue_size = queue_size
+        self.listener: Optional[QueueListener] = None
+
+    def start(self) -> None:
+        self.listener = QueueListener(self.handler.queue, self.output)
+        self.listener.start()
+
+    def stop(self) -> None:
+        if self.listener is not None:
+            self.listener.stop()  # Drains what is already queued
+            self.listener = None
+
+    def restart_after_fork(self) -> None:
+        # The listener thread does not survive fork (gunicorn preload) and its
+        # queue lock may have been held at fork time: new queue, new thread
+        self.handler.queue = queue.Queue(maxsize=self.queue_size)
+        self.handler.dropped = 0
+        self.start()
+
+
+_pipeline: Optional[_Pipeline] = None
+_setup_lock = threading.Lock()
+
+
+def _to_level(name: str, default: Optional[int] = None) -> Optional[int]:
+    value = logging.getLevelName((name or '').strip().upper())
+    return value if isinstance(value, int) else default
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """"app.inbound=DEBUG,core.attio=WARNING" -> {'app.inbound': 10, 'core.attio': 30}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, sep, level = item.partition('=')
+        value = _to_level(level)
+        if sep and name.strip() and value is not None:
+            levels[name.strip()] = value
+    return levels
+
+
+def setup_logging(level: str = 'INFO', category_levels: str = '', fmt: str = 'json',
+                  debug_sample_rate: float = 1.0, queue_size: int = 10000) -> None:
+    """Install the queue handler on the root logger (once per process)"""
+    global _pipeline
+    with _setup_lock:
+        if _pipeline is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        handler.addFilter(CorrelationFilter())
+        handler.addFilter(DebugSampler(debug_sample_rate))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(_to_level(level, logging.INFO))
+        for name, category_level in parse_levels(category_levels).items():
+            logging.getLogger(name).setLevel(category_level)
+
+        _pipeline = _Pipeline(handler, output, queue_size)
+        _pipeline.start()
+        atexit.register(_pipeline.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_pipeline.restart_after_fork)
+
+
+def get_logging_stats() -> dict:
+    if _pipeline is None:
+        return {'enabled': False}
+    return {
+        'enabled': True,
+        'queued': _pipeline.handler.queue.qsize(),
+        'queue_size': _pipeline.queue_size,
+        'dropped': _pipeline.handler.dropped,
+    }
@@ -0,0 +1,261 @@
+"""
+Memory diagnostics for long-running workers.
+
+- tracemalloc control: start / snapshot / diff against the baseline /
+  stop, reporting the top allocators by file or by line
+- ORM state: open scoped sessions and their identity-map sizes
+- RSS watchdog: logs each worker's RSS growth every
+  MEMORY_WATCHDOG_INTERVAL seconds; above MEMORY_RECYCLE_RSS_MB it asks for a
+  graceful recycle (under gunicorn the worker finishes its in-flight requests
+  and exits, and the master forks a fresh one)
+
+Everything here is per process: GET /admin/memory answers for the worker
+that handled the request (its pid is in the response).
+"""
+
+import gc
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Optional
+
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_bytes() -> int:
+    """Resident set size now (Linux /proc), else the peak RSS from getrusage"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, KiB on Linux
+
+
+def _mb(value: float) -> float:
+    return round(value / (1024 * 1024), 2)
+
+
+class TracemallocSession:
+    """Start/stop tracemalloc and diff snapshots against a baseline (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_at: Optional[float] = None
+
+    def status(self) -> dict:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'traced_mb': _mb(current),
+            'traced_peak_mb': _mb(peak),
+            'overhead_mb': _mb(tracemalloc.get_tracemalloc_memory()) if tracing else 0,
+            'baseline_age_seconds': round(time.time() - self._baseline_at, 1) if self._baseline_at else None,
+        }
+
+    def start(self, frames: int = 1) -> dict:
+        """Start tracing and take the baseline snapshot"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames))
+            self._baseline = self._take()
+            self._baseline_at = time.time()
+        return self.status()
+
+    def stop(self) -> dict:
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+            self._baseline_at = None
+        return self.status()
+
+    def top(self, group_by: str = 'lineno', limit: int = 25, diff: bool = True) -> dict:
+        """
+        Top allocators now (diff=False) or growth since the baseline (diff=True).
+        group_by: 'filename', 'lineno' or 'traceback'.
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running (POST /admin/memory/tracemalloc/start)")
+            snapshot = self._take()
+            if diff and self._baseline is not None:
+                stats = snapshot.compare_to(self._baseline, group_by)
+                entries = [{
+                    'location': _format_trace(stat.traceback, group_by),
+                    'size_kb': round(stat.size / 1024, 1),
+                    'size_diff_kb': round(stat.size_diff / 1024, 1),
+                    'count': stat.count,
+                    'count_diff': stat.count_diff,
+                } for stat in stats[:limit]]
+            else:
+                entries = [{
+                    'location': _format_trace(stat.traceback, group_by),
+                    'size_kb': round(stat.size / 1024, 1),
+                    'count': stat.count,
+                } for stat in snapshot.statistics(group_by)[:limit]]
+        return {'group_by': group_by, 'diff': diff and self._baseline is not None, 'top': entries}
+
+    def reset_baseline(self) -> dict:
+        with self._lock:
+            if tracemalloc.is_tracing():
+                self._baseline = self._take()
+                self._baseline_at = time.time()
+        return self.status()
+
+    @staticmethod
+    def _take() -> tracemalloc.Snapshot:
+        # Leave out tracemalloc's own bookkeeping and import machinery
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+
+
+def _format_trace(traceback: tracemalloc.Traceback, group_by: str) -> str:
+    frame = traceback[0]
+    if group_by == 'filename':
+        return frame.filename
+    if group_by == 'traceback':
+        return ' <- '.join(f'{f.filename}:{f.lineno}' for f in traceback)
+    return f'{frame.filename}:{frame.lineno}'
+
+
+def orm_stats(db) -> dict:
+    """Open scoped sessions and the objects each one holds in its identity map"""
+    sessions = list(getattr(db.session.registry, 'registry', {}).values())
+    sizes = [len(session.identity_map) for session in sessions]
+    by_model: Counter = Counter()
+    for session in sessions:
+        for obj in list(session.identity_map.values()):
+            by_model[type(obj).__name__] += 1
+    return {
+        'scoped_sessions': len(sessions),
+        'identity_map_total': sum(sizes),
+        'identity_map_largest': max(sizes, default=0),
+        'objects_by_model': dict(by_model.most_common()),
+    }
+
+
+def gc_stats(with_types: bool = False, limit: int = 20) -> dict:
+    stats = {'counts': gc.get_count(), 'garbage': len(gc.garbage)}
+    if with_types:
+        # Walks every tracked object - for occasional diagnostics only
+        types = Counter(type(obj).__name__ for obj in gc.get_objects())
+        stats['top_types'] = dict(types.most_common(limit))
+    return stats
+
+
+class MemoryWatchdog:
+    """Logs RSS growth periodically; requests a recycle above a threshold"""
+
+    def __init__(self, interval: float, recycle_rss_bytes: int,
+                 rss: Callable[[], int] = current_rss_bytes):
+        self.interval = interval
+        self.recycle_rss_bytes = recycle_rss_bytes
+        self._rss = rss
+        self.started_at = time.time()
+        self.start_rss = rss()
+        self.last_rss = self.start_rss
+        self.peak_rss = self.start_rss
+        self.recycle_requested = False
+        self.recycle_handler: Optional[Callable[[], None]] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> int:
+        rss = self._rss()
+        uptime_hours = max((time.time() - self.started_at) / 3600, 1e-9)
+        growth = rss - self.start_rss
+        logger.info(f"[MEMORY] pid={os.getpid()} rss={_mb(rss)}MB "
+                    f"({_mb(rss - self.last_rss):+}MB since last check, {_mb(growth):+}MB since start, "
+                    f"{_mb(growth / uptime_hours):+}MB/h)")
+        self.last_rss = rss
+        self.peak_rss = max(self.peak_rss, rss)
+        if self.recycle_rss_bytes and rss > self.recycle_rss_bytes and not self.recycle_requested:
+            self.request_recycle(f"rss {_mb(rss)}MB > {_mb(self.recycle_rss_bytes)}MB")
+        return rss
+
+    def request_recycle(self, reason: str) -> bool:
+        self.recycle_requested = True
+        if self.recycle_handler is None:
+            logger.warning(f"[MEMORY] Recycle wanted ({reason}) but no handler (not running under gunicorn)")
+            return False
+        logger.warning(f"[MEMORY] Requesting graceful worker recycle: {reason}")
+        self.recycle_handler()
+        return True
+
+    def stats(self) -> dict:
+        rss = self._rss()
+        return {
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'rss_mb': _mb(rss),
+            'start_rss_mb': _mb(self.start_rss),
+            'peak_rss_mb': _mb(max(self.peak_rss, rss)),
+            'growth_mb': _mb(rss - self.start_rss),
+            'recycle_rss_mb': _mb(self.recycle_rss_bytes) if self.recycle_rss_bytes else None,
+            'recycle_requested': self.recycle_requested,
+        }
+
+    def start(self) -> bool:
+        if self._thread is not None and self._thread.is_alive():
+            return False
+
+        def _loop():
+            while not self._stop_event.wait(self.interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    logger.error(f"[MEMORY] Watchdog check failed: {e}")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=_loop, name='memory-watchdog', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_tracemalloc_session = TracemallocSession()
+_watchdog: Optional[MemoryWatchdog] = None
+_recycle_handler: Optional[Callable[[], None]] = None
+
+
+def get_tracemalloc_session() -> TracemallocSession:
+    return _tracemalloc_session
+
+
+def get_memory_watchdog() -> Optional[MemoryWatchdog]:
+    return _watchdog
+
+
+def set_recycle_handler(handler: Callable[[], None]) -> None:
+    """How this worker exits gracefully (set by gunicorn.conf.py post_fork)"""
+    global _recycle_handler
+    _recycle_handler = handler
+    if _watchdog is not None:
+        _watchdog.recycle_handler = handler
+
+
+def start_memory_watchdog() -> bool:
+    """Start the RSS watchdog for this worker (no-op if MEMORY_WATCHDOG_INTERVAL is 0)"""
+    global _watchdog
+    if Config.MEMORY_WATCHDOG_INTERVAL <= 0:
+        return False
+    if _watchdog is None:
+        _watchdog = MemoryWatchdog(Config.MEMORY_WATCHDOG_INTERVAL, Config.MEMORY_RECYCLE_RSS_MB * 1024 * 1024)
+        _watchdog.recycle_handler = _recycle_handler
+    return _watchdog.start()
@@ -0,0 +1,441 @@
+"""
+Prometheus metrics (/metrics).
+
+Per request: latency histogram by route template, method and status, an
+in-flight gauge, and the number of SQL statements / time spent in SQL.
+Outside requests: DB commit time and Twilio / Attio / Slack call latency.
+Counters: /voice answers that skipped a step to stay within VOICE_DEADLINE_MS.
+
+Each process keeps its metrics in memory (a dict update under a lock per
+observation - no I/O). gunicorn workers don't share memory, so a worker
+answering /metrics merges the snapshots the other workers write to
+METRICS_DIR. Workers only write snapshots while a scraper is active (a
+/metrics request in the last METRICS_SCRAPE_ACTIVE_WINDOW seconds); with no
+scraper attached nothing touches the disk. The first scrape after an idle
+period only sees the worker that answered it.
+
+When a worker dies its counters and histograms are folded into a single
+retired.json and its file is deleted, so totals never go backwards and the
+directory doesn't grow with every restart. A new process that got a dead
+worker's pid folds the old file before overwriting it.
+"""
+
+import json
+import logging
+import os
+import uuid
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by route, method and status', LATENCY_BUCKETS),
+    'http_requests_in_flight': ('gauge', 'Requests currently being handled', None),
+    'db_queries_per_request': ('histogram', 'SQL statements executed per request', COUNT_BUCKETS),
+    'db_time_per_request_seconds': ('histogram', 'Time spent executing SQL per request', LATENCY_BUCKETS),
+    'db_commit_duration_seconds': ('histogram', 'Session commit time (flush + COMMIT)', LATENCY_BUCKETS),
+    'external_request_duration_seconds': ('histogram', 'Twilio, Attio and Slack API call latency', LATENCY_BUCKETS),
+    'voice_fallbacks_total': ('counter', '/voice steps skipped or deferred to answer within VOICE_DEADLINE_MS', None),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """In-memory counters for this process (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], list] = {}  # -> [bucket counts..., +Inf count, sum]
+        self._instance = uuid.uuid4().hex  # Tells this process apart from a dead one with the same pid
+
+    def observe(self, name: str, value: float, labels: Labels = ()) -> None:
+        buckets = METRICS[name][2]
+        index = bisect_left(buckets, value)
+        with self._lock:
+            series = self._histograms.get((name, labels))
+            if series is None:
+                series = self._histograms[(name, labels)] = [0] * (len(buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def gauge_add(self, name: str, delta: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._gauges[(name, labels)] = self._gauges.get((name, labels), 0) + delta
+
+    def inc(self, name: str, amount: float = 1, labels: Labels = ()) -> None:
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+
+    def reset(self) -> None:
+        self._lock = threading.Lock()
+        self._gauges = {}
+        self._counters = {}
+        self._histograms = {}
+        self._instance = uuid.uuid4().hex
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'instance': self._instance,
+                'gauges': [[name, list(labels), value] for (name, labels), value in self._gauges.items()],
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(series)]
+                               for (name, labels), series in self._histograms.items()],
+            }
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Sum histograms and counters (all snapshots) and gauges (live processes only)"""
+    gauges: Dict[Tuple[str, Labels], float] = {}
+    counters: Dict[Tuple[str, Labels], float] = {}
+    histograms: Dict[Tuple[str, Labels], list] = {}
+    for snapshot in snapshots:
+        live = snapshot.get('live', True)
+        for name, labels, value in snapshot.get('gauges', []):
+            if live and name in METRICS:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                gauges[key] = gauges.get(key, 0) + value
+        for name, labels, value in snapshot.get('counters', []):
+            if name in METRICS:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+        for name, labels, series in snapshot.get('histograms', []):
+            if name not in METRICS or len(series) != len(METRICS[name][2]) + 2:
+                continue  # Bucket layout changed between deploys
+            key = (name, tuple(tuple(pair) for pair in labels))
+            total = histograms.get(key)
+            histograms[key] = list(series) if total is None else [a + b for a, b in zip(total, series)]
+    return {'gauges': gauges, 'counters': counters, 'histograms': histograms}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render(merged: dict) -> str:
+    """Prometheus text exposition format (0.0.4)"""
+    lines: List[str] = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        if metric_type in ('gauge', 'counter'):
+            for (series_name, labels), value in sorted(merged[metric_type + 's'].items()):
+                if series_name == name:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+            continue
+        for (series_name, labels), series in sorted(merged['histograms'].items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], series[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _format_number(float(bound))
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(series[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class WorkerSnapshots:
+    """Snapshot files shared by the gunicorn workers of one host"""
+
+    def __init__(self, directory: str, active_window: float):
+        self.directory = directory
+        self.active_window = active_window
+        self._scrape_marker = os.path.join(directory, 'last-scrape')
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f'worker-{pid}.json')
+
+    def scraper_active(self) -> bool:
+        try:
+            return time.time() - os.stat(self._scrape_marker).st_mtime < self.active_window
+        except OSError:
+            return False
+
+    def mark_scrape(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._scrape_marker, 'a'):
+            pass
+        os.utime(self._scrape_marker)
+
+    def write(self, snapshot: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(snapshot['pid'])
+        previous = self._load(path)
+        if previous is not None and previous.get('instance') != snapshot.get('instance'):
+            # Our pid belonged to a worker that died: keep its totals before overwriting
+            with self._lock():
+                previous = self._load(path)
+                if previous is not None and previous.get('instance') != snapshot.get('instance'):
+                    self._retire([previous], [path])
+        self._dump(path, snapshot)
+
+    def read_others(self, own_pid: int) -> list:
+        snapshots = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return snapshots
+        dead = []
+        for name in names:
+            if not (name.startswith('worker-') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name[len('worker-'):-len('.json')])
+            except ValueError:
+                continue
+            if pid == own_pid:
+                continue
+            if not _pid_alive(pid):
+                dead.append(pid)
+                continue
+            snapshot = self._load(os.path.join(self.directory, name))
+            if snapshot is not None:
+                snapshot['live'] = True
+                snapshots.append(snapshot)
+        if dead:
+            with self._lock():
+                # Re-check under the lock: another worker may have retired them already
+                paths = [self._path(pid) for pid in dead if not _pid_alive(pid)]
+                loaded = [(path, self._load(path)) for path in paths]
+                self._retire([snapshot for _, snapshot in loaded if snapshot is not None],
+                             [path for path, snapshot in loaded if snapshot is not None])
+        retired = self._load(self._retired_path)
+        if retired is not None:
+            retired['live'] = False
+            snapshots.append(retired)
+        return snapshots
+
+    @property
+    def _retired_path(self) -> str:
+        return os.path.join(self.directory, 'retired.json')
+
+    @contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, 'retire.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _retire(self, dead: list, paths: list) -> None:
+        """Fold dead workers' counters and histograms into retired.json, then delete their files (lock held)"""
+        if not dead:
+            return
+        retired = self._load(self._retired_path) or {}
+        merged = merge_snapshots([retired] + [dict(snapshot, live=False) for snapshot in dead])
+        self._dump(self._retired_path, {
+            'counters': [[name, list(labels), value] for (name, labels), value in merged['counters'].items()],
+            'histograms': [[name, list(labels), series] for (name, labels), series in merged['histograms'].items()],
+        })
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        logger.info(f"[METRICS] Retired {len(dead)} dead worker snapshot(s)")
+
+    @staticmethod
+    def _load(path: str) -> Optional[dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _dump(path: str, data: dict) -> None:
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)  # Readers never see a partial file
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_registry = MetricsRegistry()
+_snapshots = WorkerSnapshots(
+    os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'twilio-metrics'),
+    Config.METRICS_SCRAPE_ACTIVE_WINDOW
+)
+_flush_thread: Optional[threading.Thread] = None
+_stop_event = threading.Event()
+
+if hasattr(os, 'register_at_fork'):
+    # A forked worker starts from zero, not from a copy of the parent's series
+    os.register_at_fork(after_in_child=_registry.reset)
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def collect() -> str:
+    """Merged metrics of every worker on this host, in Prometheus text format"""
+    snapshot = _registry.snapshot()
+    others = []
+    try:
+        _snapshots.mark_scrape()
+        _snapshots.write(snapshot)
+        others = _snapshots.read_others(snapshot['pid'])
+    except OSError as e:
+        logger.warning(f"[METRICS] Worker snapshots unavailable, serving this process only: {e}")
+    return render(merge_snapshots([snapshot] + others))
+
+
+def start_metrics_flusher() -> bool:
+    """Write this worker's snapshot periodically while a scraper is active"""
+    global _flush_thread
+    if not Config.METRICS_ENABLED or (_flush_thread is not None and _flush_thread.is_alive()):
+        return False
+
+    def _loop():
+        while not _stop_event.wait(Config.METRICS_FLUSH_INTERVAL):
+            try:
+                if _snapshots.scraper_active():
+                    _snapshots.write(_registry.snapshot())
+            except Exception as e:
+                logger.error(f"[METRICS] Snapshot write failed: {e}")
+
+    _stop_event.clear()
+    _flush_thread = threading.Thread(target=_loop, name='metrics-flush', daemon=True)
+    _flush_thread.start()
+    return True
+
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """
+    Time a call to an external API:
+
+        with external_call('attio', 'POST') as call:
+            response = ...
+            call.ok = response.status_code < 400
+    """
+    call = _ExternalCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.ok = False
+        raise
+    finally:
+        if Config.METRICS_ENABLED:
+            _registry.observe('external_request_duration_seconds', time.perf_counter() - start,
+                              (('service', service), ('operation', operation),
+                               ('outcome', 'ok' if call.ok else 'error')))
+
+
+class _ExternalCall:
+    __slots__ = ('ok',)
+
+    def __init__(self):
+        self.ok = True
+
+
+def _route_labels(request) -> Labels:
+    rule = request.url_rule
+    return (('route', rule.rule if rule is not None else 'unmatched'), ('method', request.method))
+
+
+def init_metrics(app) -> bool:
+    """Register the request / SQL hooks (no-op if METRICS_ENABLED is false)"""
+    if not Config.METRICS_ENABLED:
+        return False
+
+    from flask import g, has_request_context, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from core.database import RoutingSession
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_labels = _route_labels(request)
+        g.metrics_start = time.perf_counter()
+        g.db_queries = 0
+        g.db_time = 0.0
+        _registry.gauge_add('http_requests_in_flight', 1, g.metrics_labels)
+
+    @app.after_request
+    def _metrics_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        labels = g.pop('metrics_labels', None)
+        if labels is None:
+            return
+        elapsed = time.perf_counter() - g.pop('metrics_start')
+        status = str(g.pop('metrics_status', 500))
+        _registry.gauge_add('http_requests_in_flight', -1, labels)
+        _registry.observe('http_request_duration_seconds', elapsed, labels + (('status', status),))
+        route = labels[:1]
+        _registry.observe('db_queries_per_request', g.pop('db_queries', 0), route)
+        _registry.observe('db_time_per_request_seconds', g.pop('db_time', 0.0), route)
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _query_start(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_start'] = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _query_end(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('query_start', None)
+        if started is not None and has_request_context() and 'db_queries' in g:
+            g.db_queries += 1
+            g.db_time += time.perf_counter() - started
+
+    @event.listens_for(RoutingSession, 'before_commit')
+    def _commit_start(session):
+        session.info['commit_start'] = time.perf_counter()
+
+    @event.listens_for(RoutingSession, 'after_commit')
+    def _commit_end(session):
+        started = session.info.pop('commit_start', None)
+        if started is not None:
+            _registry.observe('db_commit_duration_seconds', time.perf_counter() - started)
+
+    return True
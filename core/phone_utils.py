@@ -1,3 +1,14 @@
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+try:
+    import numpy as np
+except ImportError:
+    # Batch functions fall back to pure Python
+    np = None
+
 # US Area Code to State mapping
 AREA_CODE_TO_STATE = {
     # Alabama
@@ -122,6 +133,55 @@ AREA_CODE_TO_STATE = {
     '307': 'WY',
 }
 
+# Canadian area codes (NANP) to province/territory code
+AREA_CODE_TO_PROVINCE = {
+    # Alberta
+    '368': 'AB', '403': 'AB', '587': 'AB', '780': 'AB', '825': 'AB',
+    # British Columbia
+    '236': 'BC', '250': 'BC', '257': 'BC', '604': 'BC', '672': 'BC', '778': 'BC',
+    # Manitoba
+    '204': 'MB', '431': 'MB', '584': 'MB',
+    # New Brunswick
+    '428': 'NB', '506': 'NB',
+    # Newfoundland and Labrador
+    '709': 'NL', '879': 'NL',
+    # Nova Scotia / Prince Edward Island (shared)
+    '782': 'NS', '902': 'NS',
+    # Ontario
+    '226': 'ON', '249': 'ON', '289': 'ON', '343': 'ON', '365': 'ON', '382': 'ON',
+    '387': 'ON', '416': 'ON', '437': 'ON', '519': 'ON', '548': 'ON', '613': 'ON',
+    '647': 'ON', '683': 'ON', '705': 'ON', '742': 'ON', '753': 'ON', '807': 'ON',
+    '905': 'ON', '942': 'ON',
+    # Quebec
+    '263': 'QC', '354': 'QC', '367': 'QC', '418': 'QC', '438': 'QC', '450': 'QC',
+    '468': 'QC', '514': 'QC', '579': 'QC', '581': 'QC', '819': 'QC', '873': 'QC',
+    # Saskatchewan
+    '306': 'SK', '474': 'SK', '639': 'SK',
+    # Yukon / Northwest Territories / Nunavut (shared)
+    '867': 'NT',
+}
+
+# Non-geographic NANP area codes (no state / timezone)
+NON_GEOGRAPHIC_AREA_CODES = {
+    # Toll-free
+    '800': 'toll_free', '833': 'toll_free', '844': 'toll_free', '855': 'toll_free',
+    '866': 'toll_free', '877': 'toll_free', '888': 'toll_free',
+    # Premium rate
+    '900': 'premium',
+    # Personal communications services (5XX)
+    '500': 'personal', '521': 'personal', '522': 'personal', '523': 'personal', '524': 'personal',
+    '525': 'personal', '526': 'personal', '527': 'personal', '528': 'personal', '529': 'personal',
+    '532': 'personal', '533': 'personal', '535': 'personal', '538': 'personal', '542': 'personal',
+    '543': 'personal', '544': 'personal', '545': 'personal', '546': 'personal', '547': 'personal',
+    '549': 'personal', '550': 'personal', '552': 'personal', '553': 'personal', '554': 'personal',
+    '556': 'personal', '558': 'personal', '566': 'personal', '569': 'personal', '577': 'personal',
+    '578': 'personal', '588': 'personal', '589': 'personal',
+    # Carrier / government services
+    '700': 'carrier', '710': 'government',
+    # Canadian non-geographic
+    '600': 'canada_non_geographic', '622': 'canada_non_geographic',
+}
+
 
 def get_state_from_phone(phone_number: str) -> str | None:
     """
@@ -131,7 +191,8 @@ def get_state_from_phone(phone_number: str) -> str | None:
         phone_number: Phone number in any format (+1XXXXXXXXXX, 1XXXXXXXXXX, XXXXXXXXXX)
 
     Returns:
-        Two-letter state code (e.g., 'CA', 'TX', 'NY') or None if not found
+        Two-letter state code (e.g., 'CA', 'TX', 'NY'), Canadian province code
+        (e.g., 'ON', 'BC') or None if not found
     """
     # Remove all non-digit characters
     digits = ''.join(filter(str.isdigit, phone_number))
@@ -143,7 +204,7 @@ def get_state_from_phone(phone_number: str) -> str | None:
     # Extract area code (first 3 digits)
     if len(digits) >= 3:
         area_code = digits[:3]
-        return AREA_CODE_TO_STATE.get(area_code)
+        return AREA_CODE_TO_STATE.get(area_code) or AREA_CODE_TO_PROVINCE.get(area_code)
 
     return None
 
@@ -162,10 +223,22 @@ def format_phone_number(phone_number: str) -> str:
     return phone_number
 
 
+def normalize_phone(phone_number: str) -> str:
+    """
+    Normalize a phone number to its last 10 digits (US national number).
+
+    Used as the lookup key for leads, since the same lead may show up as
+    +1XXXXXXXXXX, 1XXXXXXXXXX or XXXXXXXXXX depending on the source.
+    """
+    return ''.join(filter(str.isdigit, phone_number or ''))[-10:]
+
+
 def get_caller_id_for_number(to_number: str) -> str:
     """
-    Get the appropriate Caller ID based on the destination number's state.
+    Get the appropriate Caller ID based on the destination number.
 
+    Uses the caller ID pool (phone_numbers table) when it has a number with
+    spare capacity; otherwise the static routing:
     - Florida leads → Florida number
     - Texas leads → Texas number
     - Other states → Toll-free number
@@ -177,6 +250,11 @@ def get_caller_id_for_number(to_number: str) -> str:
         Caller ID to use for the call
     """
     from core.config import Config
+    from core.caller_id_pool import select_caller_id
+
+    caller_id = select_caller_id(to_number)
+    if caller_id:
+        return caller_id
 
     state = get_state_from_phone(to_number)
 
@@ -217,15 +295,20 @@ STATE_TO_TIMEZONE = {
     'AK': 'America/Anchorage',
     # Hawaii Time
     'HI': 'Pacific/Honolulu',
+    # Canada
+    'NL': 'America/St_Johns', 'NS': 'America/Halifax', 'NB': 'America/Moncton',
+    'QC': 'America/Toronto', 'ON': 'America/Toronto', 'MB': 'America/Winnipeg',
+    'SK': 'America/Regina', 'AB': 'America/Edmonton', 'NT': 'America/Edmonton',
+    'BC': 'America/Vancouver',
 }
 
 
 def get_timezone_for_state(state: str) -> str:
     """
-    Get timezone for a US state.
+    Get timezone for a US state (or Canadian province).
 
     Args:
-        state: Two-letter state code
+        state: Two-letter state/province code
 
     Returns:
         Timezone string (defaults to America/New_York if not found)
@@ -233,6 +316,109 @@ def get_timezone_for_state(state: str) -> str:
     return STATE_TO_TIMEZONE.get(state, 'America/New_York')
 
 
+# ============== LOCAL TIME ==============
+# UTC offset transition tables per (timezone, UTC year), built once from
+# zoneinfo. Resolving a local hour/day is then a binary search over a few
+# transitions instead of a full timezone conversion.
+
+_offset_tables: dict = {}
+_offset_tables_lock = threading.Lock()
+
+
+def _utc_offset_seconds(zone, ts: int) -> int:
+    return int(datetime.fromtimestamp(ts, timezone.utc).astimezone(zone).utcoffset().total_seconds())
+
+
+def _build_offset_table(tz_name: str, year: int) -> tuple:
+    """
+    (transitions, offsets) for one UTC year.
+
+    transitions[i] is the UTC epoch second from which offsets[i] applies;
+    transitions[0] is the start of the year.
+    """
+    zone = ZoneInfo(tz_name)
+    start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+
+    transitions = [start]
+    offsets = [_utc_offset_seconds(zone, start)]
+    step = 3600
+    previous_ts, previous_offset = start, offsets[0]
+    for ts in range(start + step, end, step):
+        offset = _utc_offset_seconds(zone, ts)
+        if offset != previous_offset:
+            # Narrow down to the exact second (not every zone switches on a UTC hour)
+            low, high = previous_ts, ts
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _utc_offset_seconds(zone, middle) == previous_offset:
+                    low = middle
+                else:
+                    high = middle
+            transitions.append(high)
+            offsets.append(offset)
+        previous_ts, previous_offset = ts, offset
+    return transitions, offsets
+
+
+def get_offset_table(tz_name: str, year: int) -> tuple:
+    """Cached (transitions, offsets) for a timezone and UTC year"""
+    key = (tz_name, year)
+    table = _offset_tables.get(key)
+    if table is None:
+        with _offset_tables_lock:
+            table = _offset_tables.get(key)
+            if table is None:
+                table = _build_offset_table(tz_name, year)
+                _offset_tables[key] = table
+    return table
+
+
+_EPOCH_NAIVE = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_DATE = date(1970, 1, 1)
+
+
+def _utc_seconds(utc_datetime) -> tuple:
+    """(UTC epoch seconds, UTC year) - naive datetimes are treated as UTC"""
+    if utc_datetime.tzinfo is None:
+        return (utc_datetime - _EPOCH_NAIVE).total_seconds(), utc_datetime.year
+    if utc_datetime.tzinfo is not timezone.utc:
+        utc_datetime = utc_datetime.astimezone(timezone.utc)
+    return (utc_datetime - _EPOCH_UTC).total_seconds(), utc_datetime.year
+
+
+def _local_seconds(utc_datetime, state: str = None) -> float:
+    """Lead's local wall-clock time as epoch seconds (offset from the transition table)"""
+    tz_name = STATE_TO_TIMEZONE.get(state, 'America/New_York') if state else 'America/New_York'
+    ts, year = _utc_seconds(utc_datetime)
+    transitions, offsets = get_offset_table(tz_name, year)
+    return ts + offsets[bisect_right(transitions, ts) - 1]
+
+
+def get_local_datetime(utc_datetime, state: str = None) -> datetime:
+    """
+    Lead's local wall-clock time (naive) for a UTC datetime.
+
+    Naive datetimes are treated as UTC. Unknown states use America/New_York.
+    """
+    return _EPOCH_NAIVE + timedelta(seconds=_local_seconds(utc_datetime, state))
+
+
+def get_local_date(utc_datetime, state: str = None) -> date:
+    """Lead's local calendar day (used for contact_number_today)"""
+    return _EPOCH_DATE + timedelta(days=int(_local_seconds(utc_datetime, state) // 86400))
+
+
+def _period_for_hour(hour: int) -> str:
+    if 6 <= hour < 12:
+        return 'morning'
+    elif 12 <= hour < 18:
+        return 'afternoon'
+    else:
+        return 'evening'
+
+
 def get_contact_period(utc_datetime, state: str = None) -> str:
     """
     Determine contact period (morning, afternoon, evening) based on local time.
@@ -244,41 +430,54 @@ def get_contact_period(utc_datetime, state: str = None) -> str:
     Returns:
         'morning' (6-12), 'afternoon' (12-18), or 'evening' (18-6)
     """
-    from datetime import datetime, timezone as tz
-    try:
-        import pytz
-    except ImportError:
-        # Fallback if pytz not available - use UTC
-        hour = utc_datetime.hour if utc_datetime else 12
-        if 6 <= hour < 12:
-            return 'morning'
-        elif 12 <= hour < 18:
-            return 'afternoon'
-        else:
-            return 'evening'
-
     if not utc_datetime:
         return 'afternoon'
 
-    # Get timezone for state
-    tz_name = get_timezone_for_state(state) if state else 'America/New_York'
-
     try:
-        local_tz = pytz.timezone(tz_name)
-        # Ensure UTC datetime has timezone info
-        if utc_datetime.tzinfo is None:
-            utc_datetime = pytz.utc.localize(utc_datetime)
-        local_time = utc_datetime.astimezone(local_tz)
-        hour = local_time.hour
+        hour = int(_local_seconds(utc_datetime, state) // 3600 % 24)
     except Exception:
-        hour = utc_datetime.hour if utc_datetime else 12
-
-    if 6 <= hour < 12:
-        return 'morning'
-    elif 12 <= hour < 18:
-        return 'afternoon'
-    else:
-        return 'evening'
+        # Timezone data unavailable - use UTC
+        hour = utc_datetime.hour
+
+    return _period_for_hour(hour)
+
+
+def _local_epoch_seconds(utc_datetimes, states) -> list:
+    """_local_seconds for many (UTC datetime, state) pairs (None datetimes stay None)"""
+    tables = {}
+    result = []
+    for utc_datetime, state in zip(utc_datetimes, states):
+        if not utc_datetime:
+            result.append(None)
+            continue
+        ts, year = _utc_seconds(utc_datetime)
+        key = (STATE_TO_TIMEZONE.get(state, 'America/New_York') if state else 'America/New_York', year)
+        table = tables.get(key)
+        if table is None:
+            table = tables[key] = get_offset_table(*key)
+        transitions, offsets = table
+        result.append(ts + offsets[bisect_right(transitions, ts) - 1])
+    return result
+
+
+def get_contact_periods(utc_datetimes, states) -> list:
+    """Batch get_contact_period (same length as the inputs)"""
+    utc_datetimes = list(utc_datetimes)
+    local = _local_epoch_seconds(utc_datetimes, list(states))
+    return [
+        _period_for_hour(int(value // 3600 % 24)) if value is not None else 'afternoon'
+        for value in local
+    ]
+
+
+def get_local_dates(utc_datetimes, states) -> list:
+    """Batch get_local_date (None where the datetime is None)"""
+    utc_datetimes = list(utc_datetimes)
+    local = _local_epoch_seconds(utc_datetimes, list(states))
+    return [
+        _EPOCH_DATE + timedelta(days=int(value // 86400)) if value is not None else None
+        for value in local
+    ]
 
 
 def get_lead_phone_for_call(direction: str, from_number: str, to_number: str) -> str:
@@ -297,3 +496,228 @@ def get_lead_phone_for_call(direction: str, from_number: str, to_number: str) ->
         return from_number
     else:
         return to_number
+
+
+# ============== BATCH ==============
+# Array versions of the functions above for backfills, exports and analytics.
+# With NumPy the digit extraction and area-code lookup are vectorized;
+# without it the same results are computed with plain Python loops.
+
+REGION_CODES = sorted(set(AREA_CODE_TO_STATE.values()) | set(AREA_CODE_TO_PROVINCE.values()))
+CATEGORY_CODES = ['geographic'] + sorted(set(NON_GEOGRAPHIC_AREA_CODES.values()))
+
+
+def _build_area_code_tables():
+    """
+    Area code (0-999) indexed tables.
+
+    Returns (region index, category index) lists; -1 = unknown.
+    """
+    region_index = [-1] * 1000
+    category_index = [-1] * 1000
+    region_pos = {code: i for i, code in enumerate(REGION_CODES)}
+    for table in (AREA_CODE_TO_PROVINCE, AREA_CODE_TO_STATE):
+        for area_code, region in table.items():
+            region_index[int(area_code)] = region_pos[region]
+            category_index[int(area_code)] = 0
+    for area_code, category in NON_GEOGRAPHIC_AREA_CODES.items():
+        category_index[int(area_code)] = CATEGORY_CODES.index(category)
+    return region_index, category_index
+
+
+_REGION_INDEX, _CATEGORY_INDEX = _build_area_code_tables()
+_REGION_COUNTRY = ['CA' if code in set(AREA_CODE_TO_PROVINCE.values()) else 'US' for code in REGION_CODES]
+_REGION_TIMEZONE = [STATE_TO_TIMEZONE.get(code) for code in REGION_CODES]
+
+
+def _clean(numbers) -> list:
+    return [n or '' for n in numbers]
+
+
+_LAST11_MOD = 100_000_000_000
+
+
+def _extract_digits(numbers: list):
+    """
+    Vectorized digit extraction.
+
+    Walks the character columns once, accumulating digits as integers
+    (no per-row Python work).
+
+    Returns (arr, count, last11, first4):
+        arr    - the input as a NumPy string array
+        count  - number of digits in each string
+        last11 - integer value of the last 11 digits
+        first4 - integer value of the first (up to) 4 digits
+    """
+    arr = np.array(numbers, dtype=str)
+    n = len(arr)
+    width = arr.dtype.itemsize // 4
+    count = np.zeros(n, np.int32)
+    last11 = np.zeros(n, np.int64)
+    first4 = np.zeros(n, np.int64)
+    if width == 0:
+        return arr, count, last11, first4
+
+    codes = arr.view(np.uint32).reshape(n, width)
+    for j in range(width):
+        value = codes[:, j].astype(np.int64)
+        value -= 48
+        is_digit = value.view(np.uint64) < 10  # non-digits wrap around
+        value *= is_digit
+        last11 *= np.where(is_digit, 10, 1)
+        last11 += value
+        if j % 6 == 5:
+            last11 %= _LAST11_MOD  # keep below 2**63
+        leading = is_digit & (count < 4)
+        first4 *= np.where(leading, 10, 1)
+        first4 += value * leading
+        count += is_digit
+    last11 %= _LAST11_MOD
+    return arr, count, last11, first4
+
+
+def _digits_to_strings(values, width, prefix: str = ''):
+    """
+    Integers -> digit strings.
+
+    width is an int (zero-padded to that width) or an array of per-row
+    widths (shorter rows end early).
+    """
+    n = len(values)
+    widths = np.broadcast_to(np.asarray(width), (n,))
+    max_width = int(widths.max()) if n else 0
+    chars = np.zeros((n, len(prefix) + max_width), np.uint32)
+    for i, c in enumerate(prefix):
+        chars[:, i] = ord(c)
+    remaining = values.copy()
+    for i in range(max_width - 1, -1, -1):
+        # Digit i of a row is only written when the row is that wide
+        column = np.where(i < widths, remaining % 10 + 48, 0)
+        chars[:, len(prefix) + i] = column
+        remaining = np.where(i < widths, remaining // 10, remaining)
+    return chars.view(f'U{len(prefix) + max_width}').ravel()
+
+
+def _normalized_strings(count, last11):
+    """normalize_phone for every row: last 10 digits (all digits if fewer)"""
+    return _digits_to_strings(last11 % 10_000_000_000, np.minimum(count, 10))
+
+
+def _area_codes(count, first4):
+    """Area code per row as int (-1 when fewer than 3 digits), same rules as get_state_from_phone"""
+    leading = np.minimum(count, 4)
+    first_digit = first4 // 10 ** np.maximum(leading - 1, 0)
+    has_country_code = (count == 11) & (first_digit == 1)
+    # Drop the country code, then keep the first 3 digits
+    digits = np.where(has_country_code, first4 % 1000, first4)
+    kept = np.where(has_country_code, 3, leading)
+    area = digits // 10 ** np.maximum(kept - 3, 0)
+    return np.where(count - has_country_code >= 3, area, -1)
+
+
+def classify_phones(phone_numbers) -> dict:
+    """
+    Classify many phone numbers at once.
+
+    Args:
+        phone_numbers: Sequence of phone numbers in any format (None allowed)
+
+    Returns:
+        Dict of lists, one entry per input number:
+            e164       - format_phone_number result
+            normalized - normalize_phone result (last 10 digits)
+            area_code  - 3-digit area code or None
+            state      - US state / Canadian province code or None
+            country    - 'US', 'CA' or None
+            category   - 'geographic', 'toll_free', 'premium', ... or None
+            timezone   - IANA timezone or None (non-geographic / unknown)
+    """
+    numbers = _clean(phone_numbers)
+    if not numbers:
+        return {key: [] for key in ('e164', 'normalized', 'area_code', 'state', 'country', 'category', 'timezone')}
+    if np is None:
+        return _classify_phones_python(numbers)
+
+    arr, count, last11, first4 = _extract_digits(numbers)
+    national = last11 % 10_000_000_000
+
+    # E.164: 10 digits, or 11 starting with 1; anything else is returned unchanged
+    valid = (count == 10) | ((count == 11) & (last11 // 10_000_000_000 == 1))
+    e164 = np.where(valid, _digits_to_strings(national, 10, '+1'), arr).tolist()
+    normalized = _normalized_strings(count, last11).tolist()
+
+    area = _area_codes(count, first4)
+    lookup = np.where(area >= 0, area, 0)
+    region_idx = np.where(area >= 0, np.asarray(_REGION_INDEX, np.int16)[lookup], -1)
+    category_idx = np.where(area >= 0, np.asarray(_CATEGORY_INDEX, np.int16)[lookup], -1)
+
+    # Object arrays with a trailing None so -1 maps to None
+    area_names = np.array([f'{i:03d}' for i in range(1000)] + [None], dtype=object)
+    regions = np.array(REGION_CODES + [None], dtype=object)
+    countries = np.array(_REGION_COUNTRY + [None], dtype=object)
+    timezones = np.array(_REGION_TIMEZONE + [None], dtype=object)
+    categories = np.array(CATEGORY_CODES + [None], dtype=object)
+
+    return {
+        'e164': e164,
+        'normalized': normalized,
+        'area_code': area_names[area].tolist(),
+        'state': regions[region_idx].tolist(),
+        'country': countries[region_idx].tolist(),
+        'category': categories[category_idx].tolist(),
+        'timezone': timezones[region_idx].tolist(),
+    }
+
+
+def _classify_phones_python(numbers: list) -> dict:
+    """classify_phones without NumPy"""
+    result = {key: [] for key in ('e164', 'normalized', 'area_code', 'state', 'country', 'category', 'timezone')}
+    for number in numbers:
+        digits = ''.join(filter(str.isdigit, number))
+        has_country_code = len(digits) == 11 and digits[0] == '1'
+        if len(digits) == 10 or has_country_code:
+            result['e164'].append(f'+1{digits[-10:]}')
+        else:
+            result['e164'].append(number)
+        result['normalized'].append(digits[-10:])
+
+        national = digits[1:] if has_country_code else digits
+        area = int(national[:3]) if len(national) >= 3 else -1
+        region_idx = _REGION_INDEX[area] if area >= 0 else -1
+        category_idx = _CATEGORY_INDEX[area] if area >= 0 else -1
+        result['area_code'].append(national[:3] if area >= 0 else None)
+        result['state'].append(REGION_CODES[region_idx] if region_idx >= 0 else None)
+        result['country'].append(_REGION_COUNTRY[region_idx] if region_idx >= 0 else None)
+        result['category'].append(CATEGORY_CODES[category_idx] if category_idx >= 0 else None)
+        result['timezone'].append(_REGION_TIMEZONE[region_idx] if region_idx >= 0 else None)
+    return result
+
+
+def get_states_from_phones(phone_numbers) -> list:
+    """Batch get_state_from_phone"""
+    return classify_phones(phone_numbers)['state']
+
+
+def format_phone_numbers(phone_numbers) -> list:
+    """Batch format_phone_number"""
+    return classify_phones(phone_numbers)['e164']
+
+
+def normalize_phones(phone_numbers) -> list:
+    """Batch normalize_phone"""
+    numbers = _clean(phone_numbers)
+    if np is None or not numbers:
+        return [normalize_phone(n) for n in numbers]
+    _, count, last11, _ = _extract_digits(numbers)
+    return _normalized_strings(count, last11).tolist()
+
+
+def get_lead_phones_for_calls(directions, from_numbers, to_numbers) -> list:
+    """Batch get_lead_phone_for_call (from_number for inbound, to_number otherwise)"""
+    if np is None:
+        return [get_lead_phone_for_call(d, f, t) for d, f, t in zip(directions, from_numbers, to_numbers)]
+    if len(directions) == 0:
+        return []
+    inbound = np.array(_clean(directions), dtype=str) == 'inbound'
+    return np.where(inbound, np.array(from_numbers, dtype=object), np.array(to_numbers, dtype=object)).tolist()
@@ -0,0 +1,298 @@
+"""
+On-demand request profiling and per-route SQL budgets.
+
+A request is profiled when it carries `X-Profile-Token: <PROFILE_TOKEN>` or
+is picked by PROFILE_SAMPLE_RATE (how Twilio webhooks get profiled - they
+can't send custom headers). For a profiled request:
+
+- a sampler thread records the handler thread's stack every
+  PROFILE_INTERVAL_MS (folded stacks, ready for flamegraph.pl / speedscope)
+- every SQL statement is kept with its duration
+- the result is written to PROFILE_DIR (last PROFILE_MAX_STORED kept) and
+  its id returned in the X-Profile-Id header (GET /admin/profiles/<id>)
+
+Every request counts its SQL statements; going over the route's budget
+(SQL_QUERY_BUDGETS, else SQL_QUERY_BUDGET) logs a warning with the
+statements that repeated (N+1 patterns).
+"""
+
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'twilio-profiles')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_STATEMENTS = 500
+MAX_STATEMENT_LENGTH = 2000
+MAX_STACK_DEPTH = 64
+REPEATED_THRESHOLD = 3
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """"/inbound_status=5,/taskrouter_event=6" -> {'/inbound_status': 5, '/taskrouter_event': 6}"""
+    budgets = {}
+    for item in (spec or '').split(','):
+        route, sep, value = item.rpartition('=')
+        if sep and route.strip() and value.strip().isdigit():
+            budgets[route.strip()] = int(value)
+    return budgets
+
+
+def _frame_label(frame) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(ROOT):
+        filename = filename[len(ROOT) + 1:]
+    else:
+        filename = os.path.basename(filename)
+    return f'{filename}:{frame.f_code.co_name}:{frame.f_lineno}'
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval (folded-stack counts)"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self) -> 'StackSampler':
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+
+class RequestProfile:
+    """SQL statements and stack samples of one request"""
+
+    def __init__(self, trigger: str, interval: float):
+        self.id = uuid.uuid4().hex[:16]
+        self.trigger = trigger
+        self.statements: List[tuple] = []  # (sql, seconds)
+        self.sql_seconds = 0.0
+        self.started = time.perf_counter()
+        self.sampler = StackSampler(threading.get_ident(), interval).start()
+
+    def add_statement(self, statement: str, seconds: float) -> None:
+        self.sql_seconds += seconds
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((statement[:MAX_STATEMENT_LENGTH], seconds))
+
+    def finish(self, route: str, method: str, path: str, status: int,
+               query_count: int, repeated: list, correlation_id: str) -> dict:
+        duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        return {
+            'id': self.id,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'trigger': self.trigger,
+            'route': route,
+            'method': method,
+            'path': path,
+            'status': status,
+            'correlation_id': correlation_id,
+            'duration_ms': round(duration * 1000, 2),
+            'sql': {
+                'count': query_count,
+                'total_ms': round(self.sql_seconds * 1000, 2),
+                'repeated': repeated,
+                'statements': [{'sql': sql, 'ms': round(seconds * 1000, 3)} for sql, seconds in self.statements],
+            },
+            'cpu': {
+                'interval_ms': round(self.sampler.interval * 1000, 2),
+                'samples': sum(self.sampler.samples.values()),
+                'folded': [f'{stack} {count}' for stack, count in self.sampler.samples.most_common()],
+            },
+        }
+
+
+def _mtime(entry: os.DirEntry) -> float:
+    try:
+        return entry.stat().st_mtime
+    except OSError:  # Pruned by another worker
+        return 0.0
+
+
+class ProfileStore:
+    """Profiles as JSON files shared by the workers of one host (newest PROFILE_MAX_STORED kept)"""
+
+    def __init__(self, directory: str, max_stored: int):
+        self.directory = directory
+        self.max_stored = max_stored
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f'{profile_id}.json')
+
+    def _files(self) -> list:
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        except OSError:
+            return []
+        return sorted(entries, key=_mtime, reverse=True)
+
+    def save(self, profile: dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile['id'])
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(profile, f, separators=(',', ':'))
+        os.replace(f'{path}.tmp', path)
+        with self._lock:
+            for entry in self._files()[self.max_stored:]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self, limit: int = 50) -> list:
+        summaries = []
+        for entry in self._files()[:limit]:
+            profile = self.get(entry.name[:-len('.json')])
+            if profile is None:
+                continue
+            summaries.append({
+                'id': profile['id'],
+                'created_at': profile['created_at'],
+                'trigger': profile['trigger'],
+                'route': profile['route'],
+                'method': profile['method'],
+                'status': profile['status'],
+                'duration_ms': profile['duration_ms'],
+                'sql_count': profile['sql']['count'],
+                'sql_ms': profile['sql']['total_ms'],
+            })
+        return summaries
+
+
+_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    """Get the profile store singleton"""
+    global _store
+    if _store is None:
+        _store = ProfileStore(PROFILE_DIR, Config.PROFILE_MAX_STORED)
+    return _store
+
+
+def _profile_trigger(request) -> Optional[str]:
+    token = request.headers.get('X-Profile-Token')
+    if token and Config.PROFILE_TOKEN and hmac.compare_digest(token, Config.PROFILE_TOKEN):
+        return 'header'
+    if Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+def _repeated_statements(statements: Counter) -> list:
+    return [{'sql': sql[:200], 'count': count}
+            for sql, count in statements.most_common(5) if count >= REPEATED_THRESHOLD]
+
+
+def init_profiling(app) -> None:
+    """Register the SQL budget / profiling hooks"""
+    from flask import g, has_request_context, request
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    from core.logging_setup import get_correlation_id
+
+    budgets = parse_budgets(Config.SQL_QUERY_BUDGETS)
+    interval = max(0.001, Config.PROFILE_INTERVAL_MS / 1000)
+
+    @app.before_request
+    def _profile_start():
+        g.sql_statements = Counter()
+        trigger = _profile_trigger(request)
+        if trigger is not None:
+            g.request_profile = RequestProfile(trigger, interval)
+
+    @app.after_request
+    def _profile_header(response):
+        g.profile_status = response.status_code
+        profile = g.get('request_profile')
+        if profile is not None:
+            response.headers['X-Profile-Id'] = profile.id
+        return response
+
+    @app.teardown_request
+    def _profile_finish(exc):
+        statements = g.pop('sql_statements', None)
+        if statements is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        query_count = sum(statements.values())
+        budget = budgets.get(route, Config.SQL_QUERY_BUDGET)
+        profile = g.pop('request_profile', None)
+        over_budget = bool(budget) and query_count > budget
+        if not over_budget and profile is None:
+            return
+
+        repeated = _repeated_statements(statements)
+        if over_budget:
+            logger.warning(f"[SQL BUDGET] {request.method} {route}: {query_count} queries (budget {budget}); "
+                           f"repeated: {json.dumps(repeated)}")
+        if profile is None:
+            return
+        try:
+            result = profile.finish(route, request.method, request.path, g.pop('profile_status', 500),
+                                    query_count, repeated, get_correlation_id())
+            get_profile_store().save(result)
+            logger.info(f"[PROFILE] {request.method} {route} -> {result['id']} "
+                        f"({result['duration_ms']}ms, {query_count} queries)")
+        except Exception as e:
+            logger.error(f"[PROFILE] Failed to save profile: {e}")
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _statement_start(conn, cursor, statement, parameters, context, executemany):
+        conn.info['profile_statement_start'] = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _statement_end(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('profile_statement_start', None)
+        if started is None or not has_request_context():
+            return
+        statements = g.get('sql_statements')
+        if statements is None:
+            return
+        statements[statement] += 1
+        profile = g.get('request_profile')
+        if profile is not None:
+            profile.add_statement(statement, time.perf_counter() - started)
@@ -0,0 +1,66 @@
+"""
+Twilio REST client, created on first use.
+
+twilio.rest (and its HTTP stack) is imported only when a request actually
+needs the API, so workers that never place/update calls don't pay for it.
+"""
+
+import logging
+import re
+import threading
+from typing import Optional
+
+from core.config import Config
+from core.metrics import external_call
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+_TWILIO_HOST = re.compile(r'^https://[a-z0-9.-]*twilio\.com')
+
+
+def get_twilio_client() -> Optional["Client"]:  # noqa: F821
+    """Get the Twilio Client singleton (None if it cannot be created)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                try:
+                    from twilio.rest import Client
+                    _client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN,
+                                     http_client=_timed_http_client())
+                    logger.info("[TWILIO] Client initialized")
+                except Exception as e:
+                    logger.error(f"[TWILIO] Client failed: {e}")
+                    return None
+    return _client
+
+
+def set_twilio_client(client) -> None:
+    """Replace the client (ex: core.dialer.LocalTwilioClient in benchmarks)"""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def twilio_api_url(url: str) -> str:
+    """Point a https://*.twilio.com URL at TWILIO_API_BASE_URL when it is set"""
+    if not Config.TWILIO_API_BASE_URL:
+        return url
+    return _TWILIO_HOST.sub(Config.TWILIO_API_BASE_URL, url, count=1)
+
+
+def _timed_http_client():
+    """TwilioHttpClient that records each API call in external_request_duration_seconds"""
+    from twilio.http.http_client import TwilioHttpClient
+
+    class TimedHttpClient(TwilioHttpClient):
+        def request(self, method, url, *args, **kwargs):
+            url = twilio_api_url(url)
+            with external_call('twilio', method.upper()) as call:
+                response = super().request(method, url, *args, **kwargs)
+                call.ok = response.status_code < 400
+            return response
+
+    return TimedHttpClient()
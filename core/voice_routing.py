@@ -0,0 +1,214 @@
+"""
+Time budget for /voice.
+
+Twilio plays nothing while it waits for the TwiML, so /voice gets
+VOICE_DEADLINE_MS for its database work. Each step runs on a small thread
+pool and the handler stops waiting once the budget is spent:
+
+- saving the call row (lookup, contact tracking, commit): left to the
+  'voice' journal event, whose projection creates the row; if the late
+  write lands anyway, the unique call_sid keeps a single row
+- active Lovable agents: the identities last read by this process are
+  dialed instead; with none cached the caller goes straight to voicemail
+
+Every skipped step is logged and counted (voice_fallbacks_total in
+/metrics, GET /admin/voice_fallbacks for this process).
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional
+
+from flask import current_app
+
+from core.config import Config
+from core.database import db
+from core.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+STEP_WORKERS = 8
+JOURNAL_MIN_SECONDS = 0.1  # The voice event gets at least this long before it is spooled
+RECENT_FALLBACKS = 20
+
+
+class VoiceBudget:
+    """Deadline of one /voice request; run each database step through it"""
+
+    def __init__(self, call_sid: str, seconds: float):
+        self.call_sid = call_sid
+        self.deadline = time.monotonic() + seconds if seconds > 0 else None
+        self.skipped: List[str] = []
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (None = no budget)"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def journal_deadline(self) -> Optional[float]:
+        """Deadline for the journal write that ends the request"""
+        remaining = self.remaining()
+        return None if remaining is None else max(remaining, JOURNAL_MIN_SECONDS)
+
+    def run(self, step: str, fn: Callable[..., Any], *args, default: Any = None, **kwargs) -> Any:
+        """
+        fn(*args, **kwargs) on a step thread (own app context and session),
+        waiting at most the remaining budget. Returns default if it failed or
+        did not finish in time - a step already running is not cancelled.
+        """
+        remaining = self.remaining()
+        try:
+            if remaining is None:
+                return fn(*args, **kwargs)
+            if remaining <= 0:
+                raise FutureTimeoutError()
+            future = _get_executor().submit(
+                contextvars.copy_context().run, _run_step, current_app._get_current_object(),
+                self.deadline, fn, args, kwargs
+            )
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            self.skip(step, 'deadline', f"not done within {Config.VOICE_DEADLINE_MS}ms")
+        except Exception as e:
+            if remaining is None:
+                db.session.rollback()
+            self.skip(step, 'error', f"{type(e).__name__}: {e}")
+        return default
+
+    def skip(self, step: str, reason: str, detail: str) -> None:
+        self.skipped.append(step)
+        logger.warning(f"[VOICE] {self.call_sid}: {step} skipped ({detail[:300]}) - answering with fallback")
+        _stats.record_skip(self.call_sid, step, reason, detail)
+
+    def finish(self) -> None:
+        _stats.record_request(fallback=bool(self.skipped))
+
+
+def _run_step(app, deadline: float, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    if time.monotonic() >= deadline:
+        return None  # Queued behind slow steps: the request already answered without it
+    with app.app_context():
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            db.session.rollback()
+            if time.monotonic() >= deadline:
+                logger.info(f"[VOICE] Late step {getattr(fn, '__name__', fn)} failed after the answer: {e}")
+            raise
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=STEP_WORKERS, thread_name_prefix='voice-step')
+    return _executor
+
+
+# ============== CACHED ROUTING STATE ==============
+
+class AgentIdentities:
+    """Client identities of the active users, as last read (the fallback's dial list)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._identities: Optional[List[str]] = None
+        self._loaded_at = 0.0
+
+    def set(self, identities: List[str]) -> None:
+        with self._lock:
+            self._identities = list(identities)
+            self._loaded_at = time.monotonic()
+
+    def get(self) -> Optional[List[str]]:
+        with self._lock:
+            return None if self._identities is None else list(self._identities)
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._identities is None:
+                return {'cached': False}
+            return {'cached': True, 'count': len(self._identities),
+                    'age_seconds': round(time.monotonic() - self._loaded_at, 1)}
+
+
+_agent_identities = AgentIdentities()
+
+
+def load_agent_identities() -> List[str]:
+    """Active users' client identities (same format as /token); refreshes the cache"""
+    from models.user import User
+
+    identities = [
+        ''.join(c for c in user.email if c.isalnum() or c in '_-')
+        for user in User.query.filter_by(is_active=True).all()
+    ]
+    _agent_identities.set(identities)
+    return identities
+
+
+def resolve_agent_identities(budget: VoiceBudget) -> Optional[List[str]]:
+    """Identities to dial: fresh if the query fits the budget, else cached (None = nothing cached)"""
+    identities = budget.run('agents', load_agent_identities)
+    if identities is None:
+        identities = _agent_identities.get()
+        logger.warning(f"[VOICE] {budget.call_sid}: dialing cached agents {identities} "
+                       f"({_agent_identities.stats()})")
+    return identities
+
+
+# ============== STATS ==============
+
+class _FallbackStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.fallbacks = 0
+        self.by_step: dict = {}
+        self.recent: deque = deque(maxlen=RECENT_FALLBACKS)
+
+    def record_request(self, fallback: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.fallbacks += fallback
+
+    def record_skip(self, call_sid: str, step: str, reason: str, detail: str) -> None:
+        with self._lock:
+            key = f"{step}:{reason}"
+            self.by_step[key] = self.by_step.get(key, 0) + 1
+            self.recent.append({'call_sid': call_sid, 'step': step, 'reason': reason,
+                                'detail': detail[:300], 'at': time.strftime('%Y-%m-%dT%H:%M:%S')})
+        if Config.METRICS_ENABLED:
+            get_registry().inc('voice_fallbacks_total', labels=(('step', step), ('reason', reason)))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'fallbacks': self.fallbacks,
+                'fallback_rate': round(self.fallbacks / self.requests, 4) if self.requests else 0.0,
+                'by_step': dict(self.by_step),
+                'recent': list(self.recent),
+            }
+
+
+_stats = _FallbackStats()
+
+
+def get_voice_stats() -> dict:
+    """Fallbacks answered by this process since it started"""
+    return {
+        'deadline_ms': Config.VOICE_DEADLINE_MS,
+        'agent_identities': _agent_identities.stats(),
+        **_stats.snapshot(),
+    }
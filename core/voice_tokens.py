@@ -0,0 +1,122 @@
+"""
+Voice SDK access token cache.
+
+The browser asks /token on every reconnect, tab reload and refresh timer.
+Tokens are cached per identity and reused until VOICE_TOKEN_REFRESH_FRACTION
+of VOICE_TOKEN_TTL has elapsed; after that a new token is minted, so clients
+always get a token with most of its lifetime left.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from twilio.jwt.access_token import AccessToken
+from twilio.jwt.access_token.grants import VoiceGrant
+
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _Token:
+    __slots__ = ('jwt', 'issued_at', 'expires_at', 'fingerprint')
+
+    def __init__(self, jwt: str, issued_at: float, expires_at: float, fingerprint: tuple):
+        self.jwt = jwt
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self.fingerprint = fingerprint
+
+
+class VoiceTokenCache:
+    """Per-identity cache of Voice SDK tokens (thread-safe, LRU bounded)"""
+
+    def __init__(self, ttl: int, refresh_fraction: float, max_size: int,
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.refresh_fraction = min(max(refresh_fraction, 0.0), 1.0)
+        self.max_size = max(1, max_size)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens: "OrderedDict[str, _Token]" = OrderedDict()
+        self._stats = {'hits': 0, 'minted': 0, 'refreshed': 0, 'evictions': 0}
+
+    @staticmethod
+    def _fingerprint() -> tuple:
+        """Credentials the token was minted with (rotating them invalidates cached tokens)"""
+        return (Config.TWILIO_ACCOUNT_SID, Config.TWILIO_API_KEY, Config.TWILIO_TWIML_APP_SID)
+
+    def _mint(self, identity: str, now: float) -> _Token:
+        token = AccessToken(
+            Config.TWILIO_ACCOUNT_SID,
+            Config.TWILIO_API_KEY,
+            Config.TWILIO_API_SECRET,
+            identity=identity,
+            ttl=self.ttl
+        )
+        token.add_grant(VoiceGrant(
+            outgoing_application_sid=Config.TWILIO_TWIML_APP_SID,
+            incoming_allow=True  # Permite receber chamadas
+        ))
+        return _Token(token.to_jwt(), now, now + self.ttl, self._fingerprint())
+
+    def get(self, identity: str) -> Tuple[str, int]:
+        """
+        Token for identity and its remaining lifetime in seconds.
+
+        Reuses the cached token while it is younger than
+        refresh_fraction * ttl, otherwise mints a new one.
+        """
+        now = self._clock()
+        with self._lock:
+            cached = self._tokens.get(identity)
+            if cached is not None:
+                if (now - cached.issued_at < self.ttl * self.refresh_fraction
+                        and cached.fingerprint == self._fingerprint()):
+                    self._tokens.move_to_end(identity)
+                    self._stats['hits'] += 1
+                    return cached.jwt, int(cached.expires_at - now)
+
+        token = self._mint(identity, now)
+
+        with self._lock:
+            self._stats['refreshed' if cached is not None else 'minted'] += 1
+            self._tokens[identity] = token
+            self._tokens.move_to_end(identity)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+                self._stats['evictions'] += 1
+        return token.jwt, self.ttl
+
+    def invalidate(self, identity: Optional[str] = None) -> None:
+        """Drop one identity (or every token)"""
+        with self._lock:
+            if identity is None:
+                self._tokens.clear()
+            else:
+                self._tokens.pop(identity, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'size': len(self._tokens), **self._stats}
+
+
+_voice_token_cache: Optional[VoiceTokenCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_voice_token_cache() -> VoiceTokenCache:
+    """Get the voice token cache singleton"""
+    global _voice_token_cache
+    if _voice_token_cache is None:
+        with _cache_lock:
+            if _voice_token_cache is None:
+                _voice_token_cache = VoiceTokenCache(
+                    ttl=Config.VOICE_TOKEN_TTL,
+                    refresh_fraction=Config.VOICE_TOKEN_REFRESH_FRACTION,
+                    max_size=Config.VOICE_TOKEN_CACHE_MAX_SIZE
+                )
+    return _voice_token_cache
@@ -0,0 +1,319 @@
+"""
+Local disk spool for webhook events the database could not take.
+
+When the call_events INSERT fails or takes longer than
+WEBHOOK_DB_DEADLINE_MS, the webhook appends the event to an append-only
+segment file here and returns; a replayer thread drains the segments into
+the journal, oldest first, once the database answers again.
+
+- Group commit: concurrent appends share one fsync (the first writer waits
+  WEBHOOK_SPOOL_FSYNC_MS for others to join, then syncs for all of them);
+  append() returns only after the record is on disk
+- One active segment per process, locked with flock while open; segments
+  of a process that died are unlocked and drained by any other worker
+- After a failure the worker stays degraded and spools every event until a
+  replay drained its segments: the segment written during a drain is sealed
+  and drained in turn, and the worker goes back to the database once a
+  drain ends with nothing new spooled (appends never wait on the database)
+- Replay is idempotent (every event carries a dedupe key): a segment is
+  replayed from the start after a failure and deleted once fully inserted
+- pending_call_sids() lists the calls with events still on disk, so the
+  projector can hold them back instead of folding the later events that
+  other workers journaled directly
+
+The spool is per host - put WEBHOOK_SPOOL_DIR on a volume that survives a
+container restart.
+"""
+
+import fcntl
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from core.config import Config
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = '.jsonl'
+REPLAY_CHUNK_SIZE = 200
+REPLAY_ROUNDS = 3  # Drains of the segment written meanwhile before giving up until the next pass
+
+
+class WebhookSpool:
+    """Append-only JSON-lines segments with batched fsync"""
+
+    def __init__(self, directory: str, fsync_window: float):
+        self.directory = directory
+        self.fsync_window = fsync_window
+        self._cond = threading.Condition()
+        self._fd: Optional[int] = None
+        self._path: Optional[str] = None
+        self._appended = 0  # Records written (not necessarily synced)
+        self._synced = 0
+        self._syncing = False
+        self.degraded: Optional[str] = None  # Why writes go to disk (None = database healthy)
+        self._degraded_at = 0.0
+        self.spooled = 0
+        self.replayed = 0
+        self.fsyncs = 0
+        # pending_call_sids(): bytes already read and call_sids found, per segment
+        self._scanned: Dict[str, Tuple[int, Set[str]]] = {}
+        self._scan_lock = threading.Lock()
+
+    # ---------- writing ----------
+
+    def _open_segment(self) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        final = os.path.join(self.directory, f"{time.time_ns():020d}-{os.getpid()}{SEGMENT_SUFFIX}")
+        # Lock before the name is visible: a replayer must never take a segment still being written
+        fd = os.open(final + '.open', os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o640)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        os.rename(final + '.open', final)
+        self._fsync_directory()
+        self._fd, self._path = fd, final
+        return fd
+
+    def _fsync_directory(self) -> None:
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    def append(self, record: dict) -> None:
+        """Write one record and wait until it is fsynced (raises OSError if the disk fails)"""
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._cond:
+            fd = self._fd if self._fd is not None else self._open_segment()
+            os.write(fd, line)  # O_APPEND: one write per record
+            self._appended += 1
+            target = self._appended
+            self.spooled += 1
+
+            while self._synced < target:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                # This thread syncs for everyone that appended meanwhile
+                self._syncing = True
+                self._cond.release()
+                try:
+                    if self.fsync_window > 0:
+                        time.sleep(self.fsync_window)
+                    with self._cond:
+                        fd, upto = self._fd, self._appended
+                    os.fsync(fd)
+                    self.fsyncs += 1
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._synced = max(self._synced, upto)
+
+    def seal(self) -> Optional[str]:
+        """Close the active segment (the next append starts a new one). Returns its path."""
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            if self._fd is None:
+                return None
+            fd, path = self._fd, self._path
+            os.fsync(fd)
+            self._synced = self._appended
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+            self._fd = self._path = None
+            return path
+
+    # ---------- reading ----------
+
+    def segments(self) -> List[str]:
+        """Segment files on this host, oldest first (includes other workers' active segments)"""
+        return sorted(glob.glob(os.path.join(self.directory, f'*{SEGMENT_SUFFIX}')))
+
+    def has_pending(self) -> bool:
+        return self._fd is not None or bool(self.segments())
+
+    def pending_call_sids(self) -> Set[str]:
+        """call_sids with events in a segment on this host (spooled, not journaled yet)"""
+        with self._scan_lock:
+            paths = self.segments()
+            for path in set(self._scanned) - set(paths):
+                del self._scanned[path]
+            call_sids: Set[str] = set()
+            for path in paths:
+                offset, found = self._scanned.get(path, (0, set()))
+                try:
+                    with open(path, 'rb') as f:
+                        f.seek(offset)
+                        data = f.read()
+                except FileNotFoundError:
+                    continue  # Replayed meanwhile
+                end = data.rfind(b'\n') + 1  # A line still being written is read next time
+                for line in data[:end].split(b'\n'):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and record.get('call_sid'):
+                        found.add(record['call_sid'])
+                self._scanned[path] = (offset + end, found)
+                call_sids |= found
+            return call_sids
+
+    def trip(self, reason: str) -> None:
+        """Send this worker's events to disk until a replay succeeds"""
+        if self.degraded is None:
+            logger.warning(f"[SPOOL] Database writes degraded ({reason}) - spooling webhooks to disk")
+            self._degraded_at = time.monotonic()
+        self.degraded = reason
+
+    def replay(self, insert: Callable[[List[dict]], None]) -> dict:
+        """
+        Drain every segment no live writer holds, oldest first, then hand
+        this worker back to the database.
+
+        insert(records) must be idempotent and raise if the database is
+        still unavailable; the segment is then kept for the next pass.
+        """
+        result = {'segments': 0, 'records': 0, 'remaining': 0}
+        self.seal()
+        for path in self.segments():
+            self._replay_segment(path, insert, result)
+
+        # Events spooled during the replay: drain them too, then new events go
+        # to the database again (after the spooled ones)
+        for _ in range(REPLAY_ROUNDS):
+            path = self.seal()
+            if path is not None:
+                self._replay_segment(path, insert, result)
+                if os.path.exists(path):
+                    break  # Held by another worker's replayer: stay degraded
+            with self._cond:
+                if self._fd is not None:
+                    continue  # Spooled while draining
+                if self.degraded is not None:
+                    logger.info(f"[SPOOL] Database healthy again after {time.monotonic() - self._degraded_at:.1f}s "
+                                f"({self.replayed} events replayed so far)")
+                    self.degraded = None
+                break
+        return result
+
+    def _replay_segment(self, path: str, insert: Callable[[List[dict]], None], result: dict) -> None:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return  # Drained by another worker
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                result['remaining'] += 1  # Another worker's active segment (or its replayer)
+                return
+            if not os.path.exists(path):
+                return
+            records = _read_records(fd, path)
+            for start in range(0, len(records), REPLAY_CHUNK_SIZE):
+                insert(records[start:start + REPLAY_CHUNK_SIZE])
+            os.unlink(path)
+            self._fsync_directory()
+            result['segments'] += 1
+            result['records'] += len(records)
+            self.replayed += len(records)
+            logger.info(f"[SPOOL] Replayed {len(records)} events from {os.path.basename(path)}")
+        finally:
+            os.close(fd)
+
+    def stats(self) -> dict:
+        segments = self.segments()
+        return {
+            'directory': self.directory,
+            'degraded': self.degraded,
+            'segments': len(segments),
+            'pending_calls': len(self.pending_call_sids()),  # Held back by the projector
+            'bytes': sum(os.path.getsize(path) for path in segments if os.path.exists(path)),
+            'this_process': {'spooled': self.spooled, 'replayed': self.replayed, 'fsyncs': self.fsyncs},
+        }
+
+
+def _read_records(fd: int, path: str) -> List[dict]:
+    with os.fdopen(os.dup(fd), 'rb') as f:
+        data = f.read()
+    records = []
+    for number, line in enumerate(data.split(b'\n'), start=1):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # A torn last line from a crash mid-write (never acknowledged to Twilio)
+            logger.warning(f"[SPOOL] Skipping unreadable line {number} of {os.path.basename(path)}")
+    return records
+
+
+# ============== REPLAYER ==============
+
+_spool: Optional[WebhookSpool] = None
+_replayer_thread: Optional[threading.Thread] = None
+_wake_event = threading.Event()
+_stop_event = threading.Event()
+
+
+def get_webhook_spool() -> Optional[WebhookSpool]:
+    """Get the spool singleton (None if WEBHOOK_SPOOL_ENABLED is off)"""
+    global _spool
+    if _spool is None and Config.WEBHOOK_SPOOL_ENABLED:
+        _spool = WebhookSpool(
+            os.environ.get('WEBHOOK_SPOOL_DIR') or os.path.join(tempfile.gettempdir(), 'twilio-webhook-spool'),
+            Config.WEBHOOK_SPOOL_FSYNC_MS / 1000
+        )
+    return _spool
+
+
+def spool_event(record: dict, reason: str) -> None:
+    """Append to the spool (the worker stays degraded until a replay) and wake the replayer"""
+    spool = get_webhook_spool()
+    spool.trip(reason)
+    spool.append(record)
+    _wake_event.set()
+
+
+def start_spool_replayer(app, insert: Callable[[List[dict]], None],
+                         after_replay: Optional[Callable[[], None]] = None) -> bool:
+    """
+    Drain the spool in background (no-op if the spool is disabled).
+    Also picks up segments left by a previous run or a dead worker.
+    """
+    global _replayer_thread
+    spool = get_webhook_spool()
+    if spool is None or (_replayer_thread is not None and _replayer_thread.is_alive()):
+        return False
+
+    def _loop():
+        while not _stop_event.is_set():
+            if spool.degraded is not None or spool.has_pending():
+                try:
+                    with app.app_context():
+                        result = spool.replay(insert)
+                        if result['records'] and after_replay is not None:
+                            after_replay()
+                except Exception as e:
+                    logger.warning(f"[SPOOL] Replay deferred, database still unavailable: {e}")
+            _wake_event.wait(Config.WEBHOOK_SPOOL_REPLAY_INTERVAL)
+            _wake_event.clear()
+
+    _stop_event.clear()
+    _replayer_thread = threading.Thread(target=_loop, name='webhook-spool-replayer', daemon=True)
+    _replayer_thread.start()
+    logger.info(f"[SPOOL] Replayer started ({spool.directory})")
+    return True
+
+
+def stop_spool_replayer() -> None:
+    _stop_event.set()
+    _wake_event.set()
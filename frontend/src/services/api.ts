@@ -5,9 +5,15 @@ const API_BASE_URL = 'https://twilio-solutions-production.up.railway.app';
 
 let authToken: string | null = null;
 
+// Read-your-writes: the backend returns X-DB-Write-Token after a write; sending it
+// back keeps our next reads on the primary database instead of the replica
+const DB_WRITE_TOKEN_HEADER = 'X-DB-Write-Token';
+let dbWriteToken: string | null = null;
+
 // Token management
 export const setAuthToken = (token: string | null) => {
   authToken = token;
+  dbWriteToken = null;
 };
 
 export const getAuthToken = () => authToken;
@@ -32,12 +38,20 @@ const apiRequest = async <T>(
   if (authToken) {
     (headers as Record<string, string>)['Authorization'] = `Bearer ${authToken}`;
   }
+  if (dbWriteToken) {
+    (headers as Record<string, string>)[DB_WRITE_TOKEN_HEADER] = dbWriteToken;
+  }
 
   const response = await fetch(`${API_BASE_URL}${endpoint}`, {
     ...options,
     headers,
   });
 
+  const writeToken = response.headers.get(DB_WRITE_TOKEN_HEADER);
+  if (writeToken) {
+    dbWriteToken = writeToken;
+  }
+
   if (!response.ok) {
     // Handle 401 Unauthorized - token expired or invalid
     if (response.status === 401 && onUnauthorized) {
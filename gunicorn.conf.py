@@ -0,0 +1,59 @@
+"""
+Gunicorn configuration.
+
+The app is preloaded once in the master (imports, Flask app, Swagger,
+models) and forked into the workers, which share that memory copy-on-write
+instead of each importing everything again. Preloading turns on LAZY_STARTUP:
+the master creates missing tables once, and each worker starts its own
+background threads after fork.
+
+Set GUNICORN_PRELOAD=false for the old per-worker startup.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+# Recycle workers after N requests (+ jitter so they don't all restart together); 0 = never
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max(0, max_requests // 10)
+accesslog = '-'
+errorlog = '-'
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+if preload_app:
+    # Must be set before app.py (and core.config) is imported by the master
+    os.environ.setdefault('LAZY_STARTUP', 'true')
+
+
+def on_starting(server):
+    """Master, once: create missing tables (skipped at import with LAZY_STARTUP)"""
+    if not preload_app:
+        return
+    from app import app
+    from core.database import create_tables
+    try:
+        create_tables(app)
+    except Exception as e:
+        server.log.error(f"[STARTUP ERROR] Database initialization failed: {e}")
+
+
+def post_fork(server, worker):
+    """Worker: drop DB connections inherited from the master, start background threads"""
+    from core.memory import set_recycle_handler
+
+    def recycle():
+        # Same as max_requests: stop accepting, finish in-flight requests, exit;
+        # the master forks a replacement
+        server.log.warning(f"[MEMORY] Recycling worker {worker.pid}")
+        worker.alive = False
+
+    set_recycle_handler(recycle)
+    if not preload_app:
+        return
+    from app import app, start_background_services
+    from core.database import dispose_engines
+    dispose_engines(app)
+    start_background_services()
@@ -1,4 +1,10 @@
 from models.user import User
 from models.call import Call
+from models.attio_person import AttioPerson, AttioPersonPhone, AttioSyncState
+from models.attio_note import AttioNoteOutbox
+from models.phone_number import PhoneNumber
+from models.campaign import Campaign, CampaignLead, DialerLease
+from models.call_event import CallEvent, ProjectorCheckpoint
 
-__all__ = ['User', 'Call']
+__all__ = ['User', 'Call', 'AttioPerson', 'AttioPersonPhone', 'AttioSyncState', 'AttioNoteOutbox', 'PhoneNumber',
+           'Campaign', 'CampaignLead', 'DialerLease', 'CallEvent', 'ProjectorCheckpoint']
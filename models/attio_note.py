@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+from core.database import db, UTCDateTime
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class AttioNoteOutbox(db.Model):
+    """Pending Attio note write (flushed to Attio by the outbox worker)"""
+    __tablename__ = 'attio_note_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(128), unique=True, nullable=False, index=True)
+    record_id = db.Column(db.String(64))  # Attio record ID (NULL = resolver pelo lead_phone)
+    lead_phone = db.Column(db.String(20))  # Telefone do lead, usado para achar o record_id
+    call_sid = db.Column(db.String(50), index=True)  # Chamada de origem (resumo)
+    title = db.Column(db.String(255), default='Call Log')
+    content = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(UTCDateTime, default=utcnow, index=True)
+    claimed_at = db.Column(UTCDateTime)
+    first_attempt_at = db.Column(UTCDateTime)  # Primeiro envio (retry ambíguo só procura notas a partir daqui)
+    last_error = db.Column(db.Text)
+    attio_note_id = db.Column(db.String(64))
+    created_at = db.Column(UTCDateTime, default=utcnow)
+    sent_at = db.Column(UTCDateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'idempotency_key': self.idempotency_key,
+            'record_id': self.record_id,
+            'call_sid': self.call_sid,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'attio_note_id': self.attio_note_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+    def __repr__(self):
+        return f'<AttioNoteOutbox {self.id} - {self.status}>'
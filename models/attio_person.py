@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from core.database import db, UTCDateTime
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class AttioPerson(db.Model):
+    """Local mirror of an Attio person record (same fields as AttioClient._format_person)"""
+    __tablename__ = 'attio_people'
+
+    id = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    name = db.Column(db.String(255))
+    email = db.Column(db.String(255))
+    phone = db.Column(db.String(30))
+    phone_normalized = db.Column(db.String(10), index=True)  # Últimos 10 dígitos do telefone principal
+    state = db.Column(db.String(50))
+    city = db.Column(db.String(100))
+    case_type = db.Column(db.String(100))
+    classification = db.Column(db.String(100))
+    description = db.Column(db.Text)
+    attorney_info = db.Column(db.Text)
+    # Campos customizados com tipo variável no Attio (select, checkbox, número)
+    has_attorney = db.Column(db.JSON)
+    advance_seeking = db.Column(db.JSON)
+    advance_value = db.Column(db.JSON)
+    workers_comp = db.Column(db.JSON)
+    raw = db.Column(db.JSON)
+
+    record_created_at = db.Column(UTCDateTime, index=True)  # created_at no Attio
+    synced_at = db.Column(UTCDateTime, default=utcnow, onupdate=utcnow, index=True)  # Refresh do índice de contatos
+
+    # Todos os telefones do registro (o lead pode ligar de um número secundário)
+    phones = db.relationship('AttioPersonPhone', backref='person', lazy='select', cascade='all, delete-orphan')
+
+    def to_lead_dict(self, include_raw=False):
+        """Same shape as AttioClient._format_person"""
+        lead = {
+            'id': self.record_id,
+            'name': self.name or '',
+            'email': self.email or '',
+            'phone': self.phone or '',
+            'state': self.state or '',
+            'city': self.city or '',
+            'case_type': self.case_type or '',
+            'classification': self.classification or '',
+            'description': self.description or '',
+            'attorney_info': self.attorney_info or '',
+            'has_attorney': self.has_attorney if self.has_attorney is not None else '',
+            'advance_seeking': self.advance_seeking if self.advance_seeking is not None else '',
+            'advance_value': self.advance_value if self.advance_value is not None else '',
+            'workers_comp': self.workers_comp if self.workers_comp is not None else '',
+        }
+        if include_raw:
+            lead['raw'] = self.raw
+        return lead
+
+    def to_contact_dict(self):
+        """Same shape as AttioClient._format_person_simple"""
+        return {
+            'id': self.record_id,
+            'name': self.name or 'Sem nome',
+            'phone': self.phone or '',
+            'state': self.state or '',
+        }
+
+    def __repr__(self):
+        return f'<AttioPerson {self.record_id} - {self.name}>'
+
+
+class AttioPersonPhone(db.Model):
+    """One phone number of a mirrored person (lookup key for find_person_by_phone)"""
+    __tablename__ = 'attio_person_phones'
+    __table_args__ = (
+        db.UniqueConstraint('person_id', 'phone_normalized', name='uq_attio_person_phones'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    person_id = db.Column(db.Integer, db.ForeignKey('attio_people.id', ondelete='CASCADE'), nullable=False)
+    phone_normalized = db.Column(db.String(10), nullable=False, index=True)  # Últimos 10 dígitos
+
+    def __repr__(self):
+        return f'<AttioPersonPhone {self.phone_normalized}>'
+
+
+class AttioSyncState(db.Model):
+    """Cursor and lease for the incremental Attio mirror sync (one row per object)"""
+    __tablename__ = 'attio_sync_state'
+
+    name = db.Column(db.String(50), primary_key=True)  # ex: 'people'
+    cursor_created_at = db.Column(db.String(40))  # ISO timestamp do último record sincronizado
+    cursor_offset = db.Column(db.Integer, default=0)  # Records já vistos com created_at == cursor
+    records_synced = db.Column(db.Integer, default=0)
+    full_sync_started_at = db.Column(UTCDateTime)
+    full_sync_completed_at = db.Column(UTCDateTime)  # Último passe completo (antes disso, misses vão para a API)
+    last_run_at = db.Column(UTCDateTime)
+    last_success_at = db.Column(UTCDateTime)
+    last_error = db.Column(db.Text)
+    lease_owner = db.Column(db.String(100))
+    lease_expires_at = db.Column(UTCDateTime)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'cursor_created_at': self.cursor_created_at,
+            'cursor_offset': self.cursor_offset,
+            'records_synced': self.records_synced,
+            'full_sync_started_at': self.full_sync_started_at.isoformat() if self.full_sync_started_at else None,
+            'full_sync_completed_at': self.full_sync_completed_at.isoformat() if self.full_sync_completed_at else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_success_at': self.last_success_at.isoformat() if self.last_success_at else None,
+            'last_error': self.last_error,
+        }
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from core.database import db
+from core.database import db, UTCDateTime
 
 
 def utcnow():
@@ -33,11 +33,11 @@ class Call(db.Model):
     # Notes/Summary for Attio integration
     resumo = db.Column(db.Text)  # Resumo/notas da ligação (para enviar ao Attio)
 
-    started_at = db.Column(db.DateTime(timezone=True))
-    answered_at = db.Column(db.DateTime(timezone=True))
-    ended_at = db.Column(db.DateTime(timezone=True))
-    created_at = db.Column(db.DateTime(timezone=True), default=utcnow)
-    updated_at = db.Column(db.DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+    started_at = db.Column(UTCDateTime)
+    answered_at = db.Column(UTCDateTime)
+    ended_at = db.Column(UTCDateTime)
+    created_at = db.Column(UTCDateTime, default=utcnow)
+    updated_at = db.Column(UTCDateTime, default=utcnow, onupdate=utcnow)
 
     def to_dict(self):
         return {
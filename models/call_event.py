@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from core.database import db, UTCDateTime
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class CallEvent(db.Model):
+    """Raw Twilio webhook payload (append-only journal, folded into calls by core.call_events)"""
+    __tablename__ = 'call_events'
+    __table_args__ = (
+        db.Index('ix_call_events_call_sid_id', 'call_sid', 'id'),
+        # Eventos ainda não projetados (o projetor só lê estes)
+        db.Index('ix_call_events_unprojected', 'id',
+                 postgresql_where=db.text('projected_at IS NULL'), sqlite_where=db.text('projected_at IS NULL')),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # Ordem de projeção
+    source = db.Column(db.String(30), nullable=False)  # Webhook de origem (call_status, inbound_status, ...)
+    call_sid = db.Column(db.String(50))  # Chamada afetada (pai para outbound-dial, TASK:<sid> antes do CallSid)
+    task_sid = db.Column(db.String(50), index=True)  # TaskRouter: liga eventos TASK:<sid> à chamada real
+    dedupe_key = db.Column(db.String(100), unique=True)  # I-Twilio-Idempotency-Token (retries do Twilio)
+    payload = db.Column(db.Text, nullable=False)  # request.form em JSON
+    received_at = db.Column(UTCDateTime, default=utcnow, nullable=False)  # Quando o webhook chegou
+    journaled_at = db.Column(UTCDateTime, default=utcnow)  # INSERT no journal (mais tarde se veio do spool)
+    projected_at = db.Column(UTCDateTime)  # Quando foi aplicado à chamada (NULL = pendente)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source': self.source,
+            'call_sid': self.call_sid,
+            'task_sid': self.task_sid,
+            'payload': self.payload,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'journaled_at': self.journaled_at.isoformat() if self.journaled_at else None,
+            'projected_at': self.projected_at.isoformat() if self.projected_at else None
+        }
+
+    def __repr__(self):
+        return f'<CallEvent {self.id} - {self.source} {self.call_sid}>'
+
+
+class ProjectorCheckpoint(db.Model):
+    """Projector lease (one process projects at a time) and its progress"""
+    __tablename__ = 'projector_checkpoints'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_event_id = db.Column(db.Integer, default=0, nullable=False)  # Maior id já projetado (informativo)
+    lease_owner = db.Column(db.String(100))  # host:pid que está projetando
+    lease_expires_at = db.Column(UTCDateTime)
+    last_error = db.Column(db.Text)  # Último evento que falhou (pulado; refaça com rebuild)
+    updated_at = db.Column(UTCDateTime, default=utcnow, onupdate=utcnow)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'last_event_id': self.last_event_id,
+            'lease_owner': self.lease_owner,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'last_error': self.last_error,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<ProjectorCheckpoint {self.name} @ {self.last_event_id}>'
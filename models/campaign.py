@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from core.database import db, UTCDateTime
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class Campaign(db.Model):
+    """Outbound dialer campaign (lead list + pacing and attempt limits)"""
+    __tablename__ = 'campaigns'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), default='draft', index=True)  # draft, running, paused, completed, canceled
+    calls_per_second = db.Column(db.Float, default=1.0)  # Ritmo de discagem (limitado pelo CPS da conta)
+    max_attempts = db.Column(db.Integer, default=3)  # Tentativas totais por lead nesta campanha
+    max_attempts_per_day = db.Column(db.Integer, default=2)  # Limite por dia local do lead (contact_number_today)
+    retry_delay_minutes = db.Column(db.Integer, default=60)  # Espera entre tentativas sem resposta
+    created_by = db.Column(db.String(255))  # Email de quem criou
+    lease_owner = db.Column(db.String(100))  # Worker que está discando a campanha
+    lease_expires_at = db.Column(UTCDateTime)
+    created_at = db.Column(UTCDateTime, default=utcnow)
+    started_at = db.Column(UTCDateTime)
+    completed_at = db.Column(UTCDateTime)
+    updated_at = db.Column(UTCDateTime, default=utcnow, onupdate=utcnow)
+
+    leads = db.relationship('CampaignLead', backref='campaign', lazy='dynamic', cascade='all, delete-orphan')
+
+    def to_dict(self, lead_counts=None):
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'calls_per_second': self.calls_per_second,
+            'max_attempts': self.max_attempts,
+            'max_attempts_per_day': self.max_attempts_per_day,
+            'retry_delay_minutes': self.retry_delay_minutes,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+        if lead_counts is not None:
+            data['leads'] = lead_counts
+        return data
+
+    def __repr__(self):
+        return f'<Campaign {self.id} - {self.name} ({self.status})>'
+
+
+class CampaignLead(db.Model):
+    """Lead in a campaign and its dialing state"""
+    __tablename__ = 'campaign_leads'
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'phone_number', name='uq_campaign_leads_phone'),
+        db.Index('ix_campaign_leads_due', 'campaign_id', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=False, index=True)
+    phone_number = db.Column(db.String(20), nullable=False)  # E.164
+    name = db.Column(db.String(255))
+    lead_state = db.Column(db.String(2))
+    # pending, dialing, in_progress, completed, exhausted, failed
+    status = db.Column(db.String(20), default='pending', index=True)
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(UTCDateTime, default=utcnow)
+    claimed_at = db.Column(UTCDateTime)
+    last_call_sid = db.Column(db.String(50), index=True)
+    last_disposition = db.Column(db.String(30))
+    last_attempt_at = db.Column(UTCDateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(UTCDateTime, default=utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'campaign_id': self.campaign_id,
+            'phone_number': self.phone_number,
+            'name': self.name,
+            'lead_state': self.lead_state,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_call_sid': self.last_call_sid,
+            'last_disposition': self.last_disposition,
+            'last_attempt_at': self.last_attempt_at.isoformat() if self.last_attempt_at else None,
+            'last_error': self.last_error
+        }
+
+    def __repr__(self):
+        return f'<CampaignLead {self.phone_number} - {self.status}>'
+
+
+class DialerLease(db.Model):
+    """Dialer-wide lease: only the holder schedules, so pacing and capacity are account-wide"""
+    __tablename__ = 'dialer_leases'
+
+    name = db.Column(db.String(50), primary_key=True)  # ex: 'scheduler'
+    lease_owner = db.Column(db.String(100))  # Worker que está agendando as chamadas
+    lease_expires_at = db.Column(UTCDateTime)
+    updated_at = db.Column(UTCDateTime, default=utcnow, onupdate=utcnow)
+
+    def __repr__(self):
+        return f'<DialerLease {self.name} - {self.lease_owner}>'
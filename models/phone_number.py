@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from core.database import db, UTCDateTime
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class PhoneNumber(db.Model):
+    """Twilio number in the outbound caller ID pool"""
+    __tablename__ = 'phone_numbers'
+
+    id = db.Column(db.Integer, primary_key=True)
+    phone_number = db.Column(db.String(20), unique=True, nullable=False, index=True)  # E.164
+    area_code = db.Column(db.String(3), index=True)
+    state = db.Column(db.String(2), index=True)  # Estado do DDD (NULL para toll-free)
+    label = db.Column(db.String(100))  # ex: "FL Miami 1"
+    max_calls_per_minute = db.Column(db.Integer)  # NULL = CALLER_ID_MAX_CALLS_PER_MINUTE
+    is_active = db.Column(db.Boolean, default=True, index=True)
+    created_at = db.Column(UTCDateTime, default=utcnow)
+    updated_at = db.Column(UTCDateTime, default=utcnow, onupdate=utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'phone_number': self.phone_number,
+            'area_code': self.area_code,
+            'state': self.state,
+            'label': self.label,
+            'max_calls_per_minute': self.max_calls_per_minute,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<PhoneNumber {self.phone_number} - {self.state}>'
@@ -1,5 +1,6 @@
 from datetime import datetime, timezone
-from core.database import db
+from core.config import Config
+from core.database import db, UTCDateTime
 import bcrypt
 
 
@@ -14,12 +15,12 @@ class User(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     name = db.Column(db.String(100))  # Nome do usuário (ex: Arthur, Eduarda)
     password_hash = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime(timezone=True), default=utcnow)
+    created_at = db.Column(UTCDateTime, default=utcnow)
     is_active = db.Column(db.Boolean, default=True)
 
     def set_password(self, password):
-        """Hash password with bcrypt"""
-        salt = bcrypt.gensalt()
+        """Hash password with bcrypt (synchronous - request handlers use auth.passwords)"""
+        salt = bcrypt.gensalt(Config.BCRYPT_ROUNDS)
         self.password_hash = bcrypt.hashpw(
             password.encode('utf-8'), salt
         ).decode('utf-8')
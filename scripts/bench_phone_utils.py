@@ -0,0 +1,100 @@
+"""
+Benchmark: per-row phone helpers vs. the batch functions in core.phone_utils.
+
+Generates N phone numbers in the formats seen in the calls table (E.164,
+11/10 digits, formatted, junk) and times:
+- scalar: get_state_from_phone / format_phone_number / normalize_phone per row
+- batch (NumPy): classify_phones
+- batch (pure Python fallback): classify_phones with NumPy disabled
+
+Usage:
+    python scripts/bench_phone_utils.py [N]   (default 1_000_000)
+"""
+
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import phone_utils
+from core.phone_utils import (
+    AREA_CODE_TO_STATE, AREA_CODE_TO_PROVINCE, NON_GEOGRAPHIC_AREA_CODES,
+    classify_phones, format_phone_number, get_state_from_phone, normalize_phone
+)
+
+FORMATS = [
+    lambda d: f'+1{d}',
+    lambda d: f'+1{d}',
+    lambda d: f'1{d}',
+    lambda d: d,
+    lambda d: f'({d[:3]}) {d[3:6]}-{d[6:]}',
+    lambda d: f'+1 {d[:3]}-{d[3:6]}-{d[6:]}',
+    lambda d: 'client:sdr_example_com',
+    lambda d: d[:7],
+]
+
+
+def generate_numbers(n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    area_codes = list(AREA_CODE_TO_STATE) + list(AREA_CODE_TO_PROVINCE) + list(NON_GEOGRAPHIC_AREA_CODES)
+    numbers = []
+    for _ in range(n):
+        digits = rng.choice(area_codes) + f'{rng.randrange(10_000_000):07d}'
+        numbers.append(rng.choice(FORMATS)(digits))
+    return numbers
+
+
+def scalar(numbers: list) -> dict:
+    return {
+        'state': [get_state_from_phone(n) for n in numbers],
+        'e164': [format_phone_number(n) for n in numbers],
+        'normalized': [normalize_phone(n) for n in numbers],
+    }
+
+
+def timed(label: str, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed * 1000:9.0f} ms")
+    return result, elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"[BENCH] Generating {n:,} numbers...")
+    numbers = generate_numbers(n)
+
+    print("[BENCH] Timings:")
+    expected, scalar_time = timed('scalar (per row)', scalar, numbers)
+
+    numpy_module = phone_utils.np
+    if numpy_module is not None:
+        batch, batch_time = timed('classify_phones (NumPy)', classify_phones, numbers)
+    else:
+        print("  classify_phones (NumPy)      skipped (numpy not installed)")
+        batch, batch_time = None, None
+
+    phone_utils.np = None
+    try:
+        fallback, _ = timed('classify_phones (Python)', classify_phones, numbers)
+    finally:
+        phone_utils.np = numpy_module
+
+    for result in filter(None, (batch, fallback)):
+        for key in ('state', 'e164', 'normalized'):
+            if result[key] != expected[key]:
+                print(f"[BENCH] MISMATCH in '{key}'")
+                sys.exit(1)
+    print("[BENCH] Results match the scalar functions")
+
+    if batch_time:
+        print(f"[BENCH] NumPy speedup: {scalar_time / batch_time:.1f}x "
+              f"(note: classify_phones also returns area code, country, category and timezone)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Benchmark: hot calls-table queries, with their EXPLAIN plans.
+
+Runs each scenario through the real code path (Flask test client for
+routes, _calculate_contact_tracking directly) against the configured
+database - fill it first with scripts/generate_calls.py. For every scenario
+it reports p50/p95/max latency and the SQL statements executed, and captures
+the plan of each distinct SELECT (SQLite: EXPLAIN QUERY PLAN; PostgreSQL:
+EXPLAIN, or EXPLAIN (ANALYZE, BUFFERS) with --analyze). Full table scans are
+flagged.
+
+Scenarios:
+- /calls (default and filtered by state / disposition / direction)
+- /calls/stats
+- /admin/analyze_calls for the busiest recent day
+- _calculate_contact_tracking for the most-contacted lead, a typical lead
+  and a new number
+
+Results go to --output as JSON; --compare OLD.json prints the change per
+scenario (e.g. before / after adding an index).
+
+Usage:
+    python scripts/bench_queries.py [--database-url URL] [--runs 5]
+        [--only calls,contact] [--analyze] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FULL_SCAN_MARKERS = ('SCAN calls', 'Seq Scan on calls')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Time hot calls-table queries and capture their plans')
+    parser.add_argument('--database-url', default=None, help='Default: DATABASE_URL')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--only', default='', help='Comma-separated scenario name prefixes')
+    parser.add_argument('--analyze', action='store_true', help='PostgreSQL: EXPLAIN (ANALYZE, BUFFERS)')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None, help='Previous --output file')
+    return parser.parse_args()
+
+
+class StatementCapture:
+    """Statements (and parameters) executed while active"""
+
+    def __init__(self):
+        self.active = False
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.statements.append((statement, parameters))
+
+
+def explain(engine, statement: str, parameters, analyze: bool) -> list:
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif dialect == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+    else:
+        prefix = 'EXPLAIN '
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    if dialect == 'sqlite':
+        # (id, parent, notused, detail): indent by depth
+        depth = {0: -1}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node_id] + detail)
+        return lines
+    return [row[0] for row in rows]
+
+
+def build_scenarios(app_module, engine):
+    """name -> zero-argument callable"""
+    from sqlalchemy import text
+
+    from auth.jwt_utils import create_token
+    from models.call import Call
+
+    client = app_module.app.test_client()
+    headers = {'Authorization': f'Bearer {create_token(1, "bench@example.com")}'}
+
+    def route(path):
+        def run():
+            response = client.get(path, headers=headers)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {path} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return run
+
+    with engine.connect() as conn:
+        busiest_lead = conn.execute(text(
+            "SELECT to_number, lead_state, COUNT(*) AS n FROM calls WHERE direction = 'outbound' "
+            "GROUP BY to_number, lead_state ORDER BY n DESC LIMIT 1"
+        )).first()
+        typical_lead = conn.execute(text(
+            "SELECT to_number, lead_state FROM calls WHERE direction = 'outbound' AND contact_number = 3 "
+            "ORDER BY id DESC LIMIT 1"
+        )).first()
+        last_call = conn.execute(text("SELECT created_at FROM calls ORDER BY id DESC LIMIT 1")).scalar()
+
+    scenarios = {
+        'calls': route('/calls'),
+        'calls_by_state': route('/calls?state=FL'),
+        'calls_by_disposition': route('/calls?disposition=voicemail'),
+        'calls_by_direction': route('/calls?direction=inbound&limit=200'),
+        'calls_stats': route('/calls/stats'),
+    }
+    if last_call is not None:
+        day = str(last_call)[:10]  # The latest day with data (string on SQLite, datetime elsewhere)
+        scenarios['analyze_calls'] = route(f'/admin/analyze_calls?date={day}')
+
+    def contact_tracking(to_number, state):
+        def run():
+            from datetime import datetime, timezone
+            call = Call(call_sid='CAbenchcontacttracking', direction='outbound', from_number='+18336411602',
+                        to_number=to_number, lead_state=state, started_at=datetime.now(timezone.utc))
+            with app_module.app.app_context():
+                app_module._calculate_contact_tracking(call)
+        return run
+
+    if busiest_lead is not None:
+        scenarios[f'contact_tracking_busiest ({busiest_lead.n} calls)'] = contact_tracking(*busiest_lead[:2])
+    if typical_lead is not None:
+        scenarios['contact_tracking_typical'] = contact_tracking(*typical_lead)
+    scenarios['contact_tracking_new_number'] = contact_tracking('+14075550123', 'FL')
+    return scenarios
+
+
+def run_scenario(name, fn, engine, capture, runs, warmup, analyze) -> dict:
+    for _ in range(warmup):
+        fn()
+    capture.statements = []
+    capture.active = True
+    try:
+        fn()  # Statements of one run
+    finally:
+        capture.active = False
+    statements = capture.statements
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    plans = []
+    seen = set()
+    for statement, parameters in statements:
+        if statement in seen or not statement.lstrip().upper().startswith('SELECT'):
+            continue
+        seen.add(statement)
+        try:
+            plan = explain(engine, statement, parameters, analyze)
+        except Exception as e:
+            plan = [f'EXPLAIN failed: {e}']
+        plans.append({
+            'sql': ' '.join(statement.split()),
+            'plan': plan,
+            'full_scan': any(marker in line and 'USING' not in line for line in plan for marker in FULL_SCAN_MARKERS),
+        })
+
+    ordered = sorted(timings)
+    return {
+        'name': name,
+        'runs': runs,
+        'p50_ms': round(statistics.median(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+        'statements': len(statements),
+        'plans': plans,
+    }
+
+
+def print_result(result: dict) -> None:
+    print(f"\n== {result['name']}: p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  "
+          f"max {result['max_ms']}ms  ({result['statements']} statements)")
+    for entry in result['plans']:
+        flag = '  [FULL SCAN]' if entry['full_scan'] else ''
+        sql = entry['sql'] if len(entry['sql']) <= 160 else entry['sql'][:157] + '...'
+        print(f"   {sql}{flag}")
+        for line in entry['plan']:
+            print(f"      {line}")
+
+
+def compare(results: list, old: dict) -> None:
+    previous = {result['name']: result for result in old.get('scenarios', [])}
+    print(f"\n{'scenario':<44} {'old p50':>10} {'new p50':>10} {'change':>8}")
+    for result in results:
+        before = previous.get(result['name'])
+        if before is None:
+            print(f"{result['name']:<44} {'-':>10} {result['p50_ms']:>10} {'new':>8}")
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] if before['p50_ms'] else 0
+        print(f"{result['name']:<44} {before['p50_ms']:>10} {result['p50_ms']:>10} {change:>+8.0%}")
+
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    os.environ.setdefault('JWT_SECRET', 'bench-queries-jwt-secret-bench-queries')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('DIALER_ENABLED', 'false')
+
+    import app as app_module
+    from sqlalchemy import event, func, select
+
+    from core.database import db
+    from models.call import Call
+
+    with app_module.app.app_context():
+        engine = db.engine
+        with engine.connect() as conn:
+            total = conn.execute(select(func.count()).select_from(Call.__table__)).scalar()
+        capture = StatementCapture()
+        event.listen(engine, 'before_cursor_execute', capture)
+
+        print(f"[BENCH] {total:,} calls in {engine.url.render_as_string(hide_password=True)} "
+              f"({engine.dialect.name}), {args.runs} runs per scenario")
+        scenarios = build_scenarios(app_module, engine)
+        only = [prefix.strip() for prefix in args.only.split(',') if prefix.strip()]
+
+        results = []
+        for name, fn in scenarios.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            result = run_scenario(name, fn, engine, capture, args.runs, args.warmup, args.analyze)
+            print_result(result)
+            results.append(result)
+
+    output = {
+        'meta': {'calls': total, 'dialect': engine.dialect.name, 'runs': args.runs,
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'scenarios': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\n[BENCH] Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: app startup time and first-request latency.
+
+Each run starts a fresh Python process (like a gunicorn worker) and measures:
+- import: `import app` (libraries, Flask app, Swagger, create_all in eager mode)
+- first /health and first authenticated /calls request
+
+Modes:
+- eager: LAZY_STARTUP=false (create_all and background services at import)
+- lazy: LAZY_STARTUP=true (tables created beforehand, like `flask --app app init-db`)
+- preload: app imported once in a parent, then forked per run (gunicorn
+  preload_app); "import" is the worker's time from fork to ready
+  (post_fork: dispose engines + start background services)
+
+Uses a temporary SQLite database unless DATABASE_URL is set.
+
+Usage:
+    python scripts/bench_startup.py [RUNS]   (default 5)
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, os, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+
+def first_requests(flask_app):
+    from auth.jwt_utils import create_token
+    client = flask_app.test_client()
+    timings = {{}}
+    t = time.perf_counter()
+    client.get('/health')
+    timings['first_health'] = time.perf_counter() - t
+    t = time.perf_counter()
+    client.get('/calls', headers={{'Authorization': create_token(1, 'bench@example.com')}})
+    timings['first_calls'] = time.perf_counter() - t
+    return timings
+
+if os.environ.get('BENCH_PRELOAD') == 'true':
+    from core.database import dispose_engines
+    results = []
+    for _ in range(int(os.environ['BENCH_RUNS'])):
+        read_fd, write_fd = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            dispose_engines(app_module.app)
+            app_module.start_background_services()
+            ready = time.perf_counter()
+            timings = first_requests(app_module.app)
+            timings['import'] = ready - forked
+            os.write(write_fd, json.dumps(timings).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            results.append(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+    print(json.dumps(results))
+else:
+    timings = first_requests(app_module.app)
+    timings['import'] = imported - started
+    print(json.dumps([timings]))
+'''
+
+
+def run_child(env: dict) -> list:
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(root=ROOT)],
+        env=env, cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        env.setdefault('JWT_SECRET', 'bench-secret-bench-secret-bench-secret')
+
+        # Schema once, as the deploy would (init-db / gunicorn master)
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'],
+                       env=env, cwd=ROOT, capture_output=True, check=True)
+
+        modes = {
+            'eager': {'LAZY_STARTUP': 'false'},
+            'lazy': {'LAZY_STARTUP': 'true'},
+        }
+        if hasattr(os, 'fork'):
+            modes['preload'] = {'LAZY_STARTUP': 'true', 'BENCH_PRELOAD': 'true', 'BENCH_RUNS': str(runs)}
+
+        print(f"[BENCH] Startup, median of {runs} runs (ms)")
+        print(f"  {'mode':<10} {'import/ready':>13} {'first /health':>14} {'first /calls':>13}")
+        for mode, extra in modes.items():
+            child_env = {**env, **extra}
+            if mode == 'preload':
+                results = run_child(child_env)
+            else:
+                results = [run_child(child_env)[0] for _ in range(runs)]
+            median = {key: statistics.median(r[key] for r in results) * 1000 for key in results[0]}
+            print(f"  {mode:<10} {median['import']:>13.0f} {median['first_health']:>14.1f} "
+                  f"{median['first_calls']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
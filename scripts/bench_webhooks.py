@@ -0,0 +1,350 @@
+"""
+Benchmark: replay signed Twilio webhook sequences for the full call lifecycle.
+
+Each simulated call replays, in order, the requests Twilio (or the frontend)
+sends for it, with a valid X-Twilio-Signature:
+
+- inbound:  /voice -> /inbound_status -> /call_status -> /recording_status
+- outbound: /make_call (JWT) -> /call_status in-progress -> /amd_status
+            -> /call_status completed
+- flex:     /taskrouter_event task.created -> task.updated
+            -> reservation.accepted -> task.completed
+
+Calls are spread over C concurrent clients for each concurrency level in the
+sweep. Reports throughput (calls/s, requests/s) and p50/p95/p99 latency per
+route, writes the results as JSON and compares them with a stored baseline
+(exit code 1 on regression).
+
+By default the app runs in a child process (werkzeug threaded server) on a
+temporary SQLite database (or DATABASE_URL), with core.dialer.LocalTwilioClient
+standing in for the Twilio REST API. With --url the requests go to a running
+server instead (e.g. gunicorn); its BASE_URL and TWILIO_AUTH_TOKEN must match
+--base-url / TWILIO_AUTH_TOKEN and JWT_SECRET must match for /make_call.
+
+Usage:
+    python scripts/bench_webhooks.py [--concurrency 1,4,16] [--calls 200]
+        [--mix inbound=6,outbound=3,flex=1] [--twilio-latency 0.15]
+        [--output results.json] [--baseline FILE] [--save-baseline]
+        [--tolerance 0.25] [--url URL --base-url URL]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+from twilio.request_validator import RequestValidator
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'build', 'bench_webhooks_baseline.json')
+BENCH_AUTH_TOKEN = 'bench-auth-token'
+BENCH_BASE_URL = 'http://bench.local'
+TWILIO_NUMBER = '+18005550100'
+AGENTS = 8
+
+SERVER = r'''
+import os, sys
+sys.path.insert(0, {root!r})
+import app as app_module
+from core.database import db
+from core.dialer import LocalTwilioClient
+from core.twilio_client import set_twilio_client
+from models.user import User
+from werkzeug.serving import make_server
+
+set_twilio_client(LocalTwilioClient(latency=float(os.environ['BENCH_TWILIO_LATENCY']), cps_limit=None))
+with app_module.app.app_context():
+    db.create_all()
+    for i in range({agents}):
+        email = f'agent{{i}}@bench.local'
+        if not User.query.filter_by(email=email).first():
+            db.session.add(User(email=email, name=f'Agent {{i}}', password_hash='-', is_active=True))
+    db.session.commit()
+
+server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+with open(os.environ['BENCH_PORT_FILE'] + '.tmp', 'w') as f:
+    f.write(str(server.server_port))
+os.replace(os.environ['BENCH_PORT_FILE'] + '.tmp', os.environ['BENCH_PORT_FILE'])
+server.serve_forever()
+'''
+
+
+def _sid(prefix: str, rng: random.Random) -> str:
+    return f"{prefix}{rng.getrandbits(128):032x}"
+
+
+def _phone(rng: random.Random) -> str:
+    return f"+1{rng.choice(['305', '212', '512', '415', '786', '713', '407'])}{rng.randrange(2_000_000, 9_999_999):07d}"
+
+
+class Replayer:
+    """Sends one call's webhook sequence; records (route, status, seconds) per request"""
+
+    def __init__(self, url: str, base_url: str, auth_token: str, jwt_token: str):
+        self.url = url.rstrip('/')
+        self.base_url = base_url.rstrip('/')
+        self.validator = RequestValidator(auth_token)
+        self.jwt_token = jwt_token
+        self.session = requests.Session()
+
+    def post(self, results: list, route: str, params: dict, signed: bool = True) -> requests.Response:
+        headers = {}
+        if signed:
+            headers['X-Twilio-Signature'] = self.validator.compute_signature(self.base_url + route, params)
+        else:
+            headers['Authorization'] = f"Bearer {self.jwt_token}"
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url + route, data=params, headers=headers, timeout=30)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        results.append((route, status, time.perf_counter() - started))
+        return response
+
+    def inbound(self, results: list, rng: random.Random) -> None:
+        call_sid, caller = _sid('CA', rng), _phone(rng)
+        common = {'CallSid': call_sid, 'AccountSid': 'ACbench', 'From': caller, 'To': TWILIO_NUMBER,
+                  'Direction': 'inbound', 'FromCity': 'MIAMI'}
+        self.post(results, '/voice', {**common, 'CallStatus': 'ringing'})
+        answered = rng.random() < 0.6
+        self.post(results, '/inbound_status', {
+            **common, 'DialCallStatus': 'completed' if answered else 'no-answer',
+            'DialCallSid': _sid('CA', rng),
+            'Called': f"client:agent{rng.randrange(AGENTS)}benchlocal" if answered else '',
+        })
+        duration = str(rng.randrange(20, 600) if answered else 0)
+        self.post(results, '/call_status', {**common, 'CallStatus': 'completed', 'CallDuration': duration})
+        if answered:
+            self.post(results, '/recording_status', {
+                'CallSid': call_sid, 'AccountSid': 'ACbench', 'RecordingSid': _sid('RE', rng),
+                'RecordingUrl': f"https://api.twilio.com/2010-04-01/Accounts/ACbench/Recordings/{_sid('RE', rng)}",
+                'RecordingStatus': 'completed', 'RecordingDuration': duration,
+            })
+
+    def outbound(self, results: list, rng: random.Random) -> None:
+        lead = _phone(rng)
+        response = self.post(results, '/make_call', {'to': lead}, signed=False)
+        if response is None or response.status_code != 200:
+            return
+        call_sid = response.json().get('call_sid')
+        common = {'CallSid': call_sid, 'AccountSid': 'ACbench', 'From': TWILIO_NUMBER, 'To': lead,
+                  'Direction': 'outbound-api'}
+        self.post(results, '/call_status', {**common, 'CallStatus': 'in-progress'})
+        machine = rng.random() < 0.3
+        self.post(results, '/amd_status', {
+            **common, 'AnsweredBy': 'machine_end_beep' if machine else 'human',
+            'MachineDetectionDuration': str(rng.randrange(1500, 4000)),
+        })
+        self.post(results, '/call_status', {**common, 'CallStatus': 'completed',
+                                            'CallDuration': str(rng.randrange(20, 30) if machine else rng.randrange(30, 600))})
+
+    def flex(self, results: list, rng: random.Random) -> None:
+        task_sid, call_sid, lead = _sid('WT', rng), _sid('CA', rng), _phone(rng)
+        worker = f"Agent {rng.randrange(AGENTS)}"
+        attributes = {'direction': 'outbound', 'from': TWILIO_NUMBER, 'outbound_to': lead}
+        for event_type, attrs in (
+                ('task.created', attributes),
+                ('task.updated', {**attributes, 'call_sid': call_sid}),
+                ('reservation.accepted', {**attributes, 'call_sid': call_sid}),
+                ('task.completed', {**attributes, 'call_sid': call_sid})):
+            self.post(results, '/taskrouter_event', {
+                'EventType': event_type, 'TaskSid': task_sid, 'AccountSid': 'ACbench',
+                'WorkerName': worker, 'TaskAttributes': json.dumps(attrs),
+            })
+
+
+def percentile(ordered: list, q: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+
+def run_level(args, concurrency: int, jwt_token: str, seed: int) -> dict:
+    scenarios = []
+    for name, weight in args.mix.items():
+        scenarios += [name] * weight
+    rng = random.Random(seed)
+    plan = [rng.choice(scenarios) for _ in range(args.calls)]
+    lock = threading.Lock()
+    results: list = []
+
+    def worker(index: int):
+        replayer = Replayer(args.url, args.base_url, args.auth_token, jwt_token)
+        worker_rng = random.Random(seed * 1000 + index)
+        local: list = []
+        while True:
+            with lock:
+                if not plan:
+                    break
+                scenario = plan.pop()
+            getattr(replayer, scenario)(local, worker_rng)
+        with lock:
+            results.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    by_route = defaultdict(list)
+    errors = defaultdict(int)
+    for route, status, seconds in results:
+        by_route[route].append(seconds)
+        if not 200 <= status < 300:
+            errors[route] += 1
+    routes = {}
+    for route, samples in sorted(by_route.items()):
+        ordered = sorted(samples)
+        routes[route] = {
+            'count': len(samples),
+            'errors': errors[route],
+            'p50_ms': percentile(ordered, 0.50),
+            'p95_ms': percentile(ordered, 0.95),
+            'p99_ms': percentile(ordered, 0.99),
+        }
+    return {
+        'concurrency': concurrency,
+        'calls': args.calls,
+        'duration_s': round(elapsed, 3),
+        'requests': len(results),
+        'errors': sum(errors.values()),
+        'calls_per_s': round(args.calls / elapsed, 2),
+        'requests_per_s': round(len(results) / elapsed, 2),
+        'routes': routes,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions vs. the baseline: throughput down or p95 up by more than tolerance, new errors"""
+    regressions = []
+    baseline_levels = {level['concurrency']: level for level in baseline.get('levels', [])}
+    for level in results['levels']:
+        base = baseline_levels.get(level['concurrency'])
+        if base is None:
+            continue
+        c = level['concurrency']
+        if level['calls_per_s'] < base['calls_per_s'] * (1 - tolerance):
+            regressions.append(f"c={c}: calls/s {level['calls_per_s']} < baseline {base['calls_per_s']}")
+        for route, stats in level['routes'].items():
+            base_route = base['routes'].get(route)
+            if base_route is None:
+                continue
+            if stats['p95_ms'] > base_route['p95_ms'] * (1 + tolerance):
+                regressions.append(f"c={c} {route}: p95 {stats['p95_ms']}ms > baseline {base_route['p95_ms']}ms")
+            if stats['errors'] / stats['count'] > base_route['errors'] / base_route['count']:
+                regressions.append(f"c={c} {route}: {stats['errors']} errors (baseline {base_route['errors']})")
+    return regressions
+
+
+def start_server(args, tmp: str) -> subprocess.Popen:
+    port_file = os.path.join(tmp, 'port')
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    env.update({
+        'TWILIO_AUTH_TOKEN': args.auth_token, 'BASE_URL': args.base_url, 'TWILIO_ACCOUNT_SID': 'ACbench',
+        'TWILIO_NUMBER': TWILIO_NUMBER, 'INBOUND_USE_LOVABLE': 'true', 'SKIP_TWILIO_VALIDATION': 'false',
+        'BENCH_TWILIO_LATENCY': str(args.twilio_latency), 'BENCH_PORT_FILE': port_file,
+    })
+    log = open(os.path.join(tmp, 'server.log'), 'w')
+    process = subprocess.Popen([sys.executable, '-c', SERVER.format(root=ROOT, agents=AGENTS)],
+                               env=env, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while not os.path.exists(port_file):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"Bench server did not start; see {log.name}")
+        time.sleep(0.05)
+    with open(port_file) as f:
+        args.url = f"http://127.0.0.1:{f.read().strip()}"
+    return process
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--concurrency', default='1,4,16', help='comma-separated levels to sweep')
+    parser.add_argument('--calls', type=int, default=200, help='calls replayed per level')
+    parser.add_argument('--mix', default='inbound=6,outbound=3,flex=1')
+    parser.add_argument('--twilio-latency', type=float, default=0.15, help='LocalTwilioClient REST latency (s)')
+    parser.add_argument('--url', help='running server to target (default: start one)')
+    parser.add_argument('--base-url', default=None, help="the server's BASE_URL (signatures)")
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    args.levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    args.mix = {name: int(weight) for name, _, weight in (item.partition('=') for item in args.mix.split(','))}
+    args.auth_token = os.environ.get('TWILIO_AUTH_TOKEN', BENCH_AUTH_TOKEN) if args.url else BENCH_AUTH_TOKEN
+    args.base_url = args.base_url or (args.url if args.url else BENCH_BASE_URL)
+    return args
+
+
+def main():
+    args = parse_args()
+    os.environ.setdefault('JWT_SECRET', 'bench-secret-bench-secret-bench-secret')
+    from auth.jwt_utils import create_token
+    jwt_token = create_token(1, 'agent0@bench.local')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None if args.url else start_server(args, tmp)
+        try:
+            levels = []
+            print(f"[BENCH] Webhook replay: {args.calls} calls per level, mix {args.mix}, target {args.url}")
+            for i, concurrency in enumerate(args.levels):
+                level = run_level(args, concurrency, jwt_token, args.seed + i)
+                levels.append(level)
+                print(f"\n  concurrency {concurrency}: {level['calls_per_s']} calls/s, "
+                      f"{level['requests_per_s']} req/s, {level['errors']} errors")
+                print(f"    {'route':<20} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+                for route, stats in level['routes'].items():
+                    print(f"    {route:<20} {stats['count']:>6} {stats['errors']:>6} {stats['p50_ms']:>8} "
+                          f"{stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    results = {
+        'meta': {'calls': args.calls, 'mix': args.mix, 'twilio_latency': args.twilio_latency,
+                 'target': 'external' if args.base_url != BENCH_BASE_URL else 'local',
+                 'python': sys.version.split()[0], 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'levels': levels,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    exit_code = 0
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n[BENCH] Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n[BENCH] {len(regressions)} regression(s) vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  - {regression}")
+            exit_code = 1
+        else:
+            print(f"\n[BENCH] No regressions vs {args.baseline}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
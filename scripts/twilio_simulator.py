@@ -0,0 +1,664 @@
+"""
+Local Twilio stand-in for load and integration tests (no network).
+
+Serves the REST endpoints the app uses and plays Twilio's side of each call
+back into the app's webhooks, signed with X-Twilio-Signature:
+
+- POST   /2010-04-01/Accounts/{AC}/Calls.json               calls.create
+- GET    /2010-04-01/Accounts/{AC}/Calls/{CA}.json          calls(sid).fetch
+- POST   /2010-04-01/Accounts/{AC}/Calls/{CA}.json          calls(sid).update
+- POST   /2010-04-01/Accounts/{AC}/Calls/{CA}/Recordings.json
+- GET    /2010-04-01/Accounts/{AC}/Recordings/{RE}[.mp3]    recording media
+- GET    /v1/Workspaces/{WS}/Workers                        TaskRouter workers (dialer)
+- GET    /_sim/stats                                        counters and callback latency
+
+Outbound calls (calls.create) follow a timeline: initiated -> ringing ->
+answered (in-progress, Url fetched) -> AMD result to AsyncAmdStatusCallback
+-> completed, or busy / no-answer / failed, with RecordingStatusCallback once
+the call ends. calls(sid).update(url=...) fetches the new TwiML (hold,
+voicemail message); update(status='completed') hangs up. With --inbound-cps
+the simulator also places inbound calls: /voice, then the <Dial action> with
+DialCallStatus, the status callback and the recording.
+
+Faults: REST latency (--latency/--jitter), 5xx (--fault-rate), the account
+CPS limit (429 / 20429, --cps), invalid numbers (21211 for destinations
+ending in '0000') and lost webhooks (--drop-rate). --time-scale shrinks the
+timelines (0.01 = a 60s call lasts 0.6s).
+
+Point the app at it:
+    TWILIO_API_BASE_URL=http://127.0.0.1:8765 TWILIO_ACCOUNT_SID=ACsim... \\
+    TWILIO_AUTH_TOKEN=<same as --auth-token> BASE_URL=<as signed> ...
+
+Usage:
+    python scripts/twilio_simulator.py [--port 8765] [--auth-token TOKEN]
+        [--app-url http://127.0.0.1:5000] [--time-scale 1.0]
+        [--outcomes human=6,machine=2,no-answer=1,busy=1,failed=0]
+        [--latency 0.15] [--jitter 0.05] [--fault-rate 0] [--drop-rate 0]
+        [--cps 0] [--workers 8] [--inbound-cps 0] [--inbound-to +18005550100]
+        [--inbound-answer-rate 0.8] [--callback-threads 16] [--seed N]
+"""
+
+import argparse
+import base64
+import heapq
+import hmac
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from twilio.request_validator import RequestValidator
+
+DEFAULT_ACCOUNT_SID = 'AC' + '0' * 30
+MACHINE_RESULTS = ('machine_end_beep', 'machine_end_silence', 'machine_end_other')
+FINAL_STATUSES = ('completed', 'busy', 'no-answer', 'failed', 'canceled')
+INITIATED_FLOOR = 0.25  # Real seconds between calls.create and the 'initiated' callback
+SILENT_MP3 = b'\xff\xfb\x90\x64' + b'\x00' * 413  # One empty MPEG frame, enough for players
+
+CALLS_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>AC\w+)/Calls\.json$')
+CALL_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>AC\w+)/Calls/(?P<sid>CA\w+)\.json$')
+CALL_RECORDINGS_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>AC\w+)/Calls/(?P<sid>CA\w+)/Recordings\.json$')
+RECORDING_PATH = re.compile(r'^/2010-04-01/Accounts/(?P<account>AC\w+)/Recordings/(?P<sid>RE\w+)(?:\.(?P<ext>mp3|wav|json))?$')
+WORKERS_PATH = re.compile(r'^/v1/Workspaces/(?P<workspace>WS\w+)/Workers$')
+
+
+def parse_weights(spec: str) -> dict:
+    """"human=6,machine=2" -> {'human': 6.0, 'machine': 2.0}"""
+    weights = {}
+    for item in spec.split(','):
+        name, _, value = item.partition('=')
+        if name.strip():
+            weights[name.strip()] = float(value or 1)
+    return weights
+
+
+def _sid(prefix: str) -> str:
+    return prefix + uuid.uuid4().hex
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+
+class TwilioError(Exception):
+    def __init__(self, status: int, code: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+class SimCall:
+    """State of one simulated call"""
+
+    def __init__(self, sid: str, account_sid: str, params: dict, direction: str):
+        self.sid = sid
+        self.account_sid = account_sid
+        self.params = params
+        self.direction = direction
+        self.to = params.get('To', '')
+        self.from_ = params.get('From', '')
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.answered_at = None
+        self.ended_at = None
+        self.answered_by = None
+        self.recording = params.get('Record', '').lower() == 'true'
+        self.recording_callback = params.get('RecordingStatusCallback', '')
+        self.sequence = itertools.count()
+        self.generation = 0  # Bumped when the timeline is replaced (hang up / redirect)
+
+    def duration(self) -> int:
+        if self.answered_at is None:
+            return 0
+        return int(round((self.ended_at or time.time()) - self.answered_at))
+
+    def resource(self) -> dict:
+        date = formatdate(self.created_at, usegmt=True)
+        return {
+            'sid': self.sid,
+            'account_sid': self.account_sid,
+            'to': self.to,
+            'from': self.from_,
+            'status': self.status,
+            'direction': self.direction,
+            'answered_by': self.answered_by,
+            'date_created': date,
+            'date_updated': formatdate(usegmt=True),
+            'start_time': formatdate(self.answered_at, usegmt=True) if self.answered_at else None,
+            'end_time': formatdate(self.ended_at, usegmt=True) if self.ended_at else None,
+            'duration': str(self.duration()) if self.ended_at else None,
+            'api_version': '2010-04-01',
+            'uri': f'/2010-04-01/Accounts/{self.account_sid}/Calls/{self.sid}.json',
+        }
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.callback_latency = {}  # route -> [seconds]
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def callback(self, route: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.callback_latency.setdefault(route, []).append(seconds)
+            key = 'callbacks_ok' if ok else 'callbacks_failed'
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'callbacks': {
+                    route: {'count': len(values), 'p50_ms': _percentile(values, 0.5),
+                            'p95_ms': _percentile(values, 0.95), 'p99_ms': _percentile(values, 0.99)}
+                    for route, values in sorted(self.callback_latency.items())
+                },
+            }
+
+
+class TwilioSimulator:
+    """REST state, call timelines and signed webhook delivery"""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.validator = RequestValidator(args.auth_token)
+        self.outcomes = parse_weights(args.outcomes)
+        self.calls = {}
+        self.stats = Stats()
+        self._lock = threading.Lock()
+        self._timeline = []  # heap of (due, seq, fn, args)
+        self._timeline_seq = itertools.count()
+        self._timeline_ready = threading.Condition(self._lock)
+        self._tokens = float(args.cps or 0)
+        self._refilled_at = time.monotonic()
+        self._http = requests.Session()
+        self._http.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=args.callback_threads))
+        self._delivery = ThreadPoolExecutor(max_workers=args.callback_threads, thread_name_prefix='sim-callback')
+        self._running = True
+
+    # ---------- timeline ----------
+
+    def at(self, delay: float, fn, *fn_args, floor: float = 0.0) -> None:
+        """Run fn(*fn_args) on the delivery pool after `delay` simulated seconds (at least `floor` real ones)"""
+        due = time.monotonic() + max(floor, max(0.0, delay) * self.args.time_scale)
+        with self._timeline_ready:
+            heapq.heappush(self._timeline, (due, next(self._timeline_seq), fn, fn_args))
+            self._timeline_ready.notify()
+
+    def run_timeline(self) -> None:
+        with self._timeline_ready:
+            while self._running:
+                if not self._timeline:
+                    self._timeline_ready.wait()
+                    continue
+                due, _, fn, fn_args = self._timeline[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._timeline_ready.wait(wait)
+                    continue
+                heapq.heappop(self._timeline)
+                self._delivery.submit(self._safe, fn, *fn_args)
+
+    def _safe(self, fn, *fn_args) -> None:
+        try:
+            fn(*fn_args)
+        except Exception as e:
+            self.stats.incr('timeline_errors')
+            print(f"[SIM] Timeline step {getattr(fn, '__name__', fn)} failed: {e}", file=sys.stderr)
+
+    # ---------- webhooks ----------
+
+    def post(self, url: str, params: dict) -> requests.Response:
+        """POST a signed webhook (signed for `url`, sent to --app-url when set)"""
+        if not url:
+            return None
+        route = urlsplit(url).path or '/'
+        if self.args.drop_rate and self.rng.random() < self.args.drop_rate:
+            self.stats.incr('callbacks_dropped')
+            return None
+        params = {key: str(value) for key, value in params.items() if value is not None}
+        target = self.args.app_url + route if self.args.app_url else url
+        headers = {'X-Twilio-Signature': self.validator.compute_signature(url, params),
+                   'I-Twilio-Idempotency-Token': uuid.uuid4().hex}
+        start = time.perf_counter()
+        try:
+            response = self._http.post(target, data=params, headers=headers, timeout=15)
+            self.stats.callback(route, time.perf_counter() - start, response.status_code < 400)
+            if response.status_code >= 400:
+                print(f"[SIM] {route} -> HTTP {response.status_code}", file=sys.stderr)
+            return response
+        except requests.RequestException as e:
+            self.stats.callback(route, time.perf_counter() - start, False)
+            print(f"[SIM] {route} failed: {e}", file=sys.stderr)
+            return None
+
+    def _call_params(self, call: SimCall, status: str) -> dict:
+        return {
+            'AccountSid': call.account_sid,
+            'ApiVersion': '2010-04-01',
+            'CallSid': call.sid,
+            'CallStatus': status,
+            'Direction': call.direction,
+            'From': call.from_,
+            'To': call.to,
+            'Called': call.to,
+            'Caller': call.from_,
+            'FromCity': 'ORLANDO' if call.direction == 'inbound' else None,
+            'FromState': 'FL' if call.direction == 'inbound' else None,
+        }
+
+    def _status_callback(self, call: SimCall, status: str, extra: dict = None) -> None:
+        events = call.params.get('StatusCallbackEvent', ['completed'])
+        event = 'answered' if status == 'in-progress' else status
+        if status not in FINAL_STATUSES and status not in events and event not in events:
+            return
+        params = self._call_params(call, status)
+        params.update({
+            'CallbackSource': 'call-progress-events',
+            'SequenceNumber': next(call.sequence),
+            'Timestamp': formatdate(usegmt=True),
+        })
+        if status in FINAL_STATUSES:
+            params['CallDuration'] = call.duration()
+            params['Duration'] = (call.duration() + 59) // 60
+        if call.answered_by:
+            params['AnsweredBy'] = call.answered_by
+        params.update(extra or {})
+        self.post(call.params.get('StatusCallback', ''), params)
+
+    def _fetch_twiml(self, call: SimCall, url: str) -> str:
+        response = self.post(url, self._call_params(call, call.status))
+        self.stats.incr('twiml_fetches')
+        return response.text if response is not None and response.status_code == 200 else ''
+
+    # ---------- outbound calls (calls.create) ----------
+
+    def _pick_outcome(self) -> str:
+        names = list(self.outcomes)
+        return self.rng.choices(names, weights=[self.outcomes[name] for name in names])[0]
+
+    def schedule_outbound(self, call: SimCall) -> None:
+        # Twilio's first callback lands after the REST response, even with a tiny --time-scale
+        self.at(0.3, self._step_initiated, call, call.generation, floor=INITIATED_FLOOR)
+
+    def _step_initiated(self, call: SimCall, gen: int) -> None:
+        if call.generation != gen or call.status in FINAL_STATUSES:
+            return
+        call.status = 'initiated'
+        self._status_callback(call, 'initiated')
+        outcome = self._pick_outcome()
+        self.stats.incr(f'outcome_{outcome}')
+        if outcome == 'failed':
+            self.at(0.5, self._step_end, call, gen, 'failed')
+            return
+        ring = self.rng.uniform(1, 3)
+        self.at(ring, self._step_status, call, gen, 'ringing')
+        if outcome == 'busy':
+            self.at(ring + self.rng.uniform(1, 4), self._step_end, call, gen, 'busy')
+        elif outcome == 'no-answer':
+            self.at(ring + 30, self._step_end, call, gen, 'no-answer')
+        else:
+            answer = ring + self.rng.uniform(3, 12)
+            self.at(answer, self._step_answer, call, gen, outcome)
+
+    def _step_status(self, call: SimCall, gen: int, status: str) -> None:
+        if call.generation != gen or call.status in FINAL_STATUSES:
+            return
+        call.status = status
+        self._status_callback(call, status)
+
+    def _step_answer(self, call: SimCall, gen: int, outcome: str) -> None:
+        if call.generation != gen or call.status in FINAL_STATUSES:
+            return
+        call.status = 'in-progress'
+        call.answered_at = time.time()
+        self._status_callback(call, 'in-progress')
+        self._fetch_twiml(call, call.params.get('Url', ''))
+
+        amd = call.params.get('MachineDetection')
+        if outcome == 'machine':
+            answered_by = self.rng.choice(MACHINE_RESULTS)
+            amd_delay = self.rng.uniform(6, 20)  # DetectMessageEnd waits for the beep
+            talk = amd_delay + 45  # Until the app redirects to the voicemail message
+        else:
+            answered_by = 'human'
+            amd_delay = self.rng.uniform(1.5, 4)
+            talk = self.rng.lognormvariate(4.0, 0.8)  # Median ~55s
+        if amd:
+            self.at(amd_delay, self._step_amd, call, gen, answered_by, amd_delay)
+        self.at(talk, self._step_end, call, gen, 'completed')
+
+    def _step_amd(self, call: SimCall, gen: int, answered_by: str, detection: float) -> None:
+        if call.generation != gen or call.status in FINAL_STATUSES:
+            return
+        call.answered_by = answered_by
+        if call.params.get('AsyncAmd', '').lower() != 'true':
+            return  # Synchronous AMD: the result only goes with the status callbacks
+        self.stats.incr('amd_callbacks')
+        params = self._call_params(call, call.status)
+        params.update({'AnsweredBy': answered_by, 'MachineDetectionDuration': int(detection * 1000)})
+        self.post(call.params.get('AsyncAmdStatusCallback', ''), params)
+
+    def _step_end(self, call: SimCall, gen: int, status: str) -> None:
+        if call.generation != gen or call.status in FINAL_STATUSES:
+            return
+        call.status = status
+        call.ended_at = time.time()
+        self.stats.incr(f'ended_{status}')
+        self._status_callback(call, status)
+        if status == 'completed' and call.recording and call.recording_callback:
+            self.at(self.rng.uniform(1, 4), self._step_recording, call)
+
+    def _step_recording(self, call: SimCall) -> None:
+        recording_sid = _sid('RE')
+        self.stats.incr('recordings')
+        self.post(call.recording_callback, {
+            'AccountSid': call.account_sid,
+            'CallSid': call.sid,
+            'RecordingSid': recording_sid,
+            'RecordingUrl': f'{self.args.public_url}/2010-04-01/Accounts/{call.account_sid}/Recordings/{recording_sid}',
+            'RecordingStatus': 'completed',
+            'RecordingDuration': call.duration(),
+            'RecordingChannels': 2,
+            'RecordingSource': 'RecordVerb' if call.direction == 'inbound' else 'OutboundAPI',
+            'RecordingStartTime': formatdate(call.answered_at, usegmt=True),
+        })
+
+    # ---------- inbound calls ----------
+
+    def place_inbound(self) -> None:
+        """Inbound call to --inbound-to: /voice, then the <Dial> it returns"""
+        call = SimCall(_sid('CA'), self.args.account_sid, {
+            'From': f'+1{self.rng.choice(["407", "512", "305", "214"])}555{self.rng.randint(0, 9999):04d}',
+            'To': self.args.inbound_to,
+            'StatusCallback': f'{self.args.base_url}/call_status',
+            'StatusCallbackEvent': ['completed'],
+        }, 'inbound')
+        call.status = 'ringing'
+        with self._lock:
+            self.calls[call.sid] = call
+        self.stats.incr('inbound_calls')
+        twiml = self._fetch_twiml(call, f'{self.args.base_url}/voice')
+        call.status = 'in-progress'
+        call.answered_at = time.time()
+        try:
+            root = ET.fromstring(twiml)
+        except ET.ParseError:
+            self.stats.incr('twiml_invalid')
+            self.at(1, self._step_end, call, call.generation, 'completed')
+            return
+
+        dial = root.find('Dial')
+        if dial is None:  # <Enqueue> (Flex) or <Hangup>: caller waits, then hangs up
+            self.at(self.rng.uniform(10, 60), self._step_end, call, call.generation, 'completed')
+            return
+        clients = [element.text for element in dial.findall('Client')]
+        record = dial.get('record', '').startswith('record-from-answer')
+        call.recording = record
+        call.recording_callback = dial.get('recordingStatusCallback', '') if record else ''
+        ring = self.rng.uniform(2, 10)
+        if clients and self.rng.random() < self.args.inbound_answer_rate:
+            talk = self.rng.lognormvariate(4.0, 0.8)
+            self.at(ring + talk, self._step_dial_done, call, call.generation, dial.get('action', ''),
+                    'completed', self.rng.choice(clients), talk)
+        else:
+            # Nobody answers: Twilio gives up after the <Dial> timeout (at once with no clients)
+            timeout = float(dial.get('timeout', 30)) if clients else 1
+            self.at(timeout, self._step_dial_done, call, call.generation, dial.get('action', ''), 'no-answer', None, 0)
+
+    def _step_dial_done(self, call: SimCall, gen: int, action: str, dial_status: str,
+                        client: str, talk: float) -> None:
+        if call.generation != gen or call.status in FINAL_STATUSES:
+            return
+        params = self._call_params(call, 'in-progress')
+        params.update({'DialCallStatus': dial_status, 'DialCallSid': _sid('CA'),
+                       'DialCallDuration': int(talk), 'DialBridged': str(client is not None).lower()})
+        if client:
+            params['Called'] = f'client:{client}'
+        else:
+            call.recording = False  # record-from-answer: nothing was recorded
+        self.post(action, params)
+        self.at(0.5, self._step_end, call, gen, 'completed')
+
+    # ---------- REST ----------
+
+    def check_request(self, auth_header: str) -> None:
+        """Auth, account CPS, latency and injected faults for one REST request"""
+        expected = 'Basic ' + base64.b64encode(f'{self.args.account_sid}:{self.args.auth_token}'.encode()).decode()
+        if not hmac.compare_digest(auth_header or '', expected):
+            raise TwilioError(401, 20003, 'Authenticate')
+        delay = self.args.latency + self.rng.uniform(-self.args.jitter, self.args.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.args.fault_rate and self.rng.random() < self.args.fault_rate:
+            self.stats.incr('faults_injected')
+            raise TwilioError(500, 20500, 'Internal Server Error')
+
+    def take_cps_token(self) -> None:
+        if not self.args.cps:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(max(1.0, self.args.cps), self._tokens + (now - self._refilled_at) * self.args.cps)
+            self._refilled_at = now
+            if self._tokens < 1:
+                self.stats.incr('rate_limited')
+                raise TwilioError(429, 20429, 'Too Many Requests')
+            self._tokens -= 1
+
+    def create_call(self, account_sid: str, form: dict) -> dict:
+        if not form.get('To') or not form.get('From'):
+            raise TwilioError(400, 21201, 'No called number is specified' if not form.get('To') else
+                              "A 'From' phone number is required.")
+        if not (form.get('Url') or form.get('Twiml') or form.get('ApplicationSid')):
+            raise TwilioError(400, 21205, 'Url parameter is required.')
+        self.take_cps_token()
+        if form['To'].endswith('0000'):
+            raise TwilioError(400, 21211, f"The 'To' number {form['To']} is not a valid phone number.")
+        call = SimCall(_sid('CA'), account_sid, form, 'outbound-api')
+        with self._lock:
+            self.calls[call.sid] = call
+        self.stats.incr('calls_created')
+        self.schedule_outbound(call)
+        return call.resource()
+
+    def get_call(self, sid: str) -> SimCall:
+        with self._lock:
+            call = self.calls.get(sid)
+        if call is None:
+            raise TwilioError(404, 20404, f'The requested resource /Calls/{sid}.json was not found')
+        return call
+
+    def update_call(self, sid: str, form: dict) -> dict:
+        call = self.get_call(sid)
+        if call.status in FINAL_STATUSES:
+            raise TwilioError(400, 21220, 'Call is not in-progress. Cannot redirect.')
+        self.stats.incr('calls_updated')
+        status = form.get('Status')
+        if status in ('completed', 'canceled'):
+            call.generation += 1
+            self._step_end(call, call.generation, 'completed' if call.answered_at else 'canceled')
+        elif form.get('Url'):
+            # Redirect: the new TwiML runs until the caller hangs up (voicemail / hold music)
+            call.generation += 1
+            gen = call.generation
+            self.at(0, self._fetch_twiml, call, form['Url'])
+            self.at(self.rng.uniform(8, 30), self._step_end, call, gen, 'completed')
+        return call.resource()
+
+    def start_recording(self, sid: str, form: dict) -> dict:
+        call = self.get_call(sid)
+        if call.status != 'in-progress':
+            raise TwilioError(400, 21220, 'Requested resource is not eligible for recording')
+        call.recording = True
+        call.recording_callback = form.get('RecordingStatusCallback', call.recording_callback)
+        return {'sid': _sid('RE'), 'call_sid': sid, 'account_sid': call.account_sid, 'status': 'in-progress',
+                'channels': 2 if form.get('RecordingChannels') == 'dual' else 1, 'source': 'StartCallRecordingAPI',
+                'date_created': formatdate(usegmt=True)}
+
+    def list_workers(self, query: dict) -> dict:
+        workers = [{'sid': f'WK{i:032x}', 'friendly_name': f'agent{i}', 'available': True,
+                    'activity_name': 'Available'} for i in range(self.args.workers)]
+        return {'workers': workers, 'meta': {'key': 'workers', 'page': 0, 'page_size': 50,
+                                             'next_page_url': None, 'previous_page_url': None}}
+
+
+def make_handler(sim: TwilioSimulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            if sim.args.verbose:
+                super().log_message(format, *args)
+
+        def _send(self, status: int, body: bytes, content_type: str = 'application/json') -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, status: int, payload: dict) -> None:
+            self._send(status, json.dumps(payload).encode())
+
+        def _error(self, error: TwilioError) -> None:
+            self._json(error.status, {'code': error.code, 'message': error.message, 'status': error.status,
+                                      'more_info': f'https://www.twilio.com/docs/errors/{error.code}'})
+
+        def _form(self) -> dict:
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = parse_qs(self.rfile.read(length).decode(), keep_blank_values=True)
+            # Repeated keys (StatusCallbackEvent) stay lists
+            return {key: values if len(values) > 1 or key.endswith('Event') else values[0]
+                    for key, values in raw.items()}
+
+        def _dispatch(self, method: str) -> None:
+            url = urlsplit(self.path)
+            path = url.path
+            if path == '/_sim/stats':
+                return self._json(200, sim.stats.snapshot())
+            form = self._form() if method == 'POST' else {}
+            sim.stats.incr(f'rest_{method}')
+            try:
+                sim.check_request(self.headers.get('Authorization'))
+                if method == 'POST' and CALLS_PATH.match(path):
+                    return self._json(201, sim.create_call(CALLS_PATH.match(path)['account'], form))
+                match = CALL_PATH.match(path)
+                if match:
+                    if method == 'GET':
+                        return self._json(200, sim.get_call(match['sid']).resource())
+                    return self._json(200, sim.update_call(match['sid'], form))
+                match = CALL_RECORDINGS_PATH.match(path)
+                if match and method == 'POST':
+                    return self._json(201, sim.start_recording(match['sid'], form))
+                match = RECORDING_PATH.match(path)
+                if match and method == 'GET':
+                    sim.stats.incr('recording_downloads')
+                    if match['ext'] == 'json':
+                        return self._json(200, {'sid': match['sid'], 'status': 'completed'})
+                    return self._send(200, SILENT_MP3, 'audio/mpeg')
+                if WORKERS_PATH.match(path) and method == 'GET':
+                    return self._json(200, sim.list_workers(parse_qs(url.query)))
+                raise TwilioError(404, 20404, f'The requested resource {path} was not found')
+            except TwilioError as e:
+                self._error(e)
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            self._dispatch('POST')
+
+    return Handler
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Local Twilio REST API + webhook driver')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--account-sid', default=os.environ.get('TWILIO_ACCOUNT_SID') or DEFAULT_ACCOUNT_SID)
+    parser.add_argument('--auth-token', default=os.environ.get('TWILIO_AUTH_TOKEN') or 'sim-auth-token')
+    parser.add_argument('--base-url', default=os.environ.get('BASE_URL', ''),
+                        help="The app's BASE_URL (webhook URLs are signed with it)")
+    parser.add_argument('--app-url', default='',
+                        help='Deliver webhooks here instead of the callback URL host (e.g. http://127.0.0.1:5000)')
+    parser.add_argument('--public-url', default='', help='Base of RecordingUrl (default: this server)')
+    parser.add_argument('--time-scale', type=float, default=1.0)
+    parser.add_argument('--outcomes', default='human=6,machine=2,no-answer=1,busy=1,failed=0')
+    parser.add_argument('--latency', type=float, default=0.15, help='REST response time in seconds')
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--fault-rate', type=float, default=0.0, help='Share of REST requests answered 500')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of webhooks never delivered')
+    parser.add_argument('--cps', type=float, default=0.0, help='Account calls.create limit (0 = none)')
+    parser.add_argument('--workers', type=int, default=8, help='Available TaskRouter workers')
+    parser.add_argument('--inbound-cps', type=float, default=0.0, help='Inbound calls placed per second')
+    parser.add_argument('--inbound-to', default=os.environ.get('TWILIO_NUMBER') or '+18005550100')
+    parser.add_argument('--inbound-answer-rate', type=float, default=0.8)
+    parser.add_argument('--callback-threads', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip('/')
+    args.app_url = args.app_url.rstrip('/')
+    args.public_url = (args.public_url or f'http://{args.host}:{args.port}').rstrip('/')
+    return args
+
+
+def run_inbound(sim: TwilioSimulator, rate: float) -> None:
+    interval = 1.0 / rate
+    next_at = time.monotonic()
+    while True:
+        sim._delivery.submit(sim._safe, sim.place_inbound)
+        next_at += sim.rng.expovariate(1.0 / interval)  # Poisson arrivals
+        time.sleep(max(0.0, next_at - time.monotonic()))
+
+
+def main():
+    args = parse_args()
+    if args.inbound_cps and not args.base_url:
+        sys.exit('--inbound-cps needs --base-url (or BASE_URL)')
+
+    sim = TwilioSimulator(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(sim))
+    server.daemon_threads = True
+    threading.Thread(target=sim.run_timeline, name='sim-timeline', daemon=True).start()
+    if args.inbound_cps:
+        threading.Thread(target=run_inbound, args=(sim, args.inbound_cps), name='sim-inbound', daemon=True).start()
+
+    print(f"[SIM] Twilio simulator on http://{args.host}:{server.server_port} "
+          f"(account {args.account_sid}, time scale {args.time_scale}, outcomes {args.outcomes})")
+    print(f"[SIM] App env: TWILIO_API_BASE_URL=http://{args.host}:{server.server_port} "
+          f"TWILIO_ACCOUNT_SID={args.account_sid} TWILIO_AUTH_TOKEN=<--auth-token>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(sim.stats.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+# Before core.config is imported: no disk spool, a fixed JWT secret
+os.environ.setdefault('JWT_SECRET', 'test-secret-test-secret-test-secret')
+os.environ['WEBHOOK_SPOOL_ENABLED'] = 'false'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from flask import Flask
+
+from core.database import db
+import models  # noqa: F401 - registers every table for create_all
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
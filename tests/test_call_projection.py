@@ -0,0 +1,226 @@
+"""
+Recorded webhook lifecycles replayed through the journal and CallProjection.
+
+Each test journals the events a call produces (same keys as record_event),
+projects them and checks the final Call row, then rebuilds it.
+"""
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from core.call_events import CallProjector, LeaseHeldError, PROJECTOR_NAME, REBUILD_OWNER_SUFFIX, event_keys
+from core.database import db
+from models.call import Call
+from models.call_event import CallEvent, ProjectorCheckpoint
+from models.user import User
+
+T0 = datetime(2026, 3, 2, 15, 0, 0, tzinfo=timezone.utc)
+
+
+def at(seconds: int) -> datetime:
+    return T0 + timedelta(seconds=seconds)
+
+
+def journal(source: str, form: dict, received_at: datetime) -> CallEvent:
+    call_sid, task_sid = event_keys(source, form)
+    event = CallEvent(source=source, call_sid=call_sid, task_sid=task_sid, dedupe_key=uuid.uuid4().hex,
+                      payload=json.dumps(form), received_at=received_at, journaled_at=received_at)
+    db.session.add(event)
+    db.session.commit()
+    return event
+
+
+def replay(projector: CallProjector, lifecycle) -> None:
+    for source, form, received_at in lifecycle:
+        journal(source, form, received_at)
+    result = projector.project_pending(settle_seconds=0)
+    assert result['leased'] and result['skipped'] == 0
+    assert result['projected'] == len(lifecycle)
+
+
+def call_row(call_sid: str) -> Call:
+    db.session.expire_all()
+    return Call.query.filter_by(call_sid=call_sid).one()
+
+
+def task_event(event_type: str, task_sid: str, attributes: dict, **fields) -> dict:
+    return {'EventType': event_type, 'TaskSid': task_sid, 'TaskAttributes': json.dumps(attributes), **fields}
+
+
+@pytest.fixture
+def projector(app):
+    return CallProjector(settle_seconds=0, batch_size=50)
+
+
+@pytest.fixture
+def sdr(app):
+    user = User(email='ana@example.com', name='Ana', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+INBOUND = {'CallSid': 'CA_IN', 'From': '+17135550100', 'To': '+18005550000', 'Direction': 'inbound',
+           'FromCity': 'HOUSTON'}
+
+
+def inbound_lifecycle():
+    return [
+        ('voice', INBOUND, at(0)),
+        ('inbound_status', {**INBOUND, 'DialCallStatus': 'completed', 'Called': 'client:anaexamplecom'}, at(20)),
+        ('call_status', {**INBOUND, 'CallStatus': 'completed', 'CallDuration': '95'}, at(120)),
+        ('recording_status', {**INBOUND, 'RecordingStatus': 'completed', 'RecordingSid': 'RE1',
+                              'RecordingUrl': 'https://api.twilio.com/Recordings/RE1'}, at(125)),
+    ]
+
+
+def assert_inbound_answered(call: Call) -> None:
+    assert call.direction == 'inbound'
+    assert call.from_number == '+17135550100'
+    assert call.caller_city == 'HOUSTON'
+    assert call.disposition == 'answered'
+    assert call.worker_email == 'ana@example.com'
+    assert call.worker_name == 'Ana'
+    assert call.started_at == at(0)
+    assert call.answered_at == at(20)
+    assert call.ended_at == at(120)
+    assert call.duration == 100  # Talk time beats Twilio's CallDuration
+    assert call.recording_url == 'https://api.twilio.com/Recordings/RE1.mp3'
+    assert call.recording_sid == 'RE1'
+
+
+def test_inbound_answered_by_sdr(projector, sdr):
+    replay(projector, inbound_lifecycle())
+    assert_inbound_answered(call_row('CA_IN'))
+
+
+def test_inbound_unanswered_goes_to_voicemail(projector):
+    replay(projector, [
+        ('voice', INBOUND, at(0)),
+        ('inbound_status', {**INBOUND, 'DialCallStatus': 'no-answer'}, at(30)),
+        ('voicemail_recorded', {**INBOUND, 'RecordingUrl': 'https://api.twilio.com/voicemail/RE2'}, at(55)),
+        ('call_status', {**INBOUND, 'CallStatus': 'completed', 'CallDuration': '60'}, at(60)),
+    ])
+    call = call_row('CA_IN')
+    assert call.disposition == 'voicemail'
+    assert call.worker_email is None
+    assert call.answered_at is None
+    assert call.duration == 60
+    assert call.recording_url == 'https://api.twilio.com/voicemail/RE2'
+
+
+def test_outbound_browser_call(projector):
+    parent = {'CallSid': 'CA_OUT', 'From': 'client:anaexamplecom', 'To': '+12125550100',
+              'SelectedCallerId': '+18005550001', 'workerEmail': 'ana@example.com', 'workerName': 'Ana'}
+    child = {'CallSid': 'CA_CHILD', 'ParentCallSid': 'CA_OUT', 'Direction': 'outbound-dial',
+             'From': '+18005550001', 'To': '+12125550100'}
+    replay(projector, [
+        ('voice', parent, at(0)),
+        ('call_status', {**child, 'CallStatus': 'in-progress'}, at(10)),
+        ('call_status', {**child, 'CallStatus': 'completed', 'CallDuration': '60'}, at(70)),
+    ])
+    call = call_row('CA_OUT')
+    assert call.direction == 'outbound'
+    assert call.from_number == '+18005550001'
+    assert call.to_number == '+12125550100'
+    assert call.worker_email == 'ana@example.com'
+    assert call.disposition == 'answered'
+    assert call.answered_at == at(10)
+    assert call.queue_time == 10
+    assert call.ended_at == at(70)
+    assert call.duration == 60
+    assert Call.query.filter_by(call_sid='CA_CHILD').first() is None
+
+
+def test_flex_outbound_task(projector):
+    created = {'direction': 'outbound', 'outbound_to': '+13055550100', 'from': '+18005550002'}
+    with_call = {**created, 'call_sid': 'CA_FLEX'}
+    replay(projector, [
+        ('taskrouter_event', task_event('task.created', 'WT1', created), at(0)),
+        ('taskrouter_event', task_event('task.updated', 'WT1', with_call), at(2)),
+        ('taskrouter_event', task_event('reservation.accepted', 'WT1', with_call, WorkerName='Bia'), at(15)),
+        ('taskrouter_event', task_event('task.completed', 'WT1', with_call), at(75)),
+    ])
+    assert Call.query.filter_by(call_sid='TASK:WT1').first() is None
+    call = call_row('CA_FLEX')
+    assert call.direction == 'outbound'
+    assert call.to_number == '+13055550100'
+    assert call.lead_state == 'FL'
+    assert call.disposition == 'answered'
+    assert call.worker_name == 'Bia'
+    assert call.answered_at == at(15)
+    assert call.queue_time == 15
+    assert call.ended_at == at(75)
+    assert call.duration == 60
+
+
+def test_amd_machine_is_voicemail(projector):
+    db.session.add(Call(call_sid='CA_AMD', from_number='+18005550003', to_number='+15125550100',
+                        direction='outbound', started_at=at(0)))  # Saved by the dialer
+    db.session.commit()
+    form = {'CallSid': 'CA_AMD', 'From': '+18005550003', 'To': '+15125550100', 'Direction': 'outbound-api'}
+    replay(projector, [
+        ('call_status', {**form, 'CallStatus': 'in-progress'}, at(5)),
+        ('amd_callback', {**form, 'AnsweredBy': 'machine_end_beep'}, at(9)),
+        ('call_status', {**form, 'CallStatus': 'completed', 'CallDuration': '35'}, at(40)),
+    ])
+    call = call_row('CA_AMD')
+    assert call.disposition == 'voicemail'  # Not overwritten by 'completed'
+    assert call.answered_at == at(5)
+    assert call.ended_at == at(40)
+    assert call.duration == 35
+
+
+def test_late_event_refolds_call_in_order(projector, sdr):
+    voice, answered, completed, _ = inbound_lifecycle()
+    replay(projector, [voice, completed])
+    assert call_row('CA_IN').disposition == 'no-answer'
+
+    # Journaled after completed was folded, but received before it
+    late = journal(*answered)
+    assert projector.project_pending(settle_seconds=0)['projected'] == 1
+    call = call_row('CA_IN')
+    assert call.disposition == 'answered'
+    assert call.worker_name == 'Ana'
+    assert call.duration == 100  # From answered_at, as if folded in order
+    assert db.session.get(CallEvent, late.id).projected_at is not None
+
+
+def test_rebuild_restores_projected_columns(projector, sdr):
+    replay(projector, inbound_lifecycle())
+    call = call_row('CA_IN')
+    call.disposition, call.duration, call.worker_name, call.recording_url = 'no-answer', 0, None, None
+    db.session.commit()
+
+    result = projector.rebuild(call_sids=['CA_IN'])
+    assert result == {'calls': 1, 'events': 4, 'changed': 1}
+    assert_inbound_answered(call_row('CA_IN'))
+    assert db.session.get(ProjectorCheckpoint, PROJECTOR_NAME).lease_owner is None
+
+
+def test_rebuild_takes_the_lease_over_from_the_projecting_worker(projector, sdr):
+    replay(projector, inbound_lifecycle())  # projector holds the lease
+    rebuilder = CallProjector(settle_seconds=0, batch_size=50)
+    rebuilder.owner = 'other-host:2'
+
+    assert rebuilder.rebuild()['calls'] == 1
+    assert_inbound_answered(call_row('CA_IN'))
+
+    # The old holder finds its lease gone, then takes it back on the next pass
+    journal('call_status', {**INBOUND, 'CallSid': 'CA_NEXT', 'CallStatus': 'completed'}, at(300))
+    assert projector.project_pending(settle_seconds=0)['projected'] == 0
+    assert projector.project_pending(settle_seconds=0)['projected'] == 1
+
+
+def test_rebuild_refuses_while_another_rebuild_runs(projector):
+    projector.project_pending(settle_seconds=0)  # Creates the checkpoint row
+    checkpoint = db.session.get(ProjectorCheckpoint, PROJECTOR_NAME)
+    checkpoint.lease_owner = 'other-host:2' + REBUILD_OWNER_SUFFIX
+    checkpoint.lease_expires_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    db.session.commit()
+
+    with pytest.raises(LeaseHeldError):
+        projector.rebuild()